@@ -9,19 +9,32 @@ Key Features:
 - Expose search functionality via HTTP endpoints
 - Handle request validation
 - Provide error handling and logging
+- Expose per-stage latency, token and cache metrics for Prometheus
 - Support cross-origin requests
 """
 
 import os
 import sys
+import json
+import atexit
 import logging
+import threading
+import concurrent.futures
 from typing import Dict, Any
 
 # Add parent directory to Python path
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from byob_search import BYOBTool
-from flask import Flask, request, jsonify, make_response
+from byob_async import AsyncBYOBRunner
+from byob_jobs import (
+    JobManager, QueueFullError, DEFAULT_JOB_WORKERS, DEFAULT_JOB_QUEUE_SIZE, DEFAULT_JOB_RETENTION
+)
+from byob_coalesce import (
+    ResponseCoalescer, response_key, DEFAULT_RESPONSE_CACHE_TTL, DEFAULT_RESPONSE_CACHE_MAX_ENTRIES
+)
+from byob_metrics import QueryTrace, get_registry
+from flask import Flask, Response, request, jsonify, make_response, stream_with_context
 from flask_cors import CORS, cross_origin
 from dotenv import load_dotenv
 
@@ -35,6 +48,15 @@ logger = logging.getLogger(__name__)
 # Load environment variables
 load_dotenv()
 
+# Response cache settings (a TTL of 0 turns the cache off; identical requests in flight are still shared)
+RESPONSE_CACHE_TTL = int(os.getenv('BYOB_RESPONSE_CACHE_TTL', DEFAULT_RESPONSE_CACHE_TTL))
+RESPONSE_CACHE_MAX_ENTRIES = int(os.getenv('BYOB_RESPONSE_CACHE_MAX_ENTRIES', DEFAULT_RESPONSE_CACHE_MAX_ENTRIES))
+
+# Search job settings (searches run at once, searches allowed to wait, seconds finished jobs are kept)
+JOB_WORKERS = int(os.getenv('BYOB_JOB_WORKERS', DEFAULT_JOB_WORKERS))
+JOB_QUEUE_SIZE = int(os.getenv('BYOB_JOB_QUEUE_SIZE', DEFAULT_JOB_QUEUE_SIZE))
+JOB_RETENTION = int(os.getenv('BYOB_JOB_RETENTION', DEFAULT_JOB_RETENTION))
+
 class BYOBBackend:
     """
     Backend service that manages BYOB web search functionality.
@@ -53,6 +75,24 @@ class BYOBBackend:
         # Initialize BYOB tool
         self.byob_tool = BYOBTool()
         
+        # Asynchronous engine, started on first use of the async search route
+        self.async_runner = None
+        self._async_runner_lock = threading.Lock()
+        
+        # Identical searches share one pipeline run, and finished answers are reused for a while
+        self.response_coalescer = ResponseCoalescer(
+            ttl_seconds=RESPONSE_CACHE_TTL,
+            max_entries=RESPONSE_CACHE_MAX_ENTRIES
+        )
+        
+        # Background search jobs, run by a fixed number of workers off a bounded queue
+        self.job_manager = JobManager(
+            self.byob_tool,
+            worker_count=JOB_WORKERS,
+            queue_size=JOB_QUEUE_SIZE,
+            retention_seconds=JOB_RETENTION
+        )
+        
         # Create Flask app
         self.app = Flask(__name__)
         
@@ -60,6 +100,7 @@ class BYOBBackend:
         CORS(self.app, resources={r"/*": {
             "origins": "*",
             "allow_headers": "*",
+            "expose_headers": ["X-Cache", "Age", "Location", "Retry-After"],
             "supports_credentials": True
         }})
         
@@ -73,9 +114,25 @@ class BYOBBackend:
         # Search endpoint with CORS
         self.app.route('/api/search', methods=['POST', 'OPTIONS'])(self.search)
         
+        # Streaming search endpoint (Server-Sent Events)
+        self.app.route('/api/search/stream', methods=['POST', 'OPTIONS'])(self.search_stream)
+        
+        # Search endpoint backed by the asynchronous engine
+        self.app.route('/api/search/async', methods=['POST', 'OPTIONS'])(self.search_async)
+        
+        # Background search jobs: submit, poll and cancel
+        self.app.route('/api/jobs', methods=['POST', 'OPTIONS'])(self.submit_job)
+        self.app.route('/api/jobs/<job_id>', methods=['GET', 'DELETE', 'OPTIONS'])(self.job)
+        
         # Health check endpoint with CORS
         self.app.route('/api/health', methods=['GET', 'OPTIONS'])(self.health_check)
         
+        # Connection pool statistics endpoint
+        self.app.route('/api/stats', methods=['GET', 'OPTIONS'])(self.stats)
+        
+        # Prometheus metrics endpoint
+        self.app.route('/api/metrics', methods=['GET', 'OPTIONS'])(self.metrics)
+        
         # Error handlers
         self.app.errorhandler(400)(self.bad_request)
         self.app.errorhandler(500)(self.server_error)
@@ -89,38 +146,340 @@ class BYOBBackend:
             return self._handle_cors_preflight()
         
         try:
-            # Parse request data
-            data = request.get_json()
+            # Parse and validate request data
+            search_request = self._parse_search_request()
+            if not isinstance(search_request, dict):
+                return search_request
             
-            # Validate input
-            if not data or 'query' not in data:
-                return self.bad_request("Missing search query")
+            # Log search request
+            logger.info(f"Processing search query: {search_request['query']}")
             
-            # Extract parameters
-            search_query = data['query']
-            site_filter = data.get('site_filter')
+            # Perform search, unless an identical one is cached or already running
+            search_response, cache_status, cache_age = self._run_coalesced(
+                search_request,
+                lambda query_trace: self.byob_tool.run(
+                    search_request['query'], 
+                    website_filter=search_request['site_filter'],
+                    recency=search_request['recency'],
+                    query_trace=query_trace,
+                    latency_budget=search_request['latency_budget'],
+                    summary_quorum=search_request['summary_quorum']
+                )
+            )
             
-            # Validate query
-            if not search_query or len(search_query) < 2:
-                return self.bad_request("Invalid search query")
+            # Return successful response
+            return self._with_cache_headers(
+                jsonify(self._response_body(search_response, search_request)), cache_status, cache_age
+            )
+        
+        except Exception as e:
+            # Log and handle unexpected errors
+            logger.error(f"Search error: {e}")
+            return self.server_error(str(e))
+    
+    def search_stream(self):
+        """
+        Handle web search requests, streaming progress as Server-Sent Events.
+        
+        Accepts the same payload as /api/search. Emits, in order:
+        'refined', one 'search_result' per hit, one 'summary' per page as it
+        finishes, 'answer_delta' fragments of the final answer, then 'done'
+        with the full result (or 'error' if something goes wrong). With
+        'include_metrics', a final 'metrics' event carries the per-stage breakdown.
+        """
+        # Handle preflight requests
+        if request.method == 'OPTIONS':
+            return self._handle_cors_preflight()
+        
+        # Parse and validate request data before any streaming starts
+        search_request = self._parse_search_request()
+        if not isinstance(search_request, dict):
+            return search_request
+        
+        logger.info(f"Processing streaming search query: {search_request['query']}")
+        
+        def generate_events():
+            query_trace = QueryTrace(search_request['query'])
+            try:
+                for event_name, event_data in self.byob_tool.run_stream(
+                    search_request['query'],
+                    website_filter=search_request['site_filter'],
+                    recency=search_request['recency'],
+                    query_trace=query_trace,
+                    latency_budget=search_request['latency_budget'],
+                    summary_quorum=search_request['summary_quorum']
+                ):
+                    yield self._format_sse(event_name, event_data)
+                if search_request['include_metrics']:
+                    yield self._format_sse('metrics', query_trace.summary())
+            except Exception as e:
+                logger.error(f"Streaming search error: {e}")
+                yield self._format_sse('error', {"error": "Internal Server Error", "message": str(e)})
+        
+        return Response(
+            stream_with_context(generate_events()),
+            mimetype='text/event-stream',
+            headers={
+                'Cache-Control': 'no-cache',
+                'X-Accel-Buffering': 'no'  # Stop reverse proxies such as nginx from buffering the stream
+            }
+        )
+    
+    @staticmethod
+    def _format_sse(event_name, event_data):
+        """
+        Encode one Server-Sent Event.
+        
+        :param event_name: Event type
+        :param event_data: JSON-serializable event payload
+        :return: SSE-formatted string
+        """
+        return f"event: {event_name}\ndata: {json.dumps(event_data)}\n\n"
+    
+    def search_async(self):
+        """
+        Handle web search requests using the asynchronous engine.
+        
+        Accepts the same payload as /api/search. All page downloads and
+        OpenAI calls for every in-flight query run on one shared event loop
+        and connection pool instead of on per-query worker threads.
+        A search that runs past its deadline is cancelled and answered
+        with 504.
+        """
+        # Handle preflight requests
+        if request.method == 'OPTIONS':
+            return self._handle_cors_preflight()
+        
+        try:
+            # Parse and validate request data
+            search_request = self._parse_search_request()
+            if not isinstance(search_request, dict):
+                return search_request
             
             # Log search request
-            logger.info(f"Processing search query: {search_query}")
+            logger.info(f"Processing async search query: {search_request['query']}")
             
-            # Perform search
-            search_response = self.byob_tool.run(
-                search_query, 
-                website_filter=site_filter
+            # Perform search on the background event loop, sharing results with /api/search
+            search_response, cache_status, cache_age = self._run_coalesced(
+                search_request,
+                lambda query_trace: self._get_async_runner().run(
+                    search_request['query'],
+                    website_filter=search_request['site_filter'],
+                    recency=search_request['recency'],
+                    query_trace=query_trace,
+                    latency_budget=search_request['latency_budget'],
+                    summary_quorum=search_request['summary_quorum']
+                )
             )
             
             # Return successful response
-            return jsonify(search_response)
+            return self._with_cache_headers(
+                jsonify(self._response_body(search_response, search_request)), cache_status, cache_age
+            )
+        
+        except concurrent.futures.TimeoutError:
+            # The query ran past its deadline and was cancelled
+            logger.error(f"Async search timed out: {search_request['query']}")
+            return make_response(jsonify({
+                "error": "Gateway Timeout",
+                "message": "The search did not finish within its deadline"
+            }), 504)
         
         except Exception as e:
             # Log and handle unexpected errors
-            logger.error(f"Search error: {e}")
+            logger.error(f"Async search error: {e}")
             return self.server_error(str(e))
     
+    def submit_job(self):
+        """
+        Queue a search as a background job.
+        
+        Accepts the same payload as /api/search and answers 202 with the job
+        id at once. If the queue is full the answer is 429 with a
+        Retry-After header, and the search is not queued.
+        """
+        # Handle preflight requests
+        if request.method == 'OPTIONS':
+            return self._handle_cors_preflight()
+        
+        # Parse and validate request data
+        search_request = self._parse_search_request()
+        if not isinstance(search_request, dict):
+            return search_request
+        
+        try:
+            search_job = self.job_manager.submit(
+                search_request['query'],
+                website_filter=search_request['site_filter'],
+                recency=search_request['recency'],
+                latency_budget=search_request['latency_budget'],
+                summary_quorum=search_request['summary_quorum']
+            )
+        except QueueFullError as e:
+            logger.warning(f"Search queue full, rejecting query: {search_request['query']}")
+            response = make_response(jsonify({
+                "error": "Too Many Requests",
+                "message": str(e),
+                "retry_after": e.retry_after
+            }), 429)
+            response.headers['Retry-After'] = str(e.retry_after)
+            return response
+        
+        logger.info(f"Queued search job {search_job.job_id}: {search_request['query']}")
+        status_url = f"/api/jobs/{search_job.job_id}"
+        response = make_response(jsonify({
+            "job_id": search_job.job_id,
+            "status": search_job.status,
+            "status_url": status_url
+        }), 202)
+        response.headers['Location'] = status_url
+        return response
+    
+    def job(self, job_id):
+        """
+        Report a search job's progress (GET) or cancel it (DELETE).
+        
+        :param job_id: Job id returned when the search was queued
+        """
+        # Handle preflight requests
+        if request.method == 'OPTIONS':
+            return self._handle_cors_preflight()
+        
+        if request.method == 'DELETE':
+            search_job = self.job_manager.cancel(job_id)
+            if search_job is not None:
+                logger.info(f"Cancelled search job {job_id}")
+        
+        job_snapshot = self.job_manager.snapshot(job_id)
+        if job_snapshot is None:
+            return make_response(jsonify({
+                "error": "Not Found",
+                "message": f"No search job {job_id} (finished jobs expire after {JOB_RETENTION} seconds)"
+            }), 404)
+        return jsonify(job_snapshot)
+    
+    def _run_coalesced(self, search_request, run_search):
+        """
+        Answer a search from the response cache, from an identical search in flight, or by running it.
+        
+        Responses without a final answer are not cached, so a failed OpenAI
+        call is retried by the next request. The per-stage breakdown of the
+        run is kept with the response under 'metrics' (see _response_body).
+        
+        :param search_request: Parsed search request
+        :param run_search: Function that runs the pipeline, recording its stages in the QueryTrace it is given
+        :return: Tuple of (search response, cache status, age in seconds)
+        """
+        def run_traced():
+            query_trace = QueryTrace(search_request['query'])
+            search_response = run_search(query_trace)
+            return {**search_response, 'metrics': query_trace.summary()}
+        
+        return self.response_coalescer.run(
+            response_key(
+                search_request['query'], search_request['site_filter'], search_request['recency'],
+                latency_budget=search_request['latency_budget'], summary_quorum=search_request['summary_quorum']
+            ),
+            run_traced,
+            recency=search_request['recency'],
+            bypass_cache='no-cache' in request.headers.get('Cache-Control', '').lower(),
+            is_cacheable=lambda search_response: bool(search_response.get('comprehensive_rag_response'))
+        )
+    
+    @staticmethod
+    def _response_body(search_response, search_request):
+        """
+        Drop the per-stage breakdown unless the client asked for it.
+        
+        A cached or shared response carries the breakdown of the run that
+        produced it (X-Cache says which).
+        
+        :param search_response: Search response from _run_coalesced
+        :param search_request: Parsed search request
+        :return: Dictionary to return to the client
+        """
+        if search_request['include_metrics']:
+            return search_response
+        return {key: value for key, value in search_response.items() if key != 'metrics'}
+    
+    @staticmethod
+    def _with_cache_headers(response, cache_status, cache_age):
+        """
+        Tell the client how its search was answered.
+        
+        :param response: Flask response
+        :param cache_status: 'HIT', 'MISS', 'COALESCED' or 'BYPASS'
+        :param cache_age: Seconds since the response was computed
+        :return: The response
+        """
+        response.headers['X-Cache'] = cache_status
+        response.headers['Age'] = str(int(cache_age))
+        return response
+    
+    def _parse_search_request(self):
+        """
+        Parse and validate the JSON body of a search request.
+        
+        :return: Dictionary with 'query', 'site_filter', 'recency', 'include_metrics', 'latency_budget'
+                 and 'summary_quorum', or an error response
+        """
+        # Parse request data
+        data = request.get_json()
+        
+        # Validate input
+        if not data or 'query' not in data:
+            return self.bad_request("Missing search query")
+        
+        # Extract parameters
+        search_query = data['query']
+        site_filter = data.get('site_filter')
+        recency = data.get('recency') or self.byob_tool.config['recency']
+        
+        # Validate query
+        if not search_query or len(search_query) < 2:
+            return self.bad_request("Invalid search query")
+        
+        # Optional latency budget (seconds) and summary quorum
+        latency_budget = data.get('latency_budget')
+        summary_quorum = data.get('summary_quorum')
+        if latency_budget is not None and (isinstance(latency_budget, bool) or not isinstance(latency_budget, (int, float))
+                                           or latency_budget <= 0):
+            return self.bad_request("latency_budget must be a positive number of seconds")
+        if summary_quorum is not None and (isinstance(summary_quorum, bool) or not isinstance(summary_quorum, int)
+                                           or summary_quorum < 0):
+            return self.bad_request("summary_quorum must be a non-negative integer")
+        
+        return {
+            'query': search_query,
+            'site_filter': site_filter,
+            'recency': recency,
+            'include_metrics': bool(data.get('include_metrics')),
+            'latency_budget': latency_budget,
+            'summary_quorum': summary_quorum
+        }
+    
+    def _get_async_runner(self):
+        """
+        Return the asynchronous engine, starting it on first use.
+        
+        :return: AsyncBYOBRunner instance
+        """
+        with self._async_runner_lock:
+            if self.async_runner is None:
+                self.async_runner = AsyncBYOBRunner()
+                # Close its connection pool and event loop when the server shuts down
+                atexit.register(self.close_async_runner)
+            return self.async_runner
+    
+    def close_async_runner(self):
+        """
+        Stop the asynchronous engine, if it was started.
+        """
+        with self._async_runner_lock:
+            if self.async_runner is not None:
+                self.async_runner.close()
+                self.async_runner = None
+    
     def _handle_cors_preflight(self):
         """
         Handle CORS preflight requests.
@@ -144,6 +503,51 @@ class BYOBBackend:
             "tool_initialized": self.byob_tool is not None
         })
     
+    def stats(self):
+        """
+        Report connection pool, page download, cache and rate limit statistics.
+        """
+        if request.method == 'OPTIONS':
+            return self._handle_cors_preflight()
+        
+        return jsonify({
+            "connection_pool": self.byob_tool.get_pool_stats(),
+            "async_connection_pool": self.async_runner.tool.get_pool_stats() if self.async_runner else None,
+            "page_downloads": self.byob_tool.get_fetch_stats(),
+            "async_page_downloads": self.async_runner.tool.get_fetch_stats() if self.async_runner else None,
+            "summary_input": self.byob_tool.get_relevance_stats(),
+            "answer_context": self.byob_tool.get_context_stats(),
+            "dedup": self.byob_tool.get_dedup_stats(),
+            "cache": self.byob_tool.get_cache_stats(),
+            "rate_limits": self.byob_tool.get_rate_limit_stats(),
+            "response_cache": self.response_coalescer.get_stats(),
+            "jobs": self.job_manager.get_stats()
+        })
+    
+    def metrics(self):
+        """
+        Report stage latency histograms and token, byte, cache and query counters in the Prometheus text format.
+        """
+        if request.method == 'OPTIONS':
+            return self._handle_cors_preflight()
+        
+        # Point-in-time values are read when scraped
+        metrics_registry = get_registry()
+        job_stats = self.job_manager.get_stats()
+        metrics_registry.set_gauge('byob_jobs_queued', job_stats['queued'], help_text='Search jobs waiting for a worker')
+        metrics_registry.set_gauge('byob_jobs_running', job_stats['running'], help_text='Search jobs running')
+        metrics_registry.set_gauge(
+            'byob_searches_in_flight', self.response_coalescer.get_stats()['in_flight'],
+            help_text='Distinct searches whose pipeline is running'
+        )
+        for service_name, limiter_stats in self.byob_tool.get_rate_limit_stats().items():
+            metrics_registry.set_gauge(
+                'byob_rate_limit_concurrency', limiter_stats['concurrency_limit'], {'service': service_name},
+                help_text='Calls allowed in flight at once (adapts to 429 responses)'
+            )
+        
+        return Response(metrics_registry.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
+    
     def bad_request(self, error=None):
         """
         Handle bad request errors.
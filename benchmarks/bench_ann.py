@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+"""
+BYOB (Bring Your Own Browser) Web Search Tool - Nearest-Neighbour Index Benchmark
+
+Compares the IVF index in byob_ann.py with exact brute-force search, so
+nlist / nprobe / compression can be picked for a given recall target. For
+every index setting it reports recall@k against the exact top k, median and
+95th percentile query latency, bytes per vector and build time.
+
+Runs on a local copy of the documents table (see byob_vector_store.py), or
+on synthetic clustered embeddings when no store is given.
+
+Usage:
+    python benchmarks/bench_ann.py
+    python benchmarks/bench_ann.py --store vector_store --compressions int8 pq --nprobe 4 8 16 32
+"""
+
+import argparse  # For command-line options
+import os        # For working with file paths
+import shutil    # For removing the temporary synthetic store
+import sys       # For adjusting the import path
+import tempfile  # For the synthetic store
+import time      # For timing
+
+import numpy as np  # For synthetic data and statistics
+
+# Add parent directory to Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from byob_ann import COMPRESSIONS, build_from_vector_store
+from byob_vector_store import VectorStore, normalize_rows
+
+
+def make_synthetic_store(store_dir, document_count, embedding_dim, cluster_count=200, seed=0):
+    """
+    Fill a store with clustered random embeddings (real embeddings are clustered by topic too).
+
+    :param store_dir: Directory for the store
+    :param document_count: Number of documents
+    :param embedding_dim: Embedding dimensions
+    :param cluster_count: Number of topics
+    :param seed: Random seed
+    :return: VectorStore
+    """
+    random_generator = np.random.default_rng(seed)
+    topic_centers = random_generator.standard_normal((cluster_count, embedding_dim)).astype(np.float32)
+    vector_store = VectorStore(store_dir, embedding_dim=embedding_dim)
+    for batch_start in range(0, document_count, 10000):
+        batch_size = min(10000, document_count - batch_start)
+        embeddings = topic_centers[random_generator.integers(0, cluster_count, batch_size)]
+        embeddings += 0.8 * random_generator.standard_normal((batch_size, embedding_dim)).astype(np.float32)
+        vector_store.add_documents((None, f"document {batch_start + offset}", embedding)
+                                   for offset, embedding in enumerate(embeddings))
+    return vector_store
+
+
+def make_queries(vector_store, query_count, seed=1):
+    """
+    Create queries near stored documents (like a question about an indexed page).
+
+    :param vector_store: VectorStore to sample from
+    :param query_count: Number of queries
+    :param seed: Random seed
+    :return: 2-D array of normalized queries
+    """
+    random_generator = np.random.default_rng(seed)
+    embeddings = vector_store.embeddings
+    sample_rows = np.sort(random_generator.choice(len(embeddings), query_count, replace=False))
+    queries = np.asarray(embeddings[sample_rows])
+    queries += 0.03 * random_generator.standard_normal(queries.shape).astype(np.float32)
+    return normalize_rows(queries)
+
+
+def exact_search(vector_store, queries, k):
+    """
+    Brute-force top k of every query, timed.
+
+    :param vector_store: VectorStore to search
+    :param queries: 2-D array of normalized queries
+    :param k: Number of neighbours
+    :return: Tuple of (list of id arrays, list of latencies in seconds)
+    """
+    embeddings, row_ids = vector_store.embeddings, vector_store.row_ids
+    exact_ids, latencies = [], []
+    for query_vector in queries:
+        start_time = time.perf_counter()
+        scores = embeddings @ query_vector
+        best_rows = np.argpartition(-scores, k - 1)[:k]
+        best_rows = best_rows[np.argsort(-scores[best_rows])]
+        latencies.append(time.perf_counter() - start_time)
+        exact_ids.append(row_ids[best_rows])
+    return exact_ids, latencies
+
+
+def benchmark_index(ivf_index, vector_store, queries, exact_ids, k, nprobe, rerank):
+    """
+    Measure recall and latency of one index at one nprobe.
+
+    :return: Tuple of (recall@k, list of latencies in seconds)
+    """
+    rerank_vectors = vector_store.embeddings if rerank else None
+    recalls, latencies = [], []
+    for query_vector, true_ids in zip(queries, exact_ids):
+        start_time = time.perf_counter()
+        result_ids, _ = ivf_index.search(query_vector, k=k, nprobe=nprobe, rerank_vectors=rerank_vectors)
+        latencies.append(time.perf_counter() - start_time)
+        recalls.append(len(set(result_ids.tolist()) & set(true_ids.tolist())) / k)
+    return float(np.mean(recalls)), latencies
+
+
+def main():
+    """
+    Run the benchmark and print a comparison table.
+    """
+    parser = argparse.ArgumentParser(description='Benchmark the BYOB IVF index against exact search.')
+    parser.add_argument('--store', help='VectorStore directory (default: synthetic embeddings)')
+    parser.add_argument('--documents', type=int, default=20000, help='Synthetic documents')
+    parser.add_argument('--dim', type=int, default=1536, help='Synthetic embedding dimensions')
+    parser.add_argument('--queries', type=int, default=100, help='Number of queries')
+    parser.add_argument('--k', type=int, default=10, help='Neighbours per query (recall@k)')
+    parser.add_argument('--nlist', type=int, help='Lists per index (default: about 4 * sqrt(training sample))')
+    parser.add_argument('--nprobe', type=int, nargs='+', default=[1, 4, 8, 16, 32], help='Lists scanned per query')
+    parser.add_argument('--compressions', nargs='+', default=list(COMPRESSIONS), choices=COMPRESSIONS)
+    parser.add_argument('--pq-subvector-dims', type=int, default=8, help='Dimensions per PQ code byte')
+    parser.add_argument('--training-sample', type=int, default=20000, help='Vectors used to train the index')
+    args = parser.parse_args()
+
+    synthetic_dir = None
+    if args.store:
+        vector_store = VectorStore(args.store)
+    else:
+        synthetic_dir = tempfile.mkdtemp(prefix='byob_bench_ann_')
+        vector_store = make_synthetic_store(synthetic_dir, args.documents, args.dim)
+    try:
+        queries = make_queries(vector_store, min(args.queries, len(vector_store)))
+        exact_ids, exact_latencies = exact_search(vector_store, queries, args.k)
+        print(f"{len(vector_store)} documents, {vector_store.embedding_dim} dims, {len(queries)} queries, k={args.k}")
+        print(f"exact: p50 {np.median(exact_latencies) * 1000:.2f} ms, "
+              f"{vector_store.embedding_dim * 4} bytes/vector\n")
+
+        header = (f"{'compression':<12}{'rerank':>7}{'nprobe':>8}{f'recall@{args.k}':>11}"
+                  f"{'p50 ms':>9}{'p95 ms':>9}{'bytes/vec':>11}{'build s':>9}")
+        print(header)
+        print('-' * len(header))
+        for compression in args.compressions:
+            start_time = time.perf_counter()
+            ivf_index = build_from_vector_store(
+                vector_store, nlist=args.nlist, compression=compression,
+                pq_subvector_dims=args.pq_subvector_dims, training_sample=args.training_sample
+            )
+            build_seconds = time.perf_counter() - start_time
+            bytes_per_vector = ivf_index.memory_bytes() / len(ivf_index)
+            for rerank in ([False, True] if compression != 'none' else [False]):
+                for nprobe in args.nprobe:
+                    recall, latencies = benchmark_index(
+                        ivf_index, vector_store, queries, exact_ids, args.k, nprobe, rerank
+                    )
+                    print(
+                        f"{compression:<12}{'yes' if rerank else 'no':>7}{nprobe:>8}{recall:>11.3f}"
+                        f"{np.median(latencies) * 1000:>9.2f}{np.percentile(latencies, 95) * 1000:>9.2f}"
+                        f"{bytes_per_vector:>11.0f}{build_seconds:>9.1f}"
+                    )
+    finally:
+        vector_store.close()
+        if synthetic_dir:
+            shutil.rmtree(synthetic_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,433 @@
+#!/usr/bin/env python3
+"""
+BYOB (Bring Your Own Browser) Web Search Tool - Offline End-to-End Benchmark
+
+Runs whole research queries against local stand-ins for Google Custom
+Search, webpages and OpenAI (benchmarks/stub_services.py, started in a
+separate process), so measurements cost nothing and are repeatable.
+
+Two targets can be driven, each at several concurrency levels:
+- tool: BYOBTool.run called from a thread pool
+- api: POST /api/search on an in-process BYOBBackend (needs Flask)
+
+For every target and concurrency it reports p50/p95/p99 latency,
+throughput, the process memory high-water mark, and the average time per
+query spent in each pipeline stage (from byob_metrics). Results are saved
+as JSON; pass an earlier file to --compare to spot regressions.
+
+Caches live in a temporary directory and every query is unique, so each
+run measures a cold pipeline.
+
+Usage:
+    python benchmarks/bench_e2e.py
+    python benchmarks/bench_e2e.py --targets tool api --concurrency 1 4 16 --queries 32
+    python benchmarks/bench_e2e.py --llm-latency 0.8 --jitter 0.5 --compare benchmarks/results/baseline.json
+"""
+
+import argparse    # For command-line options
+import contextlib  # For silencing pipeline output during measurements
+import io          # For silencing pipeline output during measurements
+import json        # For saving results
+import logging     # For silencing the backend's request log
+import os          # For environment variables and file paths
+import platform    # For recording the Python version
+import shutil      # For removing the temporary cache directory
+import subprocess  # For running the stub services and reading the git commit
+import sys         # For adjusting the import path
+import tempfile    # For the temporary cache directory
+import threading   # For running the backend server
+import time        # For timing
+from concurrent.futures import ThreadPoolExecutor  # For concurrent queries
+
+try:
+    import resource  # For the memory high-water mark (not available on Windows)
+except ImportError:
+    resource = None
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(BENCHMARKS_DIR)
+
+# Add parent directory (and the backend) to Python path
+sys.path.append(REPO_DIR)
+sys.path.append(os.path.join(REPO_DIR, 'backend'))
+
+# Where results are saved unless --output is given
+DEFAULT_RESULTS_DIR = os.path.join(BENCHMARKS_DIR, 'results')
+
+# Pipeline stages reported per query, in pipeline order
+REPORTED_STAGES = ('refine', 'search', 'fetch', 'parse', 'summarize', 'generate')
+
+# Metrics compared with --compare, and whether a higher value is worse
+COMPARED_METRICS = {
+    'latency_p50': True,
+    'latency_p95': True,
+    'latency_p99': True,
+    'throughput_qps': False
+}
+
+TOPICS = ('open source model releases', 'vector database benchmarks', 'AI agent frameworks', 'GPU pricing',
+          'context window research', 'inference optimization', 'AI regulation news', 'robotics foundation models')
+
+
+def percentile(values, fraction):
+    """
+    Nearest-rank percentile.
+
+    :param values: List of numbers
+    :param fraction: Percentile as a fraction, e.g. 0.95
+    :return: Value at that percentile (0.0 for an empty list)
+    """
+    if not values:
+        return 0.0
+    ordered_values = sorted(values)
+    rank = max(1, min(len(ordered_values), round(fraction * len(ordered_values) + 0.5)))
+    return ordered_values[rank - 1]
+
+
+def peak_rss_mb():
+    """
+    Memory high-water mark of this process so far (the stub services run separately).
+
+    :return: Megabytes, or None where it cannot be measured
+    """
+    if resource is None:
+        return None
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return max_rss / (1024 * 1024) if sys.platform == 'darwin' else max_rss / 1024
+
+
+def git_commit():
+    """
+    Commit of the code being benchmarked.
+
+    :return: Commit hash, or None outside a git checkout
+    """
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=REPO_DIR, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def start_stub_services(args):
+    """
+    Start the stub services in a separate process and wait until they answer.
+
+    :param args: Parsed command-line options
+    :return: Tuple of (subprocess.Popen, base URL)
+    """
+    stub_process = subprocess.Popen(
+        [
+            sys.executable, os.path.join(BENCHMARKS_DIR, 'stub_services.py'), '--port', '0',
+            '--search-latency', str(args.search_latency), '--page-latency', str(args.page_latency),
+            '--llm-latency', str(args.llm_latency), '--token-seconds', str(args.token_seconds),
+            '--jitter', str(args.jitter), '--page-kb', str(args.page_kb)
+        ],
+        stdout=subprocess.PIPE,
+        text=True
+    )
+    # The first line is 'Stub services listening on http://host:port'
+    ready_line = stub_process.stdout.readline().strip()
+    if not ready_line:
+        stub_process.kill()
+        raise RuntimeError("Stub services did not start")
+    return stub_process, ready_line.rsplit(' ', 1)[-1]
+
+
+def configure_environment(stub_url, cache_dir):
+    """
+    Point the BYOB tool at the stub services (must run before byob_search is imported).
+
+    :param stub_url: Base URL of the stub services
+    :param cache_dir: Directory for the local caches
+    """
+    os.environ['BYOB_GOOGLE_SEARCH_URL'] = f"{stub_url}/customsearch/v1"
+    os.environ['OPENAI_BASE_URL'] = f"{stub_url}/v1"
+    os.environ['OPENAI_API_KEY'] = 'stub-key'
+    os.environ['GOOGLE_API_KEY'] = 'stub-key'
+    os.environ['GOOGLE_CSE_ID'] = 'stub-cse'
+    os.environ['BYOB_CACHE_DIR'] = cache_dir
+    # Never send local traffic through a proxy configured in the environment
+    os.environ['NO_PROXY'] = ','.join(filter(None, [os.environ.get('NO_PROXY'), '127.0.0.1', 'localhost']))
+
+
+def make_queries(target_name, query_count, run_id):
+    """
+    Create unique queries, so no cache or coalescing shortcut applies.
+
+    :param target_name: Target the queries are for
+    :param query_count: Number of queries
+    :param run_id: Identifier of this benchmark run
+    :return: List of query strings
+    """
+    return [
+        f"{TOPICS[query_index % len(TOPICS)]} {target_name} {run_id} {query_index}"
+        for query_index in range(query_count)
+    ]
+
+
+class ToolTarget:
+    """
+    Runs queries by calling BYOBTool.run directly.
+    """
+    name = 'tool'
+
+    def __init__(self):
+        """
+        Create the tool.
+        """
+        from byob_search import BYOBTool
+        self.byob_tool = BYOBTool()
+
+    def run_query(self, search_query):
+        """
+        Run one query.
+
+        :param search_query: Query to run
+        :return: Tuple of (succeeded, per-query metrics summary)
+        """
+        from byob_metrics import QueryTrace
+        query_trace = QueryTrace(search_query)
+        search_response = self.byob_tool.run(search_query, query_trace=query_trace)
+        return bool(search_response.get('comprehensive_rag_response')), query_trace.summary(include_spans=False)
+
+    def close(self):
+        """
+        Nothing to shut down.
+        """
+
+
+class ApiTarget:
+    """
+    Runs queries through POST /api/search on an in-process BYOBBackend.
+    """
+    name = 'api'
+
+    def __init__(self, concurrency):
+        """
+        Start the backend on a free local port.
+
+        :param concurrency: Largest number of requests that will be in flight
+        """
+        import requests
+        from requests.adapters import HTTPAdapter
+        from werkzeug.serving import make_server
+        from byob_api import BYOBBackend
+
+        logging.getLogger('byob_api').setLevel(logging.WARNING)
+        logging.getLogger('werkzeug').setLevel(logging.WARNING)
+        self.backend = BYOBBackend()
+        self.server = make_server('127.0.0.1', 0, self.backend.app, threaded=True)
+        self.server_thread = threading.Thread(target=self.server.serve_forever, name='byob-bench-api', daemon=True)
+        self.server_thread.start()
+        self.search_url = f"http://127.0.0.1:{self.server.server_port}/api/search"
+
+        self.session = requests.Session()
+        self.session.trust_env = False
+        self.session.mount('http://', HTTPAdapter(pool_maxsize=max(concurrency, 10)))
+
+    def run_query(self, search_query):
+        """
+        Run one query.
+
+        :param search_query: Query to run
+        :return: Tuple of (succeeded, per-query metrics summary)
+        """
+        api_response = self.session.post(self.search_url, json={'query': search_query, 'include_metrics': True})
+        if api_response.status_code != 200:
+            return False, None
+        search_response = api_response.json()
+        return bool(search_response.get('comprehensive_rag_response')), search_response.get('metrics')
+
+    def close(self):
+        """
+        Stop the backend server.
+        """
+        self.server.shutdown()
+        self.session.close()
+
+
+def run_scenario(target, queries, concurrency, verbose=False):
+    """
+    Run a list of queries against a target with a fixed number in flight.
+
+    :param target: ToolTarget or ApiTarget
+    :param queries: Queries to run
+    :param concurrency: Number of queries in flight at once
+    :param verbose: Show the pipeline's own output
+    :return: Dictionary of results
+    """
+    def timed_query(search_query):
+        started_at = time.perf_counter()
+        try:
+            succeeded, query_metrics = target.run_query(search_query)
+        except Exception as query_error:
+            print(f"Query failed: {query_error}", file=sys.stderr)
+            succeeded, query_metrics = False, None
+        return time.perf_counter() - started_at, succeeded, query_metrics
+
+    output_sink = contextlib.nullcontext() if verbose else contextlib.redirect_stdout(io.StringIO())
+    with output_sink:
+        started_at = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as query_pool:
+            query_outcomes = list(query_pool.map(timed_query, queries))
+        wall_seconds = time.perf_counter() - started_at
+
+    latencies = [latency for latency, succeeded, _ in query_outcomes if succeeded]
+    query_summaries = [query_metrics for _, _, query_metrics in query_outcomes if query_metrics]
+    stage_seconds = {
+        stage: sum(summary['stages'].get(stage, {}).get('seconds', 0.0) for summary in query_summaries)
+        / len(query_summaries)
+        for stage in REPORTED_STAGES
+    } if query_summaries else {}
+    return {
+        'target': target.name,
+        'concurrency': concurrency,
+        'queries': len(queries),
+        'errors': len(queries) - len(latencies),
+        'wall_seconds': round(wall_seconds, 3),
+        'throughput_qps': round(len(latencies) / wall_seconds, 3) if wall_seconds else 0.0,
+        'latency_mean': round(sum(latencies) / len(latencies), 3) if latencies else 0.0,
+        'latency_p50': round(percentile(latencies, 0.50), 3),
+        'latency_p95': round(percentile(latencies, 0.95), 3),
+        'latency_p99': round(percentile(latencies, 0.99), 3),
+        'peak_rss_mb': round(peak_rss_mb(), 1) if resource is not None else None,
+        'stage_seconds': {stage: round(seconds, 3) for stage, seconds in stage_seconds.items()},
+        'prompt_tokens_per_query': round(
+            sum(summary['prompt_tokens'] for summary in query_summaries) / len(query_summaries)
+        ) if query_summaries else 0
+    }
+
+
+def print_results(results):
+    """
+    Print the results as a table.
+
+    :param results: List of scenario result dictionaries
+    """
+    # Stage columns are the average seconds one query spent in each stage (stages overlap)
+    stage_header = ' '.join(f"{stage:>9}" for stage in REPORTED_STAGES)
+    print(f"{'target':<6} {'conc':>4} {'ok':>7} {'q/s':>7} {'p50 s':>7} {'p95 s':>7} {'p99 s':>7} {'rss MB':>7} | "
+          f"{stage_header}")
+    for result in results:
+        succeeded = f"{result['queries'] - result['errors']}/{result['queries']}"
+        peak_memory = f"{result['peak_rss_mb']:>7.0f}" if result['peak_rss_mb'] is not None else f"{'n/a':>7}"
+        stage_values = ' '.join(f"{result['stage_seconds'].get(stage, 0.0):>9.2f}" for stage in REPORTED_STAGES)
+        print(f"{result['target']:<6} {result['concurrency']:>4} {succeeded:>7} {result['throughput_qps']:>7.2f} "
+              f"{result['latency_p50']:>7.2f} {result['latency_p95']:>7.2f} {result['latency_p99']:>7.2f} "
+              f"{peak_memory} | {stage_values}")
+
+
+def compare_results(results, settings, baseline_path, tolerance):
+    """
+    Compare results with an earlier run and print the changes.
+
+    :param results: List of scenario result dictionaries
+    :param settings: Settings of this run (a warning is printed if the baseline used others)
+    :param baseline_path: JSON file saved by an earlier run
+    :param tolerance: Fractional change treated as a regression (e.g. 0.1 for 10%)
+    :return: Number of regressions found
+    """
+    with open(baseline_path, encoding='utf-8') as baseline_file:
+        baseline = json.load(baseline_file)
+    baseline_results = {
+        (result['target'], result['concurrency']): result for result in baseline['results']
+    }
+    print(f"\nCompared with {baseline_path} (commit {baseline.get('git_commit')}):")
+    if baseline.get('settings') != settings:
+        print(f"  Warning: the baseline used different settings: {baseline.get('settings')}")
+    regressions = 0
+    for result in results:
+        baseline_result = baseline_results.get((result['target'], result['concurrency']))
+        if baseline_result is None:
+            continue
+        changes = []
+        for metric_name, higher_is_worse in COMPARED_METRICS.items():
+            before, after = baseline_result[metric_name], result[metric_name]
+            change = (after - before) / before if before else 0.0
+            regressed = change > tolerance if higher_is_worse else change < -tolerance
+            regressions += regressed
+            changes.append(f"{metric_name} {before:.2f} -> {after:.2f} ({change:+.0%}){' REGRESSION' if regressed else ''}")
+        print(f"  {result['target']} x{result['concurrency']}: " + '; '.join(changes))
+    return regressions
+
+
+def main():
+    """
+    Run the benchmark from the command line.
+    """
+    parser = argparse.ArgumentParser(description='Benchmark the BYOB pipeline end to end against local stubs.')
+    parser.add_argument('--targets', nargs='+', choices=('tool', 'api'), default=['tool'],
+                        help='What to drive: BYOBTool.run and/or the /api/search route')
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 4, 8], help='Queries in flight')
+    parser.add_argument('--queries', type=int, default=16, help='Queries per target and concurrency level')
+    parser.add_argument('--warmup', type=int, default=1, help='Untimed queries per target (opens connections)')
+    parser.add_argument('--search-latency', type=float, default=0.3, help='Median seconds per search request')
+    parser.add_argument('--page-latency', type=float, default=0.25, help='Median seconds before a page arrives')
+    parser.add_argument('--llm-latency', type=float, default=0.5, help='Median seconds to the first OpenAI token')
+    parser.add_argument('--token-seconds', type=float, default=0.01, help='Seconds per generated token')
+    parser.add_argument('--jitter', type=float, default=0.3, help='Lognormal sigma of every latency (0 = fixed)')
+    parser.add_argument('--page-kb', type=int, default=60, help='Size of generated pages in kilobytes')
+    parser.add_argument('--output', help='Where to save the results (default: benchmarks/results/)')
+    parser.add_argument('--compare', help='Results file of an earlier run to compare against')
+    parser.add_argument('--tolerance', type=float, default=0.1,
+                        help='Change in latency or throughput reported as a regression (fraction)')
+    parser.add_argument('--fail-on-regression', action='store_true', help='Exit with status 1 on a regression')
+    parser.add_argument('--verbose', action='store_true', help="Show the pipeline's own output")
+    args = parser.parse_args()
+
+    stub_process, stub_url = start_stub_services(args)
+    cache_dir = tempfile.mkdtemp(prefix='byob_bench_e2e_')
+    configure_environment(stub_url, cache_dir)
+    run_id = time.strftime('%Y%m%d%H%M%S')
+    results = []
+    try:
+        for target_name in args.targets:
+            target = ToolTarget() if target_name == 'tool' else ApiTarget(max(args.concurrency))
+            try:
+                if args.warmup:
+                    run_scenario(target, make_queries(f"{target_name}-warmup", args.warmup, run_id), 1, args.verbose)
+                for concurrency in args.concurrency:
+                    results.append(run_scenario(
+                        target, make_queries(f"{target_name}-c{concurrency}", args.queries, run_id),
+                        concurrency, args.verbose
+                    ))
+            finally:
+                target.close()
+    finally:
+        stub_process.terminate()
+        stub_process.wait()
+        shutil.rmtree(cache_dir, ignore_errors=True)
+
+    print_results(results)
+
+    benchmark_record = {
+        'benchmark': 'bench_e2e',
+        'created_at': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        'git_commit': git_commit(),
+        'python': platform.python_version(),
+        'settings': {
+            setting_name: getattr(args, setting_name)
+            for setting_name in ('queries', 'warmup', 'search_latency', 'page_latency', 'llm_latency',
+                                 'token_seconds', 'jitter', 'page_kb')
+        },
+        'results': results
+    }
+    output_path = args.output or os.path.join(
+        DEFAULT_RESULTS_DIR, f"bench_e2e_{run_id}_{benchmark_record['git_commit'] or 'nogit'}.json"
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
+    with open(output_path, 'w', encoding='utf-8') as output_file:
+        json.dump(benchmark_record, output_file, indent=2)
+    print(f"\nSaved results to {output_path}")
+
+    if args.compare:
+        regressions = compare_results(results, benchmark_record['settings'], args.compare, args.tolerance)
+        if regressions and args.fail_on_regression:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+BYOB (Bring Your Own Browser) Web Search Tool - Text Extraction Benchmark
+
+Compares the HTML-to-text extraction engines in byob_extract.py on a corpus
+of saved webpages. For every engine and character budget it reports the
+median time per page, throughput, peak memory and how much text came out.
+
+Usage:
+    python benchmarks/bench_extract.py
+    python benchmarks/bench_extract.py --corpus path/to/saved/pages --budgets 2000 50000 --repeat 20
+"""
+
+import argparse     # For command-line options
+import glob         # For finding saved pages
+import os           # For working with file paths
+import statistics   # For median timings
+import sys          # For adjusting the import path
+import time         # For timing
+import tracemalloc  # For measuring peak memory
+
+# Add parent directory to Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from byob_extract import EXTRACTORS, get_extractor
+
+# Saved pages shipped with the repository
+DEFAULT_CORPUS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'pages')
+
+
+def load_corpus(corpus_dir):
+    """
+    Read every saved page in a directory.
+
+    :param corpus_dir: Directory containing .html / .htm files
+    :return: Dictionary of {file name: HTML text}
+    """
+    corpus = {}
+    for page_path in sorted(glob.glob(os.path.join(corpus_dir, '*.htm*'))):
+        with open(page_path, encoding='utf-8', errors='replace') as page_file:
+            corpus[os.path.basename(page_path)] = page_file.read()
+    return corpus
+
+
+def benchmark_engine(engine_name, corpus, max_chars, repeat, prefer_main_content=False):
+    """
+    Time one extraction engine over the whole corpus.
+
+    :param engine_name: Name of the engine in byob_extract.EXTRACTORS
+    :param corpus: Dictionary of {file name: HTML text}
+    :param max_chars: Character budget passed to the engine
+    :param repeat: Number of timed runs per page
+    :param prefer_main_content: Ask the engine to keep only the main content
+    :return: Dictionary of benchmark results
+    """
+    extractor = get_extractor(engine_name, prefer_main_content=prefer_main_content)
+    page_timings = []
+    peak_memory = 0
+    extracted_chars = 0
+
+    for webpage_html in corpus.values():
+        # Measure memory on a separate, untimed run so tracing does not skew timings
+        tracemalloc.start()
+        extracted_chars += len(extractor.extract(webpage_html, max_chars))
+        peak_memory = max(peak_memory, tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+
+        run_timings = []
+        for _ in range(repeat):
+            start_time = time.perf_counter()
+            extractor.extract(webpage_html, max_chars)
+            run_timings.append(time.perf_counter() - start_time)
+        page_timings.append(statistics.median(run_timings))
+
+    total_bytes = sum(len(webpage_html.encode('utf-8')) for webpage_html in corpus.values())
+    total_seconds = sum(page_timings)
+    return {
+        'engine': engine_name + (' (main content)' if prefer_main_content else ''),
+        'max_chars': max_chars,
+        'median_ms_per_page': statistics.median(page_timings) * 1000,
+        'mb_per_second': total_bytes / total_seconds / 1e6 if total_seconds else float('inf'),
+        'peak_memory_kb': peak_memory / 1024,
+        'avg_chars': extracted_chars / len(corpus)
+    }
+
+
+def main():
+    """
+    Run the benchmark and print a comparison table.
+    """
+    parser = argparse.ArgumentParser(description='Benchmark BYOB HTML-to-text extraction engines.')
+    parser.add_argument('--corpus', default=DEFAULT_CORPUS_DIR, help='Directory of saved .html pages')
+    parser.add_argument('--budgets', type=int, nargs='+', default=[2000, 50000],
+                        help='Character budgets (max_content_chars) to test')
+    parser.add_argument('--repeat', type=int, default=10, help='Timed runs per page')
+    args = parser.parse_args()
+
+    corpus = load_corpus(args.corpus)
+    if not corpus:
+        print(f"No saved pages found in {args.corpus}")
+        return
+    corpus_bytes = sum(len(webpage_html.encode('utf-8')) for webpage_html in corpus.values())
+    print(f"Corpus: {len(corpus)} pages, {corpus_bytes / 1024:.0f} KB from {args.corpus}\n")
+
+    header = f"{'engine':<28}{'budget':>8}{'ms/page':>10}{'MB/s':>8}{'peak KB':>10}{'avg chars':>11}"
+    print(header)
+    print('-' * len(header))
+    for max_chars in args.budgets:
+        runs = [(engine_name, False) for engine_name in EXTRACTORS] + [('streaming', True)]
+        for engine_name, prefer_main_content in runs:
+            result = benchmark_engine(engine_name, corpus, max_chars, args.repeat, prefer_main_content)
+            print(
+                f"{result['engine']:<28}{result['max_chars']:>8}{result['median_ms_per_page']:>10.2f}"
+                f"{result['mb_per_second']:>8.1f}{result['peak_memory_kb']:>10.0f}{result['avg_chars']:>11.0f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+BYOB (Bring Your Own Browser) Web Search Tool - Embedding Ingestion Benchmark
+
+Compares one-document-per-request ingestion (what regenerate_embeddings.js
+does) with the packed, concurrent pipeline in byob_ingest.py. The embeddings
+API is simulated with the offline embedder plus a fixed per-request latency,
+and documents go into a local SQLite table, so no network is needed.
+
+For every setting it reports documents per second, the number of requests,
+and the projected time to re-embed 100k documents.
+
+Usage:
+    python benchmarks/bench_ingest.py
+    python benchmarks/bench_ingest.py --documents 20000 --latency 0.3 --concurrency 1 4 8
+"""
+
+import argparse  # For command-line options
+import os        # For working with file paths
+import random    # For synthetic documents
+import shutil    # For removing the temporary tables
+import sys       # For adjusting the import path
+import tempfile  # For the temporary tables
+import time      # For simulated latency
+
+# Add parent directory to Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from byob_ingest import IngestCheckpoint, IngestionPipeline, LocalDocumentTable, offline_embedder
+
+WORDS = ('model', 'release', 'benchmark', 'agent', 'search', 'vector', 'token', 'latency', 'cost', 'update',
+         'research', 'paper', 'open', 'source', 'training', 'inference', 'data', 'context', 'window', 'tool')
+
+
+def make_documents(document_count, seed=0):
+    """
+    Create synthetic documents of 50-400 words.
+
+    :param document_count: Number of documents
+    :param seed: Random seed
+    :return: List of (id, content)
+    """
+    random_generator = random.Random(seed)
+    return [
+        (document_id, ' '.join(random_generator.choice(WORDS) for _ in range(random_generator.randint(50, 400))))
+        for document_id in range(1, document_count + 1)
+    ]
+
+
+def make_embedder(latency, dimensions):
+    """
+    Create a simulated embeddings API with a fixed round-trip time per request.
+
+    :param latency: Seconds per request
+    :param dimensions: Embedding dimensions
+    :return: Embedder function
+    """
+    def embed(texts):
+        time.sleep(latency)
+        return offline_embedder(texts, dimensions=dimensions)
+    return embed
+
+
+def run_setting(work_dir, documents, latency, dimensions, concurrency, max_inputs):
+    """
+    Ingest the documents into a fresh table with one pipeline setting.
+
+    :param work_dir: Directory for the table and checkpoint
+    :param documents: List of (id, content)
+    :param latency: Simulated seconds per request
+    :param dimensions: Embedding dimensions
+    :param concurrency: Requests in flight at the same time
+    :param max_inputs: Documents per request
+    :return: Pipeline statistics
+    """
+    setting_dir = tempfile.mkdtemp(dir=work_dir)
+    target = LocalDocumentTable(os.path.join(setting_dir, 'documents.sqlite'))
+    checkpoint = IngestCheckpoint(os.path.join(setting_dir, 'checkpoint.sqlite'))
+    pipeline = IngestionPipeline(
+        make_embedder(latency, dimensions), target, checkpoint,
+        max_concurrent_requests=concurrency, max_inputs=max_inputs,
+        upsert_batch_size=1 if max_inputs == 1 else 1000
+    )
+    ingest_stats = pipeline.run(documents)
+    target.close()
+    checkpoint.close()
+    return ingest_stats
+
+
+def main():
+    """
+    Run the benchmark from the command line.
+    """
+    parser = argparse.ArgumentParser(description='Benchmark bulk embedding ingestion.')
+    parser.add_argument('--documents', type=int, default=5000, help='Number of synthetic documents')
+    parser.add_argument('--latency', type=float, default=0.2, help='Simulated seconds per embeddings request')
+    parser.add_argument('--dim', type=int, default=64, help='Embedding dimensions (small keeps the run CPU-light)')
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 4, 8], help='Requests in flight')
+    parser.add_argument('--baseline-documents', type=int, default=50,
+                        help='Documents used for the one-per-request baseline (it is slow)')
+    args = parser.parse_args()
+
+    documents = make_documents(args.documents)
+    work_dir = tempfile.mkdtemp(prefix='byob_bench_ingest_')
+    try:
+        print(f"{'setting':<28} {'docs':>7} {'requests':>9} {'docs/s':>9} {'100k docs':>10}")
+        settings = [('1 per request, sequential', documents[:args.baseline_documents], 1, 1)]
+        settings += [(f"packed, concurrency {concurrency}", documents, concurrency, 2048)
+                     for concurrency in args.concurrency]
+        for setting_name, setting_documents, concurrency, max_inputs in settings:
+            ingest_stats = run_setting(work_dir, setting_documents, args.latency, args.dim, concurrency, max_inputs)
+            documents_per_second = ingest_stats['embedded'] / ingest_stats['seconds']
+            print(f"{setting_name:<28} {ingest_stats['embedded']:>7} {ingest_stats['requests']:>9} "
+                  f"{documents_per_second:>9.0f} {100000 / documents_per_second / 60:>8.1f}m")
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,390 @@
+#!/usr/bin/env python3
+"""
+BYOB (Bring Your Own Browser) Web Search Tool - Local Stub Services
+
+Stand-ins for every external service a research query talks to, so the
+whole pipeline can be benchmarked offline, for free and with repeatable
+latency:
+- GET /customsearch/v1: Google Custom Search JSON results
+- GET /pages/<name>: the saved pages in benchmarks/pages
+- GET /synthetic/<id>: generated article pages (a query needs more distinct
+  pages than are saved, and copies would be skipped as duplicates)
+- POST /v1/chat/completions: an OpenAI-compatible chat endpoint, including
+  streamed responses and 'usage' token counts
+
+Every response waits a lognormally distributed time around a configurable
+median, so runs see realistic tail latency. Answers are derived from the
+request, so identical runs get identical pages and completions.
+
+Usage:
+    python benchmarks/stub_services.py --port 8765
+    python benchmarks/stub_services.py --port 8765 --llm-latency 0.8 --jitter 0.5
+
+Point BYOBTool at it with:
+    BYOB_GOOGLE_SEARCH_URL=http://127.0.0.1:8765/customsearch/v1
+    OPENAI_BASE_URL=http://127.0.0.1:8765/v1
+"""
+
+import argparse  # For command-line options
+import glob      # For finding saved pages
+import hashlib   # For deterministic per-request randomness
+import json      # For API responses
+import math      # For lognormal latency
+import os        # For working with file paths
+import random    # For latency jitter and generated text
+import time      # For simulated latency
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer  # For the stub server
+from urllib.parse import parse_qs, quote, urlsplit  # For reading requests and building result links
+
+# Saved pages shipped with the repository
+DEFAULT_PAGES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'pages')
+
+# Default latency settings (medians, in seconds)
+DEFAULT_SEARCH_LATENCY = 0.3  # Google Custom Search round trip
+DEFAULT_PAGE_LATENCY = 0.25  # Time to first byte of a webpage
+DEFAULT_LLM_LATENCY = 0.5  # Time to first token of a chat completion
+DEFAULT_TOKEN_SECONDS = 0.01  # Time per generated token
+DEFAULT_JITTER = 0.3  # Lognormal sigma; 0 makes every latency exactly the median
+DEFAULT_SYNTHETIC_PAGE_KB = 60  # Size of generated pages
+
+# Rough characters per token, matching byob_relevance.CHARS_PER_TOKEN
+CHARS_PER_TOKEN = 4
+
+WORDS = ('model', 'release', 'benchmark', 'agent', 'search', 'vector', 'token', 'latency', 'cost', 'update',
+         'research', 'paper', 'open', 'source', 'training', 'inference', 'data', 'context', 'window', 'tool',
+         'the', 'a', 'of', 'and', 'in', 'for', 'with', 'new', 'week', 'team', 'results', 'users', 'faster')
+
+
+def seeded_random(*parts):
+    """
+    Create a random generator seeded from request details, so answers repeat across runs.
+
+    :param parts: Values identifying the request
+    :return: random.Random
+    """
+    digest = hashlib.sha256('\x1f'.join(str(part) for part in parts).encode('utf-8')).digest()
+    return random.Random(int.from_bytes(digest[:8], 'big'))
+
+
+def make_words(random_generator, word_count):
+    """
+    Generate filler text.
+
+    :param random_generator: random.Random to draw words from
+    :param word_count: Number of words
+    :return: Text
+    """
+    return ' '.join(random_generator.choice(WORDS) for _ in range(word_count))
+
+
+def make_synthetic_page(page_id, size_kb):
+    """
+    Generate an article page with the boilerplate real pages carry (navigation, scripts, footer).
+
+    :param page_id: Page identifier (seeds the content)
+    :param size_kb: Approximate page size in kilobytes
+    :return: HTML text
+    """
+    random_generator = seeded_random('page', page_id)
+    navigation = ''.join(f'<li><a href="/section/{index}">{make_words(random_generator, 2)}</a></li>'
+                         for index in range(40))
+    script = '<script>window.analytics = ' + json.dumps(
+        {f'key{index}': make_words(random_generator, 5) for index in range(200)}
+    ) + ';</script>'
+    paragraphs = []
+    page_size = len(navigation) + len(script)
+    while page_size < size_kb * 1024:
+        paragraph = f'<p>{make_words(random_generator, random_generator.randint(40, 120))}.</p>'
+        paragraphs.append(paragraph)
+        page_size += len(paragraph)
+    title = make_words(random_generator, 6)
+    return (
+        f'<!DOCTYPE html><html><head><meta charset="utf-8"><title>{title}</title>{script}</head>'
+        f'<body><nav><ul>{navigation}</ul></nav><main><article><h1>{title}</h1>{"".join(paragraphs)}'
+        f'</article></main><footer>{make_words(random_generator, 60)}</footer></body></html>'
+    )
+
+
+class StubServices:
+    """
+    Settings and content shared by every request handler.
+    """
+
+    def __init__(self, pages_dir=DEFAULT_PAGES_DIR, search_latency=DEFAULT_SEARCH_LATENCY,
+                 page_latency=DEFAULT_PAGE_LATENCY, llm_latency=DEFAULT_LLM_LATENCY,
+                 token_seconds=DEFAULT_TOKEN_SECONDS, jitter=DEFAULT_JITTER,
+                 synthetic_page_kb=DEFAULT_SYNTHETIC_PAGE_KB):
+        """
+        Load the saved pages.
+
+        :param pages_dir: Directory of saved .html pages
+        :param search_latency: Median seconds per search request
+        :param page_latency: Median seconds before a page starts arriving
+        :param llm_latency: Median seconds before the first completion token
+        :param token_seconds: Seconds per generated token
+        :param jitter: Lognormal sigma of every latency
+        :param synthetic_page_kb: Size of generated pages in kilobytes
+        """
+        self.saved_pages = {}
+        for page_path in sorted(glob.glob(os.path.join(pages_dir, '*.htm*'))):
+            with open(page_path, 'rb') as page_file:
+                self.saved_pages[os.path.basename(page_path)] = page_file.read()
+        self.search_latency = search_latency
+        self.page_latency = page_latency
+        self.llm_latency = llm_latency
+        self.token_seconds = token_seconds
+        self.jitter = jitter
+        self.synthetic_page_kb = synthetic_page_kb
+        self._random = random.Random()
+
+    def wait(self, median_seconds):
+        """
+        Sleep for a lognormally distributed time.
+
+        :param median_seconds: Median of the distribution
+        """
+        if median_seconds <= 0:
+            return
+        delay = median_seconds if not self.jitter else self._random.lognormvariate(math.log(median_seconds),
+                                                                                   self.jitter)
+        time.sleep(delay)
+
+
+def _completion_text(messages, model):
+    """
+    Write a completion that fits the request: a short search term for refinement, otherwise prose.
+
+    :param messages: Chat messages of the request
+    :param model: Requested model
+    :return: Completion text
+    """
+    system_prompt = next((message['content'] for message in messages if message['role'] == 'system'), '')
+    user_content = next((message['content'] for message in messages if message['role'] == 'user'), '')
+    random_generator = seeded_random(model, system_prompt, user_content[:2000])
+    if 'search term' in system_prompt:
+        return make_words(random_generator, 4)
+    if 'summariz' in system_prompt:
+        return make_words(random_generator, random_generator.randint(80, 150)) + '.'
+    return make_words(random_generator, random_generator.randint(350, 600)) + '.'
+
+
+class StubRequestHandler(BaseHTTPRequestHandler):
+    """
+    Routes requests to the stand-in services.
+    """
+    protocol_version = 'HTTP/1.1'  # Keep-alive, like the real services
+    stubs = None  # StubServices, set by serve()
+
+    def log_message(self, format, *args):
+        """
+        Stay quiet; the benchmark prints its own report.
+        """
+
+    def _send_json(self, payload, status_code=200):
+        """
+        Send a JSON response.
+
+        :param payload: JSON-serializable body
+        :param status_code: HTTP status code
+        """
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(status_code)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        """
+        Serve search results, pages and the health check.
+        """
+        url_parts = urlsplit(self.path)
+        if url_parts.path == '/health':
+            self._send_json({'status': 'ok'})
+        elif url_parts.path == '/customsearch/v1':
+            self._search(parse_qs(url_parts.query))
+        elif url_parts.path.startswith('/pages/'):
+            page_html = self.stubs.saved_pages.get(url_parts.path[len('/pages/'):])
+            if page_html is None:
+                self._send_json({'error': 'not found'}, 404)
+            else:
+                self._send_page(page_html)
+        elif url_parts.path.startswith('/synthetic/'):
+            page_id = url_parts.path[len('/synthetic/'):] + '?' + url_parts.query
+            self._send_page(make_synthetic_page(page_id, self.stubs.synthetic_page_kb).encode('utf-8'))
+        else:
+            self._send_json({'error': 'not found'}, 404)
+
+    def do_POST(self):
+        """
+        Serve chat completions.
+        """
+        request_body = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b'{}')
+        if urlsplit(self.path).path != '/v1/chat/completions':
+            self._send_json({'error': {'message': 'not found'}}, 404)
+        elif request_body.get('stream'):
+            self._stream_completion(request_body)
+        else:
+            self._completion(request_body)
+
+    def _search(self, query_params):
+        """
+        Answer a Custom Search request: the saved pages first, then generated ones
+        (later pages of results are requested with 'start').
+
+        Links carry the query, so every query downloads its own pages (as with real, distinct results).
+
+        :param query_params: Parsed query string
+        """
+        self.stubs.wait(self.stubs.search_latency)
+        search_query = query_params.get('q', [''])[0]
+        result_count = min(int(query_params.get('num', ['10'])[0]), 10)
+        start_index = int(query_params.get('start', ['1'])[0])
+        base_url = f"http://{self.headers.get('Host')}"
+        saved_names = list(self.stubs.saved_pages)
+        items = []
+        # Like Google, pages run out at the 100th result
+        for result_index in range(start_index - 1, min(start_index - 1 + result_count, 100)):
+            if result_index < len(saved_names):
+                link = f"{base_url}/pages/{saved_names[result_index]}?q={quote(search_query)}"
+            else:
+                link = f"{base_url}/synthetic/{result_index}?q={quote(search_query)}"
+            items.append({
+                'title': f"Result {result_index + 1} for {search_query}",
+                'link': link,
+                'snippet': f"Snippet {result_index + 1} about {search_query}"
+            })
+        self._send_json({'kind': 'customsearch#search', 'items': items})
+
+    def _send_page(self, page_html):
+        """
+        Send a webpage after the time-to-first-byte delay.
+
+        :param page_html: Page bytes
+        """
+        self.stubs.wait(self.stubs.page_latency)
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/html; charset=utf-8')
+        self.send_header('Content-Length', str(len(page_html)))
+        self.end_headers()
+        self.wfile.write(page_html)
+
+    def _completion(self, request_body):
+        """
+        Answer a non-streamed chat completion, with usage counts.
+
+        :param request_body: Parsed request
+        """
+        model = request_body.get('model', 'gpt-4o-mini')
+        messages = request_body.get('messages', [])
+        completion_text = _completion_text(messages, model)
+        prompt_tokens = sum(len(message.get('content') or '') for message in messages) // CHARS_PER_TOKEN
+        completion_tokens = max(1, len(completion_text) // CHARS_PER_TOKEN)
+        self.stubs.wait(self.stubs.llm_latency)
+        time.sleep(completion_tokens * self.stubs.token_seconds)
+        self._send_json({
+            'id': 'chatcmpl-stub',
+            'object': 'chat.completion',
+            'created': int(time.time()),
+            'model': model,
+            'choices': [{
+                'index': 0,
+                'message': {'role': 'assistant', 'content': completion_text},
+                'finish_reason': 'stop'
+            }],
+            'usage': {
+                'prompt_tokens': prompt_tokens,
+                'completion_tokens': completion_tokens,
+                'total_tokens': prompt_tokens + completion_tokens
+            }
+        })
+
+    def _stream_completion(self, request_body):
+        """
+        Answer a streamed chat completion as Server-Sent Events, a few words per chunk.
+
+        :param request_body: Parsed request
+        """
+        model = request_body.get('model', 'gpt-4o-mini')
+        completion_words = _completion_text(request_body.get('messages', []), model).split(' ')
+        self.stubs.wait(self.stubs.llm_latency)
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Connection', 'close')
+        self.end_headers()
+        self.close_connection = True
+
+        def send_chunk(delta, finish_reason=None):
+            chunk = {
+                'id': 'chatcmpl-stub',
+                'object': 'chat.completion.chunk',
+                'created': int(time.time()),
+                'model': model,
+                'choices': [{'index': 0, 'delta': delta, 'finish_reason': finish_reason}]
+            }
+            self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode('utf-8'))
+            self.wfile.flush()
+
+        send_chunk({'role': 'assistant', 'content': ''})
+        for word_index in range(0, len(completion_words), 4):
+            piece = ' '.join(completion_words[word_index:word_index + 4])
+            time.sleep(max(1, len(piece) // CHARS_PER_TOKEN) * self.stubs.token_seconds)
+            send_chunk({'content': piece if word_index == 0 else ' ' + piece})
+        send_chunk({}, 'stop')
+        self.wfile.write(b"data: [DONE]\n\n")
+        self.wfile.flush()
+
+
+def serve(stubs, host='127.0.0.1', port=0):
+    """
+    Create the stub server (call serve_forever() on it to start answering).
+
+    :param stubs: StubServices with the settings and pages
+    :param host: Interface to listen on
+    :param port: Port to listen on (0 picks a free one)
+    :return: ThreadingHTTPServer
+    """
+    handler_class = type('BoundStubRequestHandler', (StubRequestHandler,), {'stubs': stubs})
+    stub_server = ThreadingHTTPServer((host, port), handler_class)
+    stub_server.daemon_threads = True
+    return stub_server
+
+
+def main():
+    """
+    Run the stub services from the command line.
+    """
+    parser = argparse.ArgumentParser(description='Serve offline stand-ins for Google, webpages and OpenAI.')
+    parser.add_argument('--host', default='127.0.0.1', help='Interface to listen on')
+    parser.add_argument('--port', type=int, default=8765, help='Port to listen on')
+    parser.add_argument('--pages-dir', default=DEFAULT_PAGES_DIR, help='Directory of saved pages')
+    parser.add_argument('--search-latency', type=float, default=DEFAULT_SEARCH_LATENCY,
+                        help='Median seconds per search request')
+    parser.add_argument('--page-latency', type=float, default=DEFAULT_PAGE_LATENCY,
+                        help='Median seconds before a page starts arriving')
+    parser.add_argument('--llm-latency', type=float, default=DEFAULT_LLM_LATENCY,
+                        help='Median seconds before the first completion token')
+    parser.add_argument('--token-seconds', type=float, default=DEFAULT_TOKEN_SECONDS,
+                        help='Seconds per generated token')
+    parser.add_argument('--jitter', type=float, default=DEFAULT_JITTER,
+                        help='Lognormal sigma of every latency (0 for fixed latency)')
+    parser.add_argument('--page-kb', type=int, default=DEFAULT_SYNTHETIC_PAGE_KB, help='Size of generated pages')
+    args = parser.parse_args()
+
+    stubs = StubServices(
+        pages_dir=args.pages_dir, search_latency=args.search_latency, page_latency=args.page_latency,
+        llm_latency=args.llm_latency, token_seconds=args.token_seconds, jitter=args.jitter,
+        synthetic_page_kb=args.page_kb
+    )
+    stub_server = serve(stubs, args.host, args.port)
+    print(f"Stub services listening on http://{args.host}:{stub_server.server_address[1]}", flush=True)
+    try:
+        stub_server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        stub_server.server_close()
+
+
+if __name__ == "__main__":
+    main()
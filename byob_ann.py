@@ -0,0 +1,389 @@
+#!/usr/bin/env python3
+"""
+BYOB (Bring Your Own Browser) Web Search Tool - Approximate Nearest-Neighbour Index
+
+An exact search compares the query with every stored embedding: 6 KB of
+float32 per 1536-dim document, and time that grows with the table. This
+module adds an IVF (inverted file) index:
+- Embeddings are clustered with spherical k-means into 'nlist' lists
+- A query only scans the 'nprobe' lists whose centroids are closest to it
+- Vectors can be stored compressed: 'int8' scalar quantization (4x smaller)
+  or product quantization 'pq' (1536 / pq_subvector_dims bytes each, e.g.
+  8 dims per byte is 32x smaller)
+- Compressed results can be re-scored with the exact vectors of a
+  VectorStore, which recovers most of the precision lost to compression
+- The index is saved to and loaded from a single .npz file
+
+Key Components:
+- IVFIndex: Build, add to, search, save and load the index
+- build_from_vector_store: Build an index from a local copy of the documents table
+- kmeans: Spherical k-means used for the lists and the PQ codebooks
+"""
+
+import json  # For index settings saved next to the arrays
+import numpy as np  # For all index math
+
+from byob_vector_store import normalize_rows
+
+# Supported ways of storing the vectors inside the index
+COMPRESSIONS = ('none', 'int8', 'pq')
+
+# Number of centroids per PQ subvector (one byte per code)
+PQ_CENTROIDS = 256
+
+# Rows read from a VectorStore at a time while building an index
+BUILD_BATCH_ROWS = 50000
+
+# Rows processed at a time when assigning vectors to centroids (bounds memory use)
+ASSIGN_BATCH_ROWS = 8192
+
+
+def _nearest_centroids(vectors, centroids, spherical=True):
+    """
+    Find the closest centroid of every vector.
+
+    :param vectors: 2-D array of vectors
+    :param centroids: 2-D array of centroids
+    :param spherical: Compare by dot product (normalized data) instead of Euclidean distance
+    :return: Array of centroid indexes
+    """
+    assignments = np.empty(len(vectors), dtype=np.int64)
+    centroid_norms = None if spherical else (centroids ** 2).sum(axis=1)
+    for batch_start in range(0, len(vectors), ASSIGN_BATCH_ROWS):
+        vector_batch = vectors[batch_start:batch_start + ASSIGN_BATCH_ROWS]
+        similarities = vector_batch @ centroids.T
+        if not spherical:
+            # argmin |x - c|^2 == argmax (2 x.c - |c|^2)
+            similarities = 2 * similarities - centroid_norms
+        assignments[batch_start:batch_start + len(vector_batch)] = similarities.argmax(axis=1)
+    return assignments
+
+
+def kmeans(vectors, cluster_count, iterations=20, spherical=True, seed=0):
+    """
+    Cluster vectors with Lloyd's k-means.
+
+    :param vectors: 2-D float32 array (rows normalized when spherical)
+    :param cluster_count: Number of clusters
+    :param iterations: Number of refinement rounds
+    :param spherical: Keep centroids normalized and compare by dot product
+    :param seed: Random seed for the starting centroids
+    :return: 2-D float32 array of centroids
+    """
+    random_generator = np.random.default_rng(seed)
+    cluster_count = min(cluster_count, len(vectors))
+    centroids = vectors[random_generator.choice(len(vectors), cluster_count, replace=False)].copy()
+    for _ in range(iterations):
+        assignments = _nearest_centroids(vectors, centroids, spherical)
+        cluster_sizes = np.bincount(assignments, minlength=cluster_count)
+
+        # Sum the members of each cluster (sorting by cluster makes each one a contiguous slice)
+        cluster_sums = np.zeros_like(centroids)
+        filled_clusters = np.flatnonzero(cluster_sizes)
+        cluster_starts = np.concatenate([[0], np.cumsum(cluster_sizes)[:-1]])
+        sorted_vectors = vectors[np.argsort(assignments, kind='stable')]
+        cluster_sums[filled_clusters] = np.add.reduceat(sorted_vectors, cluster_starts[filled_clusters], axis=0)
+
+        # Restart empty clusters at random points
+        empty_clusters = np.flatnonzero(cluster_sizes == 0)
+        if len(empty_clusters):
+            cluster_sums[empty_clusters] = vectors[random_generator.choice(len(vectors), len(empty_clusters))]
+            cluster_sizes[empty_clusters] = 1
+        centroids = cluster_sums / cluster_sizes[:, None]
+        if spherical:
+            centroids = normalize_rows(centroids)
+    return centroids.astype(np.float32)
+
+
+class IVFIndex:
+    """
+    Inverted-file index over normalized embeddings, with optional compression.
+
+    Vectors are kept sorted by list, so the vectors of list i are rows
+    list_offsets[i]:list_offsets[i + 1] of the code, id and row arrays.
+    """
+
+    def __init__(self, embedding_dim, nlist=None, compression='none', pq_subvector_dims=8, seed=0):
+        """
+        Create an empty, untrained index.
+
+        :param embedding_dim: Number of dimensions of every embedding
+        :param nlist: Number of lists (default: about 4 * sqrt(number of training vectors))
+        :param compression: 'none', 'int8' or 'pq'
+        :param pq_subvector_dims: Dimensions per PQ code byte (must divide embedding_dim)
+        :param seed: Random seed for training
+        """
+        if compression not in COMPRESSIONS:
+            raise ValueError(f"Unknown compression '{compression}'. Choose one of: {', '.join(COMPRESSIONS)}")
+        if compression == 'pq' and embedding_dim % pq_subvector_dims:
+            raise ValueError(f"pq_subvector_dims ({pq_subvector_dims}) must divide embedding_dim ({embedding_dim})")
+        self.embedding_dim = embedding_dim
+        self.nlist = nlist
+        self.compression = compression
+        self.pq_subvector_dims = pq_subvector_dims
+        self.seed = seed
+
+        self.centroids = None
+        self.pq_codebooks = None  # (subvectors, PQ_CENTROIDS, pq_subvector_dims)
+        self.list_offsets = np.zeros(1, dtype=np.int64)
+        self.ids = np.empty(0, dtype=np.int64)
+        self.rows = np.empty(0, dtype=np.int64)
+        self.codes = self._empty_codes()
+        self.scales = np.empty(0, dtype=np.float32)  # Per-vector int8 scale
+
+    @property
+    def is_trained(self):
+        """
+        Whether the lists (and PQ codebooks) have been trained.
+        """
+        return self.centroids is not None
+
+    def __len__(self):
+        """
+        Number of vectors in the index.
+        """
+        return len(self.ids)
+
+    def _empty_codes(self):
+        """
+        Empty code array of the right type and width.
+
+        :return: numpy array with no rows
+        """
+        if self.compression == 'int8':
+            return np.empty((0, self.embedding_dim), dtype=np.int8)
+        if self.compression == 'pq':
+            return np.empty((0, self.embedding_dim // self.pq_subvector_dims), dtype=np.uint8)
+        return np.empty((0, self.embedding_dim), dtype=np.float32)
+
+    def train(self, training_vectors, iterations=20):
+        """
+        Learn the list centroids (and PQ codebooks) from a sample of embeddings.
+
+        :param training_vectors: 2-D array of embeddings
+        :param iterations: k-means rounds
+        """
+        training_vectors = normalize_rows(training_vectors)
+        if self.nlist is None:
+            self.nlist = max(1, int(4 * np.sqrt(len(training_vectors))))
+        self.centroids = kmeans(training_vectors, self.nlist, iterations, spherical=True, seed=self.seed)
+        self.nlist = len(self.centroids)
+
+        if self.compression == 'pq':
+            # PQ encodes the vectors themselves (not their offset from the list centroid),
+            # with one codebook per slice of pq_subvector_dims dimensions
+            subvector_count = self.embedding_dim // self.pq_subvector_dims
+            subvectors = training_vectors.reshape(len(training_vectors), subvector_count, self.pq_subvector_dims)
+            self.pq_codebooks = np.stack([
+                kmeans(np.ascontiguousarray(subvectors[:, subvector_index]), PQ_CENTROIDS, iterations,
+                       spherical=False, seed=self.seed + subvector_index)
+                for subvector_index in range(subvector_count)
+            ])
+        self.list_offsets = np.zeros(self.nlist + 1, dtype=np.int64)
+
+    def _encode(self, vectors):
+        """
+        Compress normalized vectors.
+
+        :param vectors: 2-D float32 array of normalized vectors
+        :return: Tuple of (codes, int8 scales or empty array)
+        """
+        if self.compression == 'int8':
+            scales = np.abs(vectors).max(axis=1) / 127
+            scales[scales == 0] = 1
+            return np.round(vectors / scales[:, None]).astype(np.int8), scales.astype(np.float32)
+        if self.compression == 'pq':
+            subvector_count = len(self.pq_codebooks)
+            subvectors = vectors.reshape(len(vectors), subvector_count, self.pq_subvector_dims)
+            codes = np.empty((len(vectors), subvector_count), dtype=np.uint8)
+            for subvector_index in range(subvector_count):
+                codes[:, subvector_index] = _nearest_centroids(
+                    np.ascontiguousarray(subvectors[:, subvector_index]), self.pq_codebooks[subvector_index],
+                    spherical=False
+                )
+            return codes, np.empty(0, dtype=np.float32)
+        return vectors.astype(np.float32), np.empty(0, dtype=np.float32)
+
+    def add(self, ids, vectors, rows=None):
+        """
+        Add embeddings to the index.
+
+        :param ids: Document ids
+        :param vectors: 2-D array of embeddings
+        :param rows: Optional rows of the vectors in a VectorStore (for exact re-scoring)
+        """
+        if not self.is_trained:
+            raise ValueError("The index must be trained before vectors are added")
+        vectors = normalize_rows(vectors)
+        ids = np.asarray(ids, dtype=np.int64)
+        rows = np.full(len(ids), -1, dtype=np.int64) if rows is None else np.asarray(rows, dtype=np.int64)
+        codes, scales = self._encode(vectors)
+
+        # Merge with the existing vectors and keep everything sorted by list
+        list_assignments = np.concatenate([
+            np.repeat(np.arange(self.nlist), np.diff(self.list_offsets)),
+            _nearest_centroids(vectors, self.centroids)
+        ])
+        order = np.argsort(list_assignments, kind='stable')
+        self.ids = np.concatenate([self.ids, ids])[order]
+        self.rows = np.concatenate([self.rows, rows])[order]
+        self.codes = np.concatenate([self.codes, codes])[order]
+        if self.compression == 'int8':
+            self.scales = np.concatenate([self.scales, scales])[order]
+        self.list_offsets = np.concatenate([[0], np.cumsum(np.bincount(list_assignments, minlength=self.nlist))])
+
+    def _score(self, query_vector, candidates):
+        """
+        Approximate similarity between the query and some indexed vectors.
+
+        :param query_vector: Normalized query
+        :param candidates: Positions in the code arrays
+        :return: Array of scores
+        """
+        if self.compression == 'int8':
+            return (self.codes[candidates].astype(np.float32) @ query_vector) * self.scales[candidates]
+        if self.compression == 'pq':
+            # Asymmetric distance: a lookup table of query-subvector x centroid similarities
+            subvector_count = len(self.pq_codebooks)
+            query_subvectors = query_vector.reshape(subvector_count, self.pq_subvector_dims)
+            lookup_table = np.einsum('scd,sd->sc', self.pq_codebooks, query_subvectors)
+            return lookup_table[np.arange(subvector_count), self.codes[candidates]].sum(axis=1)
+        return self.codes[candidates] @ query_vector
+
+    def search(self, query_embedding, k=5, nprobe=8, rerank_vectors=None, rerank_factor=4):
+        """
+        Find approximately the k indexed vectors most similar to a query.
+
+        :param query_embedding: Query embedding
+        :param k: Number of results
+        :param nprobe: Number of lists to scan (more is slower but finds more true neighbours)
+        :param rerank_vectors: Optional full-precision matrix indexed by 'rows' (e.g. VectorStore.embeddings)
+                               used to re-score the best k * rerank_factor candidates exactly
+        :param rerank_factor: How many candidates per result to re-score
+        :return: Tuple of (ids, scores), best first
+        """
+        if not len(self.ids):
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+        query_vector = normalize_rows(np.asarray(query_embedding, dtype=np.float32).reshape(1, -1))[0]
+
+        # Pick the lists closest to the query and gather their vectors
+        nprobe = min(nprobe, self.nlist)
+        probe_lists = np.argpartition(-(self.centroids @ query_vector), nprobe - 1)[:nprobe]
+        candidates = np.concatenate([
+            np.arange(self.list_offsets[list_index], self.list_offsets[list_index + 1]) for list_index in probe_lists
+        ])
+        if not len(candidates):
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+
+        candidate_scores = self._score(query_vector, candidates)
+        keep = k * rerank_factor if rerank_vectors is not None else k
+        if len(candidates) > keep:
+            best = np.argpartition(-candidate_scores, keep - 1)[:keep]
+            candidates, candidate_scores = candidates[best], candidate_scores[best]
+
+        if rerank_vectors is not None and (self.rows[candidates] >= 0).all():
+            candidate_scores = np.asarray(rerank_vectors[np.sort(self.rows[candidates])] @ query_vector)
+            # np.sort keeps memmap reads sequential; map the scores back to the candidates
+            candidate_scores = candidate_scores[np.argsort(np.argsort(self.rows[candidates]))]
+
+        order = np.argsort(-candidate_scores, kind='stable')[:k]
+        return self.ids[candidates[order]], candidate_scores[order].astype(np.float32)
+
+    def match_documents(self, vector_store, query_embedding, match_threshold=0.1, max_limit=5, nprobe=8,
+                        rerank=True):
+        """
+        Approximate version of VectorStore.match_documents.
+
+        :param vector_store: VectorStore the index was built from (for content and re-scoring)
+        :param query_embedding: Query embedding
+        :param match_threshold: Minimum similarity (exclusive)
+        :param max_limit: Maximum number of documents to return
+        :param nprobe: Number of lists to scan
+        :param rerank: Re-score candidates with the store's exact vectors
+        :return: List of {'id', 'content', 'match_score'} dictionaries
+        """
+        result_ids, result_scores = self.search(
+            query_embedding, k=max_limit, nprobe=nprobe,
+            rerank_vectors=vector_store.embeddings if rerank and self.compression != 'none' else None
+        )
+        matches = [(int(document_id), float(score)) for document_id, score in zip(result_ids, result_scores)
+                   if score > match_threshold]
+        contents = vector_store.get_contents([document_id for document_id, _ in matches])
+        return [{'id': document_id, 'content': contents.get(document_id), 'match_score': score}
+                for document_id, score in matches]
+
+    def memory_bytes(self):
+        """
+        Bytes used by the stored vectors (codes plus per-vector extras, excluding centroids).
+
+        :return: Number of bytes
+        """
+        return self.codes.nbytes + self.scales.nbytes + self.ids.nbytes + self.rows.nbytes
+
+    def save(self, index_path):
+        """
+        Save the index to a .npz file.
+
+        :param index_path: Path of the file to write
+        """
+        settings = {
+            'embedding_dim': self.embedding_dim, 'nlist': self.nlist, 'compression': self.compression,
+            'pq_subvector_dims': self.pq_subvector_dims, 'seed': self.seed
+        }
+        arrays = {
+            'settings': np.array(json.dumps(settings)), 'list_offsets': self.list_offsets, 'ids': self.ids,
+            'rows': self.rows, 'codes': self.codes, 'scales': self.scales
+        }
+        if self.centroids is not None:
+            arrays['centroids'] = self.centroids
+        if self.pq_codebooks is not None:
+            arrays['pq_codebooks'] = self.pq_codebooks
+        with open(index_path, 'wb') as index_file:
+            np.savez(index_file, **arrays)
+
+    @classmethod
+    def load(cls, index_path):
+        """
+        Load an index saved with save().
+
+        :param index_path: Path of the .npz file
+        :return: IVFIndex
+        """
+        with np.load(index_path, allow_pickle=False) as saved_arrays:
+            settings = json.loads(str(saved_arrays['settings']))
+            ivf_index = cls(**settings)
+            ivf_index.centroids = saved_arrays['centroids'] if 'centroids' in saved_arrays else None
+            ivf_index.pq_codebooks = saved_arrays['pq_codebooks'] if 'pq_codebooks' in saved_arrays else None
+            for array_name in ('list_offsets', 'ids', 'rows', 'codes', 'scales'):
+                setattr(ivf_index, array_name, saved_arrays[array_name])
+        return ivf_index
+
+
+def build_from_vector_store(vector_store, nlist=None, compression='none', pq_subvector_dims=8,
+                            training_sample=50000, iterations=20, seed=0):
+    """
+    Build an IVF index over every document of a VectorStore.
+
+    :param vector_store: VectorStore holding the documents (e.g. imported from Postgres)
+    :param nlist: Number of lists (default: about 4 * sqrt(training sample size))
+    :param compression: 'none', 'int8' or 'pq'
+    :param pq_subvector_dims: Dimensions per PQ code byte
+    :param training_sample: Maximum number of vectors used for training
+    :param iterations: k-means rounds
+    :param seed: Random seed
+    :return: Trained and filled IVFIndex
+    """
+    embeddings = vector_store.embeddings
+    ivf_index = IVFIndex(vector_store.embedding_dim, nlist, compression, pq_subvector_dims, seed)
+    sample_rows = np.random.default_rng(seed).choice(
+        len(embeddings), min(training_sample, len(embeddings)), replace=False
+    )
+    ivf_index.train(np.asarray(embeddings[np.sort(sample_rows)]), iterations)
+
+    # Add in slices so the whole matrix never has to be in memory at once
+    row_ids = vector_store.row_ids
+    for batch_start in range(0, len(embeddings), BUILD_BATCH_ROWS):
+        batch_end = min(batch_start + BUILD_BATCH_ROWS, len(embeddings))
+        ivf_index.add(row_ids[batch_start:batch_end], np.asarray(embeddings[batch_start:batch_end]),
+                      rows=np.arange(batch_start, batch_end))
+    return ivf_index
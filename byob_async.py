@@ -0,0 +1,1048 @@
+#!/usr/bin/env python3
+"""
+BYOB (Bring Your Own Browser) Web Search Tool - Asynchronous Engine
+
+This module provides an asyncio version of the BYOB research assistant.
+Instead of tying up a thread while waiting on Google, a webpage or OpenAI,
+every network call is a coroutine, so a single event loop can juggle
+hundreds of research queries at once.
+
+Key Components:
+- AsyncBYOBTool: Coroutine versions of the BYOBTool methods, built on one
+  shared httpx.AsyncClient connection pool and AsyncOpenAI
+- AsyncBYOBRunner: Runs an AsyncBYOBTool on a background event loop so
+  synchronous code (like the Flask backend) can submit queries to it
+"""
+
+import asyncio    # For running many network calls concurrently
+import concurrent.futures  # For the futures returned to synchronous callers
+import threading  # For running the event loop in the background
+import time       # For per-query deadlines
+import httpx      # For making asynchronous HTTP requests
+from openai import AsyncOpenAI  # For interacting with OpenAI's language models asynchronously
+
+from byob_search import (
+    BYOBTool, DEFAULT_CONFIG, GOOGLE_SEARCH_URL, REFINE_COMPLETION_TOKENS, REFINE_MODEL, RESPONSE_COMPLETION_TOKENS,
+    RESPONSE_MODEL
+)
+from byob_http import PoolStats, create_async_http_client
+from byob_fetch import FetchStats, fetch_page_async
+from byob_relevance import CHARS_PER_TOKEN, RelevanceStats, count_tokens
+from byob_dedup import DedupStats
+from byob_context import ContextStats
+from byob_metrics import (
+    QueryTrace, OUTCOME_CANCELLED, OUTCOME_ERROR, OUTCOME_OK, STAGE_FETCH, STAGE_GENERATE, STAGE_REFINE, STAGE_SEARCH, STAGE_SUMMARIZE
+)
+from byob_ratelimit import DeadlineExceeded, QuotaExhausted, get_rate_limiters
+from byob_fusion import reciprocal_rank_fusion
+from byob_paging import PagedResults
+from byob_budget import (
+    SKIP_DUPLICATE, SKIP_FETCH_FAILED, SKIP_SUMMARY_FAILED, SOURCE_INCLUDED, SOURCE_SKIPPED, STOP_COMPLETE,
+    STOP_DEADLINE, STOP_QUORUM
+)
+
+# Seconds AsyncBYOBRunner.run waits past a query's deadline before giving up on it
+RUNNER_TIMEOUT_GRACE = 5.0
+
+
+class AsyncBYOBTool(BYOBTool):
+    """
+    Asynchronous version of the BYOB research assistant.
+
+    Offers the same methods as BYOBTool (search, retrieve_content,
+    summarize_content, refine_search_query, generate_comprehensive_response
+    and run), but each one is a coroutine that must be awaited. The streaming
+    methods (run_stream, iter_search_results, stream_comprehensive_response)
+    are async generators, used with 'async for'. All Google, webpage and
+    OpenAI requests share a single httpx.AsyncClient pool. The
+    caches read and write files and SQLite, so they are used from worker
+    threads (asyncio.to_thread) rather than on the event loop.
+    """
+
+    def __init__(self, config=None):
+        """
+        Initialize the asynchronous BYOB Tool with configuration settings.
+
+        :param config: Dictionary of configuration parameters with defaults
+        """
+        # Reuse the configuration defaults from the synchronous tool
+        self.config = dict(DEFAULT_CONFIG)
+        if config:
+            self.config.update(config)
+
+        # Read and validate the OpenAI and Google credentials
+        openai_key = self._load_credentials()
+
+        # One connection pool shared by Google, webpage and OpenAI requests
+        self.pool_stats = PoolStats()
+        self.http_client = create_async_http_client(
+            stats=self.pool_stats,
+            max_connections_per_host=self.config['http_max_connections_per_host'],
+            keepalive_expiry=self.config['http_keepalive_expiry'],
+            http2=self.config['http2']
+        )
+
+        # Create an asynchronous OpenAI client on top of the shared pool
+        self.openai_client = AsyncOpenAI(api_key=openai_key, http_client=self.http_client)
+
+        # Calls go through the rate limiters shared with the synchronous tools, which do the retrying themselves
+        self.rate_limiters = get_rate_limiters(self.config)
+        self._limited_openai_client = self.openai_client.with_options(max_retries=0)
+
+        # Webpage download counters (bytes downloaded, pages skipped per reason)
+        self.fetch_stats = FetchStats()
+
+        # Prompt tokens saved by sending only the relevant parts of each page
+        self.relevance_stats = RelevanceStats()
+
+        # Sources packed into answer prompts and the prompt tokens they took
+        self.context_stats = ContextStats()
+
+        # Duplicate pages found and OpenAI calls saved by skipping them
+        self.dedup_stats = DedupStats()
+
+        # Stage measurements and deadline of the query this instance is running
+        # (set on the per-query copy made by run())
+        self.query_trace = None
+        self.deadline_at = None
+        self.latency_budget = None
+
+        # Open the local caches
+        self._init_caches()
+
+    async def search(self, search_query, max_search_results=None, website_filter=None, recency=None):
+        """
+        Perform a web search using Google Custom Search API.
+
+        :param search_query: Search query (what you want to find)
+        :param max_search_results: Number of search results to return
+        :param website_filter: Optional parameter to search within a specific website
+        :param recency: Restrict results by recency ('[age][period]', e.g. 'w1', 'd7', 'm3')
+        :return: List of search results
+        """
+        return [
+            search_result
+            async for search_page in self.iter_search_pages(search_query, max_search_results, website_filter, recency)
+            for search_result in search_page
+        ]
+
+    async def iter_search_pages(self, search_query, max_search_results=None, website_filter=None, recency=None):
+        """
+        Perform a web search, yielding the results one page of Google results at a time.
+
+        Every page is requested at once (at most 'max_search_page_requests'
+        in flight) and yielded in ranking order; see BYOBTool.iter_search_pages.
+
+        :param search_query: Search query (what you want to find)
+        :param max_search_results: Number of search results to return (default: the search depth)
+        :param website_filter: Optional parameter to search within a specific website
+        :param recency: Optional '[age][period]' recency restriction
+        :return: Async generator of lists of search results (always at least one list)
+        """
+        paged_results = PagedResults(self._search_result_count(max_search_results))
+        page_semaphore = asyncio.Semaphore(self.config['max_search_page_requests'])
+
+        async def search_page(search_params):
+            async with page_semaphore:
+                return await self._search_page(search_params)
+
+        page_tasks = [
+            (asyncio.ensure_future(search_page(
+                self._build_search_params(search_query, page_size, website_filter, recency, start_index)
+            )), page_size)
+            for start_index, page_size in paged_results.pages
+        ]
+        try:
+            for page_task, page_size in page_tasks:
+                yield paged_results.add_page(await page_task, page_size)
+                if paged_results.complete:
+                    break
+        finally:
+            # Pages after the last one are not requested, or their results are ignored
+            for page_task, _ in page_tasks:
+                page_task.cancel()
+
+    async def _search_page(self, search_params):
+        """
+        Request one page of Google Custom Search results.
+
+        :param search_params: Query parameters from _build_search_params()
+        :return: List of search result items (None if the search failed)
+        """
+        with self._stage(STAGE_SEARCH) as search_span:
+            # Reuse recent results for the exact same search
+            if self.search_cache:
+                cached_search_results = await asyncio.to_thread(self.search_cache.get_search_results, search_params)
+                if cached_search_results is not None:
+                    search_span.mark_cache_hit()
+                    return cached_search_results
+
+            try:
+                # Send the search request to Google, within the Custom Search quota
+                search_response = await self.rate_limiters.google_search().call_async(
+                    lambda: self._send_search_request(search_params), deadline_at=self.deadline_at
+                )
+
+                # Extract and return search results
+                search_results = search_response.json().get('items', [])
+                search_span.add_bytes(len(search_response.content))
+                if self.search_cache:
+                    await asyncio.to_thread(self.search_cache.set_search_results, search_params, search_results)
+                return search_results
+
+            except (httpx.HTTPError, DeadlineExceeded, QuotaExhausted) as search_error:
+                # Handle any errors that occur during the search
+                search_span.mark_error(search_error)
+                print(f"Web Search Error: {search_error}")
+                return None
+
+    async def retrieve_content(self, webpage_url, max_content_chars=None):
+        """
+        Retrieve and clean web page content.
+
+        Uses the same byte and time budgets, content-type checks, page cache
+        and conditional revalidation as BYOBTool.retrieve_content.
+
+        :param webpage_url: Web page URL to scrape
+        :param max_content_chars: Maximum number of characters to retrieve
+        :return: Cleaned text content
+        """
+        max_content_chars = max_content_chars or self.config['max_content_chars']
+
+        with self._stage(STAGE_FETCH, url=webpage_url) as fetch_span:
+            # Check whether we have already read this page (the caches do file and SQLite I/O, off the event loop)
+            cached_page = await asyncio.to_thread(
+                self.page_cache.lookup, webpage_url, max_content_chars, self._extraction_settings()
+            ) if self.page_cache else None
+            if cached_page and cached_page.is_fresh:
+                fetch_span.mark_cache_hit()
+                return cached_page.text
+
+            # Never download past the query's deadline
+            fetch_deadline = self.config['page_fetch_deadline']
+            if self.deadline_at is not None:
+                fetch_deadline = min(fetch_deadline, self.deadline_at - time.monotonic())
+                if fetch_deadline <= 0:
+                    fetch_span.mark_skipped('query deadline')
+                    return None
+
+            # Stream the page, asking the website to skip it if our copy is still current
+            fetch_result = await fetch_page_async(
+                self.http_client,
+                webpage_url,
+                self._content_extractor(),
+                max_chars=max_content_chars,
+                max_bytes=self.config['max_page_bytes'],
+                deadline_seconds=fetch_deadline,
+                timeout=self.config['page_fetch_timeout'],
+                headers=cached_page.conditional_headers() if cached_page else None,
+                stats=self.fetch_stats
+            )
+            self._record_fetch(fetch_span, fetch_result)
+            return await asyncio.to_thread(self._handle_fetch_result, fetch_result, cached_page, max_content_chars)
+
+    async def summarize_content(self, webpage_content, search_query, max_summary_chars=None):
+        """
+        Summarize web page content using OpenAI's language model.
+
+        :param webpage_content: Text content to summarize
+        :param search_query: Original search query (for context)
+        :param max_summary_chars: Maximum summary length
+        :return: Summarized content
+        """
+        with self._stage(STAGE_SUMMARIZE, model=self.config['summary_model']) as summary_span:
+            # Reuse an earlier summary of the same page if we have one
+            summary_cache_key = self._summary_cache_key(webpage_content, search_query, max_summary_chars)
+            if summary_cache_key:
+                cached_summary = await asyncio.to_thread(self.summary_cache.get, summary_cache_key)
+                if cached_summary is not None:
+                    summary_span.mark_cache_hit()
+                    return cached_summary
+
+            # Only send the parts of the page that are relevant to the query (ranking is CPU-bound)
+            relevant_content = await asyncio.to_thread(self._select_relevant_content, webpage_content, search_query)
+
+            try:
+                # Use OpenAI to generate a summary
+                summary_response = await self._chat_completion(
+                    self.config['summary_model'],  # Use a compact, efficient AI model
+                    self._summary_messages(relevant_content, search_query, max_summary_chars),
+                    (max_summary_chars or self.config['max_summary_chars']) // CHARS_PER_TOKEN
+                )
+                summary_span.record_usage(summary_response.usage, self.config['summary_model'])
+                webpage_summary = summary_response.choices[0].message.content
+
+                # Remember the summary for future queries
+                if summary_cache_key and webpage_summary:
+                    await asyncio.to_thread(self.summary_cache.set, summary_cache_key, webpage_summary)
+                return webpage_summary
+
+            except Exception as summary_generation_error:
+                # Handle any errors in summarization
+                summary_span.mark_error(summary_generation_error)
+                print(f"Content Summarization Error: {summary_generation_error}")
+                return None
+
+    async def get_search_results(self, search_items, search_query, max_summary_chars=None, later_search_pages=None):
+        """
+        Process search results by retrieving and summarizing content concurrently.
+
+        Collects iter_search_results() and puts the results in ranking order.
+
+        :param search_items: List of search result items
+        :param search_query: Original search query
+        :param max_summary_chars: Maximum summary length
+        :param later_search_pages: Optional async iterator of further lists of search result items
+        :return: List of processed search results, in search ranking order
+        """
+        processed_search_results = [
+            processed_result async for processed_result in self.iter_search_results(
+                search_items, search_query, max_summary_chars, later_search_pages
+            )
+        ]
+        return sorted(processed_search_results, key=lambda processed_result: processed_result['result_rank'])
+
+    async def iter_search_results(self, search_items, search_query, max_summary_chars=None, later_search_pages=None):
+        """
+        Retrieve and summarize search results, yielding each one as soon as it is ready.
+
+        Every search result gets its own task. Semaphores cap the number of
+        downloads ('max_fetch_workers') and OpenAI calls ('max_llm_workers')
+        in flight at once, so one slow page never holds up the others.
+        Results arrive in the order they finish, each with its 'result_rank'.
+        As in BYOBTool.iter_search_results, duplicates are checked in
+        ranking order, so the best-ranked copy of a page is the one kept.
+        Within a latency budget, collection stops at the budget's collection
+        deadline or once its summary quorum is met, and the unfinished tasks
+        are cancelled. Results of 'later_search_pages' get their tasks as
+        each page arrives, while the first page is already being processed.
+
+        :param search_items: List of search result items
+        :param search_query: Original search query
+        :param max_summary_chars: Maximum summary length
+        :param later_search_pages: Optional async iterator of further lists of search result items
+        :return: Async generator of processed search results
+        """
+        # Fall back to the one-page-at-a-time behaviour when the pipeline is disabled
+        if not self.config['concurrent_pipeline']:
+            if later_search_pages is not None:
+                search_items = list(search_items) + [
+                    search_result async for search_page in later_search_pages for search_result in search_page
+                ]
+            async for processed_result in self._iter_search_results_serially(
+                search_items, search_query, max_summary_chars
+            ):
+                yield processed_result
+            return
+
+        fetch_semaphore = asyncio.Semaphore(self.config['max_fetch_workers'])
+        llm_semaphore = asyncio.Semaphore(self.config['max_llm_workers'])
+        deduplicator = self._new_deduplicator()
+        collect_tool = self._for_collection()
+        latency_budget = self.latency_budget
+
+        async def process_search_result(result_index, search_result):
+            # Retrieve full content of the webpage
+            async with fetch_semaphore:
+                webpage_content = await collect_tool.retrieve_content(search_result.get('link'))
+            # Wait for the better-ranked downloads before checking for duplicates
+            duplicate_check_turn = asyncio.Event() if webpage_content is not None else None
+            for released_turn in self._release_downloads(deduplicator, result_index, duplicate_check_turn):
+                released_turn.set()
+            if webpage_content is None:
+                self._record_source(result_index, search_result, SOURCE_SKIPPED, SKIP_FETCH_FAILED)
+                return None
+            await duplicate_check_turn.wait()
+            if self._is_duplicate_page(deduplicator, result_index, search_result, webpage_content):
+                self._record_source(result_index, search_result, SOURCE_SKIPPED, SKIP_DUPLICATE)
+                return None
+
+            # Summarize the content
+            async with llm_semaphore:
+                webpage_summary = await collect_tool.summarize_content(webpage_content, search_query, max_summary_chars)
+            if webpage_summary:
+                self._record_source(result_index, search_result, SOURCE_INCLUDED)
+            else:
+                self._record_source(result_index, search_result, SOURCE_SKIPPED, SKIP_SUMMARY_FAILED)
+            return self._build_processed_result(
+                result_index, search_result, webpage_summary, self._duplicate_urls(deduplicator, result_index)
+            )
+
+        result_tasks = {}
+        started_tasks = set()
+
+        def start_tasks(search_results, first_rank):
+            for result_index, search_result in self._results_to_fetch(search_results, deduplicator, first_rank):
+                result_task = asyncio.ensure_future(process_search_result(result_index, search_result))
+                result_tasks[result_task] = (result_index, search_result)
+                started_tasks.add(result_task)
+
+        async def start_later_pages():
+            next_rank = len(search_items) + 1
+            async for search_page in later_search_pages:
+                start_tasks(search_page, next_rank)
+                next_rank += len(search_page)
+
+        start_tasks(search_items, 1)
+        pages_task = asyncio.ensure_future(start_later_pages()) if later_search_pages is not None else None
+        pending_tasks = set(started_tasks) | ({pages_task} if pages_task is not None else set())
+        started_tasks.clear()
+        summaries_ready = 0
+        try:
+            while pending_tasks:
+                collect_seconds_left = latency_budget.collect_remaining() if latency_budget else None
+                if collect_seconds_left is not None and collect_seconds_left <= 0:
+                    latency_budget.stop_collection(STOP_DEADLINE)
+                    break
+                finished_tasks, pending_tasks = await asyncio.wait(
+                    pending_tasks, timeout=collect_seconds_left, return_when=asyncio.FIRST_COMPLETED
+                )
+                for finished_task in finished_tasks:
+                    processed_result = finished_task.result()
+                    if finished_task is pages_task or processed_result is None:
+                        continue
+                    summaries_ready += bool(processed_result['webpage_summary'])
+                    yield processed_result
+                # Tasks of the result pages that arrived in the meantime
+                pending_tasks |= started_tasks
+                started_tasks.clear()
+
+                # Enough pages are summarized: write the answer from them
+                if latency_budget and pending_tasks and latency_budget.quorum_met(summaries_ready):
+                    latency_budget.stop_collection(STOP_QUORUM)
+                    break
+            if latency_budget:
+                latency_budget.stop_collection(STOP_COMPLETE)
+                latency_budget.record_unfinished(
+                    result_tasks[pending_task] for pending_task in pending_tasks if pending_task is not pages_task
+                )
+        finally:
+            # Unfinished downloads and summaries are cancelled, not left running
+            # (also when the caller stops reading early)
+            for pending_task in pending_tasks | started_tasks:
+                pending_task.cancel()
+
+    async def _iter_search_results_serially(self, search_items, search_query, max_summary_chars=None):
+        """
+        Process search results one at a time (retrieve, then summarize, then move on).
+
+        :param search_items: List of search result items
+        :param search_query: Original search query
+        :param max_summary_chars: Maximum summary length
+        :return: Async generator of processed search results
+        """
+        collect_tool = self._for_collection()
+        latency_budget = self.latency_budget
+        deduplicator = self._new_deduplicator()
+        results_to_fetch = self._results_to_fetch(search_items, deduplicator)
+        summaries_ready = 0
+        for result_position, (result_index, search_result) in enumerate(results_to_fetch):
+            # Stop at the collection deadline or once enough pages are summarized
+            if latency_budget:
+                stop_reason = STOP_QUORUM if latency_budget.quorum_met(summaries_ready) else None
+                collect_seconds_left = latency_budget.collect_remaining()
+                if collect_seconds_left is not None and collect_seconds_left <= 0:
+                    stop_reason = STOP_DEADLINE
+                if stop_reason:
+                    latency_budget.stop_collection(stop_reason)
+                    latency_budget.record_unfinished(results_to_fetch[result_position:])
+                    return
+
+            webpage_content = await collect_tool.retrieve_content(search_result.get('link'))
+            if webpage_content is None:
+                self._record_source(result_index, search_result, SOURCE_SKIPPED, SKIP_FETCH_FAILED)
+                continue
+            if self._is_duplicate_page(deduplicator, result_index, search_result, webpage_content):
+                self._record_source(result_index, search_result, SOURCE_SKIPPED, SKIP_DUPLICATE)
+                continue
+
+            webpage_summary = await collect_tool.summarize_content(webpage_content, search_query, max_summary_chars)
+            if webpage_summary:
+                summaries_ready += 1
+                self._record_source(result_index, search_result, SOURCE_INCLUDED)
+            else:
+                self._record_source(result_index, search_result, SOURCE_SKIPPED, SKIP_SUMMARY_FAILED)
+            yield self._build_processed_result(
+                result_index, search_result, webpage_summary, self._duplicate_urls(deduplicator, result_index)
+            )
+        if latency_budget:
+            latency_budget.stop_collection(STOP_COMPLETE)
+
+    async def refine_search_query(self, search_query):
+        """
+        Refine the search query using AI.
+
+        :param search_query: User's search query
+        :return: Refined search query
+        """
+        return (await self.refine_search_terms(search_query))[0]
+
+    async def refine_search_terms(self, search_query, term_count=1):
+        """
+        Turn the user's query into one or more short search terms with a single OpenAI call.
+
+        :param search_query: User's search query
+        :param term_count: Number of different search terms wanted (the first is the best one)
+        :return: List of at least one search term
+        """
+        # Several terms are remembered separately from the single refined term
+        refine_cache_model = REFINE_MODEL if term_count == 1 else f"{REFINE_MODEL}/{term_count}"
+        with self._stage(STAGE_REFINE, model=REFINE_MODEL, terms=term_count) as refine_span:
+            # Reuse the refinement of a query we have seen before
+            if self.search_cache:
+                cached_refined_query = await asyncio.to_thread(
+                    self.search_cache.get_refined_term, search_query, refine_cache_model
+                )
+                if cached_refined_query is not None:
+                    refine_span.mark_cache_hit()
+                    return self._split_search_terms(cached_refined_query, term_count) or [search_query]
+
+            try:
+                # Use OpenAI to refine the search query
+                refine_response = await self._chat_completion(
+                    REFINE_MODEL, self._refine_messages(search_query, term_count), REFINE_COMPLETION_TOKENS * term_count
+                )
+                refine_span.record_usage(refine_response.usage, REFINE_MODEL)
+                refined_search_query = refine_response.choices[0].message.content
+
+            except Exception as refine_error:
+                # Search with the user's own words rather than failing the whole query
+                refine_span.mark_error(refine_error)
+                print(f"Query Refinement Error: {refine_error}")
+                return [search_query]
+
+            if self.search_cache and refined_search_query:
+                await asyncio.to_thread(
+                    self.search_cache.set_refined_term, search_query, refine_cache_model, refined_search_query
+                )
+            return self._split_search_terms(refined_search_query, term_count) or [search_query]
+
+    async def fan_out_search(self, search_query, website_filter=None, recency=None):
+        """
+        Search the user's query while it is being refined, then the refined terms, and fuse the rankings.
+
+        :param search_query: User's search query
+        :param website_filter: Optional website to filter search results
+        :param recency: Optional '[age][period]' recency restriction
+        :return: Tuple of (refined search term, list of search terms searched, fused search results)
+        """
+        search_options = {'website_filter': website_filter, 'recency': recency}
+        raw_search_task = asyncio.ensure_future(self.search(search_query, **search_options))
+        refine_task = asyncio.ensure_future(self.refine_search_terms(search_query, 1 + self.config['query_rewrites']))
+
+        # Refinement only holds up the search for a limited time once the raw results are in
+        raw_search_results = await raw_search_task
+        refine_wait = self.config['speculative_refine_wait']
+        if refine_wait is not None:
+            await asyncio.wait({refine_task}, timeout=refine_wait)
+            if not refine_task.done():
+                # A refinement that is still running finishes in the background
+                print(f"Query refinement took longer than {refine_wait}s; using the raw query's results")
+                return search_query, [search_query], raw_search_results
+        refined_search_terms = await refine_task
+
+        # Search every term that differs from the raw query at the same time
+        searched_terms = [search_query]
+        for refined_search_term in refined_search_terms:
+            if refined_search_term.lower() not in (searched_term.lower() for searched_term in searched_terms):
+                searched_terms.append(refined_search_term)
+        ranked_lists = list(await asyncio.gather(*(
+            self.search(searched_term, **search_options) for searched_term in searched_terms[1:]
+        )))
+
+        # The refined term's list comes first, so it wins ties as the single-term pipeline's results would
+        ranked_lists.append(raw_search_results)
+        fused_search_results = reciprocal_rank_fusion(
+            ranked_lists, k=self.config['rrf_k'], limit=self._search_result_count()
+        )
+        return refined_search_terms[0], searched_terms, fused_search_results
+
+    async def _refine_and_search(self, search_query, website_filter=None, recency=None):
+        """
+        Run the front of the pipeline: refinement and search.
+
+        :param search_query: User's search query
+        :param website_filter: Optional website to filter search results
+        :param recency: Optional '[age][period]' recency restriction
+        :return: Tuple of (refined search term, list of search terms searched, first page of search results,
+                 async iterator of later result pages or None)
+        """
+        if self.config['speculative_search']:
+            return await self.fan_out_search(search_query, website_filter=website_filter, recency=recency) + (None,)
+        refined_search_query = await self.refine_search_query(search_query)
+
+        # Processing starts with the first page of results; deeper pages join the pipeline as they arrive
+        search_pages = self.iter_search_pages(refined_search_query, website_filter=website_filter, recency=recency)
+        return refined_search_query, [refined_search_query], await search_pages.__anext__(), search_pages
+
+    async def generate_comprehensive_response(self, search_query, processed_search_results):
+        """
+        Generate a comprehensive response with citations.
+
+        :param search_query: Original user query
+        :param processed_search_results: Processed search results
+        :return: Detailed response with citations
+        """
+        with self._stage(STAGE_GENERATE, model=RESPONSE_MODEL) as generate_span:
+            try:
+                # Use OpenAI to generate a comprehensive response
+                answer_messages = self._comprehensive_messages(search_query, processed_search_results, generate_span)
+                comprehensive_response = await self._chat_completion(
+                    RESPONSE_MODEL,  # Use a more advanced model for complex reasoning
+                    answer_messages,
+                    RESPONSE_COMPLETION_TOKENS,
+                    prompt_tokens=self._answer_prompt_tokens(answer_messages, generate_span),
+                    temperature=0  # Low temperature for more focused, factual response
+                )
+                generate_span.record_usage(comprehensive_response.usage, RESPONSE_MODEL)
+                return comprehensive_response.choices[0].message.content
+
+            except Exception as comprehensive_response_generation_error:
+                # Handle any errors in response generation
+                generate_span.mark_error(comprehensive_response_generation_error)
+                print(f"Comprehensive Response Generation Error: {comprehensive_response_generation_error}")
+                return None
+
+    async def stream_comprehensive_response(self, search_query, processed_search_results):
+        """
+        Generate the comprehensive response piece by piece as OpenAI writes it.
+
+        See BYOBTool.stream_comprehensive_response.
+
+        :param search_query: Original user query
+        :param processed_search_results: Processed search results
+        :return: Async generator of response text fragments
+        """
+        with self._stage(STAGE_GENERATE, model=RESPONSE_MODEL, streamed=True) as generate_span:
+            comprehensive_messages = self._comprehensive_messages(search_query, processed_search_results, generate_span)
+            prompt_tokens = self._answer_prompt_tokens(comprehensive_messages, generate_span)
+            response_fragments = []
+            try:
+                # Ask OpenAI to send the response as it is being generated
+                response_stream = await self._chat_completion(
+                    RESPONSE_MODEL,  # Use a more advanced model for complex reasoning
+                    comprehensive_messages,
+                    RESPONSE_COMPLETION_TOKENS,
+                    prompt_tokens=prompt_tokens,
+                    temperature=0,  # Low temperature for more focused, factual response
+                    stream=True
+                )
+                async for response_chunk in response_stream:
+                    if response_chunk.choices and response_chunk.choices[0].delta.content:
+                        if not response_fragments:
+                            generate_span.attributes['first_token_seconds'] = round(generate_span.elapsed(), 4)
+                        response_fragments.append(response_chunk.choices[0].delta.content)
+                        yield response_chunk.choices[0].delta.content
+
+            except Exception as comprehensive_response_generation_error:
+                # Handle any errors in response generation
+                generate_span.mark_error(comprehensive_response_generation_error)
+                print(f"Comprehensive Response Generation Error: {comprehensive_response_generation_error}")
+
+            finally:
+                generate_span.record_tokens(
+                    prompt_tokens,
+                    count_tokens(''.join(response_fragments), RESPONSE_MODEL),
+                    RESPONSE_MODEL,
+                    estimated=True
+                )
+
+    async def generate_rag_response(self, original_search_query, processed_search_results):
+        """
+        Generate a Retrieval-Augmented Generation (RAG) response.
+
+        :param original_search_query: Original user query
+        :param processed_search_results: Processed search results
+        :return: Detailed response with citations
+        """
+        with self._stage(STAGE_GENERATE, model=RESPONSE_MODEL) as generate_span:
+            try:
+                # Use OpenAI to generate a comprehensive response
+                answer_messages = self._rag_messages(original_search_query, processed_search_results, generate_span)
+                rag_response = await self._chat_completion(
+                    RESPONSE_MODEL,  # Use a more advanced model for complex reasoning
+                    answer_messages,
+                    RESPONSE_COMPLETION_TOKENS,
+                    prompt_tokens=self._answer_prompt_tokens(answer_messages, generate_span),
+                    temperature=0  # Low temperature for more focused, factual response
+                )
+                generate_span.record_usage(rag_response.usage, RESPONSE_MODEL)
+                return rag_response.choices[0].message.content
+
+            except Exception as rag_response_generation_error:
+                # Handle any errors in response generation
+                generate_span.mark_error(rag_response_generation_error)
+                print(f"RAG Response Generation Error: {rag_response_generation_error}")
+                return None
+
+    async def _send_search_request(self, search_params):
+        """
+        Send one Google Custom Search request (called by the rate limiter, which retries it).
+
+        :param search_params: Query parameters
+        :return: Tuple of (response, response headers)
+        :raises QuotaExhausted: If the daily quota is used up (retrying would only burn attempts)
+        :raises httpx.HTTPError: If the request failed
+        """
+        search_response = await self.http_client.get(GOOGLE_SEARCH_URL, params=search_params)
+        if search_response.status_code == 429 and 'per day' in search_response.text:
+            self.rate_limiters.google_search().exhaust_daily_quota()
+            raise QuotaExhausted("Google Custom Search daily quota exhausted")
+        search_response.raise_for_status()  # Raise an error for bad responses
+        return search_response, search_response.headers
+
+    async def _chat_completion(self, model, messages, expected_completion_tokens, prompt_tokens=None,
+                               **request_options):
+        """
+        Send a chat completion request through the model's rate limiter.
+
+        :param model: OpenAI model
+        :param messages: Chat messages
+        :param expected_completion_tokens: Completion tokens to reserve until the real count is known
+        :param prompt_tokens: Prompt tokens, if already counted (default: counted from the messages)
+        :param request_options: Further create() arguments (e.g. temperature, stream=True)
+        :return: ChatCompletion, or an async response stream if stream=True
+        :raises DeadlineExceeded: If the call could not be made before the query deadline
+        """
+        model_limiter = self.rate_limiters.openai(model)
+        if prompt_tokens is None:
+            prompt_tokens = sum(count_tokens(message['content'], model) for message in messages)
+        estimated_tokens = prompt_tokens + expected_completion_tokens
+        if self.deadline_at is not None:
+            # A call that cannot finish before the deadline is abandoned rather than waited for
+            request_options.setdefault('timeout', max(1.0, self.deadline_at - time.monotonic()))
+
+        async def send_completion_request():
+            if request_options.get('stream'):
+                response_stream = await self._limited_openai_client.chat.completions.create(
+                    model=model, messages=messages, **request_options
+                )
+                return response_stream, response_stream.response.headers
+            raw_response = await self._limited_openai_client.chat.completions.with_raw_response.create(
+                model=model, messages=messages, **request_options
+            )
+            return raw_response.parse(), raw_response.headers
+
+        chat_completion = await model_limiter.call_async(send_completion_request, estimated_tokens, self.deadline_at)
+        if getattr(chat_completion, 'usage', None):
+            model_limiter.settle_tokens(estimated_tokens, chat_completion.usage.total_tokens)
+        return chat_completion
+
+    def get_pool_stats(self):
+        """
+        Report how many requests and new connections each host has seen.
+
+        :return: Dictionary of connection pool statistics
+        """
+        return self.pool_stats.snapshot()
+
+    async def run(self, search_query, website_filter=None, config=None, recency=None, query_trace=None,
+                  latency_budget=None, summary_quorum=None):
+        """
+        Main coroutine to execute the BYOB search tool.
+
+        :param search_query: User's search query
+        :param website_filter: Optional website to filter search results
+        :param config: Optional configuration dictionary to override defaults
+        :param recency: Restrict results by recency ('[age][period]', e.g. 'w1', 'd7', 'm3')
+        :param query_trace: Optional byob_metrics.QueryTrace to record the stages in
+        :param latency_budget: Optional seconds the whole query may take (see BYOBTool.run)
+        :param summary_quorum: Optional number of summaries to write the answer from (see BYOBTool.run)
+        :return: Comprehensive search results
+        """
+        # Apply any per-call configuration without creating new connection pools,
+        # on a copy that records its stages in this query's trace and keeps to its deadline
+        query_trace = query_trace or QueryTrace(search_query)
+        byob_instance = self.with_config(
+            self._query_config(config, latency_budget, summary_quorum)
+        ).for_query(query_trace)
+        query_outcome = OUTCOME_ERROR
+        try:
+            # Refine the search query using AI and search with the refined term
+            # (in speculative mode also with the raw query and any rewrites, fused into one ranking)
+            refined_search_query, searched_terms, search_result_items, later_search_pages = \
+                await byob_instance._refine_and_search(
+                    search_query,
+                    website_filter=website_filter or byob_instance.config['website_filter'],
+                    recency=recency or byob_instance.config['recency']
+                )
+            print(f"Search parameters: query={refined_search_query}, recency={recency or byob_instance.config['recency']}")
+
+            # Process search results
+            processed_search_results = await byob_instance.get_search_results(
+                search_items=search_result_items,
+                search_query=refined_search_query,
+                later_search_pages=later_search_pages
+            )
+
+            # Generate comprehensive RAG response
+            comprehensive_rag_response = await byob_instance.generate_comprehensive_response(
+                search_query=refined_search_query,
+                processed_search_results=processed_search_results
+            )
+            query_outcome = OUTCOME_OK
+
+            # Return structured search results
+            search_response = {
+                "refined_search_term": refined_search_query,
+                "comprehensive_rag_response": comprehensive_rag_response,
+                "processed_search_results": processed_search_results
+            }
+            if byob_instance.config['speculative_search']:
+                search_response["search_terms"] = searched_terms
+            if byob_instance.latency_budget:
+                search_response["sources"] = byob_instance.latency_budget.report()
+            return search_response
+        finally:
+            query_trace.finish(query_outcome)
+
+    async def run_stream(self, search_query, website_filter=None, config=None, recency=None, query_trace=None,
+                         latency_budget=None, summary_quorum=None):
+        """
+        Execute the BYOB search tool, reporting progress as each step finishes.
+
+        Yields the same (event, data) pairs as BYOBTool.run_stream ('refined',
+        'search_result', 'summary', 'answer_delta' and 'done').
+
+        :param search_query: User's search query
+        :param website_filter: Optional website to filter search results
+        :param config: Optional configuration dictionary to override defaults
+        :param recency: Optional '[age][period]' recency restriction
+        :param query_trace: Optional byob_metrics.QueryTrace to record the stages in
+        :param latency_budget: Optional seconds the whole query may take (see BYOBTool.run)
+        :param summary_quorum: Optional number of summaries to write the answer from (see BYOBTool.run)
+        :return: Async generator of (event name, event data) tuples
+        """
+        query_trace = query_trace or QueryTrace(search_query)
+        byob_instance = self.with_config(
+            self._query_config(config, latency_budget, summary_quorum)
+        ).for_query(query_trace)
+        recency = recency or byob_instance.config['recency']
+        query_outcome = OUTCOME_CANCELLED
+        try:
+            website_filter = website_filter or byob_instance.config['website_filter']
+            later_search_pages = None
+            arrived_pages = []
+            if byob_instance.config['speculative_search']:
+                # Search the raw query, the refined term and any rewrites, fused into one ranking
+                refined_search_query, searched_terms, search_result_items = await byob_instance.fan_out_search(
+                    search_query, website_filter=website_filter, recency=recency
+                )
+                yield 'refined', {'refined_search_term': refined_search_query, 'search_terms': searched_terms}
+            else:
+                refined_search_query = await byob_instance.refine_search_query(search_query)
+                yield 'refined', {'refined_search_term': refined_search_query}
+
+                # Deeper pages of results are reported, and processed, as they arrive
+                search_pages = byob_instance.iter_search_pages(
+                    refined_search_query, website_filter=website_filter, recency=recency
+                )
+                search_result_items = await search_pages.__anext__()
+                later_search_pages = self._track_arrivals(search_pages, arrived_pages)
+                searched_terms = [refined_search_query]
+            arrived_pages.insert(0, search_result_items)
+            reported_results = 0
+
+            def report_search_results():
+                # Search hits of the pages that have arrived, ranked on from the pages before them
+                nonlocal reported_results
+                search_result_events = []
+                while arrived_pages:
+                    for search_result in arrived_pages.pop(0):
+                        reported_results += 1
+                        search_result_events.append(('search_result', {
+                            'result_rank': reported_results,
+                            'webpage_url': search_result.get('link'),
+                            'result_title': search_result.get('snippet', '')
+                        }))
+                return search_result_events
+
+            for search_result_event in report_search_results():
+                yield search_result_event
+
+            # Report every page summary the moment it is ready (after the search hits that arrived before it)
+            processed_search_results = []
+            async for processed_result in byob_instance.iter_search_results(
+                search_result_items, refined_search_query, later_search_pages=later_search_pages
+            ):
+                for search_result_event in report_search_results():
+                    yield search_result_event
+                processed_search_results.append(processed_result)
+                yield 'summary', processed_result
+            for search_result_event in report_search_results():
+                yield search_result_event
+            processed_search_results.sort(key=lambda processed_result: processed_result['result_rank'])
+
+            # Stream the comprehensive response as it is written
+            response_fragments = []
+            async for response_fragment in byob_instance.stream_comprehensive_response(
+                refined_search_query, processed_search_results
+            ):
+                response_fragments.append(response_fragment)
+                yield 'answer_delta', {'content': response_fragment}
+
+            # The query is complete even if the caller stops reading after this event
+            query_outcome = OUTCOME_OK
+            query_trace.finish(query_outcome)
+            search_response = {
+                "refined_search_term": refined_search_query,
+                "comprehensive_rag_response": ''.join(response_fragments) or None,
+                "processed_search_results": processed_search_results
+            }
+            if byob_instance.config['speculative_search']:
+                search_response["search_terms"] = searched_terms
+            if byob_instance.latency_budget:
+                search_response["sources"] = byob_instance.latency_budget.report()
+            yield 'done', search_response
+        except Exception:
+            query_outcome = OUTCOME_ERROR
+            raise
+        finally:
+            query_trace.finish(query_outcome)
+
+    @staticmethod
+    async def _track_arrivals(search_pages, arrived_pages):
+        """
+        Pass pages of search results through, adding each to a list as it arrives.
+
+        :param search_pages: Async iterator of lists of search result items
+        :param arrived_pages: List the pages are appended to
+        :return: Async generator of the same pages
+        """
+        async for search_page in search_pages:
+            arrived_pages.append(search_page)
+            yield search_page
+
+    async def aclose(self):
+        """
+        Close the shared HTTP connection pool.
+        """
+        await self.http_client.aclose()
+
+
+class AsyncBYOBRunner:
+    """
+    Runs an AsyncBYOBTool on its own event loop in a background thread.
+
+    Synchronous callers (such as Flask request handlers) submit queries with
+    run(); the actual network work for every caller is multiplexed on the one
+    event loop and the one shared connection pool.
+    """
+
+    def __init__(self, config=None):
+        """
+        Start the background event loop and create the asynchronous tool on it.
+
+        :param config: Dictionary of configuration parameters for the tool
+        """
+        self.closed = False
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.loop.run_forever, name='byob-async-loop', daemon=True)
+        self.thread.start()
+
+        # Create the tool inside the loop so its connection pool belongs to that loop
+        self.tool = self.submit(self._create_tool(config)).result()
+
+    @staticmethod
+    async def _create_tool(config):
+        """
+        Create the AsyncBYOBTool from within the event loop.
+
+        :param config: Dictionary of configuration parameters for the tool
+        :return: AsyncBYOBTool instance
+        """
+        return AsyncBYOBTool(config=config)
+
+    def submit(self, coroutine):
+        """
+        Schedule a coroutine on the background event loop.
+
+        :param coroutine: Coroutine to run
+        :return: concurrent.futures.Future with the coroutine's result
+        """
+        return asyncio.run_coroutine_threadsafe(coroutine, self.loop)
+
+    def run(self, search_query, website_filter=None, config=None, recency=None, timeout=None, query_trace=None,
+            latency_budget=None, summary_quorum=None):
+        """
+        Run a research query on the background loop and wait for the result.
+
+        Without a timeout the wait is bounded by the query's latency budget or
+        'query_deadline' (whichever is shorter) plus RUNNER_TIMEOUT_GRACE
+        seconds, so a stuck query never holds the calling thread for good.
+        A query that runs out of time is cancelled on the loop.
+
+        :param search_query: User's search query
+        :param website_filter: Optional website to filter search results
+        :param config: Optional configuration dictionary to override defaults
+        :param recency: Optional '[age][period]' recency restriction
+        :param timeout: Optional number of seconds to wait for the result
+        :param query_trace: Optional byob_metrics.QueryTrace to record the stages in
+        :param latency_budget: Optional seconds the whole query may take
+        :param summary_quorum: Optional number of summaries to write the answer from
+        :return: Comprehensive search results
+        :raises concurrent.futures.TimeoutError: If the result is not ready in time
+        """
+        if timeout is None:
+            timeout = self._query_timeout(config, latency_budget)
+        search_future = self.submit(
+            self.tool.run(
+                search_query, website_filter=website_filter, config=config, recency=recency, query_trace=query_trace,
+                latency_budget=latency_budget, summary_quorum=summary_quorum
+            )
+        )
+        try:
+            return search_future.result(timeout=timeout)
+        except concurrent.futures.TimeoutError:
+            # Stop the query's downloads and OpenAI calls rather than leave them running on the loop
+            search_future.cancel()
+            raise
+
+    def _query_timeout(self, config=None, latency_budget=None):
+        """
+        Work out how long to wait for a query from its deadlines.
+
+        :param config: Optional configuration dictionary the query runs with
+        :param latency_budget: Optional seconds the whole query may take
+        :return: Seconds to wait, or None if the query has no deadline
+        """
+        query_config = {**self.tool.config, **(config or {})}
+        query_deadlines = [
+            seconds for seconds in (query_config['query_deadline'], latency_budget or query_config['latency_budget'])
+            if seconds
+        ]
+        return min(query_deadlines) + RUNNER_TIMEOUT_GRACE if query_deadlines else None
+
+    def close(self):
+        """
+        Close the connection pool and stop the background event loop.
+
+        Safe to call more than once.
+        """
+        if self.closed:
+            return
+        self.closed = True
+        self.submit(self.tool.aclose()).result()
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join()
+
+
+async def main():
+    """
+    Demonstrate the asynchronous tool by running two research queries at once.
+    """
+    byob_research_tool = AsyncBYOBTool()
+    try:
+        search_responses = await asyncio.gather(
+            byob_research_tool.run("last week in GenAI", recency='m3'),
+            byob_research_tool.run("latest open source LLM releases", recency='m3')
+        )
+        for search_response in search_responses:
+            print("Refined Search Term:", search_response['refined_search_term'])
+            print("\nComprehensive RAG Response:\n", search_response['comprehensive_rag_response'])
+    finally:
+        await byob_research_tool.aclose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,655 @@
+#!/usr/bin/env python3
+"""
+BYOB (Bring Your Own Browser) Web Search Tool - Offline Batch Research
+
+Running hundreds of research queries through BYOBTool.run makes every
+OpenAI call live, one query after another, at interactive prices. This
+module runs a whole file of queries as a few large jobs in the OpenAI Batch
+API format instead:
+1. Refine: one batch with a search-term refinement request per query
+2. Gather: Google searches and webpage downloads for every query, run concurrently
+3. Summarize: one batch with a summary request per downloaded page
+4. Answer: one batch with a comprehensive response request per query
+
+Progress is checkpointed in a work directory after every step, so an
+interrupted run picks up where it left off (already submitted batches are
+polled again, not resubmitted) when the same command is run again.
+
+Key Components:
+- BatchResearchRun: Drives the four steps and writes the final results
+- OpenAIBatchExecutor: Submits batch files to the OpenAI Batch API
+- LocalBatchExecutor: Runs batch files locally, either against the live chat
+  completions API or fully offline with a stand-in responder
+
+Usage:
+    python byob_batch.py queries.txt --work-dir nightly_run
+    python byob_batch.py queries.jsonl --executor offline
+"""
+
+import argparse  # For command-line options
+import json      # For batch files and checkpoints
+import os        # For working with file paths
+import time      # For polling batches
+import uuid      # For local batch and request ids
+from concurrent.futures import ThreadPoolExecutor  # For running searches, downloads and local requests in parallel
+
+from byob_relevance import count_tokens  # For reserving tokens with the rate limiter
+from byob_search import BYOBTool, REFINE_MODEL, RESPONSE_MODEL
+
+# Endpoint every request in the batch files is sent to
+BATCH_ENDPOINT = '/v1/chat/completions'
+
+# How long OpenAI has to finish a batch
+BATCH_COMPLETION_WINDOW = '24h'
+
+# Batch states after which polling stops
+BATCH_FINAL_STATES = frozenset({'completed', 'failed', 'expired', 'cancelled'})
+
+# The steps that are sent to the batch executor, in order
+BATCH_STAGES = ('refine', 'summarize', 'answer')
+
+
+def load_queries(queries_path):
+    """
+    Read the research queries to run.
+
+    Plain text files hold one query per line (blank lines and lines starting
+    with '#' are ignored). JSONL files hold one object per line with a
+    'query' and optionally 'website_filter' and 'recency'.
+
+    :param queries_path: Path to a .txt or .jsonl file
+    :return: List of query dictionaries
+    """
+    queries = []
+    with open(queries_path, encoding='utf-8') as queries_file:
+        for line in queries_file:
+            line = line.strip()
+            if not line or line.startswith('#'):
+                continue
+            if queries_path.endswith('.jsonl'):
+                query_spec = json.loads(line)
+            else:
+                query_spec = {'query': line}
+            queries.append({
+                'query': query_spec['query'],
+                'website_filter': query_spec.get('website_filter'),
+                'recency': query_spec.get('recency')
+            })
+    return queries
+
+
+def write_jsonl(jsonl_path, records):
+    """
+    Write records to a JSONL file, replacing it only once it is complete.
+
+    :param jsonl_path: Path of the file to write
+    :param records: Iterable of JSON-serializable records
+    """
+    temporary_path = jsonl_path + '.tmp'
+    with open(temporary_path, 'w', encoding='utf-8') as jsonl_file:
+        for record in records:
+            jsonl_file.write(json.dumps(record) + '\n')
+    os.replace(temporary_path, jsonl_path)
+
+
+def read_jsonl(jsonl_path):
+    """
+    Read every record from a JSONL file.
+
+    :param jsonl_path: Path of the file to read
+    :return: List of records
+    """
+    with open(jsonl_path, encoding='utf-8') as jsonl_file:
+        return [json.loads(line) for line in jsonl_file if line.strip()]
+
+
+def make_batch_request(custom_id, request_body):
+    """
+    Wrap a chat completion request in the Batch API input format.
+
+    :param custom_id: Id used to match the response to the request
+    :param request_body: Chat completion parameters (model, messages, ...)
+    :return: Batch input record
+    """
+    return {'custom_id': custom_id, 'method': 'POST', 'url': BATCH_ENDPOINT, 'body': request_body}
+
+
+def parse_batch_output(output_records):
+    """
+    Pull the completion text out of Batch API output records.
+
+    :param output_records: Records from a batch output (and error) file
+    :return: Dictionary of {custom_id: completion text, or None if the request failed}
+    """
+    completions = {}
+    for output_record in output_records:
+        response = output_record.get('response') or {}
+        if output_record.get('error') or response.get('status_code') != 200:
+            print(f"Batch Request Error for {output_record.get('custom_id')}: "
+                  f"{output_record.get('error') or response.get('body')}")
+            completions[output_record['custom_id']] = None
+            continue
+        completions[output_record['custom_id']] = response['body']['choices'][0]['message']['content']
+    return completions
+
+
+def offline_responder(request_body):
+    """
+    Stand-in for the model when running without network access.
+
+    Answers every request with the start of its last message, so refinement
+    keeps the original query and summaries keep the start of the page.
+
+    :param request_body: Chat completion parameters
+    :return: Completion text
+    """
+    return request_body['messages'][-1]['content'][:500]
+
+
+class OpenAIBatchExecutor:
+    """
+    Runs batch files through the OpenAI Batch API.
+    """
+
+    def __init__(self, openai_client):
+        """
+        Create the executor.
+
+        :param openai_client: OpenAI client used to upload files and create batches
+        :raises RuntimeError: If the installed openai package has no Batch API (before 1.18)
+        """
+        if not hasattr(openai_client, 'batches'):
+            raise RuntimeError(
+                "The installed openai package has no Batch API; upgrade it (pip install -r requirements.txt) "
+                "or run with --executor local"
+            )
+        self.openai_client = openai_client
+
+    def submit(self, input_path):
+        """
+        Upload a batch input file and start the batch.
+
+        :param input_path: Path of the JSONL batch input file
+        :return: Batch id
+        """
+        with open(input_path, 'rb') as input_file:
+            input_file_object = self.openai_client.files.create(file=input_file, purpose='batch')
+        batch = self.openai_client.batches.create(
+            input_file_id=input_file_object.id,
+            endpoint=BATCH_ENDPOINT,
+            completion_window=BATCH_COMPLETION_WINDOW
+        )
+        return batch.id
+
+    def poll(self, batch_id):
+        """
+        Check the state of a batch.
+
+        :param batch_id: Batch id returned by submit()
+        :return: Batch state ('validating', 'in_progress', 'completed', 'failed', ...)
+        """
+        return self.openai_client.batches.retrieve(batch_id).status
+
+    def download(self, batch_id, output_path):
+        """
+        Save the output (and error) records of a finished batch.
+
+        :param batch_id: Batch id returned by submit()
+        :param output_path: Path of the JSONL file to write
+        """
+        batch = self.openai_client.batches.retrieve(batch_id)
+        output_lines = []
+        for file_id in (batch.output_file_id, batch.error_file_id):
+            if file_id:
+                output_lines.extend(line for line in self.openai_client.files.content(file_id).text.splitlines() if line)
+        write_jsonl(output_path, (json.loads(line) for line in output_lines))
+
+
+class LocalBatchExecutor:
+    """
+    Runs batch files on this machine, producing the same output format as the Batch API.
+
+    With an OpenAI client the requests go to the live chat completions API
+    (useful where the Batch API is not available), through the process-wide
+    rate limiters if they are given; with a responder function no network
+    calls are made at all.
+    """
+
+    def __init__(self, work_dir, openai_client=None, responder=None, max_workers=4, rate_limiters=None):
+        """
+        Create the executor.
+
+        :param work_dir: Directory where local batch outputs are kept
+        :param openai_client: OpenAI client for live requests
+        :param responder: Function turning a request body into completion text (used instead of OpenAI)
+        :param max_workers: Number of requests run at the same time
+        :param rate_limiters: Optional byob_ratelimit.RateLimiterRegistry live requests wait and retry in
+        """
+        if openai_client is None and responder is None:
+            raise ValueError("LocalBatchExecutor needs an OpenAI client or a responder function")
+        self.batch_dir = os.path.join(work_dir, 'local_batches')
+        os.makedirs(self.batch_dir, exist_ok=True)
+        self.openai_client = openai_client
+        self.responder = responder
+        self.max_workers = max_workers
+        self.rate_limiters = rate_limiters
+
+    def _execute_request(self, batch_request):
+        """
+        Run one batch request.
+
+        :param batch_request: Batch input record
+        :return: Batch output record
+        """
+        output_record = {'id': f"batch_req_{uuid.uuid4().hex}", 'custom_id': batch_request['custom_id'],
+                         'response': None, 'error': None}
+        try:
+            if self.responder is not None:
+                completion_text = self.responder(batch_request['body'])
+                response_body = {
+                    'id': f"chatcmpl-local-{uuid.uuid4().hex}",
+                    'object': 'chat.completion',
+                    'model': batch_request['body']['model'],
+                    'choices': [{'index': 0, 'finish_reason': 'stop',
+                                 'message': {'role': 'assistant', 'content': completion_text}}]
+                }
+            elif self.rate_limiters is not None:
+                response_body = self._limited_completion(batch_request['body']).model_dump()
+            else:
+                response_body = self.openai_client.chat.completions.create(**batch_request['body']).model_dump()
+            output_record['response'] = {'status_code': 200, 'request_id': '', 'body': response_body}
+        except Exception as request_error:
+            output_record['error'] = {'code': type(request_error).__name__, 'message': str(request_error)}
+        return output_record
+
+    def _limited_completion(self, request_body):
+        """
+        Send one chat completion request through the model's rate limiter.
+
+        :param request_body: Chat completions request body
+        :return: ChatCompletion
+        """
+        model_limiter = self.rate_limiters.openai(request_body['model'])
+        estimated_tokens = sum(count_tokens(message['content'], request_body['model'])
+                               for message in request_body['messages']) + request_body.get('max_tokens', 0)
+
+        def send_completion_request():
+            raw_response = self.openai_client.chat.completions.with_raw_response.create(**request_body)
+            return raw_response.parse(), raw_response.headers
+
+        chat_completion = model_limiter.call(send_completion_request, estimated_tokens)
+        if getattr(chat_completion, 'usage', None):
+            model_limiter.settle_tokens(estimated_tokens, chat_completion.usage.total_tokens)
+        return chat_completion
+
+    def submit(self, input_path):
+        """
+        Run every request in a batch file and keep the output.
+
+        :param input_path: Path of the JSONL batch input file
+        :return: Batch id
+        """
+        batch_id = f"batch_local_{uuid.uuid4().hex}"
+        with ThreadPoolExecutor(max_workers=self.max_workers) as request_pool:
+            output_records = list(request_pool.map(self._execute_request, read_jsonl(input_path)))
+        write_jsonl(os.path.join(self.batch_dir, batch_id + '.jsonl'), output_records)
+        return batch_id
+
+    def poll(self, batch_id):
+        """
+        Check the state of a batch (local batches finish during submit()).
+
+        :param batch_id: Batch id returned by submit()
+        :return: 'completed', or 'failed' if the output is missing
+        """
+        return 'completed' if os.path.exists(os.path.join(self.batch_dir, batch_id + '.jsonl')) else 'failed'
+
+    def download(self, batch_id, output_path):
+        """
+        Copy the output records of a batch.
+
+        :param batch_id: Batch id returned by submit()
+        :param output_path: Path of the JSONL file to write
+        """
+        write_jsonl(output_path, read_jsonl(os.path.join(self.batch_dir, batch_id + '.jsonl')))
+
+
+class BatchResearchRun:
+    """
+    Runs a file of research queries as batches, with checkpoint/resume.
+
+    Everything needed to resume is kept in the work directory:
+    state.json (progress, refined terms, search results, cached summaries)
+    plus the input and output file of each batch.
+    """
+
+    def __init__(self, byob_tool, work_dir, executor, poll_interval=60):
+        """
+        Prepare a batch run.
+
+        :param byob_tool: BYOBTool used for searches, downloads, caches and prompts
+        :param work_dir: Directory for checkpoints and batch files
+        :param executor: OpenAIBatchExecutor or LocalBatchExecutor
+        :param poll_interval: Seconds between batch state checks
+        """
+        self.byob_tool = byob_tool
+        self.work_dir = work_dir
+        self.executor = executor
+        self.poll_interval = poll_interval
+        self.state_path = os.path.join(work_dir, 'state.json')
+        os.makedirs(work_dir, exist_ok=True)
+        self.state = None
+
+    def _load_state(self, queries):
+        """
+        Load the checkpoint for these queries, or start a new one.
+
+        :param queries: List of query dictionaries
+        :raises ValueError: If the work directory belongs to a different set of queries
+        """
+        if os.path.exists(self.state_path):
+            with open(self.state_path, encoding='utf-8') as state_file:
+                self.state = json.load(state_file)
+            if self.state['queries'] != queries:
+                raise ValueError(f"{self.work_dir} holds a run for different queries; use a new --work-dir")
+            print(f"Resuming batch run from {self.state_path}")
+            return
+        self.state = {
+            'queries': queries,
+            'stages': {stage_name: {} for stage_name in BATCH_STAGES},
+            'refined_terms': {},
+            'search_items': {},
+            'cached_summaries': {},
+            'duplicate_urls': {},
+            'results_written': False
+        }
+        self._save_state()
+
+    def _save_state(self):
+        """
+        Write the checkpoint, replacing the previous one only once it is complete.
+        """
+        temporary_path = self.state_path + '.tmp'
+        with open(temporary_path, 'w', encoding='utf-8') as state_file:
+            json.dump(self.state, state_file)
+        os.replace(temporary_path, self.state_path)
+
+    def _run_batch_stage(self, stage_name, build_requests):
+        """
+        Submit one batch (unless it already was), wait for it and read its output.
+
+        :param stage_name: One of BATCH_STAGES
+        :param build_requests: Function returning the list of batch input records
+        :return: Dictionary of {custom_id: completion text}, or None if the batch failed
+        """
+        stage_state = self.state['stages'][stage_name]
+        input_path = os.path.join(self.work_dir, f"{stage_name}_input.jsonl")
+        output_path = os.path.join(self.work_dir, f"{stage_name}_output.jsonl")
+
+        if not stage_state.get('complete'):
+            if not stage_state.get('batch_id'):
+                batch_requests = build_requests()
+                if not batch_requests:
+                    stage_state['complete'] = True
+                    self._save_state()
+                    return {}
+                write_jsonl(input_path, batch_requests)
+                stage_state['batch_id'] = self.executor.submit(input_path)
+                stage_state['request_count'] = len(batch_requests)
+                self._save_state()
+                print(f"Submitted {stage_name} batch {stage_state['batch_id']} with {len(batch_requests)} requests")
+
+            # Wait for the batch to finish
+            batch_state = self.executor.poll(stage_state['batch_id'])
+            while batch_state not in BATCH_FINAL_STATES:
+                time.sleep(self.poll_interval)
+                batch_state = self.executor.poll(stage_state['batch_id'])
+            if batch_state != 'completed':
+                print(f"Batch {stage_state['batch_id']} for the {stage_name} step ended as '{batch_state}'; "
+                      f"run again to resubmit it")
+                # Forget the batch so the next run submits it again
+                stage_state.pop('batch_id')
+                self._save_state()
+                return None
+
+            self.executor.download(stage_state['batch_id'], output_path)
+            stage_state['complete'] = True
+            self._save_state()
+
+        return parse_batch_output(read_jsonl(output_path)) if os.path.exists(output_path) else {}
+
+    def _build_refine_requests(self):
+        """
+        Create a refinement request for every query without a cached refined term.
+
+        :return: List of batch input records
+        """
+        batch_requests = []
+        for query_index, query_spec in enumerate(self.state['queries']):
+            cached_refined_term = None
+            if self.byob_tool.search_cache:
+                cached_refined_term = self.byob_tool.search_cache.get_refined_term(query_spec['query'], REFINE_MODEL)
+            if cached_refined_term is not None:
+                self.state['refined_terms'][str(query_index)] = cached_refined_term
+                continue
+            batch_requests.append(make_batch_request(
+                f"refine-{query_index}",
+                {'model': REFINE_MODEL, 'messages': self.byob_tool._refine_messages(query_spec['query'])}
+            ))
+        return batch_requests
+
+    def _search_query(self, query_index):
+        """
+        Run the Google search for one query.
+
+        :param query_index: Position of the query in the query file
+        :return: Tuple of (query index, search result items)
+        """
+        query_spec = self.state['queries'][query_index]
+        search_items = self.byob_tool.search(
+            search_query=self.state['refined_terms'][str(query_index)],
+            website_filter=query_spec['website_filter'] or self.byob_tool.config['website_filter'],
+            recency=query_spec['recency'] or self.byob_tool.config['recency']
+        )
+        return query_index, search_items
+
+    def _build_summary_requests(self):
+        """
+        Search and download pages for every query, then create a summary request per page.
+
+        Pages whose summary is already cached are answered from the cache
+        instead of being added to the batch, and copies of a page already in
+        the batch are left out (their URLs are cited with the kept copy).
+
+        :return: List of batch input records
+        """
+        query_count = len(self.state['queries'])
+        with ThreadPoolExecutor(max_workers=self.byob_tool.config['max_fetch_workers']) as gather_pool:
+            # Search for every query at once
+            for query_index, search_items in gather_pool.map(self._search_query, range(query_count)):
+                self.state['search_items'][str(query_index)] = search_items
+
+            # Download every page of every query at once (each canonical URL once per query)
+            deduplicators = [self.byob_tool._new_deduplicator() for _ in range(query_count)]
+            page_keys = [
+                (query_index, result_rank, search_result)
+                for query_index in range(query_count)
+                for result_rank, search_result in self.byob_tool._results_to_fetch(
+                    self.state['search_items'][str(query_index)], deduplicators[query_index]
+                )
+            ]
+            page_contents = gather_pool.map(
+                lambda page_key: self.byob_tool.retrieve_content(page_key[2].get('link')), page_keys
+            )
+
+            batch_requests = []
+            for (query_index, result_rank, search_result), webpage_content in zip(page_keys, page_contents):
+                if webpage_content is None:
+                    continue
+                deduplicator = deduplicators[query_index]
+                if self.byob_tool._is_duplicate_page(deduplicator, result_rank, search_result, webpage_content):
+                    continue
+                refined_term = self.state['refined_terms'][str(query_index)]
+                custom_id = f"summary-{query_index}-{result_rank}"
+                # The list keeps growing if later pages turn out to be copies of this one
+                self.state['duplicate_urls'][custom_id] = self.byob_tool._duplicate_urls(deduplicator, result_rank)
+
+                summary_cache_key = self.byob_tool._summary_cache_key(webpage_content, refined_term)
+                cached_summary = self.byob_tool.summary_cache.get(summary_cache_key) if summary_cache_key else None
+                if cached_summary is not None:
+                    self.state['cached_summaries'][custom_id] = cached_summary
+                    continue
+
+                relevant_content = self.byob_tool._select_relevant_content(webpage_content, refined_term)
+                summary_request = make_batch_request(custom_id, {
+                    'model': self.byob_tool.config['summary_model'],
+                    'messages': self.byob_tool._summary_messages(relevant_content, refined_term)
+                })
+                # Remember the cache key so the summary can be stored once the batch returns
+                summary_request['byob_summary_cache_key'] = summary_cache_key
+                batch_requests.append(summary_request)
+
+        self._save_state()
+        # The cache keys are kept in a separate file; the Batch API only accepts its own fields
+        write_jsonl(os.path.join(self.work_dir, 'summary_cache_keys.jsonl'), (
+            {'custom_id': summary_request['custom_id'], 'key': summary_request.pop('byob_summary_cache_key')}
+            for summary_request in batch_requests
+        ))
+        return batch_requests
+
+    def _store_summaries(self, summaries):
+        """
+        Put the summaries from the batch into the summary cache.
+
+        :param summaries: Dictionary of {custom_id: summary}
+        """
+        cache_keys_path = os.path.join(self.work_dir, 'summary_cache_keys.jsonl')
+        if not self.byob_tool.summary_cache or not os.path.exists(cache_keys_path):
+            return
+        for cache_key_record in read_jsonl(cache_keys_path):
+            webpage_summary = summaries.get(cache_key_record['custom_id'])
+            if cache_key_record['key'] and webpage_summary:
+                self.byob_tool.summary_cache.set(cache_key_record['key'], webpage_summary)
+
+    def _processed_search_results(self, query_index, summaries):
+        """
+        Build the processed search results of one query, in search ranking order.
+
+        :param query_index: Position of the query in the query file
+        :param summaries: Dictionary of {custom_id: summary}
+        :return: List of processed search results
+        """
+        processed_search_results = []
+        for result_rank, search_result in enumerate(self.state['search_items'][str(query_index)], start=1):
+            custom_id = f"summary-{query_index}-{result_rank}"
+            if custom_id in summaries:
+                processed_search_results.append(self.byob_tool._build_processed_result(
+                    result_rank, search_result, summaries[custom_id], self.state['duplicate_urls'].get(custom_id)
+                ))
+        return processed_search_results
+
+    def _build_answer_requests(self, summaries):
+        """
+        Create a comprehensive response request for every query.
+
+        :param summaries: Dictionary of {custom_id: summary}
+        :return: List of batch input records
+        """
+        return [
+            make_batch_request(f"answer-{query_index}", {
+                'model': RESPONSE_MODEL,
+                'messages': self.byob_tool._comprehensive_messages(
+                    self.state['refined_terms'][str(query_index)],
+                    self._processed_search_results(query_index, summaries)
+                ),
+                'temperature': 0
+            })
+            for query_index in range(len(self.state['queries']))
+        ]
+
+    def run(self, queries, output_path):
+        """
+        Run (or resume) the batch research for a list of queries.
+
+        :param queries: List of query dictionaries (see load_queries)
+        :param output_path: Path of the JSONL file to write the results to
+        :return: List of results with the same structure BYOBTool.run returns, or None if a batch failed
+        """
+        self._load_state(queries)
+
+        # Step 1: refine every query
+        refined_terms = self._run_batch_stage('refine', self._build_refine_requests)
+        if refined_terms is None:
+            return None
+        for query_index, query_spec in enumerate(self.state['queries']):
+            refined_term = refined_terms.get(f"refine-{query_index}")
+            if refined_term and self.byob_tool.search_cache:
+                self.byob_tool.search_cache.set_refined_term(query_spec['query'], REFINE_MODEL, refined_term)
+            # Fall back to the original query if its refinement failed
+            self.state['refined_terms'].setdefault(str(query_index), refined_term or query_spec['query'])
+        self._save_state()
+
+        # Steps 2 and 3: search and download, then summarize every page
+        batch_summaries = self._run_batch_stage('summarize', self._build_summary_requests)
+        if batch_summaries is None:
+            return None
+        self._store_summaries(batch_summaries)
+        summaries = {**self.state['cached_summaries'], **batch_summaries}
+
+        # Step 4: write the comprehensive response for every query
+        answers = self._run_batch_stage('answer', lambda: self._build_answer_requests(summaries))
+        if answers is None:
+            return None
+
+        batch_results = [
+            {
+                'query': query_spec['query'],
+                'refined_search_term': self.state['refined_terms'][str(query_index)],
+                'comprehensive_rag_response': answers.get(f"answer-{query_index}"),
+                'processed_search_results': self._processed_search_results(query_index, summaries)
+            }
+            for query_index, query_spec in enumerate(self.state['queries'])
+        ]
+        write_jsonl(output_path, batch_results)
+        self.state['results_written'] = True
+        self._save_state()
+        return batch_results
+
+
+def main():
+    """
+    Run a file of research queries as batches from the command line.
+    """
+    parser = argparse.ArgumentParser(description='Run BYOB research queries as OpenAI batches.')
+    parser.add_argument('queries_file', help='Text file with one query per line, or JSONL with a "query" per line')
+    parser.add_argument('--work-dir', default='byob_batch_run', help='Directory for checkpoints and batch files')
+    parser.add_argument('--output', help='Results file (default: <work-dir>/results.jsonl)')
+    parser.add_argument('--executor', choices=['openai', 'local', 'offline'], default='openai',
+                        help="'openai' uses the Batch API, 'local' sends the batch requests one by one to the "
+                             "live API, 'offline' answers them with a stand-in without calling OpenAI")
+    parser.add_argument('--poll-interval', type=float, default=60, help='Seconds between batch state checks')
+    args = parser.parse_args()
+
+    byob_tool = BYOBTool()
+    if args.executor == 'openai':
+        try:
+            executor = OpenAIBatchExecutor(byob_tool.openai_client)
+        except RuntimeError as executor_error:
+            parser.error(str(executor_error))
+    elif args.executor == 'local':
+        # The rate limiters do the retrying, so the client must not retry on its own as well
+        executor = LocalBatchExecutor(args.work_dir, openai_client=byob_tool._limited_openai_client,
+                                      max_workers=byob_tool.config['max_llm_workers'],
+                                      rate_limiters=byob_tool.rate_limiters)
+    else:
+        executor = LocalBatchExecutor(args.work_dir, responder=offline_responder)
+
+    output_path = args.output or os.path.join(args.work_dir, 'results.jsonl')
+    batch_run = BatchResearchRun(byob_tool, args.work_dir, executor, poll_interval=args.poll_interval)
+    batch_results = batch_run.run(load_queries(args.queries_file), output_path)
+    if batch_results is not None:
+        print(f"Wrote {len(batch_results)} results to {output_path}")
+
+
+if __name__ == "__main__":
+    main()
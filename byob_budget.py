@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""
+BYOB (Bring Your Own Browser) Web Search Tool - Latency Budgets
+
+Without a budget, the final answer is only written once every page has been
+downloaded and summarized, so the slowest website decides how long every
+query takes. A latency budget makes query time predictable:
+- The query gets a total budget in seconds. Page collection must stop early
+  enough to leave 'generation_reserve' seconds for writing the answer
+- A quorum can end collection sooner: once that many pages are summarized,
+  the answer is written from them
+- When collection stops, downloads and summaries still running are stopped
+  and their pages skipped
+- Every search result is reported as included in the answer or skipped,
+  with the reason
+
+Key Components:
+- LatencyBudget: Deadlines and quorum of one query, and its source report
+"""
+
+import threading  # For stopping work running on other threads
+import time       # For deadlines
+
+# Default share of the budget kept for writing the answer
+DEFAULT_GENERATION_RESERVE = 15.0  # Seconds
+MIN_COLLECT_SHARE = 0.5  # Collection always gets at least this share of the budget
+
+# Why collection stopped
+STOP_COMPLETE = 'complete'  # Every page was processed
+STOP_QUORUM = 'quorum'      # Enough pages were summarized
+STOP_DEADLINE = 'deadline'  # The collection deadline passed
+
+# What happened to a search result
+SOURCE_INCLUDED = 'included'
+SOURCE_SKIPPED = 'skipped'
+
+# Why a search result was skipped
+SKIP_FETCH_FAILED = 'fetch_failed'          # The page could not be downloaded or had no text
+SKIP_DUPLICATE = 'duplicate'                # The page is a copy of another result
+SKIP_SUMMARY_FAILED = 'summary_failed'      # Summarization failed
+SKIP_UNFINISHED = 'unfinished'              # Still downloading or summarizing when collection stopped
+
+
+class LatencyBudget:
+    """
+    The time budget and summary quorum of one query, and what happened to each of its search results.
+    """
+
+    def __init__(self, total_seconds=None, summary_quorum=None, generation_reserve=DEFAULT_GENERATION_RESERVE):
+        """
+        Start the budget clock.
+
+        :param total_seconds: Seconds the whole query may take (None for no time limit)
+        :param summary_quorum: Number of summaries after which the answer is written (None or 0 waits for all)
+        :param generation_reserve: Seconds of the budget kept for writing the answer
+        """
+        self.total_seconds = total_seconds
+        self.summary_quorum = summary_quorum or None
+        self.started_at = time.monotonic()
+        self.deadline_at = None
+        self.collect_deadline_at = None
+        if total_seconds:
+            self.deadline_at = self.started_at + total_seconds
+            collect_seconds = max(total_seconds - generation_reserve, total_seconds * MIN_COLLECT_SHARE)
+            self.collect_deadline_at = self.started_at + collect_seconds
+
+        # Set when collection stops; downloads and summaries still running give up at their next step
+        self.collection_stopped = threading.Event()
+        self.stop_reason = None
+        self.collect_seconds = None
+        self._lock = threading.Lock()
+        self._sources = {}
+
+    def collect_remaining(self):
+        """
+        Seconds left for collecting pages.
+
+        :return: Seconds (may be negative), or None without a time limit
+        """
+        if self.collect_deadline_at is None:
+            return None
+        return self.collect_deadline_at - time.monotonic()
+
+    def quorum_met(self, summaries_ready):
+        """
+        Check whether enough pages have been summarized to write the answer.
+
+        :param summaries_ready: Number of successful summaries so far
+        :return: True if the quorum is set and met
+        """
+        return self.summary_quorum is not None and summaries_ready >= self.summary_quorum
+
+    def stop_collection(self, stop_reason):
+        """
+        End page collection (the first reason given is kept).
+
+        :param stop_reason: STOP_COMPLETE, STOP_QUORUM or STOP_DEADLINE
+        """
+        with self._lock:
+            if self.stop_reason is None:
+                self.stop_reason = stop_reason
+                self.collect_seconds = round(time.monotonic() - self.started_at, 3)
+        self.collection_stopped.set()
+
+    def record_source(self, result_rank, webpage_url, status, skip_reason=None):
+        """
+        Record what happened to a search result (a later record for the same rank replaces an earlier one).
+
+        :param result_rank: Rank of the result in the search ranking
+        :param webpage_url: URL of the result
+        :param status: SOURCE_INCLUDED or SOURCE_SKIPPED
+        :param skip_reason: Why the result was skipped
+        """
+        with self._lock:
+            self._sources[result_rank] = {
+                'result_rank': result_rank, 'webpage_url': webpage_url, 'status': status, 'skip_reason': skip_reason
+            }
+
+    def record_unfinished(self, unfinished_results):
+        """
+        Mark results still being downloaded or summarized when collection stopped as skipped.
+
+        :param unfinished_results: Iterable of (result rank, search result)
+        """
+        for result_rank, search_result in unfinished_results:
+            self.record_source(result_rank, search_result.get('link'), SOURCE_SKIPPED, SKIP_UNFINISHED)
+
+    def report(self):
+        """
+        Describe the budget and which search results the answer was written from.
+
+        :return: Dictionary with the budget settings, why collection stopped, and included / skipped sources
+        """
+        with self._lock:
+            sources = [dict(self._sources[result_rank]) for result_rank in sorted(self._sources)]
+        return {
+            'latency_budget': self.total_seconds,
+            'summary_quorum': self.summary_quorum,
+            'stop_reason': self.stop_reason,
+            'collect_seconds': self.collect_seconds,
+            'included': [
+                {'result_rank': source['result_rank'], 'webpage_url': source['webpage_url']}
+                for source in sources if source['status'] == SOURCE_INCLUDED
+            ],
+            'skipped': [
+                {key: value for key, value in source.items() if key != 'status'}
+                for source in sources if source['status'] == SOURCE_SKIPPED
+            ]
+        }
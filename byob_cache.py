@@ -0,0 +1,776 @@
+#!/usr/bin/env python3
+"""
+BYOB (Bring Your Own Browser) Web Search Tool - Local Caches
+
+Popular webpages show up in the results of many different research queries.
+Downloading, parsing and summarizing them again every time wastes bandwidth,
+CPU and OpenAI spend, so this module keeps local, disk-backed caches of the
+work already done.
+
+Key Components:
+- PageCache: Content-addressed store of extracted webpage text, with TTL,
+  size-bounded LRU eviction and HTTP conditional revalidation
+  (If-None-Match / If-Modified-Since)
+- SQLiteCache: Generic key/value store with TTL and LRU eviction
+- SummaryCache: Memoized webpage summaries keyed by page text, query and model
+- LRUCache / TieredCache: In-memory LRU with optional SQLite persistence
+- SearchCache: Refined search terms and Google Custom Search results, with
+  TTLs that follow the recency window of the search
+"""
+
+import hashlib    # For content-addressing cached text
+import json       # For storing structured cache values
+import os         # For working with cache directories and files
+import re         # For parsing recency filters
+import sqlite3    # For the cache index
+import tempfile   # For writing cache files atomically
+import threading  # For making the caches safe to share between threads
+import time       # For TTL bookkeeping
+from collections import OrderedDict  # For the in-memory LRU
+from dataclasses import dataclass  # For simple cache entry records
+
+# Default cache settings
+DEFAULT_CACHE_DIR = os.getenv(
+    'BYOB_CACHE_DIR',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), '.byob_cache')
+)
+DEFAULT_PAGE_CACHE_TTL = 6 * 60 * 60  # Seconds a cached page is served without revalidation
+DEFAULT_PAGE_CACHE_MAX_BYTES = 200 * 1024 * 1024  # Total size of cached page text
+DEFAULT_SUMMARY_CACHE_TTL = 24 * 60 * 60  # Seconds a summary is reused
+DEFAULT_SUMMARY_CACHE_MAX_ENTRIES = 50000  # Number of summaries kept before evicting
+DEFAULT_SEARCH_CACHE_MAX_ENTRIES = 1000  # Number of refined terms / result lists kept in memory
+DEFAULT_REFINE_CACHE_TTL = 7 * 24 * 60 * 60  # Seconds a refined search term is reused
+MIN_SEARCH_RESULTS_TTL = 10 * 60  # Shortest time search results are reused
+MAX_SEARCH_RESULTS_TTL = 24 * 60 * 60  # Longest time search results are reused
+
+# Length of each recency period in seconds
+RECENCY_PERIOD_SECONDS = {
+    'd': 24 * 60 * 60,
+    'w': 7 * 24 * 60 * 60,
+    'm': 30 * 24 * 60 * 60,
+    'y': 365 * 24 * 60 * 60
+}
+
+
+def content_hash(text):
+    """
+    Compute the SHA-256 hash used to address a piece of text.
+
+    :param text: Text to hash
+    :return: Hexadecimal digest
+    """
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+@dataclass
+class CachedPage:
+    """
+    A webpage's extracted text as stored in the PageCache.
+    """
+    url: str
+    text: str
+    etag: str
+    last_modified: str
+    fetched_at: float
+    is_fresh: bool
+
+    def conditional_headers(self):
+        """
+        Build the headers that ask the server whether the page has changed.
+
+        :return: Dictionary of If-None-Match / If-Modified-Since headers
+        """
+        headers = {}
+        if self.etag:
+            headers['If-None-Match'] = self.etag
+        if self.last_modified:
+            headers['If-Modified-Since'] = self.last_modified
+        return headers
+
+
+class PageCache:
+    """
+    Disk-backed cache of extracted webpage text.
+
+    The text lives in content-addressed files (named after the SHA-256 of the
+    text, so mirrored pages share one file) and a small SQLite index maps each
+    URL to its file together with the ETag / Last-Modified validators the
+    server sent. Within the TTL a page is served straight from disk; after the
+    TTL it is revalidated, and a 304 Not Modified answer skips both the
+    download and the HTML parse.
+
+    Text depends on how it was extracted, so entries are keyed by the URL
+    together with the extraction settings (see make_key).
+    """
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, ttl_seconds=DEFAULT_PAGE_CACHE_TTL,
+                 max_bytes=DEFAULT_PAGE_CACHE_MAX_BYTES):
+        """
+        Open (or create) the page cache.
+
+        :param cache_dir: Directory that holds the cache files
+        :param ttl_seconds: Seconds a cached page is served without revalidation
+        :param max_bytes: Total size of cached text before least recently used pages are evicted
+        """
+        self.cache_dir = os.path.join(cache_dir, 'pages')
+        self.objects_dir = os.path.join(self.cache_dir, 'objects')
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        os.makedirs(self.objects_dir, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(
+            os.path.join(self.cache_dir, 'index.sqlite'), timeout=30, check_same_thread=False
+        )
+        self._connection.execute('PRAGMA journal_mode=WAL')
+        self._connection.execute(
+            '''CREATE TABLE IF NOT EXISTS pages (
+                url TEXT PRIMARY KEY,
+                content_hash TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                char_limit INTEGER NOT NULL,
+                etag TEXT,
+                last_modified TEXT,
+                fetched_at REAL NOT NULL,
+                last_access REAL NOT NULL
+            )'''
+        )
+        self._connection.execute('CREATE INDEX IF NOT EXISTS pages_last_access ON pages (last_access)')
+        self._connection.commit()
+
+        # Counters for sizing the cache
+        self._stats = {
+            'hits': 0,             # Fresh pages served from disk
+            'misses': 0,           # Pages not in the cache at all
+            'revalidations': 0,    # Stale pages confirmed unchanged by a 304
+            'refreshes': 0,        # Stale pages the server sent again with new content
+            'stores': 0,           # Pages written to the cache
+            'evictions': 0         # Pages removed to stay under max_bytes
+        }
+
+    def _object_path(self, text_hash):
+        """
+        Return the file path for a content hash.
+
+        :param text_hash: SHA-256 digest of the text
+        :return: Path of the file holding the text
+        """
+        return os.path.join(self.objects_dir, text_hash[:2], text_hash)
+
+    def _count(self, counter_name):
+        """
+        Increment one of the statistics counters.
+
+        :param counter_name: Name of the counter
+        """
+        with self._lock:
+            self._stats[counter_name] += 1
+
+    @staticmethod
+    def make_key(url, extraction=None):
+        """
+        Build the cache key of a page.
+
+        :param url: Webpage URL
+        :param extraction: Settings the text was extracted with (e.g. extractor name, main-content only)
+        :return: Cache key
+        """
+        if not extraction:
+            return url
+        return f"{url}\x1f{json.dumps(extraction, sort_keys=True)}"
+
+    def lookup(self, url, max_chars, extraction=None):
+        """
+        Look up a page in the cache.
+
+        :param url: Webpage URL
+        :param max_chars: Number of characters the caller needs
+        :param extraction: Settings the caller extracts text with (see make_key)
+        :return: CachedPage, or None if the page is not cached (or was cached too short)
+        """
+        page_key = self.make_key(url, extraction)
+        with self._lock:
+            row = self._connection.execute(
+                'SELECT content_hash, size, char_limit, etag, last_modified, fetched_at FROM pages WHERE url = ?',
+                (page_key,)
+            ).fetchone()
+        if row is None:
+            self._count('misses')
+            return None
+
+        text_hash, size, char_limit, etag, last_modified, fetched_at = row
+        try:
+            with open(self._object_path(text_hash), encoding='utf-8') as object_file:
+                text = object_file.read()
+        except OSError:
+            # The file was removed underneath us; treat it as a miss
+            self._count('misses')
+            return None
+
+        # A page cut off at a smaller limit than the caller needs cannot be reused
+        if len(text) >= char_limit and char_limit < max_chars:
+            self._count('misses')
+            return None
+
+        is_fresh = time.time() - fetched_at < self.ttl_seconds
+        if is_fresh:
+            self._count('hits')
+            self._touch(page_key)
+        return CachedPage(url, text[:max_chars], etag, last_modified, fetched_at, is_fresh)
+
+    def _touch(self, page_key, refetched=False):
+        """
+        Mark a page as recently used (and optionally as just revalidated).
+
+        :param page_key: Cache key from make_key()
+        :param refetched: Also reset the TTL clock
+        """
+        now = time.time()
+        with self._lock:
+            if refetched:
+                self._connection.execute(
+                    'UPDATE pages SET last_access = ?, fetched_at = ? WHERE url = ?', (now, now, page_key)
+                )
+            else:
+                self._connection.execute('UPDATE pages SET last_access = ? WHERE url = ?', (now, page_key))
+            self._connection.commit()
+
+    def mark_revalidated(self, url, extraction=None):
+        """
+        Record that the server answered 304 Not Modified for a stale page.
+
+        :param url: Webpage URL
+        :param extraction: Settings the text was extracted with (see make_key)
+        """
+        self._count('revalidations')
+        self._touch(self.make_key(url, extraction), refetched=True)
+
+    def store(self, url, text, char_limit, etag=None, last_modified=None, refreshed=False, extraction=None):
+        """
+        Save a page's extracted text in the cache.
+
+        :param url: Webpage URL
+        :param text: Extracted text
+        :param char_limit: Character limit the text was truncated to
+        :param etag: ETag header sent by the server
+        :param last_modified: Last-Modified header sent by the server
+        :param refreshed: Whether this replaces a stale cached copy
+        :param extraction: Settings the text was extracted with (see make_key)
+        """
+        text_hash = content_hash(text)
+        object_path = self._object_path(text_hash)
+
+        # Identical text is only written once
+        if not os.path.exists(object_path):
+            os.makedirs(os.path.dirname(object_path), exist_ok=True)
+            file_descriptor, temporary_path = tempfile.mkstemp(dir=os.path.dirname(object_path))
+            with os.fdopen(file_descriptor, 'w', encoding='utf-8') as object_file:
+                object_file.write(text)
+            os.replace(temporary_path, object_path)
+
+        now = time.time()
+        with self._lock:
+            self._connection.execute(
+                '''INSERT OR REPLACE INTO pages
+                   (url, content_hash, size, char_limit, etag, last_modified, fetched_at, last_access)
+                   VALUES (?, ?, ?, ?, ?, ?, ?, ?)''',
+                (self.make_key(url, extraction), text_hash, len(text.encode('utf-8')), char_limit, etag,
+                 last_modified, now, now)
+            )
+            self._connection.commit()
+            self._stats['stores'] += 1
+            if refreshed:
+                self._stats['refreshes'] += 1
+
+        self._evict()
+
+    def _evict(self):
+        """
+        Remove least recently used pages until the cache fits in max_bytes.
+        """
+        with self._lock:
+            total_bytes = self._connection.execute('SELECT COALESCE(SUM(size), 0) FROM pages').fetchone()[0]
+            if total_bytes <= self.max_bytes:
+                return
+
+            evicted_hashes = set()
+            for url, text_hash, size in self._connection.execute(
+                'SELECT url, content_hash, size FROM pages ORDER BY last_access'
+            ).fetchall():
+                if total_bytes <= self.max_bytes:
+                    break
+                self._connection.execute('DELETE FROM pages WHERE url = ?', (url,))
+                evicted_hashes.add(text_hash)
+                total_bytes -= size
+                self._stats['evictions'] += 1
+            self._connection.commit()
+
+            # Delete files no other URL points at any more
+            for text_hash in evicted_hashes:
+                still_used = self._connection.execute(
+                    'SELECT 1 FROM pages WHERE content_hash = ? LIMIT 1', (text_hash,)
+                ).fetchone()
+                if not still_used:
+                    try:
+                        os.remove(self._object_path(text_hash))
+                    except OSError:
+                        pass
+
+    def get_stats(self):
+        """
+        Report cache effectiveness and size.
+
+        :return: Dictionary of counters, hit rate and current size
+        """
+        with self._lock:
+            stats = dict(self._stats)
+            page_count, total_bytes = self._connection.execute(
+                'SELECT COUNT(*), COALESCE(SUM(size), 0) FROM pages'
+            ).fetchone()
+        lookups = stats['hits'] + stats['misses'] + stats['revalidations'] + stats['refreshes']
+        stats['hit_rate'] = (stats['hits'] + stats['revalidations']) / lookups if lookups else 0.0
+        stats['pages'] = page_count
+        stats['bytes'] = total_bytes
+        stats['max_bytes'] = self.max_bytes
+        return stats
+
+
+class SQLiteCache:
+    """
+    A small key/value cache stored in a single SQLite file.
+
+    Values are stored as JSON. Entries older than the TTL are ignored (and
+    removed), and once there are more than max_entries the least recently used
+    ones are evicted.
+    """
+
+    # Evict in batches so the table is not scanned on every single write
+    EVICTION_BATCH = 100
+
+    def __init__(self, database_path, ttl_seconds, max_entries):
+        """
+        Open (or create) the cache.
+
+        :param database_path: Path of the SQLite file
+        :param ttl_seconds: Seconds an entry stays valid (None for no expiry)
+        :param max_entries: Number of entries kept before evicting the least recently used
+        """
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        os.makedirs(os.path.dirname(os.path.abspath(database_path)), exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(database_path, timeout=30, check_same_thread=False)
+        self._connection.execute('PRAGMA journal_mode=WAL')
+        self._connection.execute(
+            '''CREATE TABLE IF NOT EXISTS entries (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL,
+                expires_at REAL,
+                last_access REAL NOT NULL
+            )'''
+        )
+        self._connection.execute('CREATE INDEX IF NOT EXISTS entries_last_access ON entries (last_access)')
+        self._connection.commit()
+
+        self._stats = {'hits': 0, 'misses': 0, 'stores': 0, 'evictions': 0, 'expirations': 0}
+
+    def get(self, key):
+        """
+        Look up a value.
+
+        :param key: Cache key
+        :return: Stored value, or None if missing or expired
+        """
+        entry = self.get_entry(key)
+        return entry[0] if entry is not None else None
+
+    def get_entry(self, key):
+        """
+        Look up a value together with its expiry time.
+
+        :param key: Cache key
+        :return: Tuple of (value, expires_at or None), or None if missing or expired
+        """
+        now = time.time()
+        with self._lock:
+            row = self._connection.execute(
+                'SELECT value, expires_at FROM entries WHERE key = ?', (key,)
+            ).fetchone()
+            if row is None:
+                self._stats['misses'] += 1
+                return None
+
+            value, expires_at = row
+            if expires_at is not None and expires_at <= now:
+                self._connection.execute('DELETE FROM entries WHERE key = ?', (key,))
+                self._connection.commit()
+                self._stats['misses'] += 1
+                self._stats['expirations'] += 1
+                return None
+
+            self._connection.execute('UPDATE entries SET last_access = ? WHERE key = ?', (now, key))
+            self._connection.commit()
+            self._stats['hits'] += 1
+        return json.loads(value), expires_at
+
+    def set(self, key, value, ttl_seconds=None):
+        """
+        Store a value.
+
+        :param key: Cache key
+        :param value: JSON-serializable value
+        :param ttl_seconds: Optional TTL for this entry instead of the cache default
+        """
+        now = time.time()
+        ttl_seconds = ttl_seconds if ttl_seconds is not None else self.ttl_seconds
+        expires_at = now + ttl_seconds if ttl_seconds is not None else None
+        with self._lock:
+            self._connection.execute(
+                'INSERT OR REPLACE INTO entries (key, value, expires_at, last_access) VALUES (?, ?, ?, ?)',
+                (key, json.dumps(value), expires_at, now)
+            )
+            self._stats['stores'] += 1
+            self._evict()
+            self._connection.commit()
+
+    def _evict(self):
+        """
+        Drop expired entries and the least recently used ones beyond max_entries.
+
+        Must be called with the lock held.
+        """
+        entry_count = self._connection.execute('SELECT COUNT(*) FROM entries').fetchone()[0]
+        if entry_count <= self.max_entries + self.EVICTION_BATCH:
+            return
+
+        expired = self._connection.execute(
+            'DELETE FROM entries WHERE expires_at IS NOT NULL AND expires_at <= ?', (time.time(),)
+        ).rowcount
+        self._stats['expirations'] += expired
+        overflow = entry_count - expired - self.max_entries
+        if overflow > 0:
+            self._connection.execute(
+                'DELETE FROM entries WHERE key IN (SELECT key FROM entries ORDER BY last_access LIMIT ?)',
+                (overflow,)
+            )
+            self._stats['evictions'] += overflow
+
+    def get_stats(self):
+        """
+        Report cache effectiveness and size.
+
+        :return: Dictionary of counters, hit rate and number of entries
+        """
+        with self._lock:
+            stats = dict(self._stats)
+            stats['entries'] = self._connection.execute('SELECT COUNT(*) FROM entries').fetchone()[0]
+        lookups = stats['hits'] + stats['misses']
+        stats['hit_rate'] = stats['hits'] / lookups if lookups else 0.0
+        stats['max_entries'] = self.max_entries
+        return stats
+
+
+class SummaryCache(SQLiteCache):
+    """
+    Memoized webpage summaries.
+
+    A summary depends only on the page text, the (refined) query it was
+    written for, the model and the requested length, so those four things
+    make up the key. The page text is reduced to its SHA-256 hash, which also
+    lets identical mirrored pages share one summary.
+    """
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, ttl_seconds=DEFAULT_SUMMARY_CACHE_TTL,
+                 max_entries=DEFAULT_SUMMARY_CACHE_MAX_ENTRIES):
+        """
+        Open (or create) the summary cache.
+
+        :param cache_dir: Directory that holds the cache files
+        :param ttl_seconds: Seconds a summary is reused
+        :param max_entries: Number of summaries kept before evicting the least recently used
+        """
+        super().__init__(os.path.join(cache_dir, 'summaries.sqlite'), ttl_seconds, max_entries)
+
+    @staticmethod
+    def make_key(webpage_content, search_query, summary_model, max_summary_chars, content_selection=None):
+        """
+        Build the cache key for a summary.
+
+        :param webpage_content: Text that was summarized
+        :param search_query: Query the summary was written for
+        :param summary_model: OpenAI model that wrote the summary
+        :param max_summary_chars: Requested summary length
+        :param content_selection: Settings that chose which parts of the text the model saw
+        :return: Cache key
+        """
+        return content_hash(json.dumps(
+            [content_hash(webpage_content), search_query, summary_model, max_summary_chars, content_selection]
+        ))
+
+
+def recency_ttl(recency):
+    """
+    Work out how long search results for a recency window stay reusable.
+
+    Results restricted to a short window (like 'd1') go stale quickly because
+    new pages keep entering the window, so the TTL is 1% of the window length,
+    kept between 10 minutes and 24 hours. For example 'd7' gives about 1.7
+    hours and 'm3' about 21.6 hours. Searches without a recency filter get
+    the maximum.
+
+    :param recency: Recency filter such as 'w1', 'd7' or 'm3' (or None)
+    :return: TTL in seconds
+    """
+    recency_match = re.fullmatch(r'([dwmy])(\d+)', (recency or '').strip().lower())
+    if not recency_match:
+        return MAX_SEARCH_RESULTS_TTL
+    window_seconds = RECENCY_PERIOD_SECONDS[recency_match.group(1)] * int(recency_match.group(2))
+    return min(max(window_seconds * 0.01, MIN_SEARCH_RESULTS_TTL), MAX_SEARCH_RESULTS_TTL)
+
+
+class LRUCache:
+    """
+    Thread-safe in-memory cache with per-entry TTLs and least recently used eviction.
+    """
+
+    def __init__(self, max_entries, ttl_seconds=None):
+        """
+        Create an empty cache.
+
+        :param max_entries: Number of entries kept before evicting the least recently used
+        :param ttl_seconds: Default seconds an entry stays valid (None for no expiry)
+        """
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {'hits': 0, 'misses': 0, 'stores': 0, 'evictions': 0, 'expirations': 0}
+
+    def get(self, key):
+        """
+        Look up a value.
+
+        :param key: Cache key
+        :return: Stored value, or None if missing or expired
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._stats['misses'] += 1
+                return None
+
+            value, expires_at = entry
+            if expires_at is not None and expires_at <= time.time():
+                del self._entries[key]
+                self._stats['misses'] += 1
+                self._stats['expirations'] += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self._stats['hits'] += 1
+            return value
+
+    def set(self, key, value, ttl_seconds=None):
+        """
+        Store a value.
+
+        :param key: Cache key
+        :param value: Value to store
+        :param ttl_seconds: Optional TTL for this entry instead of the cache default
+        """
+        ttl_seconds = ttl_seconds if ttl_seconds is not None else self.ttl_seconds
+        expires_at = time.time() + ttl_seconds if ttl_seconds is not None else None
+        with self._lock:
+            self._entries[key] = (value, expires_at)
+            self._entries.move_to_end(key)
+            self._stats['stores'] += 1
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._stats['evictions'] += 1
+
+    def get_stats(self):
+        """
+        Report cache effectiveness and size.
+
+        :return: Dictionary of counters, hit rate and number of entries
+        """
+        with self._lock:
+            stats = dict(self._stats)
+            stats['entries'] = len(self._entries)
+        lookups = stats['hits'] + stats['misses']
+        stats['hit_rate'] = stats['hits'] / lookups if lookups else 0.0
+        stats['max_entries'] = self.max_entries
+        return stats
+
+
+class TieredCache:
+    """
+    An in-memory LRU in front of an optional SQLite cache.
+
+    Lookups try memory first and fall back to disk, copying disk hits back
+    into memory for the rest of their lifetime. Values must be
+    JSON-serializable when persistence is on.
+    """
+
+    def __init__(self, memory_cache, disk_cache=None):
+        """
+        Combine the two cache levels.
+
+        :param memory_cache: LRUCache used as the first level
+        :param disk_cache: Optional SQLiteCache used as the second level
+        """
+        self.memory_cache = memory_cache
+        self.disk_cache = disk_cache
+
+    def get(self, key):
+        """
+        Look up a value in memory, then on disk.
+
+        :param key: Cache key
+        :return: Stored value, or None if missing or expired
+        """
+        value = self.memory_cache.get(key)
+        if value is None and self.disk_cache is not None:
+            disk_entry = self.disk_cache.get_entry(key)
+            if disk_entry is not None:
+                value, expires_at = disk_entry
+                remaining_ttl = expires_at - time.time() if expires_at is not None else None
+                self.memory_cache.set(key, value, remaining_ttl)
+        return value
+
+    def set(self, key, value, ttl_seconds=None):
+        """
+        Store a value in both levels.
+
+        :param key: Cache key
+        :param value: Value to store
+        :param ttl_seconds: Optional TTL for this entry
+        """
+        self.memory_cache.set(key, value, ttl_seconds)
+        if self.disk_cache is not None:
+            self.disk_cache.set(key, value, ttl_seconds)
+
+    def get_stats(self):
+        """
+        Report statistics for both levels.
+
+        :return: Dictionary with 'memory' and 'disk' statistics
+        """
+        return {
+            'memory': self.memory_cache.get_stats(),
+            'disk': self.disk_cache.get_stats() if self.disk_cache is not None else None
+        }
+
+
+class SearchCache:
+    """
+    Two-level cache for the front of the research pipeline.
+
+    1. Raw user query -> refined search term (saves a gpt-4o-mini round trip)
+    2. (refined term, website filter, recency, number of results, ...) ->
+       Google Custom Search items (saves paid CSE quota), with a TTL that
+       follows the recency window
+    """
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, persist=True,
+                 max_entries=DEFAULT_SEARCH_CACHE_MAX_ENTRIES, refine_ttl_seconds=DEFAULT_REFINE_CACHE_TTL):
+        """
+        Create the search cache.
+
+        :param cache_dir: Directory that holds the cache files (used when persist is on)
+        :param persist: Also keep entries on disk so they survive restarts
+        :param max_entries: Number of entries of each kind kept in memory
+        :param refine_ttl_seconds: Seconds a refined search term is reused
+        """
+        self.refine_ttl_seconds = refine_ttl_seconds
+        self.refined_terms = TieredCache(
+            LRUCache(max_entries, refine_ttl_seconds),
+            SQLiteCache(os.path.join(cache_dir, 'refined_terms.sqlite'), refine_ttl_seconds, max_entries * 10)
+            if persist else None
+        )
+        self.search_results = TieredCache(
+            LRUCache(max_entries, MAX_SEARCH_RESULTS_TTL),
+            SQLiteCache(os.path.join(cache_dir, 'search_results.sqlite'), MAX_SEARCH_RESULTS_TTL, max_entries * 10)
+            if persist else None
+        )
+
+    @staticmethod
+    def _refine_key(search_query, refine_model):
+        """
+        Build the cache key for a raw query.
+
+        Case and extra whitespace do not change the meaning of a query, so
+        they are normalized away.
+
+        :param search_query: User's search query
+        :param refine_model: OpenAI model used for refinement
+        :return: Cache key
+        """
+        return json.dumps([' '.join(search_query.split()).casefold(), refine_model])
+
+    def get_refined_term(self, search_query, refine_model):
+        """
+        Look up the refined search term for a raw query.
+
+        :param search_query: User's search query
+        :param refine_model: OpenAI model used for refinement
+        :return: Refined search term, or None
+        """
+        return self.refined_terms.get(self._refine_key(search_query, refine_model))
+
+    def set_refined_term(self, search_query, refine_model, refined_term):
+        """
+        Remember the refined search term for a raw query.
+
+        :param search_query: User's search query
+        :param refine_model: OpenAI model used for refinement
+        :param refined_term: Refined search term
+        """
+        self.refined_terms.set(self._refine_key(search_query, refine_model), refined_term)
+
+    @staticmethod
+    def _results_key(search_params):
+        """
+        Build the cache key for a Google Custom Search request.
+
+        :param search_params: Query parameters sent to Google (the API key is left out)
+        :return: Cache key
+        """
+        return json.dumps(
+            {name: value for name, value in search_params.items() if name != 'key'},
+            sort_keys=True
+        )
+
+    def get_search_results(self, search_params):
+        """
+        Look up cached Google Custom Search items.
+
+        :param search_params: Query parameters sent to Google
+        :return: List of search result items, or None
+        """
+        return self.search_results.get(self._results_key(search_params))
+
+    def set_search_results(self, search_params, search_items):
+        """
+        Remember Google Custom Search items for as long as the recency window allows.
+
+        :param search_params: Query parameters sent to Google
+        :param search_items: List of search result items
+        """
+        self.search_results.set(
+            self._results_key(search_params),
+            search_items,
+            ttl_seconds=recency_ttl(search_params.get('dateRestrict'))
+        )
+
+    def get_stats(self):
+        """
+        Report statistics for both cache levels.
+
+        :return: Dictionary with 'refined_terms' and 'search_results' statistics
+        """
+        return {
+            'refined_terms': self.refined_terms.get_stats(),
+            'search_results': self.search_results.get_stats()
+        }
@@ -0,0 +1,238 @@
+#!/usr/bin/env python3
+"""
+BYOB (Bring Your Own Browser) Web Search Tool - Request Coalescing
+
+When a topic trends, many users ask the backend the same question within
+seconds of each other. Running the whole research pipeline once per request
+multiplies OpenAI and Custom Search spend for identical answers. This module
+makes sure that work is done once:
+- Queries are normalized (case, spacing, surrounding punctuation), so
+  trivially different spellings share one key
+- Concurrent requests for the same key wait for the single computation
+  already in flight instead of starting their own ("single-flight")
+- Finished responses are kept for a short TTL, which never exceeds the TTL
+  of the search results they were built from
+
+Key Components:
+- normalize_query: Canonical form of a user query
+- response_key: Key of a search request (query, site filter, recency)
+- SingleFlight: Runs one computation per key at a time and shares its result
+- ResponseCoalescer: Response cache in front of SingleFlight, with statistics
+"""
+
+import re           # For normalizing queries
+import threading    # For waiting on in-flight computations
+import time         # For response ages
+import unicodedata  # For normalizing queries
+
+from byob_cache import LRUCache, recency_ttl
+
+# Default response cache settings
+DEFAULT_RESPONSE_CACHE_TTL = 10 * 60  # Seconds a finished response is served again
+DEFAULT_RESPONSE_CACHE_MAX_ENTRIES = 500  # Number of responses kept in memory
+
+# Cache status values reported to clients
+CACHE_HIT = 'HIT'              # Served from the response cache
+CACHE_MISS = 'MISS'            # Computed for this request
+CACHE_COALESCED = 'COALESCED'  # Shared the result of an identical request already in flight
+CACHE_BYPASS = 'BYPASS'        # The client asked for a fresh response
+
+_WHITESPACE = re.compile(r'\s+')
+_EDGE_PUNCTUATION = re.compile(r'^[\s"\'`.,!?;:]+|[\s"\'`.,!?;:]+$')
+
+
+def normalize_query(search_query):
+    """
+    Reduce a query to the form used for coalescing and caching.
+
+    'What is GPT-5?' and '  what is  gpt-5 ' give the same result.
+
+    :param search_query: User's search query
+    :return: Normalized query
+    """
+    normalized_query = unicodedata.normalize('NFKC', search_query or '').casefold()
+    normalized_query = _EDGE_PUNCTUATION.sub('', normalized_query)
+    return _WHITESPACE.sub(' ', normalized_query)
+
+
+def normalize_site_filter(site_filter):
+    """
+    Reduce a website filter to its bare host and path.
+
+    :param site_filter: Website filter, e.g. 'https://www.example.com/'
+    :return: Normalized filter, e.g. 'www.example.com' ('' for no filter)
+    """
+    site_filter = (site_filter or '').strip().lower()
+    site_filter = re.sub(r'^[a-z]+://', '', site_filter)
+    return site_filter.rstrip('/')
+
+
+def response_key(search_query, site_filter=None, recency=None, latency_budget=None, summary_quorum=None):
+    """
+    Build the key that identifies equivalent search requests.
+
+    A search run within a latency budget or summary quorum may be answered
+    from fewer pages, so it is only shared with requests asking for the same.
+
+    :param search_query: User's search query
+    :param site_filter: Optional website filter
+    :param recency: Recency filter the search runs with
+    :param latency_budget: Optional latency budget in seconds
+    :param summary_quorum: Optional summary quorum
+    :return: Key string
+    """
+    key_parts = [normalize_query(search_query), normalize_site_filter(site_filter), (recency or '').lower()]
+    if latency_budget or summary_quorum:
+        key_parts.append(f"budget={latency_budget or ''},quorum={summary_quorum or ''}")
+    return '\x1f'.join(key_parts)
+
+
+class _Flight:
+    """
+    One computation in progress, and the requests waiting for it.
+    """
+
+    def __init__(self):
+        """
+        Create an unfinished flight.
+        """
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    Runs at most one computation per key at a time.
+
+    The first caller for a key (the leader) runs the function; callers that
+    arrive while it is running block until it finishes and receive the same
+    result, or the same exception.
+    """
+
+    def __init__(self):
+        """
+        Create an empty set of flights.
+        """
+        self._lock = threading.Lock()
+        self._flights = {}
+
+    def run(self, key, compute):
+        """
+        Run compute() for a key, or wait for the run already in progress.
+
+        :param key: Key identifying equivalent computations
+        :param compute: Function with no arguments producing the result
+        :return: Tuple of (result, shared), where shared is True if another caller computed it
+        """
+        with self._lock:
+            flight = self._flights.get(key)
+            is_leader = flight is None
+            if is_leader:
+                flight = self._flights[key] = _Flight()
+
+        if not is_leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.result, True
+
+        try:
+            flight.result = compute()
+        except BaseException as compute_error:
+            flight.error = compute_error
+            raise
+        finally:
+            with self._lock:
+                del self._flights[key]
+            flight.done.set()
+        return flight.result, False
+
+    def in_flight(self):
+        """
+        Number of computations currently running.
+        """
+        with self._lock:
+            return len(self._flights)
+
+
+class ResponseCoalescer:
+    """
+    Serves repeated search requests from a short-lived response cache, and
+    shares one computation between identical requests that arrive together.
+    """
+
+    def __init__(self, ttl_seconds=DEFAULT_RESPONSE_CACHE_TTL, max_entries=DEFAULT_RESPONSE_CACHE_MAX_ENTRIES):
+        """
+        Create the coalescer.
+
+        :param ttl_seconds: Seconds a finished response is served again (0 disables the cache)
+        :param max_entries: Number of responses kept in memory
+        """
+        self.ttl_seconds = ttl_seconds
+        self.response_cache = LRUCache(max_entries, ttl_seconds) if ttl_seconds else None
+        self.single_flight = SingleFlight()
+        self._lock = threading.Lock()
+        self._stats = {'hits': 0, 'misses': 0, 'coalesced': 0, 'bypassed': 0, 'errors': 0}
+
+    def _count(self, counter_name):
+        """
+        Increment one of the statistics counters.
+
+        :param counter_name: Name of the counter
+        """
+        with self._lock:
+            self._stats[counter_name] += 1
+
+    def run(self, key, compute, recency=None, bypass_cache=False, is_cacheable=None):
+        """
+        Return the response for a key from the cache, an in-flight computation, or compute().
+
+        :param key: Key from response_key()
+        :param compute: Function with no arguments producing the response
+        :param recency: Recency filter of the search (limits how long the response is cached)
+        :param bypass_cache: Skip the cache lookup (the new response is still cached)
+        :param is_cacheable: Optional function deciding whether a response may be cached
+        :return: Tuple of (response, cache status, age in seconds)
+        """
+        if self.response_cache is not None and not bypass_cache:
+            cached_entry = self.response_cache.get(key)
+            if cached_entry is not None:
+                cached_response, stored_at = cached_entry
+                self._count('hits')
+                return cached_response, CACHE_HIT, time.time() - stored_at
+
+        def compute_and_store():
+            computed_response = compute()
+            if self.response_cache is not None and (is_cacheable is None or is_cacheable(computed_response)):
+                self.response_cache.set(
+                    key, (computed_response, time.time()), min(self.ttl_seconds, recency_ttl(recency))
+                )
+            return computed_response
+
+        try:
+            response, shared = self.single_flight.run(key, compute_and_store)
+        except Exception:
+            self._count('errors')
+            raise
+        if shared:
+            self._count('coalesced')
+            return response, CACHE_COALESCED, 0.0
+        self._count('bypassed' if bypass_cache else 'misses')
+        return response, CACHE_BYPASS if bypass_cache else CACHE_MISS, 0.0
+
+    def get_stats(self):
+        """
+        Report how many requests were answered without running the pipeline.
+
+        :return: Dictionary of counters, the share of requests saved and cache size
+        """
+        with self._lock:
+            stats = dict(self._stats)
+        requests_seen = stats['hits'] + stats['misses'] + stats['coalesced'] + stats['bypassed']
+        stats['pipeline_runs_saved'] = stats['hits'] + stats['coalesced']
+        stats['saved_rate'] = stats['pipeline_runs_saved'] / requests_seen if requests_seen else 0.0
+        stats['in_flight'] = self.single_flight.in_flight()
+        stats['entries'] = self.response_cache.get_stats()['entries'] if self.response_cache is not None else 0
+        stats['ttl_seconds'] = self.ttl_seconds
+        return stats
@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+"""
+BYOB (Bring Your Own Browser) Web Search Tool - Answer Context Packing
+
+The final answer is written by the largest model, so every prompt token
+sent to it costs the most and delays the first token of the answer the
+longest. Sending the processed search results as JSON repeats every key
+name for every result and includes every summary, however many results a
+deep search found. This module packs them into a compact prompt instead:
+- Each source is a short numbered block: '[n] URL' followed by its summary,
+  so the answer can cite it as [n]; n is the result's 'result_rank', so a
+  citation can be looked up in the processed search results
+- Other copies of the same page found by deduplication are listed on an
+  'also at:' line, so they can be cited too
+- Sources are taken in ranking order until a token budget is full; the
+  source that no longer fits is trimmed to the space left, and the
+  lower-ranked sources after it are dropped (the best-ranked source is
+  always sent, so the answer never has to be written from nothing)
+- Results without a summary carry no information and are left out
+- Tokens are counted with the model's tokenizer (see byob_relevance)
+
+Comparing a prompt with the JSON format means tokenizing the whole JSON as
+well, which would double the counting work before every answer, so that
+baseline is only measured on request (json_baseline_tokens).
+
+Key Components:
+- pack_sources: Format processed search results as numbered sources within a token budget
+- json_baseline_tokens: Tokens the same results take in the JSON format
+- ContextStats: Sources and prompt tokens packed, compared with the JSON format when measured
+"""
+
+import json       # For measuring the JSON format the packer replaces
+import threading  # For protecting shared counters
+
+from byob_relevance import count_tokens, exact_token_counts, truncate_to_tokens
+
+# Default packing settings
+DEFAULT_CONTEXT_TOKEN_BUDGET = 8000  # Tokens of sources sent to write the answer
+DEFAULT_MIN_SOURCE_TOKENS = 50       # A summary is only trimmed if at least this many tokens remain
+
+# Placed at the end of a trimmed summary
+TRIM_MARKER = ' ...'
+
+# Placed between two sources
+SOURCE_SEPARATOR = '\n\n'
+
+
+def _source_block(citation_id, processed_result, webpage_summary):
+    """
+    Format one source.
+
+    :param citation_id: Number the answer cites the source by
+    :param processed_result: Processed search result
+    :param webpage_summary: Summary text to include
+    :return: Source block text
+    """
+    source_header = f"[{citation_id}] {processed_result.get('webpage_url')}"
+    duplicate_urls = processed_result.get('duplicate_urls')
+    if duplicate_urls:
+        source_header += f"\nalso at: {', '.join(duplicate_urls)}"
+    return f"{source_header}\n{webpage_summary}"
+
+
+def pack_sources(processed_search_results, token_budget, model, min_source_tokens=DEFAULT_MIN_SOURCE_TOKENS):
+    """
+    Format processed search results as numbered sources that fit a token budget.
+
+    Results are taken in order of their 'result_rank', and each source is
+    numbered with its 'result_rank', so an answer's [n] can be looked up in
+    the processed results (numbers skip the results that were left out).
+    The best-ranked summary is always packed, trimmed to min_source_tokens
+    if even that is more than the budget leaves room for.
+
+    :param processed_search_results: List of processed search results
+    :param token_budget: Maximum number of tokens of sources (0 or None packs every source)
+    :param model: OpenAI model the sources are sent to (for token counting)
+    :param min_source_tokens: Smallest number of tokens a trimmed summary is worth sending with
+    :return: Tuple of (source text, packing report dictionary)
+    """
+    ranked_results = sorted(
+        processed_search_results, key=lambda processed_result: processed_result.get('result_rank') or 0
+    )
+    source_blocks = []
+    packed_tokens = 0
+    sources_trimmed = 0
+    sources_dropped = 0
+    sources_empty = 0
+    budget_full = False
+    for result_position, processed_result in enumerate(ranked_results, start=1):
+        citation_id = processed_result.get('result_rank') or result_position
+        webpage_summary = (processed_result.get('webpage_summary') or '').strip()
+        if not webpage_summary:
+            sources_empty += 1
+            continue
+        if budget_full:
+            sources_dropped += 1
+            continue
+
+        source_block = _source_block(citation_id, processed_result, webpage_summary)
+        block_tokens = count_tokens(SOURCE_SEPARATOR + source_block, model)
+        if token_budget and packed_tokens + block_tokens > token_budget:
+            # Trim the summary to the space left, unless too little is left to be worth it
+            header_tokens = block_tokens - count_tokens(webpage_summary, model)
+            summary_tokens_left = token_budget - packed_tokens - header_tokens - count_tokens(TRIM_MARKER, model)
+            budget_full = True
+            if summary_tokens_left < min_source_tokens:
+                if source_blocks:
+                    sources_dropped += 1
+                    continue
+                # The answer needs at least one source, even if it goes a little over the budget
+                summary_tokens_left = min_source_tokens
+            trimmed_summary = truncate_to_tokens(webpage_summary, summary_tokens_left, model).rstrip() + TRIM_MARKER
+            source_block = _source_block(citation_id, processed_result, trimmed_summary)
+            block_tokens = count_tokens(SOURCE_SEPARATOR + source_block, model)
+            sources_trimmed += 1
+        source_blocks.append(source_block)
+        packed_tokens += block_tokens
+
+    source_text = SOURCE_SEPARATOR.join(source_blocks)
+    return source_text, {
+        'sources_packed': len(source_blocks),
+        'sources_trimmed': sources_trimmed,
+        'sources_dropped': sources_dropped,
+        'sources_empty': sources_empty,
+        'context_tokens': count_tokens(source_text, model)
+    }
+
+
+def json_baseline_tokens(processed_search_results, model):
+    """
+    Count the tokens the processed search results take in the JSON format the packer replaces.
+
+    :param processed_search_results: List of processed search results
+    :param model: OpenAI model the sources are sent to (for token counting)
+    :return: Number of tokens
+    """
+    return count_tokens(json.dumps(processed_search_results), model)
+
+
+class ContextStats:
+    """
+    Thread-safe counters of the sources packed into answer prompts.
+    """
+
+    def __init__(self):
+        """
+        Initialize empty counters.
+        """
+        self._lock = threading.Lock()
+        self.answers = 0
+        self.sources_packed = 0
+        self.sources_trimmed = 0
+        self.sources_dropped = 0
+        self.context_tokens = 0
+        self.baseline_answers = 0
+        self.baseline_context_tokens = 0
+        self.json_tokens = 0
+
+    def record(self, pack_report):
+        """
+        Count one answer prompt.
+
+        :param pack_report: Packing report returned by pack_sources(), with 'json_tokens' added if the
+                            JSON baseline was measured
+        """
+        with self._lock:
+            self.answers += 1
+            self.sources_packed += pack_report['sources_packed']
+            self.sources_trimmed += pack_report['sources_trimmed']
+            self.sources_dropped += pack_report['sources_dropped']
+            self.context_tokens += pack_report['context_tokens']
+            if 'json_tokens' in pack_report:
+                self.baseline_answers += 1
+                self.baseline_context_tokens += pack_report['context_tokens']
+                self.json_tokens += pack_report['json_tokens']
+
+    def get_stats(self):
+        """
+        Return the counters.
+
+        'reduction' compares the answers whose JSON baseline was measured.
+
+        :return: Dictionary of statistics
+        """
+        with self._lock:
+            return {
+                'answers': self.answers,
+                'sources_packed': self.sources_packed,
+                'sources_trimmed': self.sources_trimmed,
+                'sources_dropped': self.sources_dropped,
+                'context_tokens': self.context_tokens,
+                'baseline_answers': self.baseline_answers,
+                'json_tokens': self.json_tokens,
+                'reduction': 1 - self.baseline_context_tokens / self.json_tokens if self.json_tokens else 0.0,
+                'exact_token_counts': exact_token_counts()
+            }
@@ -0,0 +1,323 @@
+#!/usr/bin/env python3
+"""
+BYOB (Bring Your Own Browser) Web Search Tool - Near-Duplicate Page Detection
+
+Search results often contain the same story several times: wire articles
+syndicated to many news sites, AMP and mobile variants, mirrors. Summarizing
+every copy costs an OpenAI call each and fills the final report's context
+with the same facts. Before pages are summarized this module:
+- Canonicalizes URLs (tracking parameters, AMP and mobile variants, trailing
+  slashes...) so the same page under two addresses is only downloaded once
+- Fingerprints the extracted text with SimHash and treats pages whose
+  fingerprints are similar enough as copies of each other
+
+The best-ranked copy is kept and carries the URLs of its duplicates, so
+they can still be cited.
+
+Key Components:
+- canonicalize_url: Normalize a URL so variants of the same page compare equal
+- simhash / simhash_similarity: 64-bit text fingerprints and their similarity
+- PageDeduplicator: Per-query tracker of kept pages and their duplicates
+- DedupStats: Duplicates found and OpenAI calls saved
+"""
+
+import hashlib    # For hashing text features
+import re         # For splitting text into words
+import threading  # For protecting shared counters
+from collections import defaultdict  # For duplicate URL lists
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit  # For taking URLs apart
+
+# Number of bits in a SimHash fingerprint
+SIMHASH_BITS = 64
+
+# Number of consecutive words in each SimHash feature
+SHINGLE_WORDS = 3
+
+# Pages with fewer words than this are too short for a meaningful SimHash;
+# they only count as duplicates when their text is identical
+MIN_SIMHASH_WORDS = 20
+
+# Query parameters that only track where a visitor came from
+TRACKING_PARAMS = frozenset({
+    'fbclid', 'gclid', 'dclid', 'msclkid', 'yclid', 'igshid', 'mc_cid', 'mc_eid', 'ref', 'ref_src',
+    'ref_url', 'cmpid', 'ocid', 'src', 'smid', 'amp', 'outputtype', '_ga', '_gl', 'spm', 'share'
+})
+TRACKING_PARAM_PREFIXES = ('utm_', 'pk_', 'mtm_')
+
+# Host name prefixes used by mobile and AMP variants of a website
+VARIANT_HOST_PREFIXES = ('www.', 'm.', 'mobile.', 'amp.')
+
+_WORD = re.compile(r'\w+')
+
+
+def canonicalize_url(url):
+    """
+    Normalize a URL so that variants of the same page compare equal.
+
+    Lowercases the scheme and host, drops 'www.', mobile and AMP host
+    prefixes, default ports, fragments, tracking parameters, '/amp' path
+    suffixes and trailing slashes, and sorts the remaining parameters.
+
+    :param url: URL to normalize
+    :return: Canonical URL ('' for an empty URL)
+    """
+    if not url:
+        return ''
+    url_parts = urlsplit(url.strip())
+    scheme = url_parts.scheme.lower()
+    if scheme == 'http':
+        # Most sites serve the same page on both; treat them as one
+        scheme = 'https'
+
+    host = (url_parts.hostname or '').lower()
+    for host_prefix in VARIANT_HOST_PREFIXES:
+        if host.startswith(host_prefix) and host.count('.') > 1:
+            host = host[len(host_prefix):]
+    if url_parts.port and url_parts.port not in (80, 443):
+        host = f"{host}:{url_parts.port}"
+
+    path = url_parts.path or '/'
+    for amp_suffix in ('/amp/', '/amp', '.amp'):
+        if path.endswith(amp_suffix):
+            path = path[:-len(amp_suffix)] or '/'
+    if path.endswith('.amp.html'):
+        path = path[:-len('.amp.html')] + '.html'
+    path = path.rstrip('/') or '/'
+
+    query_params = sorted(
+        (name, value) for name, value in parse_qsl(url_parts.query, keep_blank_values=True)
+        if name.lower() not in TRACKING_PARAMS and not name.lower().startswith(TRACKING_PARAM_PREFIXES)
+    )
+    return urlunsplit((scheme, host, path, urlencode(query_params), ''))
+
+
+def _feature_hash(feature):
+    """
+    Hash a text feature to a 64-bit integer.
+
+    :param feature: Feature string
+    :return: 64-bit integer
+    """
+    return int.from_bytes(hashlib.blake2b(feature.encode('utf-8'), digest_size=8).digest(), 'big')
+
+
+def simhash(text):
+    """
+    Compute the 64-bit SimHash fingerprint of a text.
+
+    Similar texts get fingerprints that differ in few bits. The features are
+    overlapping runs of SHINGLE_WORDS words, so word order matters a little
+    while small edits (a changed byline, an extra paragraph) matter little.
+
+    :param text: Text to fingerprint
+    :return: 64-bit integer fingerprint
+    """
+    words = _WORD.findall(text.lower())
+    if len(words) < SHINGLE_WORDS:
+        features = [' '.join(words)]
+    else:
+        features = [' '.join(words[word_index:word_index + SHINGLE_WORDS])
+                    for word_index in range(len(words) - SHINGLE_WORDS + 1)]
+
+    bit_weights = [0] * SIMHASH_BITS
+    for feature in features:
+        feature_hash = _feature_hash(feature)
+        for bit in range(SIMHASH_BITS):
+            bit_weights[bit] += 1 if feature_hash >> bit & 1 else -1
+
+    fingerprint = 0
+    for bit, bit_weight in enumerate(bit_weights):
+        if bit_weight > 0:
+            fingerprint |= 1 << bit
+    return fingerprint
+
+
+def simhash_similarity(fingerprint_a, fingerprint_b):
+    """
+    Share of identical bits between two SimHash fingerprints.
+
+    :param fingerprint_a: First fingerprint
+    :param fingerprint_b: Second fingerprint
+    :return: Similarity between 0.0 and 1.0
+    """
+    return 1 - bin(fingerprint_a ^ fingerprint_b).count('1') / SIMHASH_BITS
+
+
+class DedupStats:
+    """
+    Thread-safe counters of duplicates found and work saved.
+    """
+
+    def __init__(self):
+        """
+        Initialize empty counters.
+        """
+        self._lock = threading.Lock()
+        self.pages_checked = 0
+        self.url_duplicates = 0
+        self.content_duplicates = 0
+
+    def record_page(self):
+        """
+        Count one page that went through duplicate detection.
+        """
+        with self._lock:
+            self.pages_checked += 1
+
+    def record_url_duplicate(self):
+        """
+        Count one page skipped because its canonical URL was already in the results.
+        """
+        with self._lock:
+            self.url_duplicates += 1
+
+    def record_content_duplicate(self):
+        """
+        Count one page skipped because its text nearly matches a kept page.
+        """
+        with self._lock:
+            self.content_duplicates += 1
+
+    def get_stats(self):
+        """
+        Return the counters.
+
+        :return: Dictionary of statistics
+        """
+        with self._lock:
+            return {
+                'pages_checked': self.pages_checked,
+                'url_duplicates': self.url_duplicates,
+                'content_duplicates': self.content_duplicates,
+                'downloads_saved': self.url_duplicates,
+                'llm_calls_saved': self.url_duplicates + self.content_duplicates
+            }
+
+
+class PageDeduplicator:
+    """
+    Tracks the pages kept for one query and the duplicates folded into them.
+
+    Results are identified by their search rank. The duplicate URL list of a
+    kept result is the same list object every time, so a processed result
+    built before a late duplicate turns up still gets its URL.
+
+    Pages downloaded concurrently finish in any order; release_in_rank_order
+    holds each one until every better-ranked download is done, so of two
+    copies the one ranked higher is always the one kept.
+    """
+
+    def __init__(self, similarity_threshold, stats=None):
+        """
+        Start tracking a query's results.
+
+        :param similarity_threshold: SimHash similarity (0.0-1.0) at which two pages count as copies
+        :param stats: Optional DedupStats to record duplicates in
+        """
+        self.similarity_threshold = similarity_threshold
+        self.stats = stats or DedupStats()
+        self._kept_by_url = {}
+        self._kept_fingerprints = []
+        self._duplicate_urls = defaultdict(list)
+        self._downloading = set()
+        self._held_pages = {}
+
+    def filter_urls(self, search_items, first_rank=1):
+        """
+        Drop search results whose canonical URL already appeared higher in the ranking.
+
+        Later pages of results can be filtered in further calls, starting at
+        the rank after the previous page's last result.
+
+        :param search_items: List of search result items
+        :param first_rank: Search rank of the first item
+        :return: List of (result rank, search result) for the results to download
+        """
+        kept_results = []
+        for result_index, search_result in enumerate(search_items, start=first_rank):
+            canonical_url = canonicalize_url(search_result.get('link'))
+            kept_index = self._kept_by_url.get(canonical_url)
+            if kept_index is not None:
+                self._duplicate_urls[kept_index].append(search_result.get('link'))
+                self.stats.record_page()
+                self.stats.record_url_duplicate()
+                continue
+            self._kept_by_url[canonical_url] = result_index
+            self._downloading.add(result_index)
+            kept_results.append((result_index, search_result))
+        return kept_results
+
+    def release_in_rank_order(self, result_index, downloaded_page=None):
+        """
+        Hold a downloaded page until every better-ranked download has finished.
+
+        Call once for every result filter_urls returned, with None if its
+        download failed. Checking the released pages with check_content in
+        the order given keeps the best-ranked copy of every page, whichever
+        download finished first.
+
+        :param result_index: Search rank of the finished download
+        :param downloaded_page: Anything standing for the downloaded page, or None if the download failed
+        :return: List of the held pages (in rank order) whose better-ranked downloads have all finished
+        """
+        self._downloading.discard(result_index)
+        if downloaded_page is not None:
+            self._held_pages[result_index] = downloaded_page
+        first_downloading = min(self._downloading, default=None)
+        released_ranks = sorted(
+            held_index for held_index in self._held_pages
+            if first_downloading is None or held_index < first_downloading
+        )
+        return [self._held_pages.pop(held_index) for held_index in released_ranks]
+
+    def held_pages(self):
+        """
+        Pages still waiting for a better-ranked download.
+
+        :return: List of held pages, in rank order
+        """
+        return [self._held_pages[held_index] for held_index in sorted(self._held_pages)]
+
+    def check_content(self, result_index, url, webpage_content):
+        """
+        Check a downloaded page against the pages kept so far.
+
+        A page that is not a duplicate is kept, so later pages are compared with it.
+
+        :param result_index: Search rank of the page
+        :param url: URL of the page
+        :param webpage_content: Extracted page text
+        :return: Rank of the kept page this one duplicates, or None if it is kept
+        """
+        self.stats.record_page()
+        word_count = len(_WORD.findall(webpage_content))
+        if word_count >= MIN_SIMHASH_WORDS:
+            fingerprint = simhash(webpage_content)
+        else:
+            fingerprint = None
+        content_digest = hashlib.sha256(webpage_content.encode('utf-8')).digest()
+
+        for kept_index, kept_fingerprint, kept_digest in self._kept_fingerprints:
+            same_text = content_digest == kept_digest
+            similar_text = (
+                fingerprint is not None and kept_fingerprint is not None
+                and simhash_similarity(fingerprint, kept_fingerprint) >= self.similarity_threshold
+            )
+            if same_text or similar_text:
+                # The kept page also takes over the URL variants of this copy
+                self._duplicate_urls[kept_index].append(url)
+                self._duplicate_urls[kept_index].extend(self._duplicate_urls.pop(result_index, []))
+                self.stats.record_content_duplicate()
+                return kept_index
+
+        self._kept_fingerprints.append((result_index, fingerprint, content_digest))
+        return None
+
+    def duplicates_of(self, result_index):
+        """
+        URLs of the pages folded into a kept result.
+
+        :param result_index: Search rank of the kept page
+        :return: List of duplicate URLs (grows if more duplicates are found)
+        """
+        return self._duplicate_urls[result_index]
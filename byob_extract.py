@@ -0,0 +1,388 @@
+#!/usr/bin/env python3
+"""
+BYOB (Bring Your Own Browser) Web Search Tool - HTML Text Extraction
+
+Turning a webpage into text used to mean building a full BeautifulSoup tree
+of the whole document, pulling the text out of everything (including
+<script>, <style> and navigation menus) and then throwing most of it away
+to fit the character budget. This module offers pluggable extraction
+engines, including a streaming one that:
+- Skips non-content elements (scripts, styles, navigation, headers, footers...)
+- Stops parsing as soon as the character budget is filled
+- Can optionally prefer the main content region (<main>, <article>, role="main")
+- Accepts the page in pieces, so it can work while the page is still downloading
+
+Key Components:
+- StreamingTextExtractor: Incremental HTML-to-text parser with a character budget
+- StreamingExtractor / BeautifulSoupExtractor: Extraction engines
+- get_extractor: Look up an engine by name
+"""
+
+from html.parser import HTMLParser  # For incremental, standard-library HTML parsing
+from bs4 import BeautifulSoup  # For the original full-tree extraction engine
+
+# Elements whose text is never part of the readable content. Their subtree is skipped
+# until the end tag, so only elements whose end tag HTML never omits belong here: not
+# <head> (often left open before <body>) or <form> (which wraps whole ASP.NET pages);
+# the <head> elements that hold text (<title>, <script>, <style>) are skipped themselves
+NON_CONTENT_TAGS = frozenset({
+    'script', 'style', 'noscript', 'template', 'title', 'svg', 'canvas', 'iframe',
+    'object', 'nav', 'header', 'footer', 'aside', 'button', 'select', 'menu', 'dialog'
+})
+
+# Elements that usually wrap the main content of a page
+MAIN_CONTENT_TAGS = frozenset({'main', 'article'})
+
+# Elements that start a new block of text, so words on either side must not run together
+BLOCK_TAGS = frozenset({
+    'address', 'blockquote', 'br', 'dd', 'div', 'dl', 'dt', 'figcaption', 'figure', 'h1', 'h2',
+    'h3', 'h4', 'h5', 'h6', 'hr', 'li', 'main', 'article', 'ol', 'p', 'pre', 'section', 'table',
+    'tbody', 'td', 'th', 'thead', 'tr', 'ul'
+})
+
+# Elements that never have a closing tag
+VOID_TAGS = frozenset({
+    'area', 'base', 'br', 'col', 'embed', 'hr', 'img', 'input', 'link', 'meta', 'param',
+    'source', 'track', 'wbr'
+})
+
+# When preferring the main content, keep reading this many times the budget looking for it
+MAIN_CONTENT_OVERSCAN = 4
+
+# Main content is used if it holds at least this share of the page text (or fills the budget)
+MAIN_CONTENT_MIN_SHARE = 0.25
+
+# Size of the pieces whole documents are fed to the streaming parser in
+FEED_CHUNK_CHARS = 16 * 1024
+
+
+class _BudgetReached(Exception):
+    """
+    Raised inside the parser callbacks to stop parsing once enough text is collected.
+    """
+
+
+class _TextBuffer:
+    """
+    Collects text with whitespace collapsed to single spaces, like ' '.join(text.split()).
+    """
+
+    def __init__(self):
+        """
+        Create an empty buffer.
+        """
+        self.parts = []
+        self.length = 0
+        self.pending_space = False
+
+    def append(self, data):
+        """
+        Add a piece of text, keeping words split across pieces together.
+
+        :param data: Text to add
+        """
+        words = data.split()
+        if not words:
+            if data:
+                self.pending_space = True
+            return
+
+        if self.parts and (self.pending_space or data[0].isspace()):
+            self.parts.append(' ')
+            self.length += 1
+        joined_words = ' '.join(words)
+        self.parts.append(joined_words)
+        self.length += len(joined_words)
+        self.pending_space = data[-1].isspace()
+
+    def break_block(self):
+        """
+        Mark a block boundary, so the next text starts after a space.
+        """
+        self.pending_space = True
+
+    def text(self, max_chars):
+        """
+        Return the collected text.
+
+        :param max_chars: Maximum number of characters to return
+        :return: Collected text
+        """
+        return ''.join(self.parts)[:max_chars]
+
+
+class StreamingTextExtractor(HTMLParser):
+    """
+    Incremental HTML-to-text parser with a character budget.
+
+    Feed it the page in as many pieces as you like; check 'done' after each
+    piece to learn whether enough text has been collected to stop downloading.
+    """
+
+    def __init__(self, max_chars, prefer_main_content=False):
+        """
+        Create the parser.
+
+        :param max_chars: Number of characters of text to collect
+        :param prefer_main_content: Return only the main content region when the page has one
+        """
+        super().__init__(convert_charrefs=True)
+        self.max_chars = max_chars
+        self.prefer_main_content = prefer_main_content
+        self.done = False
+        self._skip_stack = []
+        self._main_stack = []
+        self._all_text = _TextBuffer()
+        self._main_text = _TextBuffer()
+
+    def feed(self, html_chunk):
+        """
+        Parse the next piece of the page.
+
+        :param html_chunk: Next piece of HTML text
+        :return: True once the character budget is filled and parsing has stopped
+        """
+        if self.done:
+            return True
+        try:
+            super().feed(html_chunk)
+        except _BudgetReached:
+            self.done = True
+        return self.done
+
+    def close(self):
+        """
+        Flush any text still buffered at the end of the page.
+        """
+        if self.done:
+            return
+        try:
+            super().close()
+        except _BudgetReached:
+            self.done = True
+
+    def handle_starttag(self, tag, attrs):
+        """
+        Track entry into skipped and main content elements.
+        """
+        if tag in BLOCK_TAGS:
+            self._break_block()
+        if tag in VOID_TAGS:
+            return
+        if tag in NON_CONTENT_TAGS and not (tag == 'header' and self._main_stack):
+            # A <header> inside an article usually holds its headline, so only page headers are skipped
+            self._skip_stack.append(tag)
+        elif tag in MAIN_CONTENT_TAGS or ('role', 'main') in attrs:
+            self._main_stack.append(tag)
+
+    def handle_startendtag(self, tag, attrs):
+        """
+        Treat self-closing tags (like <br/>) as elements without content.
+        """
+        if tag in BLOCK_TAGS:
+            self._break_block()
+
+    def handle_endtag(self, tag):
+        """
+        Track exit from skipped and main content elements, tolerating unclosed tags.
+        """
+        if tag in BLOCK_TAGS:
+            self._break_block()
+        if tag in self._skip_stack:
+            while self._skip_stack.pop() != tag:
+                pass
+        elif tag in self._main_stack:
+            while self._main_stack.pop() != tag:
+                pass
+
+    def handle_data(self, data):
+        """
+        Collect readable text and stop once the budget is filled.
+        """
+        if self._skip_stack:
+            return
+
+        self._all_text.append(data)
+        if self._main_stack:
+            self._main_text.append(data)
+
+        if self.prefer_main_content:
+            # Keep looking for the main content a while past the budget
+            if (self._main_text.length >= self.max_chars
+                    or self._all_text.length >= self.max_chars * MAIN_CONTENT_OVERSCAN):
+                raise _BudgetReached()
+        elif self._all_text.length >= self.max_chars:
+            raise _BudgetReached()
+
+    def _break_block(self):
+        """
+        Separate the text on either side of a block element.
+        """
+        self._all_text.break_block()
+        self._main_text.break_block()
+
+    def get_text(self):
+        """
+        Return the extracted text.
+
+        :return: Text, truncated to the character budget
+        """
+        if self.prefer_main_content and self._main_text.length and (
+                self._main_text.length >= self.max_chars
+                or self._main_text.length >= self._all_text.length * MAIN_CONTENT_MIN_SHARE):
+            return self._main_text.text(self.max_chars)
+        return self._all_text.text(self.max_chars)
+
+
+class StreamingExtractor:
+    """
+    Extraction engine built on StreamingTextExtractor.
+    """
+
+    name = 'streaming'
+
+    def __init__(self, prefer_main_content=False):
+        """
+        Create the engine.
+
+        :param prefer_main_content: Return only the main content region when the page has one
+        """
+        self.prefer_main_content = prefer_main_content
+
+    def start(self, max_chars):
+        """
+        Begin extracting a page that will be fed in pieces.
+
+        :param max_chars: Number of characters of text to collect
+        :return: StreamingTextExtractor to feed
+        """
+        return StreamingTextExtractor(max_chars, prefer_main_content=self.prefer_main_content)
+
+    def extract(self, webpage_html, max_chars):
+        """
+        Extract text from a whole HTML document.
+
+        :param webpage_html: HTML source of the webpage
+        :param max_chars: Number of characters of text to collect
+        :return: Extracted text
+        """
+        text_extractor = self.start(max_chars)
+        for chunk_start in range(0, len(webpage_html), FEED_CHUNK_CHARS):
+            if text_extractor.feed(webpage_html[chunk_start:chunk_start + FEED_CHUNK_CHARS]):
+                break
+        else:
+            text_extractor.close()
+        return text_extractor.get_text()
+
+
+class BeautifulSoupExtractor:
+    """
+    The original extraction engine: full BeautifulSoup tree, text of every element.
+    """
+
+    name = 'beautifulsoup'
+
+    def __init__(self, prefer_main_content=False):
+        """
+        Create the engine.
+
+        :param prefer_main_content: Ignored; kept so all engines take the same options
+        """
+        self.prefer_main_content = prefer_main_content
+
+    def start(self, max_chars):
+        """
+        Begin extracting a page that will be fed in pieces.
+
+        BeautifulSoup needs the whole document, so the pieces are buffered
+        and parsed when the page is closed.
+
+        :param max_chars: Maximum number of characters to keep
+        :return: _BufferedExtraction to feed
+        """
+        return _BufferedExtraction(self, max_chars)
+
+    def extract(self, webpage_html, max_chars):
+        """
+        Extract text from a whole HTML document.
+
+        :param webpage_html: HTML source of the webpage
+        :param max_chars: Maximum number of characters to keep
+        :return: Extracted text
+        """
+        # Use BeautifulSoup to parse and extract text
+        webpage_soup = BeautifulSoup(webpage_html, 'html.parser')
+
+        # Extract text and remove extra whitespace
+        webpage_text = ' '.join(webpage_soup.get_text().split())
+
+        # Truncate text to specified maximum length
+        return webpage_text[:max_chars]
+
+
+class _BufferedExtraction:
+    """
+    Gives a whole-document engine the same feed()/close()/get_text() interface
+    as StreamingTextExtractor.
+    """
+
+    def __init__(self, extractor, max_chars):
+        """
+        Start buffering a page.
+
+        :param extractor: Engine with an extract(webpage_html, max_chars) method
+        :param max_chars: Maximum number of characters to keep
+        """
+        self.extractor = extractor
+        self.max_chars = max_chars
+        self.done = False
+        self._html_parts = []
+        self._text = None
+
+    def feed(self, html_chunk):
+        """
+        Buffer the next piece of the page.
+
+        :param html_chunk: Next piece of HTML text
+        :return: Always False; the whole page is needed
+        """
+        self._html_parts.append(html_chunk)
+        return False
+
+    def close(self):
+        """
+        Parse the buffered page.
+        """
+        if self._text is None:
+            self._text = self.extractor.extract(''.join(self._html_parts), self.max_chars)
+            self._html_parts = []
+
+    def get_text(self):
+        """
+        Return the extracted text.
+
+        :return: Text, truncated to the character budget
+        """
+        self.close()
+        return self._text
+
+
+# Extraction engines available by name
+EXTRACTORS = {
+    StreamingExtractor.name: StreamingExtractor,
+    BeautifulSoupExtractor.name: BeautifulSoupExtractor
+}
+
+
+def get_extractor(name, prefer_main_content=False):
+    """
+    Create an extraction engine by name.
+
+    :param name: Engine name ('streaming' or 'beautifulsoup')
+    :param prefer_main_content: Return only the main content region when the page has one
+    :return: Extraction engine
+    :raises ValueError: If the engine name is unknown
+    """
+    if name not in EXTRACTORS:
+        raise ValueError(f"Unknown content extractor '{name}'. Choose one of: {', '.join(sorted(EXTRACTORS))}")
+    return EXTRACTORS[name](prefer_main_content=prefer_main_content)
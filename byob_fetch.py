@@ -0,0 +1,459 @@
+#!/usr/bin/env python3
+"""
+BYOB (Bring Your Own Browser) Web Search Tool - Budgeted Page Downloads
+
+A search hit can point at anything: a 40 MB PDF, a video page, or a website
+that trickles bytes for a minute. Instead of downloading the whole response
+and handing it to the HTML parser, pages are streamed in chunks:
+- Content-Type is checked before the body is read; only HTML and plain text
+  are processed, everything else is skipped without downloading it
+- The download stops at a byte budget, at a total-time deadline, or as soon
+  as the text extractor has collected enough characters
+- Bytes are decoded incrementally using the charset from the headers (or the
+  page's <meta charset>), and fed to the extractor as they arrive
+
+Key Components:
+- PageReader: Network-free state machine that gates, decodes and extracts a response
+- PageFetcher: Streams pages through the shared requests.Session
+- fetch_page_async: The same for the asyncio engine's httpx.AsyncClient
+- FetchStats: Bytes downloaded, pages fetched and pages skipped per reason
+"""
+
+import asyncio    # For finishing async downloads off the event loop
+import codecs     # For incremental charset decoding
+import re         # For finding charsets in headers and <meta> tags
+import threading  # For protecting shared counters
+import time       # For download deadlines
+from collections import defaultdict  # For per-reason skip counters
+from dataclasses import dataclass, field  # For simple result records
+
+# Size of each piece read from the network
+DOWNLOAD_CHUNK_BYTES = 16 * 1024
+
+# How much of the page to search for a <meta charset> when the headers have none
+CHARSET_SNIFF_BYTES = 2048
+
+# Content types handled by the HTML extractor and as plain text
+HTML_CONTENT_TYPES = frozenset({'text/html', 'application/xhtml+xml'})
+TEXT_CONTENT_TYPES = frozenset({'text/plain'})
+
+# Reasons a page can be skipped
+SKIP_UNSUPPORTED_TYPE = 'unsupported_content_type'
+SKIP_HTTP_ERROR = 'http_error'
+SKIP_REQUEST_ERROR = 'request_error'
+SKIP_DEADLINE = 'deadline'
+SKIP_CANCELLED = 'cancelled'
+SKIP_EMPTY = 'no_text'
+
+_HEADER_CHARSET = re.compile(r'charset\s*=\s*["\']?([\w.:-]+)', re.IGNORECASE)
+_META_CHARSET = re.compile(rb'<meta[^>]+charset\s*=\s*["\']?([\w.:-]+)', re.IGNORECASE)
+
+
+def _valid_charset(charset):
+    """
+    Return the charset if Python knows how to decode it.
+
+    :param charset: Charset name (may be None)
+    :return: Charset name or None
+    """
+    if not charset:
+        return None
+    try:
+        codecs.lookup(charset)
+        return charset
+    except LookupError:
+        return None
+
+
+def _set_read_timeout(raw_response, timeout):
+    """
+    Change the socket timeout of a streamed response for the next read.
+
+    :param raw_response: urllib3 response behind a requests.Response
+    :param timeout: Seconds the next read may wait
+    """
+    # urllib3 2.x exposes the connection as 'connection', 1.x as '_connection'
+    connection = getattr(raw_response, 'connection', None) or getattr(raw_response, '_connection', None)
+    connection_socket = getattr(connection, 'sock', None)
+    if connection_socket is not None:
+        connection_socket.settimeout(max(timeout, 0.001))
+
+
+def _iter_response_chunks(webpage_response, read_timeout=None, deadline_at=None):
+    """
+    Yield the body of a streamed requests.Response as soon as each piece arrives.
+
+    iter_content() waits until a whole chunk has been received, which would
+    let a slow website hold a download well past its deadline. For the same
+    reason every read may only wait until the deadline, not a full
+    read_timeout past it.
+
+    :param webpage_response: requests.Response opened with stream=True
+    :param read_timeout: Seconds a single read may wait
+    :param deadline_at: time.monotonic() value the download must finish by
+    :return: Generator of byte strings
+    """
+    raw_response = webpage_response.raw
+    if hasattr(raw_response, 'read1'):
+        read_chunk = lambda: raw_response.read1(DOWNLOAD_CHUNK_BYTES, decode_content=True)
+    else:
+        # Older urllib3 versions can only read whole chunks
+        content_chunks = webpage_response.iter_content(chunk_size=DOWNLOAD_CHUNK_BYTES)
+        read_chunk = lambda: next(content_chunks, b'')
+    while True:
+        if deadline_at is not None:
+            seconds_left = deadline_at - time.monotonic()
+            if seconds_left <= 0:
+                return
+            _set_read_timeout(raw_response, min(read_timeout, seconds_left) if read_timeout else seconds_left)
+        chunk = read_chunk()
+        if not chunk:
+            return
+        yield chunk
+
+
+@dataclass
+class FetchResult:
+    """
+    Outcome of downloading one page.
+    """
+    url: str
+    status_code: int = None
+    text: str = None
+    headers: dict = field(default_factory=dict)  # Case-insensitive response headers
+    skip_reason: str = None
+    bytes_downloaded: int = 0
+    truncated: bool = False
+    parse_seconds: float = 0.0  # Time spent decoding and extracting text (part of the download time)
+
+    @property
+    def not_modified(self):
+        """
+        Whether the server answered 304 Not Modified to a conditional request.
+        """
+        return self.status_code == 304
+
+
+class FetchStats:
+    """
+    Thread-safe download counters, for sizing the byte budget and deadline.
+    """
+
+    def __init__(self):
+        """
+        Initialize empty counters.
+        """
+        self._lock = threading.Lock()
+        self._counters = defaultdict(int)
+        self._skipped = defaultdict(int)
+
+    def record_result(self, fetch_result):
+        """
+        Count the outcome of one download.
+
+        :param fetch_result: FetchResult of the download
+        """
+        with self._lock:
+            self._counters['bytes_downloaded'] += fetch_result.bytes_downloaded
+            if fetch_result.skip_reason:
+                self._skipped[fetch_result.skip_reason] += 1
+            elif fetch_result.not_modified:
+                self._counters['pages_not_modified'] += 1
+            else:
+                self._counters['pages_fetched'] += 1
+                if fetch_result.truncated:
+                    self._counters['pages_truncated'] += 1
+
+    def snapshot(self):
+        """
+        Return a copy of the counters.
+
+        :return: Dictionary of counters, including pages skipped per reason
+        """
+        with self._lock:
+            stats = {
+                'bytes_downloaded': self._counters['bytes_downloaded'],
+                'pages_fetched': self._counters['pages_fetched'],
+                'pages_truncated': self._counters['pages_truncated'],
+                'pages_not_modified': self._counters['pages_not_modified'],
+                'pages_skipped': dict(self._skipped)
+            }
+        return stats
+
+
+class PageReader:
+    """
+    Turns a streamed HTTP response into page text, without doing any I/O itself.
+
+    Call start() with the status and headers, then feed() each chunk of the
+    body until it returns True (or the body ends), then finish().
+    """
+
+    def __init__(self, url, extractor, max_chars, max_bytes, deadline_at, stop_event=None):
+        """
+        Prepare to read one page.
+
+        :param url: Webpage URL (for the result)
+        :param extractor: Extraction engine from byob_extract
+        :param max_chars: Number of characters of text to collect
+        :param max_bytes: Maximum number of body bytes to download
+        :param deadline_at: time.monotonic() value by which the download must finish
+        :param stop_event: Optional threading.Event; once set, the download is abandoned at the next chunk
+        """
+        self.result = FetchResult(url=url)
+        self.extractor = extractor
+        self.max_chars = max_chars
+        self.max_bytes = max_bytes
+        self.deadline_at = deadline_at
+        self.stop_event = stop_event
+        self._charset = None
+        self._decoder = None
+        self._text_session = None
+        self._plain_text_parts = None
+        self._sniff_buffer = b''
+
+    def start(self, status_code, headers):
+        """
+        Decide from the status line and headers whether the body is worth reading.
+
+        :param status_code: HTTP status code
+        :param headers: Response headers (case-insensitive mapping)
+        :return: True if the body should be read
+        """
+        self.result.status_code = status_code
+        self.result.headers = headers
+        if status_code == 304:
+            return False
+        if status_code >= 400:
+            self.result.skip_reason = SKIP_HTTP_ERROR
+            return False
+
+        content_type_header = headers.get('Content-Type', '')
+        content_type = content_type_header.split(';')[0].strip().lower()
+
+        # Pages that do not say what they are are treated as HTML
+        if not content_type or content_type in HTML_CONTENT_TYPES:
+            self._text_session = self.extractor.start(self.max_chars)
+        elif content_type in TEXT_CONTENT_TYPES:
+            self._plain_text_parts = []
+        else:
+            self.result.skip_reason = SKIP_UNSUPPORTED_TYPE
+            return False
+
+        header_charset = _HEADER_CHARSET.search(content_type_header)
+        self._charset = _valid_charset(header_charset.group(1) if header_charset else None)
+        if self._charset:
+            self._decoder = codecs.getincrementaldecoder(self._charset)(errors='replace')
+
+        # A body declared larger than the budget is still read, but only up to the budget
+        content_length = headers.get('Content-Length')
+        if content_length and content_length.isdigit() and int(content_length) > self.max_bytes:
+            self.result.truncated = True
+        return True
+
+    def feed(self, chunk):
+        """
+        Process the next chunk of the body.
+
+        :param chunk: Bytes received from the network
+        :return: True if no more of the body is needed
+        """
+        # Never go past the byte budget
+        remaining_bytes = self.max_bytes - self.result.bytes_downloaded
+        if len(chunk) > remaining_bytes:
+            chunk = chunk[:remaining_bytes]
+            self.result.truncated = True
+        self.result.bytes_downloaded += len(chunk)
+
+        parse_started_at = time.perf_counter()
+        enough_text = self._consume(chunk)
+        self.result.parse_seconds += time.perf_counter() - parse_started_at
+        return (
+            enough_text
+            or self.result.bytes_downloaded >= self.max_bytes
+            or time.monotonic() >= self.deadline_at
+            or self.stopped()
+        )
+
+    def stopped(self):
+        """
+        Check whether the download was called off from outside.
+
+        :return: True if the stop event is set
+        """
+        return self.stop_event is not None and self.stop_event.is_set()
+
+    def _consume(self, chunk):
+        """
+        Decode a chunk and pass the text to the extractor.
+
+        :param chunk: Bytes to decode
+        :return: True once the extractor has collected enough text
+        """
+        if self._decoder is None:
+            # Look for a <meta charset> near the top of the page before picking a decoder
+            self._sniff_buffer += chunk
+            if len(self._sniff_buffer) < CHARSET_SNIFF_BYTES and self.result.bytes_downloaded < self.max_bytes:
+                return False
+            self._start_decoder_from_sniff()
+            chunk, self._sniff_buffer = self._sniff_buffer, b''
+        return self._consume_text(self._decoder.decode(chunk))
+
+    def _start_decoder_from_sniff(self):
+        """
+        Choose a charset from the page's <meta> tag, defaulting to UTF-8.
+        """
+        meta_charset = _META_CHARSET.search(self._sniff_buffer)
+        self._charset = _valid_charset(meta_charset.group(1).decode('ascii', 'ignore') if meta_charset else None)
+        self._decoder = codecs.getincrementaldecoder(self._charset or 'utf-8')(errors='replace')
+
+    def _consume_text(self, text):
+        """
+        Pass decoded text to the HTML extractor or the plain-text buffer.
+
+        :param text: Decoded text
+        :return: True once enough text has been collected
+        """
+        if self._text_session is not None:
+            return self._text_session.feed(text)
+        self._plain_text_parts.append(text)
+        return sum(len(part) for part in self._plain_text_parts) >= self.max_chars * 2
+
+    def finish(self, deadline_passed=False):
+        """
+        Flush everything and produce the result.
+
+        :param deadline_passed: Whether the download was cut short by the deadline
+        :return: FetchResult
+        """
+        if self.result.skip_reason or self.result.not_modified:
+            return self.result
+        if self.stopped():
+            # A partial page is not worth summarizing once nobody is waiting for it
+            self.result.skip_reason = SKIP_CANCELLED
+            return self.result
+
+        # Flush bytes still waiting for charset detection or in the decoder
+        parse_started_at = time.perf_counter()
+        if self._decoder is None:
+            self._start_decoder_from_sniff()
+        self._consume_text(self._decoder.decode(self._sniff_buffer, final=True))
+        self._sniff_buffer = b''
+
+        if self._text_session is not None:
+            self._text_session.close()
+            page_text = self._text_session.get_text()
+        else:
+            page_text = ' '.join(''.join(self._plain_text_parts).split())[:self.max_chars]
+        self.result.parse_seconds += time.perf_counter() - parse_started_at
+
+        if deadline_passed:
+            self.result.truncated = True
+        if not page_text:
+            self.result.skip_reason = SKIP_DEADLINE if deadline_passed else SKIP_EMPTY
+            return self.result
+        self.result.text = page_text
+        return self.result
+
+
+class PageFetcher:
+    """
+    Streams webpages through the shared requests.Session with byte and time budgets.
+    """
+
+    def __init__(self, http_pool, stats=None):
+        """
+        Create the fetcher.
+
+        :param http_pool: byob_http.HTTPPool to send requests through
+        :param stats: Optional FetchStats to record downloads in
+        """
+        self.http_pool = http_pool
+        self.stats = stats or FetchStats()
+
+    def fetch(self, url, extractor, max_chars, max_bytes, deadline_seconds, timeout=10, headers=None,
+              stop_event=None):
+        """
+        Download a page and extract its text.
+
+        :param url: Webpage URL
+        :param extractor: Extraction engine from byob_extract
+        :param max_chars: Number of characters of text to collect
+        :param max_bytes: Maximum number of body bytes to download
+        :param deadline_seconds: Total seconds allowed for the whole download
+        :param timeout: Connect / between-chunks read timeout in seconds
+        :param headers: Optional extra request headers (e.g. conditional headers)
+        :param stop_event: Optional threading.Event; once set, the download is abandoned at the next chunk
+        :return: FetchResult
+        """
+        deadline_at = time.monotonic() + deadline_seconds
+        page_reader = PageReader(url, extractor, max_chars, max_bytes, deadline_at, stop_event)
+        body_started = False
+        try:
+            request_timeout = min(timeout, deadline_seconds)
+            with self.http_pool.get(url, timeout=request_timeout, headers=headers, stream=True) as webpage_response:
+                if page_reader.start(webpage_response.status_code, webpage_response.headers):
+                    body_started = True
+                    for chunk in _iter_response_chunks(webpage_response, timeout, deadline_at):
+                        if page_reader.feed(chunk):
+                            break
+        except Exception as fetch_error:
+            if body_started and time.monotonic() >= deadline_at:
+                # The last read was cut off at the deadline: keep the text that arrived before it
+                pass
+            else:
+                print(f"Webpage Download Error for {url}: {fetch_error}")
+                page_reader.result.skip_reason = SKIP_REQUEST_ERROR
+
+        fetch_result = page_reader.finish(deadline_passed=time.monotonic() >= deadline_at)
+        self.stats.record_result(fetch_result)
+        return fetch_result
+
+
+async def fetch_page_async(http_client, url, extractor, max_chars, max_bytes, deadline_seconds,
+                           timeout=10, headers=None, stats=None):
+    """
+    Download a page with an httpx.AsyncClient and extract its text.
+
+    Parameters match PageFetcher.fetch. The streaming engine parses on the
+    event loop as chunks arrive (it stops at the character budget, so the
+    work per page is small); the final flush, which is where whole-document
+    engines parse, runs in a worker thread.
+
+    The httpx timeout only bounds each read, so the whole download is
+    bounded by the deadline as well: a website that trickles bytes cannot
+    hold it for a read timeout per chunk.
+
+    :param http_client: httpx.AsyncClient to send the request through
+    :param stats: Optional FetchStats to record the download in
+    :return: FetchResult
+    """
+    deadline_at = time.monotonic() + deadline_seconds
+    page_reader = PageReader(url, extractor, max_chars, max_bytes, deadline_at)
+    body_started = False
+
+    async def download():
+        nonlocal body_started
+        request_timeout = min(timeout, deadline_seconds)
+        async with http_client.stream('GET', url, timeout=request_timeout, headers=headers) as webpage_response:
+            if page_reader.start(webpage_response.status_code, webpage_response.headers):
+                body_started = True
+                # Without a chunk size, httpx yields each piece as soon as it arrives
+                async for chunk in webpage_response.aiter_bytes():
+                    if page_reader.feed(chunk):
+                        break
+
+    try:
+        await asyncio.wait_for(download(), deadline_seconds)
+    except asyncio.TimeoutError:
+        # Cut off at the deadline: keep the text that arrived before it, like PageFetcher.fetch
+        if not body_started:
+            page_reader.result.skip_reason = SKIP_DEADLINE
+    except Exception as fetch_error:
+        print(f"Webpage Download Error for {url}: {fetch_error}")
+        page_reader.result.skip_reason = SKIP_REQUEST_ERROR
+
+    fetch_result = await asyncio.to_thread(page_reader.finish, time.monotonic() >= deadline_at)
+    if stats is not None:
+        stats.record_result(fetch_result)
+    return fetch_result
@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+BYOB (Bring Your Own Browser) Web Search Tool - Query Fan-Out and Rank Fusion
+
+A single 3-4 word search term finds only what that one phrasing finds, and
+the pipeline cannot search until the refinement round trip to OpenAI has
+finished. With speculative search the user's own query is searched while it
+is being refined, then the refined term (and optional rewrites) are searched
+in parallel. This module merges the resulting ranked lists:
+- Reciprocal rank fusion scores each page by 1 / (k + rank) summed over
+  every list it appears in, so pages that several phrasings agree on rise
+  to the top without having to compare Google's scores across queries
+- Pages are merged by canonical URL, so the same page found by two queries
+  is only downloaded once
+
+Key Components:
+- reciprocal_rank_fusion: Merge ranked search result lists into one
+- parse_search_terms: Read the search terms out of a refinement response
+"""
+
+import re  # For stripping list markers from search terms
+
+from byob_dedup import canonicalize_url
+
+# Rank offset of reciprocal rank fusion; 60 is the value from the original paper
+DEFAULT_RRF_K = 60
+
+_LIST_MARKER = re.compile(r'^\s*(?:[-*•]|\d+[.)])\s*')
+
+
+def reciprocal_rank_fusion(ranked_lists, k=DEFAULT_RRF_K, limit=None):
+    """
+    Merge ranked search result lists with reciprocal rank fusion.
+
+    Each merged result is a copy of the first occurrence of the page (lists
+    earlier in 'ranked_lists' win ties), with 'fusion_score' and
+    'fusion_ranks' (its rank in each list, None where it is missing) added.
+
+    :param ranked_lists: List of search result lists, each in ranking order
+    :param k: Rank offset; larger values flatten the difference between top and lower ranks
+    :param limit: Maximum number of results to return (None for all)
+    :return: Merged list of search results, best first
+    """
+    fused_results = {}
+    for list_index, ranked_list in enumerate(ranked_lists):
+        for result_rank, search_result in enumerate(ranked_list, start=1):
+            canonical_url = canonicalize_url(search_result.get('link'))
+            fused_result = fused_results.get(canonical_url)
+            if fused_result is None:
+                fused_result = dict(search_result, fusion_score=0.0, fusion_ranks=[None] * len(ranked_lists))
+                fused_results[canonical_url] = fused_result
+            if fused_result['fusion_ranks'][list_index] is None:
+                # Only a page's best rank in each list counts
+                fused_result['fusion_ranks'][list_index] = result_rank
+                fused_result['fusion_score'] += 1.0 / (k + result_rank)
+
+    # Python's sort is stable, so equal scores keep first-seen order
+    merged_results = sorted(fused_results.values(), key=lambda fused_result: -fused_result['fusion_score'])
+    for fused_result in merged_results:
+        fused_result['fusion_score'] = round(fused_result['fusion_score'], 6)
+    return merged_results[:limit] if limit else merged_results
+
+
+def parse_search_terms(refine_text, max_terms):
+    """
+    Read the search terms out of a refinement response with one term per line.
+
+    :param refine_text: Text returned by the refinement model
+    :param max_terms: Maximum number of terms to return
+    :return: List of distinct search terms, in the order given
+    """
+    search_terms = []
+    for refine_line in (refine_text or '').splitlines():
+        search_term = _LIST_MARKER.sub('', refine_line).strip().strip('"\'').strip()
+        if search_term and search_term.lower() not in (known_term.lower() for known_term in search_terms):
+            search_terms.append(search_term)
+    return search_terms[:max_terms]
@@ -0,0 +1,363 @@
+#!/usr/bin/env python3
+"""
+BYOB (Bring Your Own Browser) Web Search Tool - Shared HTTP Connection Pools
+
+Every hop of a research query (Google Custom Search, webpage downloads and
+OpenAI calls) goes over HTTPS. Opening a fresh TCP connection and TLS session
+for each of them adds a noticeable delay, so this module keeps long-lived,
+keep-alive connection pools that every BYOBTool in the process shares.
+
+Key Components:
+- HTTPPool: A requests.Session for Google and webpages plus an httpx.Client
+  for OpenAI, both with per-host connection limits and keep-alive
+- create_async_http_client: The same limits for the asyncio engine
+- PoolStats: Per-host request and new-connection counters
+- get_shared_pool: Process-wide HTTPPool singleton
+"""
+
+import threading  # For protecting shared counters and the singleton
+from http.cookiejar import DefaultCookiePolicy  # For keeping cookies out of the shared session
+from collections import defaultdict  # For per-host counters
+from urllib.parse import urlsplit  # For finding the host of a URL
+import httpx      # For the OpenAI HTTP client
+import requests   # For Google and webpage requests
+from requests.adapters import HTTPAdapter  # For configuring the requests connection pool
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool  # For bounding the wait for a connection
+from urllib3.exceptions import EmptyPoolError  # Raised when no connection frees up in time
+
+# Default connection pool settings
+DEFAULT_MAX_CONNECTIONS_PER_HOST = 10  # Maximum open connections to a single host
+DEFAULT_MAX_HOSTS = 100  # Number of per-host pools kept alive at the same time
+DEFAULT_KEEPALIVE_EXPIRY = 30.0  # Seconds an idle connection is kept open
+DEFAULT_POOL_TIMEOUT = 10.0  # Seconds a request waits for a free connection to a busy host
+
+
+def _http2_available():
+    """
+    Check whether the optional 'h2' package needed for HTTP/2 is installed.
+
+    :return: True if HTTP/2 can be enabled
+    """
+    try:
+        import h2  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+def _resolve_http2(http2):
+    """
+    Decide whether HTTP/2 can actually be used.
+
+    :param http2: Whether HTTP/2 was requested
+    :return: True if HTTP/2 was requested and is available
+    """
+    if http2 and not _http2_available():
+        print("HTTP/2 requested but the 'h2' package is not installed; falling back to HTTP/1.1")
+        return False
+    return bool(http2)
+
+
+def _bounded_pool_class(pool_class, pool_timeout):
+    """
+    Make a urllib3 pool class that stops waiting for a free connection after pool_timeout seconds.
+
+    requests never passes a pool timeout to urllib3, so a blocking pool
+    otherwise waits forever once every connection to a host is taken.
+
+    :param pool_class: urllib3 HTTPConnectionPool or HTTPSConnectionPool
+    :param pool_timeout: Seconds to wait for a free connection
+    :return: Subclass of pool_class
+    """
+    class BoundedPool(pool_class):
+        def _get_conn(self, timeout=None):
+            return super()._get_conn(timeout=pool_timeout if timeout is None else timeout)
+
+    return BoundedPool
+
+
+class _BoundedPoolAdapter(HTTPAdapter):
+    """
+    HTTPAdapter whose per-host pools block when full, but only for a limited time.
+    """
+
+    def __init__(self, pool_timeout=DEFAULT_POOL_TIMEOUT, **kwargs):
+        """
+        Create the adapter.
+
+        :param pool_timeout: Seconds a request waits for a free connection
+        :param kwargs: Arguments passed to HTTPAdapter
+        """
+        self.pool_timeout = pool_timeout
+        super().__init__(**kwargs)
+
+    def init_poolmanager(self, *args, **kwargs):
+        """
+        Create the pool manager with pool classes that bound the wait for a connection.
+        """
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            'http': _bounded_pool_class(HTTPConnectionPool, self.pool_timeout),
+            'https': _bounded_pool_class(HTTPSConnectionPool, self.pool_timeout)
+        }
+
+
+class PoolStats:
+    """
+    Thread-safe per-host counters for requests sent and connections opened.
+
+    A request that does not open a new connection reused a keep-alive one.
+    """
+
+    def __init__(self):
+        """
+        Initialize empty counters.
+        """
+        self._lock = threading.Lock()
+        self._requests = defaultdict(int)
+        self._connections = defaultdict(int)
+
+    def record_request(self, host):
+        """
+        Count one request sent to a host.
+
+        :param host: Host name the request was sent to
+        """
+        with self._lock:
+            self._requests[host] += 1
+
+    def record_connection(self, host):
+        """
+        Count one new connection opened to a host.
+
+        :param host: Host name the connection was opened to
+        """
+        with self._lock:
+            self._connections[host] += 1
+
+    def snapshot(self, extra_connections=None):
+        """
+        Return a copy of the counters.
+
+        :param extra_connections: Optional {host: count} of connections counted elsewhere
+        :return: Dictionary with per-host and total request/connection counts
+        """
+        extra_connections = extra_connections or {}
+        with self._lock:
+            hosts = {
+                host: {
+                    'requests': self._requests[host],
+                    'connections_opened': self._connections[host] + extra_connections.get(host, 0)
+                }
+                for host in sorted(set(self._requests) | set(self._connections) | set(extra_connections))
+            }
+        total_requests = sum(host_stats['requests'] for host_stats in hosts.values())
+        total_connections = sum(host_stats['connections_opened'] for host_stats in hosts.values())
+        return {
+            'hosts': hosts,
+            'total_requests': total_requests,
+            'total_connections_opened': total_connections,
+            'connections_reused': max(total_requests - total_connections, 0)
+        }
+
+
+class HTTPPool:
+    """
+    Long-lived connection pools shared by Google, webpage and OpenAI requests.
+
+    - Google Custom Search and webpages go through one requests.Session, which
+      keeps a separate keep-alive pool for every host.
+    - OpenAI calls go through one httpx.Client (optionally over HTTP/2).
+    """
+
+    def __init__(self, max_connections_per_host=DEFAULT_MAX_CONNECTIONS_PER_HOST,
+                 max_hosts=DEFAULT_MAX_HOSTS, keepalive_expiry=DEFAULT_KEEPALIVE_EXPIRY, http2=False,
+                 pool_timeout=DEFAULT_POOL_TIMEOUT, openai_max_connections=None):
+        """
+        Create the connection pools.
+
+        :param max_connections_per_host: Maximum open connections to a single host
+        :param max_hosts: Number of per-host pools kept alive at the same time
+        :param keepalive_expiry: Seconds an idle OpenAI connection is kept open
+        :param http2: Use HTTP/2 for OpenAI calls (requires the 'h2' package)
+        :param pool_timeout: Seconds a request waits for a free connection to a host whose pool is full
+        :param openai_max_connections: Maximum open connections to OpenAI (default: max_connections_per_host);
+                                       should match the number of calls the rate limiters let through at once
+        """
+        self.stats = PoolStats()
+        self.http2 = _resolve_http2(http2)
+
+        # requests keeps one pool per host; pool_block makes the per-host limit a hard cap,
+        # and pool_timeout makes sure a request waiting for a connection eventually gives up
+        self.session = requests.Session()
+        # Websites must not be able to leak cookies from one user's query into another's
+        self.session.cookies.set_policy(DefaultCookiePolicy(allowed_domains=[]))
+        self._adapter = _BoundedPoolAdapter(
+            pool_timeout=pool_timeout,
+            pool_connections=max_hosts,
+            pool_maxsize=max_connections_per_host,
+            pool_block=True
+        )
+        self.session.mount('http://', self._adapter)
+        self.session.mount('https://', self._adapter)
+
+        # httpx client handed to the OpenAI SDK
+        openai_max_connections = openai_max_connections or max_connections_per_host
+        self.openai_http_client = httpx.Client(
+            limits=httpx.Limits(
+                max_connections=openai_max_connections,
+                max_keepalive_connections=openai_max_connections,
+                keepalive_expiry=keepalive_expiry
+            ),
+            http2=self.http2,
+            event_hooks={'request': [self._on_httpx_request]}
+        )
+
+    def _on_httpx_request(self, httpx_request):
+        """
+        Count an OpenAI request and watch whether it opens a new connection.
+
+        :param httpx_request: Outgoing httpx request
+        """
+        host = httpx_request.url.host
+        self.stats.record_request(host)
+
+        def trace(event_name, info):
+            if event_name == 'connection.connect_tcp.complete':
+                self.stats.record_connection(host)
+
+        httpx_request.extensions['trace'] = trace
+
+    def request(self, method, url, **kwargs):
+        """
+        Send a request through the shared requests.Session.
+
+        :param method: HTTP method
+        :param url: URL to request
+        :param kwargs: Extra arguments passed to requests
+        :return: requests.Response
+        """
+        self.stats.record_request(urlsplit(url).hostname or '')
+        try:
+            return self.session.request(method, url, **kwargs)
+        except EmptyPoolError as pool_error:
+            # requests passes this urllib3 error through as is; callers expect a requests error
+            raise requests.ConnectionError(f"No free connection within the pool timeout: {pool_error}") from pool_error
+
+    def get(self, url, **kwargs):
+        """
+        Send a GET request through the shared requests.Session.
+
+        :param url: URL to request
+        :param kwargs: Extra arguments passed to requests
+        :return: requests.Response
+        """
+        return self.request('GET', url, **kwargs)
+
+    def _session_connection_counts(self):
+        """
+        Count the connections the requests pools have opened, per host.
+
+        Only hosts whose pool is still alive are included.
+
+        :return: Dictionary of {host: connections opened}
+        """
+        pools = self._adapter.poolmanager.pools
+        connection_counts = defaultdict(int)
+        for pool_key in pools.keys():
+            try:
+                connection_counts[pool_key.key_host] += pools[pool_key].num_connections
+            except KeyError:
+                # The pool was evicted while we were counting
+                continue
+        return connection_counts
+
+    def get_stats(self):
+        """
+        Return request and connection counters for all pools.
+
+        :return: Dictionary of pool statistics
+        """
+        pool_stats = self.stats.snapshot(self._session_connection_counts())
+        pool_stats['http2'] = self.http2
+        return pool_stats
+
+    def close(self):
+        """
+        Close every pooled connection.
+        """
+        self.session.close()
+        self.openai_http_client.close()
+
+
+def create_async_http_client(stats=None, max_connections_per_host=DEFAULT_MAX_CONNECTIONS_PER_HOST,
+                             keepalive_expiry=DEFAULT_KEEPALIVE_EXPIRY, http2=False):
+    """
+    Create the httpx.AsyncClient used by the asynchronous engine.
+
+    httpx only limits connections for the whole client, so the limit is
+    scaled by the default number of hosts to leave room for many websites.
+
+    :param stats: Optional PoolStats to record requests and new connections in
+    :param max_connections_per_host: Maximum open connections to a single host
+    :param keepalive_expiry: Seconds an idle connection is kept open
+    :param http2: Use HTTP/2 where the server supports it (requires the 'h2' package)
+    :return: httpx.AsyncClient
+    """
+    event_hooks = {}
+    if stats is not None:
+        async def on_request(httpx_request):
+            host = httpx_request.url.host
+            stats.record_request(host)
+
+            async def trace(event_name, info):
+                if event_name == 'connection.connect_tcp.complete':
+                    stats.record_connection(host)
+
+            httpx_request.extensions['trace'] = trace
+
+        event_hooks['request'] = [on_request]
+
+    return httpx.AsyncClient(
+        follow_redirects=True,
+        limits=httpx.Limits(
+            max_connections=max_connections_per_host * DEFAULT_MAX_HOSTS,
+            max_keepalive_connections=max_connections_per_host * 2,
+            keepalive_expiry=keepalive_expiry
+        ),
+        http2=_resolve_http2(http2),
+        event_hooks=event_hooks
+    )
+
+
+# Process-wide pool shared by every BYOBTool
+_shared_pool = None
+_shared_pool_lock = threading.Lock()
+
+
+def get_shared_pool(max_connections_per_host=DEFAULT_MAX_CONNECTIONS_PER_HOST,
+                    keepalive_expiry=DEFAULT_KEEPALIVE_EXPIRY, http2=False,
+                    pool_timeout=DEFAULT_POOL_TIMEOUT, openai_max_connections=None):
+    """
+    Return the process-wide HTTPPool, creating it on first use.
+
+    The settings only take effect for the call that creates the pool.
+
+    :param max_connections_per_host: Maximum open connections to a single host
+    :param keepalive_expiry: Seconds an idle connection is kept open
+    :param http2: Use HTTP/2 for OpenAI calls
+    :param pool_timeout: Seconds a request waits for a free connection to a busy host
+    :param openai_max_connections: Maximum open connections to OpenAI
+    :return: HTTPPool instance
+    """
+    global _shared_pool
+    with _shared_pool_lock:
+        if _shared_pool is None:
+            _shared_pool = HTTPPool(
+                max_connections_per_host=max_connections_per_host,
+                keepalive_expiry=keepalive_expiry,
+                http2=http2,
+                pool_timeout=pool_timeout,
+                openai_max_connections=openai_max_connections
+            )
+        return _shared_pool
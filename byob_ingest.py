@@ -0,0 +1,780 @@
+#!/usr/bin/env python3
+"""
+BYOB (Bring Your Own Browser) Web Search Tool - Bulk Embedding Ingestion
+
+The JavaScript tools embed one document per OpenAI request and write one
+row per database call (regenerate_embeddings.js, store_embeddings.js), so
+re-embedding a large documents table takes hours. This module does the same
+job in bulk:
+- Many documents are packed into each embeddings request, up to the API's
+  input count and token limits
+- A few requests run at the same time, within the requests/minute and
+  tokens/minute limits of the process-wide OpenAI rate limiter (byob_ratelimit),
+  which also retries throttled requests
+- Rows are written back with one multi-row upsert per batch
+- Documents whose content has not changed since they were last embedded
+  are skipped, based on a content hash kept in a checkpoint file
+- The checkpoint is only updated after the rows are written, so a crashed
+  run simply picks up where it left off when started again
+
+The documents can come from, and go to, the Postgres table, a local SQLite
+stand-in with the same columns, or the local vector store. With the offline
+embedder the whole pipeline runs without network access.
+
+Key Components:
+- IngestionPipeline: Reads, filters, embeds and writes documents
+- EmbeddingBatcher: Packs documents into embeddings requests
+- IngestCheckpoint: Content hashes of the documents already embedded
+- LocalDocumentTable / PostgresDocumentTable / VectorStoreTable: Where documents are read and written
+
+Usage:
+    python byob_ingest.py postgres --dsn "$DATABASE_URL"
+    python byob_ingest.py jsonl --input documents.jsonl --target local --local-db documents.sqlite
+    python byob_ingest.py local --local-db documents.sqlite --embedder offline
+"""
+
+import argparse   # For command-line options
+import hashlib    # For offline embeddings
+import json       # For JSONL input
+import os         # For working with file paths
+import sqlite3    # For the checkpoint and the local documents table
+import struct     # For offline embeddings
+import time       # For timing and retries
+from array import array  # For storing embeddings as float32 bytes
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait  # For running requests in parallel
+from functools import partial  # For configuring the offline embedder
+
+from byob_cache import content_hash
+from byob_relevance import count_tokens, truncate_to_tokens
+
+# OpenAI model used to embed documents (same as the JavaScript tools)
+EMBEDDING_MODEL = 'text-embedding-3-small'
+
+# Embedding size of the documents table (vector(1536))
+DEFAULT_EMBEDDING_DIM = 1536
+
+# Limits of the OpenAI embeddings endpoint
+MAX_INPUTS_PER_REQUEST = 2048
+MAX_TOKENS_PER_INPUT = 8191
+MAX_TOKENS_PER_REQUEST = 300000
+
+# Default pipeline settings
+DEFAULT_REQUEST_TOKENS = 250000  # Tokens packed into one request (below the limit, since counts may be estimates)
+DEFAULT_MAX_CONCURRENT_REQUESTS = 4  # Embeddings requests in flight at the same time
+DEFAULT_REQUESTS_PER_MINUTE = 3000  # Starting requests/minute limit of the embedding model
+DEFAULT_TOKENS_PER_MINUTE = 1000000  # Starting tokens/minute limit of the embedding model
+DEFAULT_READ_BATCH = 2000  # Documents read from the source at a time
+DEFAULT_UPSERT_BATCH = 1000  # Rows written to the target at a time
+DEFAULT_MAX_ATTEMPTS = 5  # Tries per embeddings request before its documents are left for the next run
+DEFAULT_CHECKPOINT_PATH = 'byob_ingest_checkpoint.sqlite'
+
+
+def float32_bytes(embedding):
+    """
+    Pack an embedding into float32 bytes.
+
+    :param embedding: Sequence of numbers
+    :return: Bytes (4 per dimension)
+    """
+    return array('f', embedding).tobytes()
+
+
+def float32_list(embedding_bytes):
+    """
+    Unpack float32 bytes into a list of floats.
+
+    :param embedding_bytes: Bytes written by float32_bytes
+    :return: List of floats
+    """
+    embedding = array('f')
+    embedding.frombytes(embedding_bytes)
+    return embedding.tolist()
+
+
+def iter_jsonl_documents(jsonl_path):
+    """
+    Read documents from a JSONL file of {'id', 'content'} records.
+
+    :param jsonl_path: Path of the file to read
+    :return: Generator of (id, content) tuples
+    :raises ValueError: If a record has no id
+    """
+    with open(jsonl_path, encoding='utf-8') as jsonl_file:
+        for line_number, line in enumerate(jsonl_file, start=1):
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            if record.get('id') is None:
+                raise ValueError(f"{jsonl_path}:{line_number} has no 'id'; ingestion needs stable document ids")
+            yield int(record['id']), record['content']
+
+
+def offline_embedder(texts, model=EMBEDDING_MODEL, dimensions=DEFAULT_EMBEDDING_DIM):
+    """
+    Stand-in for the embeddings API when running without network access.
+
+    Every text gets a fixed unit-length vector derived from its hash, so the
+    same text always gets the same embedding.
+
+    :param texts: List of texts
+    :param model: Model name (mixed into the hash)
+    :param dimensions: Number of dimensions
+    :return: List of embeddings
+    """
+    embeddings = []
+    for text in texts:
+        seed = hashlib.sha256(f"{model}\n{text}".encode('utf-8')).digest()
+        values = []
+        counter = 0
+        while len(values) < dimensions:
+            block = hashlib.sha256(seed + struct.pack('<I', counter)).digest()
+            values.extend(byte / 127.5 - 1 for byte in block)
+            counter += 1
+        values = values[:dimensions]
+        norm = sum(value * value for value in values) ** 0.5 or 1
+        embeddings.append([value / norm for value in values])
+    return embeddings
+
+
+def openai_embedder(openai_client, model=EMBEDDING_MODEL):
+    """
+    Create an embedder function that calls the OpenAI embeddings API.
+
+    :param openai_client: OpenAI client
+    :param model: Embedding model
+    :return: Function turning a list of texts into a list of embeddings (same order)
+    """
+    def embed(texts):
+        embedding_response = openai_client.embeddings.create(model=model, input=texts)
+        return [item.embedding for item in sorted(embedding_response.data, key=lambda item: item.index)]
+    return embed
+
+
+class EmbeddingBatcher:
+    """
+    Packs documents into embeddings requests.
+
+    A request is closed once adding the next document would pass the input
+    count or token limit. Texts longer than the per-input limit are cut
+    down to it.
+    """
+
+    def __init__(self, model=EMBEDDING_MODEL, max_inputs=MAX_INPUTS_PER_REQUEST, max_tokens=DEFAULT_REQUEST_TOKENS):
+        """
+        Set the packing limits.
+
+        :param model: Embedding model (for token counting)
+        :param max_inputs: Maximum number of texts per request
+        :param max_tokens: Maximum number of tokens per request
+        """
+        self.model = model
+        self.max_inputs = min(max_inputs, MAX_INPUTS_PER_REQUEST)
+        self.max_tokens = min(max_tokens, MAX_TOKENS_PER_REQUEST)
+        self._documents = []
+        self._tokens = 0
+
+    def prepare(self, content):
+        """
+        Cut a text down to the per-input limit and count its tokens.
+
+        :param content: Document text
+        :return: Tuple of (text to embed, token count)
+        """
+        content_tokens = count_tokens(content, self.model)
+        if content_tokens > MAX_TOKENS_PER_INPUT:
+            content = truncate_to_tokens(content, MAX_TOKENS_PER_INPUT, self.model)
+            content_tokens = count_tokens(content, self.model)
+        return content, content_tokens
+
+    def add(self, document_id, content, document_hash):
+        """
+        Add a document, closing the current request first if it would not fit.
+
+        :param document_id: Document id
+        :param content: Document text
+        :param document_hash: Content hash recorded once the document is written
+        :return: A full request (list of (id, content, hash, text, tokens)), or None
+        """
+        text, text_tokens = self.prepare(content)
+        full_request = None
+        if self._documents and (len(self._documents) >= self.max_inputs or self._tokens + text_tokens > self.max_tokens):
+            full_request = self.flush()
+        self._documents.append((document_id, content, document_hash, text, text_tokens))
+        self._tokens += text_tokens
+        return full_request
+
+    def flush(self):
+        """
+        Close the current request.
+
+        :return: List of (id, content, hash, text, tokens), or None if it is empty
+        """
+        if not self._documents:
+            return None
+        full_request, self._documents, self._tokens = self._documents, [], 0
+        return full_request
+
+
+class IngestCheckpoint:
+    """
+    Content hashes of the documents already embedded and written.
+
+    A document is skipped when its stored hash matches; the hash covers the
+    embedding model as well as the text, so switching models re-embeds
+    everything.
+    """
+
+    def __init__(self, checkpoint_path=DEFAULT_CHECKPOINT_PATH):
+        """
+        Open (or create) the checkpoint.
+
+        :param checkpoint_path: Path of the SQLite file
+        """
+        checkpoint_dir = os.path.dirname(os.path.abspath(checkpoint_path))
+        os.makedirs(checkpoint_dir, exist_ok=True)
+        self.connection = sqlite3.connect(checkpoint_path, timeout=30)
+        self.connection.execute('PRAGMA journal_mode=WAL')
+        self.connection.execute(
+            'CREATE TABLE IF NOT EXISTS embedded (id INTEGER PRIMARY KEY, content_hash TEXT NOT NULL, '
+            'embedded_at REAL NOT NULL)'
+        )
+        self.connection.commit()
+
+    @staticmethod
+    def document_hash(content, model):
+        """
+        Hash a document's text together with the embedding model.
+
+        :param content: Document text
+        :param model: Embedding model
+        :return: Hexadecimal digest
+        """
+        return content_hash(f"{model}\n{content}")
+
+    def unchanged_ids(self, documents):
+        """
+        Find the documents whose current hash is already recorded.
+
+        :param documents: List of (id, hash) tuples
+        :return: Set of ids that can be skipped
+        """
+        if not documents:
+            return set()
+        recorded_hashes = dict(self.connection.execute(
+            f"SELECT id, content_hash FROM embedded WHERE id IN ({','.join('?' * len(documents))})",
+            [document_id for document_id, _ in documents]
+        ).fetchall())
+        return {document_id for document_id, document_hash in documents
+                if recorded_hashes.get(document_id) == document_hash}
+
+    def record(self, documents):
+        """
+        Remember that documents were embedded and written.
+
+        :param documents: List of (id, hash) tuples
+        """
+        now = time.time()
+        self.connection.executemany(
+            'INSERT INTO embedded (id, content_hash, embedded_at) VALUES (?, ?, ?) '
+            'ON CONFLICT(id) DO UPDATE SET content_hash = excluded.content_hash, embedded_at = excluded.embedded_at',
+            [(document_id, document_hash, now) for document_id, document_hash in documents]
+        )
+        self.connection.commit()
+
+    def reset(self):
+        """
+        Forget every recorded hash, so the next run embeds everything again.
+        """
+        self.connection.execute('DELETE FROM embedded')
+        self.connection.commit()
+
+    def __len__(self):
+        """
+        Number of documents recorded.
+        """
+        return self.connection.execute('SELECT COUNT(*) FROM embedded').fetchone()[0]
+
+    def close(self):
+        """
+        Close the checkpoint.
+        """
+        self.connection.close()
+
+
+class LocalDocumentTable:
+    """
+    SQLite stand-in for the Postgres documents table (id, content, embedding).
+
+    Embeddings are stored as float32 bytes. Useful for running and testing
+    the ingestion pipeline without a database server.
+    """
+
+    def __init__(self, database_path):
+        """
+        Open (or create) the table.
+
+        :param database_path: Path of the SQLite file
+        """
+        os.makedirs(os.path.dirname(os.path.abspath(database_path)), exist_ok=True)
+        self.connection = sqlite3.connect(database_path, timeout=30)
+        self.connection.execute('PRAGMA journal_mode=WAL')
+        self.connection.execute(
+            'CREATE TABLE IF NOT EXISTS documents (id INTEGER PRIMARY KEY, content TEXT NOT NULL, embedding BLOB)'
+        )
+        self.connection.commit()
+
+    def add_contents(self, documents):
+        """
+        Insert or replace document text without embeddings (the embedding is cleared).
+
+        :param documents: Iterable of (id, content)
+        """
+        self.connection.executemany(
+            'INSERT INTO documents (id, content, embedding) VALUES (?, ?, NULL) '
+            'ON CONFLICT(id) DO UPDATE SET content = excluded.content, embedding = NULL',
+            documents
+        )
+        self.connection.commit()
+
+    def iter_documents(self, batch_size=DEFAULT_READ_BATCH):
+        """
+        Yield every document, in id order.
+
+        :param batch_size: Number of rows read at a time
+        :return: Generator of (id, content) tuples
+        """
+        last_id = None
+        while True:
+            document_rows = self.connection.execute(
+                'SELECT id, content FROM documents WHERE ? IS NULL OR id > ? ORDER BY id LIMIT ?',
+                (last_id, last_id, batch_size)
+            ).fetchall()
+            if not document_rows:
+                return
+            yield from document_rows
+            last_id = document_rows[-1][0]
+
+    def upsert(self, rows):
+        """
+        Insert or update documents and their embeddings in one transaction.
+
+        :param rows: List of (id, content, embedding)
+        """
+        self.connection.executemany(
+            'INSERT INTO documents (id, content, embedding) VALUES (?, ?, ?) '
+            'ON CONFLICT(id) DO UPDATE SET content = excluded.content, embedding = excluded.embedding',
+            [(document_id, content, float32_bytes(embedding)) for document_id, content, embedding in rows]
+        )
+        self.connection.commit()
+
+    def get_embedding(self, document_id):
+        """
+        Look up the embedding of one document.
+
+        :param document_id: Document id
+        :return: List of floats, or None if the document has no embedding
+        """
+        row = self.connection.execute('SELECT embedding FROM documents WHERE id = ?', (document_id,)).fetchone()
+        return float32_list(row[0]) if row and row[0] is not None else None
+
+    def __len__(self):
+        """
+        Number of documents in the table.
+        """
+        return self.connection.execute('SELECT COUNT(*) FROM documents').fetchone()[0]
+
+    def close(self):
+        """
+        Close the table.
+        """
+        self.connection.close()
+
+
+class PostgresDocumentTable:
+    """
+    The Postgres documents table, read with a server-side cursor and written with multi-row upserts.
+
+    Reading and writing use separate connections, so the table can be
+    re-embedded in place while it is being streamed.
+    """
+
+    def __init__(self, dsn, table='documents'):
+        """
+        Connect to the table.
+
+        :param dsn: Postgres connection string
+        :param table: Table with id, content and embedding columns
+        """
+        from byob_vector_store import _check_table_name, _connect_postgres
+        self.dsn = dsn
+        self.table = _check_table_name(table)
+        self._connect = _connect_postgres
+        self._write_connection = None
+
+    def iter_documents(self, batch_size=DEFAULT_READ_BATCH):
+        """
+        Yield every document, in id order.
+
+        :param batch_size: Number of rows fetched at a time
+        :return: Generator of (id, content) tuples
+        """
+        read_connection = self._connect(self.dsn)
+        try:
+            read_cursor = read_connection.cursor(name='byob_ingest_read')
+            read_cursor.itersize = batch_size
+            read_cursor.execute(f"SELECT id, content FROM {self.table} ORDER BY id")
+            while True:
+                table_rows = read_cursor.fetchmany(batch_size)
+                if not table_rows:
+                    break
+                yield from table_rows
+            read_cursor.close()
+        finally:
+            read_connection.close()
+
+    def upsert(self, rows):
+        """
+        Insert or update documents and their embeddings with a single statement.
+
+        :param rows: List of (id, content, embedding)
+        """
+        if not rows:
+            return
+        from byob_vector_store import format_pgvector
+        if self._write_connection is None:
+            self._write_connection = self._connect(self.dsn)
+        upsert_sql = (
+            f"INSERT INTO {self.table} (id, content, embedding) VALUES "
+            + ','.join(['(%s, %s, %s::vector)'] * len(rows))
+            + " ON CONFLICT (id) DO UPDATE SET content = EXCLUDED.content, embedding = EXCLUDED.embedding"
+        )
+        parameters = []
+        for document_id, content, embedding in rows:
+            parameters.extend((document_id, content, format_pgvector(embedding)))
+        write_cursor = self._write_connection.cursor()
+        try:
+            write_cursor.execute(upsert_sql, parameters)
+            self._write_connection.commit()
+        except Exception:
+            self._write_connection.rollback()
+            raise
+        finally:
+            write_cursor.close()
+
+    def close(self):
+        """
+        Close the write connection.
+        """
+        if self._write_connection is not None:
+            self._write_connection.close()
+            self._write_connection = None
+
+
+class VectorStoreTable:
+    """
+    Adapter that lets the local vector store (byob_vector_store.VectorStore) be an ingestion target.
+    """
+
+    def __init__(self, vector_store):
+        """
+        Wrap a vector store.
+
+        :param vector_store: VectorStore
+        """
+        self.vector_store = vector_store
+
+    def iter_documents(self, batch_size=DEFAULT_READ_BATCH):
+        """
+        Yield every document, in id order.
+
+        :param batch_size: Number of rows read at a time
+        :return: Generator of (id, content) tuples
+        """
+        for document_id, content, _ in self.vector_store.iter_documents(batch_size):
+            yield document_id, content
+
+    def upsert(self, rows):
+        """
+        Add or replace documents in the store.
+
+        :param rows: List of (id, content, embedding)
+        """
+        self.vector_store.add_documents(rows)
+
+    def close(self):
+        """
+        Close the store.
+        """
+        self.vector_store.close()
+
+
+class IngestionPipeline:
+    """
+    Embeds documents in bulk and writes them to a target table.
+
+    Documents are read in batches, unchanged ones are dropped, the rest are
+    packed into embeddings requests that run in a small thread pool under
+    the rate limiter, and finished embeddings are written in large upserts.
+    Only the calling thread touches the target and the checkpoint.
+    """
+
+    def __init__(self, embed, target, checkpoint, model=EMBEDDING_MODEL, rate_limiter=None,
+                 max_concurrent_requests=DEFAULT_MAX_CONCURRENT_REQUESTS, max_inputs=MAX_INPUTS_PER_REQUEST,
+                 max_request_tokens=DEFAULT_REQUEST_TOKENS, upsert_batch_size=DEFAULT_UPSERT_BATCH,
+                 read_batch_size=DEFAULT_READ_BATCH, max_attempts=DEFAULT_MAX_ATTEMPTS):
+        """
+        Set up the pipeline.
+
+        :param embed: Function turning a list of texts into a list of embeddings (same order)
+        :param target: Table with an upsert(rows) method
+        :param checkpoint: IngestCheckpoint
+        :param model: Embedding model (for hashing and token counting)
+        :param rate_limiter: byob_ratelimit.RateLimiter of the embedding model, or None for no limit
+        :param max_concurrent_requests: Embeddings requests in flight at the same time
+        :param max_inputs: Maximum number of texts per request
+        :param max_request_tokens: Maximum number of tokens per request
+        :param upsert_batch_size: Rows written to the target at a time
+        :param read_batch_size: Documents checked against the checkpoint at a time
+        :param max_attempts: Tries per request before its documents are left for the next run
+        """
+        self.embed = embed
+        self.target = target
+        self.checkpoint = checkpoint
+        self.model = model
+        self.rate_limiter = rate_limiter
+        self.max_concurrent_requests = max_concurrent_requests
+        self.max_inputs = max_inputs
+        self.max_request_tokens = max_request_tokens
+        self.upsert_batch_size = upsert_batch_size
+        self.read_batch_size = read_batch_size
+        self.max_attempts = max_attempts
+        self.stats = {}
+
+    def _embed_request(self, request_documents):
+        """
+        Embed one packed request, retrying with exponential backoff.
+
+        With a rate limiter the request waits for capacity, and the limiter
+        does the retrying (backing off together with every other caller of
+        the model).
+
+        :param request_documents: List of (id, content, hash, text, tokens)
+        :return: List of embeddings, in request order
+        """
+        request_tokens = sum(document[4] for document in request_documents)
+        texts = [document[3] for document in request_documents]
+        if self.rate_limiter:
+            embeddings = self.rate_limiter.call(lambda: (self.embed(texts), None), request_tokens)
+            if len(embeddings) != len(texts):
+                raise ValueError(f"Expected {len(texts)} embeddings, got {len(embeddings)}")
+            return embeddings
+        for attempt in range(1, self.max_attempts + 1):
+            try:
+                embeddings = self.embed(texts)
+                if len(embeddings) != len(texts):
+                    raise ValueError(f"Expected {len(texts)} embeddings, got {len(embeddings)}")
+                return embeddings
+            except Exception as embedding_error:
+                if attempt == self.max_attempts:
+                    raise
+                backoff_seconds = min(2 ** attempt, 60)
+                print(f"Embedding Request Error (attempt {attempt}/{self.max_attempts}, "
+                      f"retrying in {backoff_seconds}s): {embedding_error}")
+                time.sleep(backoff_seconds)
+
+    def _iter_changed(self, documents):
+        """
+        Drop documents that are empty or unchanged since they were last embedded.
+
+        :param documents: Iterable of (id, content)
+        :return: Generator of (id, content, hash)
+        """
+        document_batch = []
+
+        def changed_in_batch():
+            hashed = [(document_id, content, self.checkpoint.document_hash(content, self.model))
+                      for document_id, content in document_batch]
+            unchanged = self.checkpoint.unchanged_ids([(document_id, document_hash)
+                                                       for document_id, _, document_hash in hashed])
+            self.stats['unchanged'] += len(unchanged)
+            return [document for document in hashed if document[0] not in unchanged]
+
+        for document_id, content in documents:
+            self.stats['read'] += 1
+            # The embeddings API rejects empty input
+            if not content or not content.strip():
+                self.stats['empty'] += 1
+                continue
+            document_batch.append((document_id, content))
+            if len(document_batch) >= self.read_batch_size:
+                yield from changed_in_batch()
+                document_batch = []
+        if document_batch:
+            yield from changed_in_batch()
+
+    def _write(self, pending_rows):
+        """
+        Upsert rows into the target, then record them in the checkpoint.
+
+        :param pending_rows: List of (id, content, embedding, hash)
+        """
+        if not pending_rows:
+            return
+        self.target.upsert([(document_id, content, embedding) for document_id, content, embedding, _ in pending_rows])
+        self.checkpoint.record([(document_id, document_hash) for document_id, _, _, document_hash in pending_rows])
+        self.stats['upserts'] += 1
+        self.stats['embedded'] += len(pending_rows)
+
+    def run(self, documents):
+        """
+        Embed and write every new or changed document.
+
+        :param documents: Iterable of (id, content)
+        :return: Dictionary of statistics
+        """
+        self.stats = {'read': 0, 'empty': 0, 'unchanged': 0, 'embedded': 0, 'failed': 0,
+                      'requests': 0, 'tokens': 0, 'upserts': 0, 'seconds': 0.0}
+        start_time = time.monotonic()
+        batcher = EmbeddingBatcher(self.model, self.max_inputs, self.max_request_tokens)
+        pending_rows = []
+        in_flight = {}
+
+        def collect(finished_futures):
+            for finished_future in finished_futures:
+                request_documents = in_flight.pop(finished_future)
+                try:
+                    embeddings = finished_future.result()
+                except Exception as embedding_error:
+                    # Not checkpointed, so these documents are tried again on the next run
+                    print(f"Embedding Request Failed for {len(request_documents)} documents: {embedding_error}")
+                    self.stats['failed'] += len(request_documents)
+                    continue
+                self.stats['requests'] += 1
+                self.stats['tokens'] += sum(document[4] for document in request_documents)
+                pending_rows.extend(
+                    (document_id, content, embedding, document_hash)
+                    for (document_id, content, document_hash, _, _), embedding in zip(request_documents, embeddings)
+                )
+            if len(pending_rows) >= self.upsert_batch_size:
+                self._write(pending_rows)
+                pending_rows.clear()
+
+        with ThreadPoolExecutor(max_workers=self.max_concurrent_requests) as request_pool:
+            def submit(request_documents):
+                # Keep a bounded number of requests queued, so memory use stays flat on huge tables
+                while len(in_flight) >= self.max_concurrent_requests * 2:
+                    finished_futures, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                    collect(finished_futures)
+                in_flight[request_pool.submit(self._embed_request, request_documents)] = request_documents
+
+            for document_id, content, document_hash in self._iter_changed(documents):
+                full_request = batcher.add(document_id, content, document_hash)
+                if full_request:
+                    submit(full_request)
+            last_request = batcher.flush()
+            if last_request:
+                submit(last_request)
+            while in_flight:
+                finished_futures, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                collect(finished_futures)
+        self._write(pending_rows)
+
+        self.stats['seconds'] = time.monotonic() - start_time
+        return self.stats
+
+
+def _open_table(kind, args):
+    """
+    Open a documents table from the command-line options.
+
+    :param kind: 'postgres', 'local' or 'vector-store'
+    :param args: Parsed command-line arguments
+    :return: Table object
+    """
+    if kind == 'postgres':
+        return PostgresDocumentTable(args.dsn, args.table)
+    if kind == 'local':
+        return LocalDocumentTable(args.local_db)
+    from byob_vector_store import VectorStore
+    return VectorStoreTable(VectorStore(args.store, embedding_dim=args.dim))
+
+
+def main():
+    """
+    Embed a documents table (or a JSONL file of documents) from the command line.
+    """
+    parser = argparse.ArgumentParser(description='Bulk, resumable embedding of the documents table.')
+    parser.add_argument('source', choices=['postgres', 'local', 'vector-store', 'jsonl'],
+                        help='Where the documents are read from')
+    parser.add_argument('--target', choices=['postgres', 'local', 'vector-store'],
+                        help='Where the embeddings are written (default: same as the source; local for jsonl)')
+    parser.add_argument('--input', help='JSONL file of {"id", "content"} records (for the jsonl source)')
+    parser.add_argument('--dsn', default=os.getenv('DATABASE_URL'), help='Postgres connection string')
+    parser.add_argument('--table', default='documents', help='Postgres table')
+    parser.add_argument('--local-db', default='documents.sqlite', help='Local SQLite documents table')
+    parser.add_argument('--store', default='vector_store', help='Local vector store directory')
+    parser.add_argument('--dim', type=int, default=DEFAULT_EMBEDDING_DIM, help='Embedding dimensions')
+    parser.add_argument('--checkpoint', default=DEFAULT_CHECKPOINT_PATH, help='Checkpoint file')
+    parser.add_argument('--full', action='store_true', help='Ignore the checkpoint and embed every document again')
+    parser.add_argument('--embedder', choices=['openai', 'offline'], default='openai',
+                        help="'offline' uses deterministic stand-in vectors without calling OpenAI")
+    parser.add_argument('--model', default=EMBEDDING_MODEL, help='Embedding model')
+    parser.add_argument('--concurrency', type=int, default=DEFAULT_MAX_CONCURRENT_REQUESTS,
+                        help='Embeddings requests in flight at the same time')
+    parser.add_argument('--rpm', type=int, default=DEFAULT_REQUESTS_PER_MINUTE, help='Requests per minute limit')
+    parser.add_argument('--tpm', type=int, default=DEFAULT_TOKENS_PER_MINUTE, help='Tokens per minute limit')
+    parser.add_argument('--request-tokens', type=int, default=DEFAULT_REQUEST_TOKENS, help='Tokens per request')
+    parser.add_argument('--upsert-batch', type=int, default=DEFAULT_UPSERT_BATCH, help='Rows written at a time')
+    args = parser.parse_args()
+
+    if args.source == 'jsonl':
+        if not args.input:
+            parser.error('the jsonl source needs --input')
+        source_table = None
+        documents = iter_jsonl_documents(args.input)
+    else:
+        source_table = _open_table(args.source, args)
+        documents = source_table.iter_documents()
+    target_kind = args.target or (args.source if args.source != 'jsonl' else 'local')
+    target_table = source_table if target_kind == args.source else _open_table(target_kind, args)
+
+    if args.embedder == 'openai':
+        from dotenv import load_dotenv
+        from openai import OpenAI
+        from byob_ratelimit import get_rate_limiters
+        from byob_search import DEFAULT_CONFIG
+        load_dotenv()
+        # The rate limiter does the retrying, so the client must not retry on its own as well
+        embed = openai_embedder(OpenAI(api_key=os.getenv('OPENAI_API_KEY'), max_retries=0), args.model)
+        rate_limiter = get_rate_limiters({
+            **DEFAULT_CONFIG,
+            'openai_rate_limits': {args.model: {'requests_per_minute': args.rpm, 'tokens_per_minute': args.tpm}}
+        }).openai(args.model)
+    else:
+        embed = partial(offline_embedder, model=args.model, dimensions=args.dim)
+        rate_limiter = None
+
+    checkpoint = IngestCheckpoint(args.checkpoint)
+    if args.full:
+        checkpoint.reset()
+    pipeline = IngestionPipeline(
+        embed, target_table, checkpoint, model=args.model,
+        rate_limiter=rate_limiter,
+        max_concurrent_requests=args.concurrency,
+        max_request_tokens=args.request_tokens,
+        upsert_batch_size=args.upsert_batch
+    )
+    ingest_stats = pipeline.run(documents)
+    print(f"Read {ingest_stats['read']} documents: embedded {ingest_stats['embedded']}, "
+          f"unchanged {ingest_stats['unchanged']}, empty {ingest_stats['empty']}, failed {ingest_stats['failed']} "
+          f"({ingest_stats['requests']} requests, {ingest_stats['tokens']} tokens, "
+          f"{ingest_stats['seconds']:.1f}s)")
+
+    checkpoint.close()
+    target_table.close()
+    if source_table is not None and source_table is not target_table:
+        source_table.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,370 @@
+#!/usr/bin/env python3
+"""
+BYOB (Bring Your Own Browser) Web Search Tool - Background Search Jobs
+
+A research query takes about a minute. Served as one synchronous HTTP
+request, it holds a connection (and a server thread) for that whole time,
+and a burst of users starts as many pipelines as there are requests. This
+module runs searches as background jobs instead:
+- Submitting a search only puts it in a bounded queue and returns a job id
+- A fixed number of worker threads take jobs off the queue, so at most that
+  many pipelines run at once no matter how many users arrive
+- When the queue is full, new searches are refused with an estimate of
+  when to try again, instead of piling up threads and memory
+- While a job runs, its refined term, search hits, page summaries and the
+  answer written so far can be read at any time
+- Queued and running jobs can be cancelled; a running job stops between
+  steps and its pending downloads and OpenAI calls are dropped
+
+Key Components:
+- SearchJob: State and partial results of one search
+- JobManager: The queue, the worker pool and the job registry
+- QueueFullError: Raised when a search cannot be queued
+"""
+
+import math       # For rounding retry hints
+import queue      # For handing jobs to the workers
+import threading  # For the worker pool
+import time       # For job timestamps and retention
+import uuid       # For job ids
+
+# Default job settings
+DEFAULT_JOB_WORKERS = 4  # Searches run at the same time
+DEFAULT_JOB_QUEUE_SIZE = 32  # Searches waiting for a worker before new ones are refused
+DEFAULT_JOB_RETENTION = 60 * 60  # Seconds a finished job can still be read
+DEFAULT_JOB_DURATION = 60.0  # Assumed seconds per search until real durations are known
+
+# Job states
+JOB_QUEUED = 'queued'
+JOB_RUNNING = 'running'
+JOB_SUCCEEDED = 'succeeded'
+JOB_FAILED = 'failed'
+JOB_CANCELLED = 'cancelled'
+FINISHED_STATES = frozenset({JOB_SUCCEEDED, JOB_FAILED, JOB_CANCELLED})
+
+
+class QueueFullError(Exception):
+    """
+    Raised when the job queue has no room for another search.
+    """
+
+    def __init__(self, retry_after):
+        """
+        Create the error.
+
+        :param retry_after: Suggested number of seconds to wait before submitting again
+        """
+        super().__init__(f"Search queue is full; retry in {retry_after} seconds")
+        self.retry_after = retry_after
+
+
+class SearchJob:
+    """
+    One queued or running search and everything it has produced so far.
+    """
+
+    def __init__(self, search_query, website_filter=None, recency=None, latency_budget=None, summary_quorum=None):
+        """
+        Create a queued job.
+
+        :param search_query: User's search query
+        :param website_filter: Optional website to filter search results
+        :param recency: Optional '[age][period]' recency restriction
+        :param latency_budget: Optional seconds the search may take once a worker starts it
+        :param summary_quorum: Optional number of summaries to write the answer from
+        """
+        self.job_id = uuid.uuid4().hex
+        self.search_query = search_query
+        self.website_filter = website_filter
+        self.recency = recency
+        self.latency_budget = latency_budget
+        self.summary_quorum = summary_quorum
+        self.status = JOB_QUEUED
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.error = None
+        self.refined_search_term = None
+        self.search_results = []
+        self.processed_search_results = []
+        self.answer_fragments = []
+        self.result = None
+        self.cancel_requested = threading.Event()
+        self._lock = threading.Lock()
+
+    def apply_event(self, event_name, event_data):
+        """
+        Record one progress event from BYOBTool.run_stream.
+
+        :param event_name: Event type
+        :param event_data: Event payload
+        """
+        with self._lock:
+            if event_name == 'refined':
+                self.refined_search_term = event_data['refined_search_term']
+            elif event_name == 'search_result':
+                self.search_results.append(event_data)
+            elif event_name == 'summary':
+                self.processed_search_results.append(event_data)
+            elif event_name == 'answer_delta':
+                self.answer_fragments.append(event_data['content'])
+            elif event_name == 'done':
+                self.result = event_data
+
+    def finish(self, status, error=None):
+        """
+        Mark the job as finished.
+
+        :param status: JOB_SUCCEEDED, JOB_FAILED or JOB_CANCELLED
+        :param error: Error message for failed jobs
+        """
+        with self._lock:
+            self.status = status
+            self.error = error
+            self.finished_at = time.time()
+
+    def snapshot(self, queue_position=None):
+        """
+        Describe the job and its results so far.
+
+        Summaries are listed in search ranking order. Once the job has
+        succeeded, 'result' holds the same structure /api/search returns.
+
+        :param queue_position: Number of jobs ahead of this one (for queued jobs)
+        :return: JSON-serializable dictionary
+        """
+        with self._lock:
+            job_snapshot = {
+                'job_id': self.job_id,
+                'status': self.status,
+                'query': self.search_query,
+                'site_filter': self.website_filter,
+                'recency': self.recency,
+                'latency_budget': self.latency_budget,
+                'summary_quorum': self.summary_quorum,
+                'created_at': self.created_at,
+                'started_at': self.started_at,
+                'finished_at': self.finished_at,
+                'error': self.error,
+                'refined_search_term': self.refined_search_term,
+                'search_results': list(self.search_results),
+                'processed_search_results': sorted(
+                    self.processed_search_results, key=lambda processed_result: processed_result['result_rank']
+                ),
+                'partial_answer': ''.join(self.answer_fragments),
+                'result': self.result
+            }
+        if queue_position is not None:
+            job_snapshot['queue_position'] = queue_position
+        return job_snapshot
+
+
+class JobManager:
+    """
+    Runs search jobs on a fixed-size worker pool fed by a bounded queue.
+    """
+
+    def __init__(self, byob_tool, worker_count=DEFAULT_JOB_WORKERS, queue_size=DEFAULT_JOB_QUEUE_SIZE,
+                 retention_seconds=DEFAULT_JOB_RETENTION):
+        """
+        Start the worker pool.
+
+        :param byob_tool: BYOBTool used to run the searches
+        :param worker_count: Number of searches run at the same time
+        :param queue_size: Number of searches that may wait for a worker
+        :param retention_seconds: Seconds a finished job is kept for GET requests
+        """
+        self.byob_tool = byob_tool
+        self.worker_count = worker_count
+        self.queue_size = queue_size
+        self.retention_seconds = retention_seconds
+        # Unbounded: cancelled jobs stay in it until a worker skips them, so
+        # the queue_size limit is checked against the ids still waiting instead
+        self._job_queue = queue.Queue()
+        self._jobs = {}
+        self._queued_ids = []
+        self._lock = threading.Lock()
+        self._stats = {'submitted': 0, 'rejected': 0, 'succeeded': 0, 'failed': 0, 'cancelled': 0}
+        self._average_duration = DEFAULT_JOB_DURATION
+        self._workers = [
+            threading.Thread(target=self._work, name=f"byob-job-worker-{worker_index}", daemon=True)
+            for worker_index in range(worker_count)
+        ]
+        for worker in self._workers:
+            worker.start()
+
+    def retry_after(self):
+        """
+        Estimate how long until a queue slot frees up (a worker finishes a search and takes the next one).
+
+        :return: Seconds (at least 1)
+        """
+        with self._lock:
+            average_duration = self._average_duration
+        return max(1, math.ceil(average_duration / self.worker_count))
+
+    def submit(self, search_query, website_filter=None, recency=None, latency_budget=None, summary_quorum=None):
+        """
+        Queue a search.
+
+        :param search_query: User's search query
+        :param website_filter: Optional website to filter search results
+        :param recency: Optional '[age][period]' recency restriction
+        :param latency_budget: Optional seconds the search may take once a worker starts it (see BYOBTool.run())
+        :param summary_quorum: Optional number of summaries to write the answer from (see BYOBTool.run())
+        :return: SearchJob
+        :raises QueueFullError: If the queue is full
+        """
+        self._purge_finished()
+        search_job = SearchJob(search_query, website_filter, recency, latency_budget, summary_quorum)
+        with self._lock:
+            if len(self._queued_ids) >= self.queue_size:
+                self._stats['rejected'] += 1
+                rejected = True
+            else:
+                self._job_queue.put_nowait(search_job)
+                self._jobs[search_job.job_id] = search_job
+                self._queued_ids.append(search_job.job_id)
+                self._stats['submitted'] += 1
+                rejected = False
+        if rejected:
+            raise QueueFullError(self.retry_after())
+        return search_job
+
+    def get(self, job_id):
+        """
+        Look up a job.
+
+        :param job_id: Job id returned by submit()
+        :return: SearchJob, or None if it does not exist (or has expired)
+        """
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def snapshot(self, job_id):
+        """
+        Describe a job, including its place in the queue.
+
+        :param job_id: Job id returned by submit()
+        :return: Job dictionary, or None if the job does not exist
+        """
+        with self._lock:
+            search_job = self._jobs.get(job_id)
+            queue_position = self._queued_ids.index(job_id) if job_id in self._queued_ids else None
+        return search_job.snapshot(queue_position) if search_job else None
+
+    def cancel(self, job_id):
+        """
+        Cancel a job.
+
+        A queued job is cancelled at once; a running job stops at its next
+        step. Finished jobs are left as they are.
+
+        :param job_id: Job id returned by submit()
+        :return: SearchJob, or None if the job does not exist
+        """
+        with self._lock:
+            search_job = self._jobs.get(job_id)
+            if search_job is None or search_job.status in FINISHED_STATES:
+                return search_job
+            search_job.cancel_requested.set()
+            if search_job.status == JOB_QUEUED:
+                # Frees its queue slot at once; the worker that eventually
+                # takes it off the queue skips it
+                self._queued_ids.remove(job_id)
+                search_job.finish(JOB_CANCELLED)
+                self._stats['cancelled'] += 1
+        return search_job
+
+    def _work(self):
+        """
+        Worker loop: take jobs off the queue and run them one at a time.
+        """
+        while True:
+            search_job = self._job_queue.get()
+            try:
+                with self._lock:
+                    if search_job.status != JOB_QUEUED:
+                        continue
+                    self._queued_ids.remove(search_job.job_id)
+                    search_job.status = JOB_RUNNING
+                    search_job.started_at = time.time()
+                self._run_job(search_job)
+            finally:
+                self._job_queue.task_done()
+
+    def _run_job(self, search_job):
+        """
+        Run one search, recording its progress on the job.
+
+        :param search_job: SearchJob to run
+        """
+        event_stream = self.byob_tool.run_stream(
+            search_job.search_query,
+            website_filter=search_job.website_filter,
+            recency=search_job.recency,
+            latency_budget=search_job.latency_budget,
+            summary_quorum=search_job.summary_quorum
+        )
+        try:
+            for event_name, event_data in event_stream:
+                if search_job.cancel_requested.is_set():
+                    break
+                search_job.apply_event(event_name, event_data)
+        except Exception as job_error:
+            print(f"Search Job Error ({search_job.job_id}): {job_error}")
+            self._finish(search_job, JOB_FAILED, str(job_error))
+            return
+        finally:
+            # Stops the pipeline's worker pools if the job was cancelled part-way
+            event_stream.close()
+
+        if search_job.cancel_requested.is_set():
+            self._finish(search_job, JOB_CANCELLED)
+        else:
+            self._finish(search_job, JOB_SUCCEEDED)
+
+    def _finish(self, search_job, status, error=None):
+        """
+        Mark a job finished and update the statistics.
+
+        :param search_job: SearchJob that finished
+        :param status: Final state
+        :param error: Error message for failed jobs
+        """
+        search_job.finish(status, error)
+        with self._lock:
+            self._stats[status] += 1
+            if status == JOB_SUCCEEDED:
+                # Moving average of search durations, for Retry-After estimates
+                duration = search_job.finished_at - search_job.started_at
+                self._average_duration = 0.8 * self._average_duration + 0.2 * duration
+
+    def _purge_finished(self):
+        """
+        Forget finished jobs older than the retention time.
+        """
+        expired_before = time.time() - self.retention_seconds
+        with self._lock:
+            expired_ids = [
+                job_id for job_id, search_job in self._jobs.items()
+                if search_job.status in FINISHED_STATES and search_job.finished_at < expired_before
+            ]
+            for job_id in expired_ids:
+                del self._jobs[job_id]
+
+    def get_stats(self):
+        """
+        Report queue depth, running jobs and job outcomes.
+
+        :return: Dictionary of statistics
+        """
+        with self._lock:
+            stats = dict(self._stats)
+            stats['queued'] = len(self._queued_ids)
+            stats['running'] = sum(search_job.status == JOB_RUNNING for search_job in self._jobs.values())
+            stats['stored_jobs'] = len(self._jobs)
+            stats['average_duration'] = self._average_duration
+        stats['workers'] = self.worker_count
+        stats['queue_size'] = self.queue_size
+        return stats
@@ -0,0 +1,569 @@
+#!/usr/bin/env python3
+"""
+BYOB (Bring Your Own Browser) Web Search Tool - Stage Metrics
+
+A research query goes through several stages (refine, Google search, page
+downloads, parsing, summaries, final answer), many of them at the same
+time. To see where a slow query spends its time and money, every stage is
+measured:
+- Each stage records its wall time, the bytes it downloaded, the prompt and
+  completion tokens OpenAI reports in its 'usage' field (and the estimated
+  cost), and whether a cache answered it
+- The stages of one query are collected in a QueryTrace, which can be
+  returned to the client as a per-query breakdown
+- Every stage also feeds process-wide histograms and counters, exposed in
+  the Prometheus text format
+- If the 'opentelemetry' package is installed, each query and stage is also
+  reported as an OpenTelemetry span
+
+Key Components:
+- QueryTrace: The stages of one query and their per-query summary
+- StageSpan: Context manager measuring one stage
+- stage_span: Start a StageSpan, with or without a QueryTrace
+- record_stage: Record a stage timed elsewhere (page parsing happens during the download)
+- MetricsRegistry: Process-wide histograms, counters and gauges
+- get_registry: The registry shared by every BYOBTool
+"""
+
+import asyncio    # For recognizing cancelled coroutines
+import math       # For infinite histogram bounds
+import threading  # For protecting shared counters
+import time       # For measuring stages
+from collections import defaultdict  # For per-stage totals
+
+# OpenTelemetry is optional; without it only the built-in metrics are recorded
+try:
+    from opentelemetry import trace as otel_trace
+except ImportError:
+    otel_trace = None
+
+# Pipeline stages
+STAGE_REFINE = 'refine'
+STAGE_SEARCH = 'search'
+STAGE_FETCH = 'fetch'
+STAGE_PARSE = 'parse'
+STAGE_SUMMARIZE = 'summarize'
+STAGE_GENERATE = 'generate'
+
+# Stage outcomes
+OUTCOME_OK = 'ok'
+OUTCOME_CACHE_HIT = 'cache_hit'
+OUTCOME_SKIPPED = 'skipped'
+OUTCOME_ERROR = 'error'
+OUTCOME_CANCELLED = 'cancelled'
+
+# Histogram bucket upper bounds, in seconds
+DEFAULT_LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 30.0, 60.0, 120.0)
+
+# USD per million (prompt, completion) tokens, for cost estimates; unknown models count as free
+MODEL_PRICES_PER_MILLION_TOKENS = {
+    'gpt-4o': (2.50, 10.00),
+    'gpt-4o-mini': (0.15, 0.60)
+}
+
+# Metric names, types and help texts for the Prometheus exposition
+METRIC_DEFINITIONS = {
+    'byob_stage_duration_seconds': ('histogram', 'Wall time of one pipeline stage'),
+    'byob_stage_total': ('counter', 'Pipeline stages run, by outcome'),
+    'byob_cache_hits_total': ('counter', 'Pipeline stages answered from a cache'),
+    'byob_bytes_downloaded_total': ('counter', 'Webpage body bytes downloaded'),
+    'byob_openai_tokens_total': ('counter', 'OpenAI tokens used, by model and kind (prompt or completion)'),
+    'byob_openai_cost_usd_total': ('counter', 'Estimated OpenAI cost in US dollars'),
+    'byob_query_duration_seconds': ('histogram', 'Wall time of a whole research query'),
+    'byob_queries_total': ('counter', 'Research queries run, by outcome'),
+    'byob_rate_limit_throttled_total': ('counter', 'OpenAI / Google calls answered with 429, by service'),
+    'byob_rate_limit_retries_total': ('counter', 'OpenAI / Google calls retried, by service and reason'),
+    'byob_rate_limit_wait_seconds_total': ('counter', 'Seconds calls waited for rate limit capacity, by service')
+}
+
+
+def estimate_cost(model, prompt_tokens, completion_tokens):
+    """
+    Estimate what an OpenAI call cost.
+
+    :param model: Model the call was made with
+    :param prompt_tokens: Prompt tokens used
+    :param completion_tokens: Completion tokens used
+    :return: Cost in US dollars (0.0 for models without a known price)
+    """
+    prompt_price, completion_price = MODEL_PRICES_PER_MILLION_TOKENS.get(model, (0.0, 0.0))
+    return (prompt_tokens * prompt_price + completion_tokens * completion_price) / 1_000_000
+
+
+def _escape_label_value(label_value):
+    """
+    Escape a label value for the Prometheus text format.
+
+    :param label_value: Label value
+    :return: Escaped string
+    """
+    return str(label_value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(labels):
+    """
+    Format a label set, e.g. '{stage="fetch"}'.
+
+    :param labels: Tuple of (name, value) pairs
+    :return: Label string ('' for no labels)
+    """
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape_label_value(value)}"' for name, value in labels) + '}'
+
+
+def _format_value(value):
+    """
+    Format a sample value.
+
+    :param value: Number
+    :return: String in the Prometheus text format
+    """
+    if value == math.inf:
+        return '+Inf'
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class MetricsRegistry:
+    """
+    Thread-safe histograms, counters and gauges, rendered in the Prometheus text format.
+    """
+
+    def __init__(self, latency_buckets=DEFAULT_LATENCY_BUCKETS):
+        """
+        Create an empty registry.
+
+        :param latency_buckets: Histogram bucket upper bounds in seconds
+        """
+        self.latency_buckets = tuple(latency_buckets)
+        self._lock = threading.Lock()
+        self._counters = defaultdict(float)
+        self._gauges = {}
+        self._histograms = {}
+        self._definitions = dict(METRIC_DEFINITIONS)
+
+    @staticmethod
+    def _key(name, labels):
+        """
+        Build the key of one time series.
+
+        :param name: Metric name
+        :param labels: Optional dictionary of labels
+        :return: Tuple of (name, sorted label pairs)
+        """
+        return name, tuple(sorted((labels or {}).items()))
+
+    def inc(self, name, labels=None, value=1):
+        """
+        Add to a counter.
+
+        :param name: Metric name
+        :param labels: Optional dictionary of labels
+        :param value: Amount to add
+        """
+        with self._lock:
+            self._counters[self._key(name, labels)] += value
+
+    def set_gauge(self, name, value, labels=None, help_text=None):
+        """
+        Set a gauge.
+
+        :param name: Metric name
+        :param value: Current value
+        :param labels: Optional dictionary of labels
+        :param help_text: Help text, needed the first time a gauge not in METRIC_DEFINITIONS is set
+        """
+        with self._lock:
+            if name not in self._definitions:
+                self._definitions[name] = ('gauge', help_text or name)
+            self._gauges[self._key(name, labels)] = value
+
+    def observe(self, name, value, labels=None):
+        """
+        Record one observation in a histogram.
+
+        :param name: Metric name
+        :param value: Observed value (seconds)
+        :param labels: Optional dictionary of labels
+        """
+        with self._lock:
+            histogram = self._histograms.setdefault(
+                self._key(name, labels), {'buckets': [0] * len(self.latency_buckets), 'count': 0, 'sum': 0.0}
+            )
+            for bucket_index, upper_bound in enumerate(self.latency_buckets):
+                if value <= upper_bound:
+                    histogram['buckets'][bucket_index] += 1
+            histogram['count'] += 1
+            histogram['sum'] += value
+
+    def render(self):
+        """
+        Render every metric in the Prometheus text exposition format (version 0.0.4).
+
+        :return: Exposition text
+        """
+        with self._lock:
+            series_by_name = defaultdict(list)
+            for (name, labels), value in self._counters.items():
+                series_by_name[name].append((labels, value))
+            for (name, labels), value in self._gauges.items():
+                series_by_name[name].append((labels, value))
+            for (name, labels), histogram in self._histograms.items():
+                series_by_name[name].append((labels, {
+                    'buckets': list(histogram['buckets']), 'count': histogram['count'], 'sum': histogram['sum']
+                }))
+            definitions = dict(self._definitions)
+
+        lines = []
+        for name in sorted(series_by_name):
+            metric_type, help_text = definitions.get(name, ('untyped', name))
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {metric_type}")
+            for labels, value in sorted(series_by_name[name], key=lambda series: series[0]):
+                if metric_type != 'histogram':
+                    lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+                    continue
+                for upper_bound, bucket_count in zip(self.latency_buckets + (math.inf,),
+                                                     value['buckets'] + [value['count']]):
+                    bucket_labels = labels + (('le', _format_value(upper_bound)),)
+                    lines.append(f"{name}_bucket{_format_labels(bucket_labels)} {bucket_count}")
+                lines.append(f"{name}_sum{_format_labels(labels)} {_format_value(value['sum'])}")
+                lines.append(f"{name}_count{_format_labels(labels)} {value['count']}")
+        return '\n'.join(lines) + '\n'
+
+
+# Registry shared by every tool in the process
+_registry = MetricsRegistry()
+
+
+def get_registry():
+    """
+    Return the process-wide metrics registry.
+
+    :return: MetricsRegistry
+    """
+    return _registry
+
+
+class StageSpan:
+    """
+    Measures one pipeline stage; use it as a context manager.
+
+    The stage is recorded when the block exits. An exception leaving the
+    block marks it as an error (or as cancelled, if a generator was closed).
+    """
+
+    def __init__(self, stage, query_trace=None, registry=None, **attributes):
+        """
+        Create the span (timing starts on entering the block).
+
+        :param stage: Stage name, e.g. STAGE_FETCH
+        :param query_trace: QueryTrace to add the stage to, or None to only update the registry
+        :param registry: MetricsRegistry to record into (the process-wide one by default)
+        :param attributes: Extra details to keep with the stage, e.g. url or model
+        """
+        self.stage = stage
+        self.query_trace = query_trace
+        self.registry = registry or (query_trace.registry if query_trace else get_registry())
+        self.attributes = attributes
+        self.outcome = OUTCOME_OK
+        self.cache_hit = False
+        self.bytes_downloaded = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.model = attributes.get('model')
+        self.started_at = None
+        self.seconds = None
+        self._otel_span = None
+
+    def __enter__(self):
+        self.started_at = time.perf_counter()
+        if self.query_trace is not None:
+            self._otel_span = self.query_trace.start_otel_span(f"byob.{self.stage}")
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.seconds = time.perf_counter() - self.started_at
+        if exc_type is not None:
+            cancelled = issubclass(exc_type, (GeneratorExit, asyncio.CancelledError))
+            self.outcome = OUTCOME_CANCELLED if cancelled else OUTCOME_ERROR
+        self._record()
+        return False
+
+    def elapsed(self):
+        """
+        Seconds since the stage started.
+        """
+        return time.perf_counter() - self.started_at
+
+    def mark_cache_hit(self):
+        """
+        Note that a cache answered this stage.
+        """
+        self.cache_hit = True
+        self.outcome = OUTCOME_CACHE_HIT
+
+    def mark_skipped(self, reason=None):
+        """
+        Note that the stage produced nothing (e.g. a page that was not HTML).
+
+        :param reason: Why it was skipped
+        """
+        self.outcome = OUTCOME_SKIPPED
+        if reason:
+            self.attributes['skip_reason'] = reason
+
+    def mark_error(self, error=None):
+        """
+        Note that the stage failed (for errors that are handled rather than raised).
+
+        :param error: The error
+        """
+        self.outcome = OUTCOME_ERROR
+        if error is not None:
+            self.attributes['error'] = str(error)
+
+    def add_bytes(self, bytes_downloaded):
+        """
+        Count bytes downloaded by this stage.
+
+        :param bytes_downloaded: Number of bytes
+        """
+        self.bytes_downloaded += bytes_downloaded
+
+    def record_usage(self, usage, model=None):
+        """
+        Count the tokens an OpenAI response reports in its 'usage' field.
+
+        :param usage: CompletionUsage object or dictionary (may be None)
+        :param model: Model the call was made with
+        """
+        if usage is None:
+            return
+        if isinstance(usage, dict):
+            self.record_tokens(usage.get('prompt_tokens') or 0, usage.get('completion_tokens') or 0, model)
+        else:
+            self.record_tokens(usage.prompt_tokens or 0, usage.completion_tokens or 0, model)
+
+    def record_tokens(self, prompt_tokens, completion_tokens, model=None, estimated=False):
+        """
+        Count tokens used by this stage.
+
+        :param prompt_tokens: Prompt tokens
+        :param completion_tokens: Completion tokens
+        :param model: Model the call was made with
+        :param estimated: True if the counts were computed locally rather than reported by OpenAI
+        """
+        self.prompt_tokens += prompt_tokens
+        self.completion_tokens += completion_tokens
+        self.model = model or self.model
+        if estimated:
+            self.attributes['tokens_estimated'] = True
+
+    @property
+    def cost_usd(self):
+        """
+        Estimated OpenAI cost of this stage in US dollars.
+        """
+        return estimate_cost(self.model, self.prompt_tokens, self.completion_tokens)
+
+    def to_dict(self, trace_started_at=None):
+        """
+        Describe the stage.
+
+        :param trace_started_at: perf_counter() value the query started at (for the 'start' offset)
+        :return: JSON-serializable dictionary
+        """
+        span_details = {'stage': self.stage, 'outcome': self.outcome, 'seconds': round(self.seconds, 4)}
+        if trace_started_at is not None:
+            span_details['start'] = round(self.started_at - trace_started_at, 4)
+        if self.bytes_downloaded:
+            span_details['bytes_downloaded'] = self.bytes_downloaded
+        if self.prompt_tokens or self.completion_tokens:
+            span_details['prompt_tokens'] = self.prompt_tokens
+            span_details['completion_tokens'] = self.completion_tokens
+            span_details['cost_usd'] = round(self.cost_usd, 6)
+        span_details.update(self.attributes)
+        return span_details
+
+    def _record(self):
+        """
+        Add the finished stage to the registry, the query trace and OpenTelemetry.
+        """
+        stage_labels = {'stage': self.stage}
+        self.registry.observe('byob_stage_duration_seconds', self.seconds, stage_labels)
+        self.registry.inc('byob_stage_total', {'stage': self.stage, 'outcome': self.outcome})
+        if self.cache_hit:
+            self.registry.inc('byob_cache_hits_total', stage_labels)
+        if self.bytes_downloaded:
+            self.registry.inc('byob_bytes_downloaded_total', value=self.bytes_downloaded)
+        if self.prompt_tokens or self.completion_tokens:
+            model = self.model or 'unknown'
+            self.registry.inc('byob_openai_tokens_total', {'model': model, 'kind': 'prompt'}, self.prompt_tokens)
+            self.registry.inc('byob_openai_tokens_total', {'model': model, 'kind': 'completion'},
+                              self.completion_tokens)
+            self.registry.inc('byob_openai_cost_usd_total', {'model': model}, self.cost_usd)
+
+        if self.query_trace is not None:
+            self.query_trace.add_span(self)
+
+        if self._otel_span is not None:
+            for attribute_name, attribute_value in self.to_dict().items():
+                if isinstance(attribute_value, (str, bool, int, float)):
+                    self._otel_span.set_attribute(f"byob.{attribute_name}", attribute_value)
+            self._otel_span.end()
+
+
+def stage_span(query_trace, stage, **attributes):
+    """
+    Start measuring a stage.
+
+    :param query_trace: QueryTrace of the running query, or None outside a query
+    :param stage: Stage name
+    :param attributes: Extra details to keep with the stage
+    :return: StageSpan (use it in a 'with' block)
+    """
+    return StageSpan(stage, query_trace=query_trace, **attributes)
+
+
+def record_stage(query_trace, stage, seconds, **attributes):
+    """
+    Record a stage whose time was measured elsewhere (e.g. parsing done during a download).
+
+    :param query_trace: QueryTrace of the running query, or None outside a query
+    :param stage: Stage name
+    :param seconds: Time the stage took
+    :param attributes: Extra details to keep with the stage
+    """
+    recorded_span = StageSpan(stage, query_trace=query_trace, **attributes)
+    recorded_span.started_at = time.perf_counter() - seconds
+    recorded_span.seconds = seconds
+    recorded_span._record()
+
+
+class QueryTrace:
+    """
+    The stages of one research query.
+
+    Stages run on several worker threads at once, so spans are added under
+    a lock. Call finish() when the query is done to record its total time.
+    """
+
+    def __init__(self, search_query=None, registry=None):
+        """
+        Start tracing a query.
+
+        :param search_query: User's search query (kept on the OpenTelemetry span)
+        :param registry: MetricsRegistry to record into (the process-wide one by default)
+        """
+        self.search_query = search_query
+        self.registry = registry or get_registry()
+        self.started_at = time.perf_counter()
+        self.seconds = None
+        self.spans = []
+        self._lock = threading.Lock()
+        self._otel_root = None
+        if otel_trace is not None:
+            self._otel_root = otel_trace.get_tracer(__name__).start_span('byob.query')
+            if search_query:
+                self._otel_root.set_attribute('byob.query', search_query)
+
+    def start_otel_span(self, span_name):
+        """
+        Start an OpenTelemetry span under this query's span.
+
+        :param span_name: Span name
+        :return: OpenTelemetry span, or None if OpenTelemetry is not installed
+        """
+        if self._otel_root is None:
+            return None
+        return otel_trace.get_tracer(__name__).start_span(
+            span_name, context=otel_trace.set_span_in_context(self._otel_root)
+        )
+
+    def stage(self, stage, **attributes):
+        """
+        Start measuring a stage of this query.
+
+        :param stage: Stage name
+        :param attributes: Extra details to keep with the stage
+        :return: StageSpan (use it in a 'with' block)
+        """
+        return StageSpan(stage, query_trace=self, **attributes)
+
+    def add_span(self, finished_span):
+        """
+        Keep a finished stage.
+
+        :param finished_span: StageSpan that has exited
+        """
+        with self._lock:
+            self.spans.append(finished_span)
+
+    def finish(self, outcome=OUTCOME_OK):
+        """
+        Record the query's total time (only the first call counts).
+
+        :param outcome: OUTCOME_OK, OUTCOME_ERROR or OUTCOME_CANCELLED
+        """
+        with self._lock:
+            if self.seconds is not None:
+                return
+            self.seconds = time.perf_counter() - self.started_at
+        self.registry.observe('byob_query_duration_seconds', self.seconds)
+        self.registry.inc('byob_queries_total', {'outcome': outcome})
+        if self._otel_root is not None:
+            self._otel_root.set_attribute('byob.outcome', outcome)
+            self._otel_root.end()
+
+    def summary(self, include_spans=True):
+        """
+        Describe where the query spent its time, tokens and money.
+
+        Stages overlap (pages are downloaded and summarized in parallel), so
+        per-stage seconds can add up to more than 'total_seconds'; each
+        span's 'start' offset shows the overlap.
+
+        :param include_spans: Also list every individual stage
+        :return: JSON-serializable dictionary
+        """
+        with self._lock:
+            spans = list(self.spans)
+        total_seconds = self.seconds if self.seconds is not None else time.perf_counter() - self.started_at
+
+        stages = {}
+        for span in spans:
+            stage_totals = stages.setdefault(span.stage, {
+                'count': 0, 'seconds': 0.0, 'max_seconds': 0.0, 'cache_hits': 0, 'errors': 0,
+                'bytes_downloaded': 0, 'prompt_tokens': 0, 'completion_tokens': 0, 'cost_usd': 0.0
+            })
+            stage_totals['count'] += 1
+            stage_totals['seconds'] += span.seconds
+            stage_totals['max_seconds'] = max(stage_totals['max_seconds'], span.seconds)
+            stage_totals['cache_hits'] += span.cache_hit
+            stage_totals['errors'] += span.outcome == OUTCOME_ERROR
+            stage_totals['bytes_downloaded'] += span.bytes_downloaded
+            stage_totals['prompt_tokens'] += span.prompt_tokens
+            stage_totals['completion_tokens'] += span.completion_tokens
+            stage_totals['cost_usd'] += span.cost_usd
+        for stage_totals in stages.values():
+            stage_totals['seconds'] = round(stage_totals['seconds'], 4)
+            stage_totals['max_seconds'] = round(stage_totals['max_seconds'], 4)
+            stage_totals['cost_usd'] = round(stage_totals['cost_usd'], 6)
+
+        query_summary = {
+            'total_seconds': round(total_seconds, 4),
+            'stages': stages,
+            'bytes_downloaded': sum(span.bytes_downloaded for span in spans),
+            'prompt_tokens': sum(span.prompt_tokens for span in spans),
+            'completion_tokens': sum(span.completion_tokens for span in spans),
+            'cost_usd': round(sum(span.cost_usd for span in spans), 6),
+            'cache_hits': sum(span.cache_hit for span in spans)
+        }
+        if include_spans:
+            query_summary['spans'] = [
+                span.to_dict(self.started_at) for span in sorted(spans, key=lambda span: span.started_at)
+            ]
+        return query_summary
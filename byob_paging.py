@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+BYOB (Bring Your Own Browser) Web Search Tool - Paginated Search
+
+Google Custom Search returns at most 10 results per request, so a deeper
+search has to ask for several pages ('start' = 1, 11, 21, ...). Asking for
+them one after another would add a full round trip per page; instead the
+pages are requested at the same time and merged here:
+- A search for N results is split into pages of at most 10, up to the
+  100th result (Google returns nothing beyond it)
+- Pages are merged in ranking order, dropping results whose canonical URL
+  already appeared on an earlier page, so ranks stay contiguous
+- A page that comes back short is the last one; later pages are ignored
+- A page whose request failed is skipped: it says nothing about how many
+  results there are, so the pages after it are still used
+
+Key Components:
+- results_pages: Split a number of results into (start, num) requests
+- PagedResults: Merges the pages of one search as they arrive
+"""
+
+from byob_dedup import canonicalize_url
+
+# Custom Search API limits
+CSE_PAGE_SIZE = 10     # Most results returned by one request ('num')
+CSE_MAX_RESULTS = 100  # Results beyond this rank are never returned
+
+
+def results_pages(result_count):
+    """
+    Split a number of search results into Custom Search requests.
+
+    :param result_count: Number of results wanted
+    :return: List of (start index, number of results) per page, e.g. [(1, 10), (11, 5)] for 15
+    """
+    result_count = max(1, min(result_count, CSE_MAX_RESULTS))
+    return [
+        (start_index, min(CSE_PAGE_SIZE, result_count - start_index + 1))
+        for start_index in range(1, result_count + 1, CSE_PAGE_SIZE)
+    ]
+
+
+class PagedResults:
+    """
+    The results of one paginated search, merged page by page in ranking order.
+
+    Pages must be added in page order; the caller stops adding once
+    'complete' is set.
+    """
+
+    def __init__(self, result_count):
+        """
+        Plan the pages of a search.
+
+        :param result_count: Number of results wanted
+        """
+        self.pages = results_pages(result_count)
+        self.search_results = []
+        self.complete = False
+        self._pages_added = 0
+        self._seen_urls = set()
+
+    def add_page(self, page_items, page_size):
+        """
+        Merge the next page of results.
+
+        :param page_items: Search result items of the page, in ranking order (None if the request failed)
+        :param page_size: Number of results the page was requested with
+        :return: List of the page's results not seen on an earlier page
+        """
+        self._pages_added += 1
+        if page_items is None:
+            # A failed page is skipped, but does not end the search
+            if self._pages_added == len(self.pages):
+                self.complete = True
+            return []
+
+        new_results = []
+        for search_result in page_items:
+            canonical_url = canonicalize_url(search_result.get('link'))
+            if canonical_url in self._seen_urls:
+                continue
+            self._seen_urls.add(canonical_url)
+            new_results.append(search_result)
+        self.search_results.extend(new_results)
+
+        # A short page means Google has nothing further down the ranking
+        if len(page_items) < page_size or self._pages_added == len(self.pages):
+            self.complete = True
+        return new_results
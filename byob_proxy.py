@@ -0,0 +1,325 @@
+#!/usr/bin/env python3
+"""
+BYOB (Bring Your Own Browser) Web Search Tool - Backend Proxy
+
+The web frontend forwards every search to the backend API. Opening a new
+connection per search, waiting for the whole answer, parsing its JSON and
+encoding it again adds work on every hop and ties the frontend to a single
+backend process. This module forwards requests the cheap way:
+- One pooled keep-alive session is reused for every backend request
+- Request and response bodies are passed through as bytes, never decoded,
+  and response chunks are relayed as they arrive (so Server-Sent Events
+  and other streaming responses work unchanged)
+- The backend's status code and headers are returned to the browser as-is
+- Several backend processes can be used; each request goes to the healthy
+  backend with the fewest requests in flight, and a background thread
+  checks /api/health so broken backends are skipped until they recover
+
+Key Components:
+- BackendPool: Backend list, health checks and backend selection
+- BackendProxy: Forwards one request and relays the streamed response
+- NoBackendAvailable: Raised when no backend accepted the connection
+"""
+
+import itertools  # For round-robin tie breaking
+import threading  # For the health checker and in-flight counters
+import time       # For health check timestamps
+import requests   # For talking to the backends
+from requests.adapters import HTTPAdapter  # For sizing the connection pool
+from urllib3.exceptions import NewConnectionError  # For telling refused connections from broken ones
+
+# Default proxy settings
+DEFAULT_MAX_CONNECTIONS_PER_BACKEND = 50  # Pooled keep-alive connections kept per backend
+DEFAULT_HEALTH_CHECK_INTERVAL = 10.0  # Seconds between health checks
+DEFAULT_HEALTH_CHECK_TIMEOUT = 2.0  # Seconds a health check may take
+DEFAULT_CONNECT_TIMEOUT = 5.0  # Seconds to connect to a backend
+DEFAULT_READ_TIMEOUT = 120.0  # Seconds to wait for the next piece of a backend response
+
+# Headers that describe one connection rather than the message, and are never forwarded (RFC 9110)
+HOP_BY_HOP_HEADERS = frozenset({
+    'connection', 'keep-alive', 'proxy-authenticate', 'proxy-authorization', 'te', 'trailer',
+    'transfer-encoding', 'upgrade'
+})
+
+# Request headers that requests sets itself for the backend connection
+REQUEST_HEADERS_NOT_FORWARDED = HOP_BY_HOP_HEADERS | {'host', 'content-length'}
+
+
+class NoBackendAvailable(Exception):
+    """
+    Raised when every backend refused the connection.
+    """
+
+
+def never_reached_backend(connection_error):
+    """
+    Check whether a request failed before the backend could have received it.
+
+    Only such requests are safe to send to another backend; retrying one
+    that was cut off part-way could run a search (or queue a job) twice.
+
+    :param connection_error: requests.ConnectionError
+    :return: True if the connection was never established
+    """
+    if isinstance(connection_error, requests.exceptions.ConnectTimeout):
+        return True
+    failure_reason = getattr(connection_error.args[0], 'reason', None) if connection_error.args else None
+    return isinstance(failure_reason, NewConnectionError)
+
+
+class Backend:
+    """
+    One backend process and what the proxy knows about it.
+    """
+
+    def __init__(self, base_url):
+        """
+        Create the backend entry (assumed healthy until a check says otherwise).
+
+        :param base_url: Backend URL, e.g. 'http://localhost:5001'
+        """
+        self.base_url = base_url.rstrip('/')
+        self.healthy = True
+        self.in_flight = 0
+        self.requests = 0
+        self.failures = 0
+        self.last_checked = None
+        self.last_error = None
+
+
+class BackendPool:
+    """
+    The backends a frontend may forward to, with active and passive health checking.
+    """
+
+    def __init__(self, backend_urls, max_connections_per_backend=DEFAULT_MAX_CONNECTIONS_PER_BACKEND,
+                 health_check_interval=DEFAULT_HEALTH_CHECK_INTERVAL,
+                 health_check_timeout=DEFAULT_HEALTH_CHECK_TIMEOUT):
+        """
+        Create the pool and start health checking.
+
+        :param backend_urls: List of backend URLs
+        :param max_connections_per_backend: Pooled keep-alive connections kept per backend
+        :param health_check_interval: Seconds between health checks (0 disables the checker thread)
+        :param health_check_timeout: Seconds a health check may take
+        :raises ValueError: If no backend URL is given
+        """
+        if not backend_urls:
+            raise ValueError("At least one backend URL is required")
+        self.backends = [Backend(backend_url) for backend_url in backend_urls]
+        self.health_check_interval = health_check_interval
+        self.health_check_timeout = health_check_timeout
+        self._lock = threading.Lock()
+        self._rotation = itertools.count()
+
+        # One session for every backend; each backend host gets its own keep-alive pool
+        self.session = requests.Session()
+        self.session.trust_env = False  # Backends are internal; never route them through a proxy
+        adapter = HTTPAdapter(pool_connections=len(self.backends), pool_maxsize=max_connections_per_backend)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+        self._stop_checking = threading.Event()
+        self._checker = None
+        if health_check_interval:
+            self._checker = threading.Thread(target=self._check_loop, name='byob-backend-health', daemon=True)
+            self._checker.start()
+
+    def choose(self, exclude=()):
+        """
+        Pick the backend for the next request and count it as in flight.
+
+        Healthy backends with the fewest requests in flight are preferred
+        (ties go round-robin). If no backend is healthy, all are tried, so
+        a false alarm never takes the whole site down.
+
+        :param exclude: Backends already tried for this request
+        :return: Backend, or None if every backend was excluded
+        """
+        with self._lock:
+            candidates = [backend for backend in self.backends if backend not in exclude]
+            if not candidates:
+                return None
+            candidates = [backend for backend in candidates if backend.healthy] or candidates
+            rotation = next(self._rotation)
+            chosen = min(
+                candidates,
+                key=lambda backend: (backend.in_flight, (self.backends.index(backend) - rotation) % len(self.backends))
+            )
+            chosen.in_flight += 1
+            chosen.requests += 1
+            return chosen
+
+    def release(self, backend):
+        """
+        Mark a request to a backend as finished.
+
+        :param backend: Backend returned by choose()
+        """
+        with self._lock:
+            backend.in_flight -= 1
+
+    def mark_failed(self, backend, error):
+        """
+        Take a backend out of rotation after a connection failure (until a health check passes).
+
+        :param backend: Backend that failed
+        :param error: What went wrong
+        """
+        with self._lock:
+            backend.healthy = False
+            backend.failures += 1
+            backend.last_error = str(error)
+
+    def check_health(self):
+        """
+        Ask every backend's /api/health whether it is up.
+        """
+        for backend in self.backends:
+            try:
+                health_response = self.session.get(
+                    f"{backend.base_url}/api/health", timeout=self.health_check_timeout
+                )
+                healthy = health_response.ok
+                error = None if healthy else f"HTTP {health_response.status_code}"
+                health_response.close()
+            except requests.RequestException as health_error:
+                healthy, error = False, str(health_error)
+            with self._lock:
+                backend.healthy = healthy
+                backend.last_checked = time.time()
+                if error:
+                    backend.last_error = error
+
+    def _check_loop(self):
+        """
+        Run health checks until the pool is closed.
+        """
+        while not self._stop_checking.wait(self.health_check_interval):
+            self.check_health()
+
+    def get_stats(self):
+        """
+        Report the state of every backend.
+
+        :return: Dictionary of per-backend statistics
+        """
+        with self._lock:
+            return {
+                'backends': [
+                    {
+                        'url': backend.base_url,
+                        'healthy': backend.healthy,
+                        'in_flight': backend.in_flight,
+                        'requests': backend.requests,
+                        'failures': backend.failures,
+                        'last_checked': backend.last_checked,
+                        'last_error': backend.last_error
+                    }
+                    for backend in self.backends
+                ],
+                'healthy_backends': sum(backend.healthy for backend in self.backends)
+            }
+
+    def close(self):
+        """
+        Stop health checking and close pooled connections.
+        """
+        self._stop_checking.set()
+        self.session.close()
+
+
+class BackendProxy:
+    """
+    Forwards requests to a BackendPool and streams the responses back.
+    """
+
+    def __init__(self, backend_pool, connect_timeout=DEFAULT_CONNECT_TIMEOUT, read_timeout=DEFAULT_READ_TIMEOUT):
+        """
+        Create the proxy.
+
+        :param backend_pool: BackendPool to forward to
+        :param connect_timeout: Seconds to connect to a backend
+        :param read_timeout: Seconds to wait for the next piece of a response (there is no overall limit)
+        """
+        self.backend_pool = backend_pool
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+
+    @staticmethod
+    def forwardable_headers(headers, dropped_headers=HOP_BY_HOP_HEADERS):
+        """
+        Drop hop-by-hop headers.
+
+        :param headers: Mapping or list of (name, value) pairs
+        :param dropped_headers: Lowercase names of the headers to drop
+        :return: List of (name, value) pairs safe to forward
+        """
+        header_items = headers.items() if hasattr(headers, 'items') else headers
+        return [(name, value) for name, value in header_items if name.lower() not in dropped_headers]
+
+    def send(self, method, path, body=None, headers=None, query_string=None):
+        """
+        Send a request to a backend, moving on to the next one if it cannot be reached.
+
+        Only requests that never reached a backend are retried elsewhere;
+        once a backend has accepted the request, its answer (including
+        errors) is what the caller gets.
+
+        :param method: HTTP method
+        :param path: Path on the backend, e.g. '/api/search'
+        :param body: Raw request body bytes
+        :param headers: Request headers to forward
+        :param query_string: Raw query string (bytes or str), if any
+        :return: Tuple of (Backend, streaming requests.Response); release the backend when done
+        :raises NoBackendAvailable: If no backend accepted the connection
+        """
+        tried_backends = []
+        last_error = None
+        while True:
+            backend = self.backend_pool.choose(exclude=tried_backends)
+            if backend is None:
+                raise NoBackendAvailable(f"No search backend reachable: {last_error}")
+            tried_backends.append(backend)
+            url = f"{backend.base_url}{path}"
+            if query_string:
+                url += '?' + (query_string.decode('latin-1') if isinstance(query_string, bytes) else query_string)
+            try:
+                backend_response = self.backend_pool.session.request(
+                    method,
+                    url,
+                    data=body,
+                    headers=dict(self.forwardable_headers(headers or {}, REQUEST_HEADERS_NOT_FORWARDED)),
+                    stream=True,
+                    allow_redirects=False,
+                    timeout=(self.connect_timeout, self.read_timeout)
+                )
+                return backend, backend_response
+            except requests.ConnectionError as connection_error:
+                self.backend_pool.release(backend)
+                self.backend_pool.mark_failed(backend, connection_error)
+                if not never_reached_backend(connection_error):
+                    raise
+                last_error = connection_error
+            except Exception:
+                self.backend_pool.release(backend)
+                raise
+
+    def relay(self, backend, backend_response, chunk_size=64 * 1024):
+        """
+        Yield the raw response body as it arrives, without decoding it.
+
+        Compressed bodies stay compressed (Content-Encoding is forwarded), and
+        chunked responses are handed over one chunk at a time.
+
+        :param backend: Backend returned by send()
+        :param backend_response: Streaming response returned by send()
+        :param chunk_size: Largest piece read at a time
+        :return: Generator of bytes
+        """
+        try:
+            for body_chunk in backend_response.raw.stream(chunk_size, decode_content=False):
+                yield body_chunk
+        finally:
+            backend_response.close()
+            self.backend_pool.release(backend)
@@ -0,0 +1,649 @@
+#!/usr/bin/env python3
+"""
+BYOB (Bring Your Own Browser) Web Search Tool - Rate Limiting and Retries
+
+Under load, OpenAI and Google Custom Search answer with 429 Too Many
+Requests and the occasional 5xx. Retrying at once makes it worse (every
+caller retries together), and giving up drops pages from the answer. This
+module sits in front of the OpenAI and Google calls that compete for those
+limits: the search pipeline (sync and async), the batch runner's local
+executor, and the embedding requests of byob_ingest and byob_vector_store.
+Only the Batch API's own file uploads and status polls go around it. It provides:
+- Token buckets hold requests to the provider limits: requests and tokens
+  per minute for each OpenAI model, queries per minute and per day for
+  Custom Search. The limits are learned from the x-ratelimit-* headers
+  OpenAI sends with every response
+- The number of calls in flight per service adapts (AIMD): it grows by one
+  per window of successful calls and halves when the provider throttles
+- A throttled or failed call is retried with jittered exponential backoff,
+  never sooner than Retry-After, and a 429 pauses every caller of that
+  service rather than only the one that saw it
+- Waiting and retrying stop at the query's deadline, so a query ends with
+  an error instead of hanging
+
+Key Components:
+- RateLimiter: Buckets, adaptive concurrency and retries for one service
+- RateLimiterRegistry: The limiters for each OpenAI model and for Custom Search
+- get_rate_limiters: Registry shared by every BYOBTool in the process
+- DeadlineExceeded / QuotaExhausted: Raised when a call cannot be made in time
+"""
+
+import asyncio    # For waiting without blocking the event loop
+import random     # For backoff jitter
+import re         # For parsing reset durations
+import threading  # For protecting shared state
+import time       # For buckets, backoff and deadlines
+from email.utils import parsedate_to_datetime  # For HTTP-date Retry-After values
+import httpx      # For recognizing transient connection errors
+import openai     # For recognizing transient connection errors
+import requests   # For recognizing transient connection errors
+
+from byob_metrics import get_registry
+
+# Default limiter settings
+DEFAULT_INITIAL_CONCURRENCY = 8  # Calls in flight per service before anything has been learned
+DEFAULT_MAX_CONCURRENCY = 64  # Most calls in flight per service
+DEFAULT_MAX_RETRIES = 4  # Retries of one throttled or failed call
+DEFAULT_RETRY_BASE_DELAY = 0.5  # Seconds before the first retry (doubled for every further retry)
+DEFAULT_RETRY_MAX_DELAY = 20.0  # Longest backoff between two attempts
+DECREASE_FACTOR = 0.5  # Concurrency is multiplied by this when the provider throttles
+DECREASE_COOLDOWN = 1.0  # Seconds after a decrease in which further 429s do not decrease again
+MAX_ADMISSION_WAIT = 1.0  # Longest single sleep while waiting for capacity (limits may change meanwhile)
+CONCURRENCY_POLL_INTERVAL = 0.05  # Seconds between checks for a free slot in async callers
+
+# How a failed call is handled
+THROTTLED = 'throttled'  # 429: back off, pause the service, shrink concurrency, retry
+TRANSIENT = 'transient'  # Connection problems and 5xx: back off and retry
+FATAL = 'fatal'          # Anything else (bad request, authentication): give up at once
+
+# Status codes worth retrying besides 429
+RETRYABLE_STATUS_CODES = frozenset({408, 409, 500, 502, 503, 504})
+
+# Errors that mean the request never got an answer
+TRANSIENT_ERRORS = (
+    requests.ConnectionError, requests.Timeout, httpx.TransportError, openai.APIConnectionError
+)
+
+_DURATION_PART = re.compile(r'(\d+(?:\.\d+)?)(ms|h|m|s)')
+
+
+class DeadlineExceeded(Exception):
+    """
+    Raised when waiting for capacity, or the next retry, would pass the query deadline.
+    """
+
+
+class QuotaExhausted(Exception):
+    """
+    Raised when a daily quota is used up; retrying before it resets is pointless.
+    """
+
+
+def parse_duration(duration_text):
+    """
+    Parse a rate-limit reset duration.
+
+    :param duration_text: e.g. '1s', '6m0s', '120ms', '1h2m3.5s' or a plain number of seconds
+    :return: Seconds, or None if it cannot be parsed
+    """
+    if not duration_text:
+        return None
+    try:
+        return float(duration_text)
+    except ValueError:
+        pass
+    duration_parts = _DURATION_PART.findall(duration_text)
+    if not duration_parts:
+        return None
+    unit_seconds = {'ms': 0.001, 's': 1, 'm': 60, 'h': 3600}
+    return sum(float(amount) * unit_seconds[unit] for amount, unit in duration_parts)
+
+
+def retry_after_seconds(headers):
+    """
+    Read how long the provider asked us to wait.
+
+    :param headers: Response headers (case-insensitive mapping)
+    :return: Seconds, or None if the response does not say
+    """
+    if not headers:
+        return None
+    retry_after_ms = headers.get('retry-after-ms')
+    if retry_after_ms:
+        try:
+            return float(retry_after_ms) / 1000
+        except ValueError:
+            pass
+    retry_after = headers.get('retry-after')
+    if not retry_after:
+        return None
+    try:
+        return max(0.0, float(retry_after))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(retry_after).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def classify_error(error):
+    """
+    Decide whether a failed call is worth retrying.
+
+    :param error: Exception raised by the call (requests, httpx or OpenAI)
+    :return: Tuple of (THROTTLED, TRANSIENT or FATAL, response headers or None)
+    """
+    response = getattr(error, 'response', None)
+    status_code = getattr(error, 'status_code', None) or getattr(response, 'status_code', None)
+    headers = getattr(response, 'headers', None)
+    if status_code == 429:
+        return THROTTLED, headers
+    if status_code is not None:
+        return (TRANSIENT if status_code in RETRYABLE_STATUS_CODES or status_code >= 500 else FATAL), headers
+    if isinstance(error, TRANSIENT_ERRORS):
+        return TRANSIENT, headers
+    return FATAL, headers
+
+
+class TokenBucket:
+    """
+    A bucket holding up to 'capacity' units, refilled evenly over 'period_seconds'.
+
+    Not thread-safe on its own; RateLimiter guards its buckets with one lock.
+    """
+
+    def __init__(self, capacity, period_seconds):
+        """
+        Create a full bucket.
+
+        :param capacity: Units allowed per period
+        :param period_seconds: Length of the period
+        """
+        self.capacity = float(capacity)
+        self.period_seconds = period_seconds
+        self.available = float(capacity)
+        self.paused_until = 0.0
+        self._last_refill = time.monotonic()
+
+    def _refill(self, now):
+        """
+        Add what has been earned since the last refill.
+
+        :param now: time.monotonic() value
+        """
+        elapsed_seconds = max(0.0, now - self._last_refill)
+        self._last_refill = now
+        self.available = min(self.capacity, self.available + elapsed_seconds * self.capacity / self.period_seconds)
+
+    def wait_time(self, amount, now):
+        """
+        Seconds until 'amount' units are available (0 if they are now).
+
+        :param amount: Units needed (larger than the capacity counts as a full bucket)
+        :param now: time.monotonic() value
+        :return: Seconds to wait
+        """
+        self._refill(now)
+        if now < self.paused_until:
+            return self.paused_until - now
+        missing = min(amount, self.capacity) - self.available
+        return max(0.0, missing * self.period_seconds / self.capacity)
+
+    def take(self, amount):
+        """
+        Remove units (call after wait_time() returned 0).
+
+        :param amount: Units to remove
+        """
+        self.available -= min(amount, self.capacity)
+
+    def adjust(self, extra_amount):
+        """
+        Correct an estimate once the real amount is known (positive takes more, negative gives back).
+
+        :param extra_amount: Real amount minus the amount taken
+        """
+        self.available = max(-self.capacity, min(self.capacity, self.available - extra_amount))
+
+    def pause(self, seconds, now):
+        """
+        Hand out nothing for a while (after a 429 or when the provider reports nothing left).
+
+        :param seconds: Seconds to pause
+        :param now: time.monotonic() value
+        """
+        self.paused_until = max(self.paused_until, now + seconds)
+        self.available = min(self.available, 0.0)
+
+    def update_limit(self, capacity=None, remaining=None):
+        """
+        Apply a limit reported by the provider.
+
+        :param capacity: Units allowed per period
+        :param remaining: Units the provider says are left (shared with other processes, so only lowers ours)
+        """
+        if capacity:
+            self.capacity = float(capacity)
+            self.available = min(self.available, self.capacity)
+        if remaining is not None:
+            self.available = min(self.available, float(remaining))
+
+
+class RateLimiter:
+    """
+    Request/token buckets, adaptive concurrency and retries for one service (one OpenAI model, or Custom Search).
+    """
+
+    def __init__(self, name, requests_per_minute=None, tokens_per_minute=None, requests_per_day=None,
+                 initial_concurrency=DEFAULT_INITIAL_CONCURRENCY, max_concurrency=DEFAULT_MAX_CONCURRENCY,
+                 max_retries=DEFAULT_MAX_RETRIES, retry_base_delay=DEFAULT_RETRY_BASE_DELAY,
+                 retry_max_delay=DEFAULT_RETRY_MAX_DELAY):
+        """
+        Create the limiter.
+
+        :param name: Service name, used in statistics and metrics
+        :param requests_per_minute: Requests allowed per minute (None for no limit)
+        :param tokens_per_minute: Tokens allowed per minute (None for no limit)
+        :param requests_per_day: Requests allowed per day (None for no limit)
+        :param initial_concurrency: Calls in flight allowed at first
+        :param max_concurrency: Most calls in flight ever allowed
+        :param max_retries: Retries of one throttled or failed call
+        :param retry_base_delay: Seconds before the first retry
+        :param retry_max_delay: Longest backoff between two attempts
+        """
+        self.name = name
+        self.request_bucket = TokenBucket(requests_per_minute, 60) if requests_per_minute else None
+        self.token_bucket = TokenBucket(tokens_per_minute, 60) if tokens_per_minute else None
+        self.daily_bucket = TokenBucket(requests_per_day, 24 * 60 * 60) if requests_per_day else None
+        self.max_concurrency = max_concurrency
+        self.concurrency_limit = float(min(initial_concurrency, max_concurrency))
+        self.max_retries = max_retries
+        self.retry_base_delay = retry_base_delay
+        self.retry_max_delay = retry_max_delay
+        self.in_flight = 0
+        self._last_decrease = 0.0
+        self._lock = threading.Lock()
+        self._capacity_changed = threading.Condition(self._lock)
+        self._random = random.Random()
+        self._stats = {
+            'calls': 0, 'succeeded': 0, 'throttled': 0, 'transient_errors': 0, 'retries': 0, 'failed': 0,
+            'deadline_exceeded': 0, 'wait_seconds': 0.0
+        }
+
+    def _buckets(self, tokens):
+        """
+        The buckets a call draws from, with the amount it needs from each.
+
+        :param tokens: Tokens the call is expected to use
+        :return: List of (TokenBucket, amount)
+        """
+        return [
+            (bucket, amount) for bucket, amount in (
+                (self.request_bucket, 1), (self.token_bucket, tokens), (self.daily_bucket, 1)
+            ) if bucket is not None
+        ]
+
+    def _try_admit(self, tokens):
+        """
+        Start a call if every bucket and the concurrency limit allow it. Must be called with the lock held.
+
+        :param tokens: Tokens the call is expected to use
+        :return: 0 if the call was admitted, otherwise seconds to wait (None if waiting on concurrency)
+        """
+        if self.in_flight >= int(self.concurrency_limit):
+            return None
+        now = time.monotonic()
+        buckets = self._buckets(tokens)
+        wait_seconds = max((bucket.wait_time(amount, now) for bucket, amount in buckets), default=0.0)
+        if wait_seconds > 0:
+            return wait_seconds
+        for bucket, amount in buckets:
+            bucket.take(amount)
+        self.in_flight += 1
+        self._stats['calls'] += 1
+        return 0
+
+    def _check_deadline(self, wait_seconds, deadline_at):
+        """
+        Give up if waiting this long would pass the deadline.
+
+        :param wait_seconds: Seconds the caller is about to wait
+        :param deadline_at: time.monotonic() value the query must finish by (None for no deadline)
+        :raises DeadlineExceeded: If the wait would pass the deadline
+        """
+        if deadline_at is not None and time.monotonic() + wait_seconds > deadline_at:
+            with self._lock:
+                self._stats['deadline_exceeded'] += 1
+            raise DeadlineExceeded(f"{self.name}: no capacity before the query deadline")
+
+    def _record_wait(self, waited_seconds):
+        """
+        Count time spent waiting for capacity.
+
+        :param waited_seconds: Seconds waited
+        """
+        if waited_seconds <= 0:
+            return
+        with self._lock:
+            self._stats['wait_seconds'] += waited_seconds
+        get_registry().inc('byob_rate_limit_wait_seconds_total', {'service': self.name}, waited_seconds)
+
+    def _admit(self, tokens, deadline_at):
+        """
+        Wait until a call may start.
+
+        :param tokens: Tokens the call is expected to use
+        :param deadline_at: time.monotonic() value the query must finish by (None for no deadline)
+        :raises DeadlineExceeded: If the call cannot start before the deadline
+        """
+        started_waiting_at = time.monotonic()
+        with self._lock:
+            while True:
+                wait_seconds = self._try_admit(tokens)
+                if wait_seconds == 0:
+                    break
+                now = time.monotonic()
+                if deadline_at is not None and now + (wait_seconds or 0.0) >= deadline_at:
+                    self._stats['deadline_exceeded'] += 1
+                    raise DeadlineExceeded(f"{self.name}: no capacity before the query deadline")
+                sleep_seconds = min(wait_seconds or MAX_ADMISSION_WAIT, MAX_ADMISSION_WAIT)
+                if deadline_at is not None:
+                    sleep_seconds = min(sleep_seconds, deadline_at - now)
+                # Woken early when a call finishes (concurrency) or the limits change
+                self._capacity_changed.wait(sleep_seconds)
+        self._record_wait(time.monotonic() - started_waiting_at)
+
+    async def _admit_async(self, tokens, deadline_at):
+        """
+        Wait until a call may start, without blocking the event loop.
+
+        :param tokens: Tokens the call is expected to use
+        :param deadline_at: time.monotonic() value the query must finish by (None for no deadline)
+        :raises DeadlineExceeded: If the call cannot start before the deadline
+        """
+        started_waiting_at = time.monotonic()
+        while True:
+            with self._lock:
+                wait_seconds = self._try_admit(tokens)
+            if wait_seconds == 0:
+                break
+            # Concurrency slots are polled; a running call frees one within its own latency
+            self._check_deadline(wait_seconds or 0.0, deadline_at)
+            await asyncio.sleep(min(wait_seconds or CONCURRENCY_POLL_INTERVAL, MAX_ADMISSION_WAIT))
+        self._record_wait(time.monotonic() - started_waiting_at)
+
+    def _release(self, throttled):
+        """
+        Finish a call and adapt the concurrency limit (additive increase, multiplicative decrease).
+
+        :param throttled: Whether the provider answered 429
+        """
+        with self._lock:
+            self.in_flight -= 1
+            now = time.monotonic()
+            if throttled:
+                if now - self._last_decrease >= DECREASE_COOLDOWN:
+                    self.concurrency_limit = max(1.0, self.concurrency_limit * DECREASE_FACTOR)
+                    self._last_decrease = now
+            else:
+                self.concurrency_limit = min(
+                    float(self.max_concurrency), self.concurrency_limit + 1 / self.concurrency_limit
+                )
+            self._capacity_changed.notify_all()
+
+    def observe_headers(self, headers):
+        """
+        Learn the provider's limits from OpenAI's x-ratelimit-* response headers.
+
+        :param headers: Response headers (case-insensitive mapping, may be None)
+        """
+        if not headers:
+            return
+
+        def header_number(header_name):
+            try:
+                return float(headers.get(header_name))
+            except (TypeError, ValueError):
+                return None
+
+        with self._lock:
+            now = time.monotonic()
+            for bucket, kind in ((self.request_bucket, 'requests'), (self.token_bucket, 'tokens')):
+                if bucket is None:
+                    continue
+                remaining = header_number(f'x-ratelimit-remaining-{kind}')
+                bucket.update_limit(header_number(f'x-ratelimit-limit-{kind}'), remaining)
+                reset_seconds = parse_duration(headers.get(f'x-ratelimit-reset-{kind}'))
+                if remaining is not None and remaining < 1 and reset_seconds:
+                    bucket.pause(reset_seconds, now)
+            self._capacity_changed.notify_all()
+
+    def settle_tokens(self, estimated_tokens, actual_tokens):
+        """
+        Correct the token bucket once a call reports how many tokens it really used.
+
+        :param estimated_tokens: Tokens taken when the call was admitted
+        :param actual_tokens: Tokens the provider reported
+        """
+        if self.token_bucket is None or actual_tokens is None:
+            return
+        with self._lock:
+            self.token_bucket.adjust(actual_tokens - estimated_tokens)
+
+    def exhaust_daily_quota(self, seconds_until_reset=None):
+        """
+        Stop using a service whose daily quota the provider says is used up.
+
+        :param seconds_until_reset: Seconds until the quota resets (a day if unknown)
+        """
+        with self._lock:
+            bucket = self.daily_bucket or self.request_bucket
+            if bucket is not None:
+                bucket.pause(seconds_until_reset or 24 * 60 * 60, time.monotonic())
+
+    def _retry_delay(self, error, attempt, deadline_at):
+        """
+        Handle a failed call: count it and decide how long to back off before retrying.
+
+        :param error: Exception raised by the call
+        :param attempt: Number of retries already made
+        :param deadline_at: time.monotonic() value the query must finish by (None for no deadline)
+        :return: Seconds to wait before the next attempt, or None to give up
+        :raises DeadlineExceeded: If the next attempt could not start before the deadline
+        """
+        error_kind, headers = classify_error(error)
+        self._release(throttled=error_kind == THROTTLED)
+        self.observe_headers(headers)
+        retry_after = retry_after_seconds(headers)
+        with self._lock:
+            if error_kind == THROTTLED:
+                self._stats['throttled'] += 1
+                # Everyone waits, not just this caller, so the retries do not arrive as a storm
+                if retry_after and self.request_bucket is not None:
+                    self.request_bucket.pause(retry_after, time.monotonic())
+            elif error_kind == TRANSIENT:
+                self._stats['transient_errors'] += 1
+            if error_kind == FATAL or attempt >= self.max_retries:
+                self._stats['failed'] += 1
+                return None
+        if error_kind == THROTTLED:
+            get_registry().inc('byob_rate_limit_throttled_total', {'service': self.name})
+
+        # Full jitter: anywhere between 0 and the exponential backoff, but never before Retry-After
+        backoff_seconds = self._random.uniform(0, min(self.retry_max_delay, self.retry_base_delay * 2 ** attempt))
+        delay_seconds = max(backoff_seconds, retry_after or 0.0)
+        self._check_deadline(delay_seconds, deadline_at)
+        with self._lock:
+            self._stats['retries'] += 1
+        get_registry().inc('byob_rate_limit_retries_total', {'service': self.name, 'reason': error_kind})
+        return delay_seconds
+
+    def _succeeded(self, headers):
+        """
+        Finish a successful call.
+
+        :param headers: Response headers
+        """
+        self._release(throttled=False)
+        self.observe_headers(headers)
+        with self._lock:
+            self._stats['succeeded'] += 1
+
+    def call(self, send, tokens=0, deadline_at=None):
+        """
+        Make a call within the limits, retrying throttled and transient failures.
+
+        :param send: Function with no arguments returning (result, response headers)
+        :param tokens: Tokens the call is expected to use
+        :param deadline_at: time.monotonic() value the query must finish by (None for no deadline)
+        :return: The result returned by send()
+        :raises DeadlineExceeded: If the call could not be made before the deadline
+        :raises Exception: The call's own error once it is not worth retrying
+        """
+        attempt = 0
+        while True:
+            self._admit(tokens, deadline_at)
+            try:
+                result, headers = send()
+            except Exception as call_error:
+                delay_seconds = self._retry_delay(call_error, attempt, deadline_at)
+                if delay_seconds is None:
+                    raise
+                time.sleep(delay_seconds)
+                attempt += 1
+                continue
+            self._succeeded(headers)
+            return result
+
+    async def call_async(self, send, tokens=0, deadline_at=None):
+        """
+        Coroutine version of call().
+
+        :param send: Coroutine function with no arguments returning (result, response headers)
+        :param tokens: Tokens the call is expected to use
+        :param deadline_at: time.monotonic() value the query must finish by (None for no deadline)
+        :return: The result returned by send()
+        """
+        attempt = 0
+        while True:
+            await self._admit_async(tokens, deadline_at)
+            try:
+                result, headers = await send()
+            except asyncio.CancelledError:
+                self._release(throttled=False)
+                raise
+            except Exception as call_error:
+                delay_seconds = self._retry_delay(call_error, attempt, deadline_at)
+                if delay_seconds is None:
+                    raise
+                await asyncio.sleep(delay_seconds)
+                attempt += 1
+                continue
+            self._succeeded(headers)
+            return result
+
+    def get_stats(self):
+        """
+        Report the limiter's current limits and how often calls were throttled or retried.
+
+        :return: Dictionary of statistics
+        """
+        with self._lock:
+            stats = dict(self._stats)
+            stats['wait_seconds'] = round(stats['wait_seconds'], 3)
+            stats['in_flight'] = self.in_flight
+            stats['concurrency_limit'] = round(self.concurrency_limit, 2)
+            stats['requests_per_minute'] = self.request_bucket.capacity if self.request_bucket else None
+            stats['tokens_per_minute'] = self.token_bucket.capacity if self.token_bucket else None
+            stats['requests_per_day'] = self.daily_bucket.capacity if self.daily_bucket else None
+        return stats
+
+
+class RateLimiterRegistry:
+    """
+    One RateLimiter per OpenAI model plus one for Google Custom Search, created on first use.
+    """
+
+    def __init__(self, config):
+        """
+        Create the registry.
+
+        :param config: BYOBTool configuration with the rate limit settings
+        """
+        self.config = dict(config)
+        self._lock = threading.Lock()
+        self._limiters = {}
+
+    def _limiter(self, name, **limits):
+        """
+        Return the limiter for a service, creating it on first use.
+
+        :param name: Service name
+        :param limits: requests_per_minute / tokens_per_minute / requests_per_day
+        :return: RateLimiter
+        """
+        with self._lock:
+            if name not in self._limiters:
+                self._limiters[name] = RateLimiter(
+                    name,
+                    max_concurrency=self.config['max_concurrent_requests'],
+                    max_retries=self.config['max_retries'],
+                    retry_base_delay=self.config['retry_base_delay'],
+                    retry_max_delay=self.config['retry_max_delay'],
+                    **limits
+                )
+            return self._limiters[name]
+
+    def openai(self, model):
+        """
+        Limiter for one OpenAI model (each model has its own limits).
+
+        :param model: Model name
+        :return: RateLimiter
+        """
+        model_limits = self.config['openai_rate_limits'].get(model) or self.config['openai_rate_limits'].get('default', {})
+        return self._limiter(f"openai:{model}", **model_limits)
+
+    def google_search(self):
+        """
+        Limiter for Google Custom Search.
+
+        :return: RateLimiter
+        """
+        return self._limiter(
+            'google_cse',
+            requests_per_minute=self.config['cse_queries_per_minute'],
+            requests_per_day=self.config['cse_queries_per_day']
+        )
+
+    def get_stats(self):
+        """
+        Report every limiter.
+
+        :return: Dictionary of {service name: statistics}
+        """
+        with self._lock:
+            limiters = dict(self._limiters)
+        return {name: limiter.get_stats() for name, limiter in sorted(limiters.items())}
+
+
+# Registry shared by every BYOBTool in the process (provider limits are per account, not per tool)
+_shared_registry = None
+_shared_registry_lock = threading.Lock()
+
+
+def get_rate_limiters(config):
+    """
+    Return the process-wide RateLimiterRegistry, creating it on first use.
+
+    The settings only take effect for the call that creates the registry.
+
+    :param config: BYOBTool configuration with the rate limit settings
+    :return: RateLimiterRegistry
+    """
+    global _shared_registry
+    with _shared_registry_lock:
+        if _shared_registry is None:
+            _shared_registry = RateLimiterRegistry(config)
+        return _shared_registry
@@ -0,0 +1,338 @@
+#!/usr/bin/env python3
+"""
+BYOB (Bring Your Own Browser) Web Search Tool - Query-Relevant Chunk Selection
+
+Sending a whole webpage to the summary model costs thousands of prompt
+tokens, and most of the page usually has nothing to do with the query. This
+module picks out the parts that matter before the model sees them:
+- The page text is split into chunks of a few sentences
+- Every chunk is scored against the query with BM25, a fast lexical ranker
+- The best chunks that fit a token budget are kept, in page order
+
+Everything runs locally; no network or model calls are made. Tokens are
+counted with the model's own tokenizer through the 'tiktoken' package (listed
+in requirements.txt); if it is missing they are only estimated from the
+character count, and RelevanceStats reports which counter is in use.
+
+Key Components:
+- count_tokens: Token count of a text for a given model
+- truncate_to_tokens: Cut a text down to a token limit
+- split_into_chunks: Split page text into roughly equal chunks on sentence boundaries
+- BM25: Okapi BM25 scorer over a list of chunks
+- select_relevant_text: Keep the chunks most relevant to a query within a token budget
+- RelevanceStats: Prompt tokens before and after selection
+"""
+
+import math       # For BM25 IDF weights
+import re         # For splitting text into sentences and terms
+import threading  # For protecting shared counters
+from collections import Counter  # For term frequencies
+from functools import lru_cache  # For loading each tokenizer once
+
+try:
+    import tiktoken  # For counting tokens exactly like the OpenAI models do
+except ImportError:
+    tiktoken = None
+
+# Rough number of characters per token, used when tiktoken is not installed
+CHARS_PER_TOKEN = 4
+
+# Default chunk size in characters (about 200 tokens)
+DEFAULT_CHUNK_CHARS = 800
+
+# Placed between chunks that were not next to each other on the page
+CHUNK_SEPARATOR = ' ... '
+
+# BM25 parameters (the usual defaults)
+BM25_K1 = 1.5
+BM25_B = 0.75
+
+# Very common English words that say nothing about relevance
+STOPWORDS = frozenset({
+    'a', 'an', 'and', 'are', 'as', 'at', 'be', 'by', 'for', 'from', 'has', 'have', 'how', 'in',
+    'is', 'it', 'its', 'of', 'on', 'or', 'that', 'the', 'this', 'to', 'was', 'were', 'what',
+    'when', 'where', 'which', 'who', 'why', 'will', 'with'
+})
+
+_SENTENCE_END = re.compile(r'(?<=[.!?])\s+')
+_TERM = re.compile(r'\w+')
+
+
+# Models whose tokenizer could not be loaded (their tokens are estimated)
+_unavailable_encodings = set()
+
+
+@lru_cache(maxsize=None)
+def _get_encoding(model):
+    """
+    Load the tiktoken encoding for a model.
+
+    tiktoken downloads each encoding's BPE file on first use, so on an
+    offline or sandboxed host loading can fail; the tokens are then
+    estimated rather than failing the query.
+
+    :param model: OpenAI model name
+    :return: tiktoken Encoding, or None if tiktoken is not installed or the encoding cannot be loaded
+    """
+    if tiktoken is None:
+        return None
+    try:
+        try:
+            return tiktoken.encoding_for_model(model)
+        except KeyError:
+            # Newer models that this tiktoken version does not know yet
+            return tiktoken.get_encoding('o200k_base')
+    except (ValueError, OSError) as encoding_error:
+        # ValueError: encoding unknown to this tiktoken version; OSError: BPE file download failed
+        print(f"Token Counter Warning: estimating tokens for {model} ({encoding_error})")
+        _unavailable_encodings.add(model)
+        return None
+
+
+def count_tokens(text, model):
+    """
+    Count the tokens a text takes up in a model's prompt.
+
+    :param text: Text to count
+    :param model: OpenAI model name
+    :return: Number of tokens (estimated if tiktoken is not installed)
+    """
+    encoding = _get_encoding(model)
+    if encoding is None:
+        return math.ceil(len(text) / CHARS_PER_TOKEN)
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+def token_counter_name():
+    """
+    Name the way tokens are being counted.
+
+    :return: 'tiktoken', or 'estimate' when tiktoken is not installed or a model's encoding could not be
+             loaded (CHARS_PER_TOKEN characters per token)
+    """
+    return 'tiktoken' if exact_token_counts() else 'estimate'
+
+
+def exact_token_counts():
+    """
+    Whether every token count so far came from the model's tokenizer.
+
+    :return: True if tiktoken is installed and every encoding used could be loaded
+    """
+    return tiktoken is not None and not _unavailable_encodings
+
+
+def truncate_to_tokens(text, max_tokens, model):
+    """
+    Cut a text down to at most max_tokens tokens.
+
+    Without tiktoken the cut is made at max_tokens * CHARS_PER_TOKEN characters.
+
+    :param text: Text to cut
+    :param max_tokens: Maximum number of tokens to keep
+    :param model: OpenAI model name
+    :return: The text, shortened if it was too long
+    """
+    encoding = _get_encoding(model)
+    if encoding is None:
+        return text[:max_tokens * CHARS_PER_TOKEN]
+    tokens = encoding.encode(text, disallowed_special=())
+    if len(tokens) <= max_tokens:
+        return text
+    return encoding.decode(tokens[:max_tokens])
+
+
+def tokenize_terms(text):
+    """
+    Split text into lowercase search terms, dropping stopwords.
+
+    :param text: Text to split
+    :return: List of terms
+    """
+    return [term for term in _TERM.findall(text.lower()) if term not in STOPWORDS]
+
+
+def split_into_chunks(text, chunk_chars=DEFAULT_CHUNK_CHARS):
+    """
+    Split text into chunks of about chunk_chars characters, on sentence boundaries.
+
+    Sentences longer than a chunk are split between words.
+
+    :param text: Text to split
+    :param chunk_chars: Target chunk size in characters
+    :return: List of chunks, in page order
+    """
+    chunks = []
+    current_parts = []
+    current_length = 0
+
+    def flush():
+        nonlocal current_length
+        if current_parts:
+            chunks.append(' '.join(current_parts))
+            current_parts.clear()
+            current_length = 0
+
+    for sentence in _SENTENCE_END.split(text):
+        # Break sentences that are too long on their own (e.g. pages without punctuation)
+        pieces = [sentence]
+        if len(sentence) > chunk_chars:
+            words = sentence.split()
+            pieces, piece_words, piece_length = [], [], 0
+            for word in words:
+                if piece_words and piece_length + len(word) + 1 > chunk_chars:
+                    pieces.append(' '.join(piece_words))
+                    piece_words, piece_length = [], 0
+                piece_words.append(word)
+                piece_length += len(word) + 1
+            if piece_words:
+                pieces.append(' '.join(piece_words))
+
+        for piece in pieces:
+            if current_parts and current_length + len(piece) + 1 > chunk_chars:
+                flush()
+            current_parts.append(piece)
+            current_length += len(piece) + 1
+    flush()
+    return chunks
+
+
+class BM25:
+    """
+    Okapi BM25 scorer over a fixed list of chunks.
+
+    Term statistics come from the chunks themselves, so a term that appears
+    all over the page counts for less than one that appears in a few places.
+    """
+
+    def __init__(self, chunks, k1=BM25_K1, b=BM25_B):
+        """
+        Index the chunks.
+
+        :param chunks: List of chunk texts
+        :param k1: Term frequency saturation
+        :param b: Length normalization strength
+        """
+        self.k1 = k1
+        self.b = b
+        self.chunk_terms = [Counter(tokenize_terms(chunk)) for chunk in chunks]
+        self.chunk_lengths = [sum(term_counts.values()) for term_counts in self.chunk_terms]
+        self.average_length = (sum(self.chunk_lengths) / len(chunks)) if chunks else 0
+        document_frequencies = Counter()
+        for term_counts in self.chunk_terms:
+            document_frequencies.update(term_counts.keys())
+        chunk_count = len(chunks)
+        self.idf = {
+            term: math.log(1 + (chunk_count - frequency + 0.5) / (frequency + 0.5))
+            for term, frequency in document_frequencies.items()
+        }
+
+    def score(self, query):
+        """
+        Score every chunk against a query.
+
+        :param query: Query text
+        :return: List of scores, one per chunk
+        """
+        query_terms = set(tokenize_terms(query))
+        scores = []
+        for term_counts, chunk_length in zip(self.chunk_terms, self.chunk_lengths):
+            length_norm = self.k1 * (1 - self.b + self.b * chunk_length / (self.average_length or 1))
+            chunk_score = 0.0
+            for term in query_terms:
+                term_frequency = term_counts.get(term)
+                if term_frequency:
+                    chunk_score += self.idf[term] * term_frequency * (self.k1 + 1) / (term_frequency + length_norm)
+            scores.append(chunk_score)
+        return scores
+
+
+def select_relevant_text(text, query, token_budget, model, chunk_chars=DEFAULT_CHUNK_CHARS):
+    """
+    Keep the parts of a page most relevant to a query, within a token budget.
+
+    Pages that already fit the budget are returned unchanged. Otherwise the
+    highest-scoring chunks are taken until the budget is full (ties go to
+    the chunk earlier on the page) and put back in page order.
+
+    :param text: Page text
+    :param query: Query the page is being read for
+    :param token_budget: Maximum number of tokens to keep
+    :param model: OpenAI model the text will be sent to (for token counting)
+    :param chunk_chars: Target chunk size in characters
+    :return: Tuple of (selected text, tokens before, tokens after)
+    """
+    original_tokens = count_tokens(text, model)
+    if original_tokens <= token_budget:
+        return text, original_tokens, original_tokens
+
+    chunks = split_into_chunks(text, chunk_chars)
+    chunk_scores = BM25(chunks).score(query)
+    ranked_indexes = sorted(range(len(chunks)), key=lambda chunk_index: (-chunk_scores[chunk_index], chunk_index))
+
+    selected_indexes = []
+    selected_tokens = 0
+    for chunk_index in ranked_indexes:
+        chunk_tokens = count_tokens(chunks[chunk_index], model)
+        if selected_tokens + chunk_tokens > token_budget:
+            continue
+        selected_indexes.append(chunk_index)
+        selected_tokens += chunk_tokens
+        if selected_tokens >= token_budget:
+            break
+
+    # Rebuild the text in page order, marking gaps where chunks were dropped
+    selected_text = ''
+    previous_index = None
+    for chunk_index in sorted(selected_indexes):
+        if previous_index is not None:
+            selected_text += ' ' if chunk_index == previous_index + 1 else CHUNK_SEPARATOR
+        selected_text += chunks[chunk_index]
+        previous_index = chunk_index
+    return selected_text, original_tokens, count_tokens(selected_text, model)
+
+
+class RelevanceStats:
+    """
+    Thread-safe counters of summary prompt tokens before and after chunk selection.
+    """
+
+    def __init__(self):
+        """
+        Initialize empty counters.
+        """
+        self._lock = threading.Lock()
+        self.pages = 0
+        self.pages_reduced = 0
+        self.tokens_before = 0
+        self.tokens_after = 0
+
+    def record(self, tokens_before, tokens_after):
+        """
+        Count one page that went through chunk selection.
+
+        :param tokens_before: Tokens in the full page text
+        :param tokens_after: Tokens in the text sent to the model
+        """
+        with self._lock:
+            self.pages += 1
+            self.pages_reduced += tokens_after < tokens_before
+            self.tokens_before += tokens_before
+            self.tokens_after += tokens_after
+
+    def get_stats(self):
+        """
+        Return the counters.
+
+        :return: Dictionary of statistics
+        """
+        with self._lock:
+            return {
+                'pages': self.pages,
+                'pages_reduced': self.pages_reduced,
+                'tokens_before': self.tokens_before,
+                'tokens_after': self.tokens_after,
+                'reduction': 1 - self.tokens_after / self.tokens_before if self.tokens_before else 0.0,
+                'exact_token_counts': exact_token_counts(),
+                'token_counter': token_counter_name()
+            }
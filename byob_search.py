@@ -18,17 +18,145 @@ Key Components:
 
 # Import necessary libraries for web searching, data processing, and AI interactions
 import os      # For interacting with the operating system (e.g., reading environment variables)
-import json    # For handling structured data
+import copy    # For creating lightweight per-call copies of the tool
+import time    # For per-query deadlines
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait  # For fetching and summarizing pages in parallel
 import requests  # For making web requests
-from bs4 import BeautifulSoup  # For parsing and cleaning HTML content
+from byob_extract import get_extractor  # For turning HTML into clean text
 from dotenv import load_dotenv  # For loading environment variables from a .env file
 from openai import OpenAI  # For interacting with OpenAI's language models
-import httpx   # For making HTTP requests (used by OpenAI client)
+from byob_http import get_shared_pool  # For reusing keep-alive connections across queries
+from byob_fetch import PageFetcher  # For budgeted, content-type aware page downloads
+from byob_relevance import CHARS_PER_TOKEN, RelevanceStats, count_tokens, select_relevant_text  # For sending only the relevant parts of a page
+from byob_dedup import DedupStats, PageDeduplicator  # For summarizing syndicated copies of a page only once
+from byob_cache import PageCache, SearchCache, SummaryCache, DEFAULT_CACHE_DIR  # For reusing work done by earlier queries
+from byob_metrics import (  # For measuring the time, tokens and downloads of every pipeline stage
+    QueryTrace, record_stage, stage_span, OUTCOME_CANCELLED, OUTCOME_ERROR, OUTCOME_OK,
+    STAGE_FETCH, STAGE_GENERATE, STAGE_PARSE, STAGE_REFINE, STAGE_SEARCH, STAGE_SUMMARIZE
+)
+from byob_ratelimit import DeadlineExceeded, QuotaExhausted, get_rate_limiters  # For staying within OpenAI and Google limits
+from byob_fusion import parse_search_terms, reciprocal_rank_fusion  # For merging the results of several search terms
+from byob_paging import PagedResults, CSE_PAGE_SIZE  # For searching deeper than one page of Google results
+from byob_context import ContextStats, json_baseline_tokens, pack_sources  # For sending the answer model compact, budgeted sources
+from byob_budget import (  # For answering within a latency budget
+    LatencyBudget, SKIP_DUPLICATE, SKIP_FETCH_FAILED, SKIP_SUMMARY_FAILED, SOURCE_INCLUDED, SOURCE_SKIPPED,
+    STOP_COMPLETE, STOP_DEADLINE, STOP_QUORUM
+)
 
 # Load environment variables from .env file
 # This allows us to keep sensitive information like API keys secure
 load_dotenv()
 
+# Google Custom Search API endpoint (BYOB_GOOGLE_SEARCH_URL points it at a stand-in, e.g. for benchmarks)
+GOOGLE_SEARCH_URL = os.getenv('BYOB_GOOGLE_SEARCH_URL', "https://www.googleapis.com/customsearch/v1")
+
+# AI model used to turn user queries into short search terms
+REFINE_MODEL = "gpt-4o-mini"
+
+# AI model used to write the final report
+RESPONSE_MODEL = "gpt-4o"
+
+# Completion tokens reserved in the tokens-per-minute budget before the real count is known
+REFINE_COMPLETION_TOKENS = 20
+RESPONSE_COMPLETION_TOKENS = 1500
+
+# Default configuration shared by the synchronous and asynchronous tools
+DEFAULT_CONFIG = {
+    # Search configuration
+    'max_search_results': 10,  # Number of search results to retrieve
+    'search_depth': 10,  # Depth of search processing: results up to this rank are retrieved even beyond
+                         # 'max_search_results', in pages of 10 requested in parallel (Google stops at 100)
+    'max_search_page_requests': 4,  # Pages of one search requested from Google at the same time
+    'speculative_search': False,  # Search the raw query while it is refined, then the refined terms,
+                                  # and merge the result lists with reciprocal rank fusion
+    'query_rewrites': 0,  # Extra search terms requested with the refined term (speculative search only)
+    'speculative_refine_wait': 3.0,  # Seconds to wait for refinement after the raw query's results
+                                     # arrived before using them alone (None waits as long as it takes)
+    'rrf_k': 60,  # Rank offset of reciprocal rank fusion (larger values weigh top ranks less)
+    
+    # Content retrieval configuration
+    'max_content_chars': 50000,  # Maximum characters to retrieve from a webpage
+    'content_extractor': 'streaming',  # HTML-to-text engine: 'streaming' (skips boilerplate, stops at the
+                                       # character limit) or 'beautifulsoup' (original full-page parse)
+    'prefer_main_content': False,  # Keep only the <main>/<article> region when a page has one
+    'max_page_bytes': 2 * 1024 * 1024,  # Stop downloading a webpage after this many bytes
+    'page_fetch_deadline': 15.0,  # Seconds allowed for a whole webpage download
+    'page_fetch_timeout': 10,  # Seconds to wait for a connection or for the next piece of a webpage
+    
+    # Summarization configuration
+    'max_summary_chars': 1000,  # Maximum characters for AI summary
+    'summary_token_budget': 1500,  # Tokens of page text sent to the summary model; the chunks most
+                                   # relevant to the query are kept (0 sends the whole page)
+    'relevance_chunk_chars': 800,  # Size of the chunks pages are split into for relevance ranking
+    'dedup_enabled': True,  # Summarize only one copy of pages that appear under several URLs
+    'dedup_similarity': 0.9,  # SimHash similarity (0-1) at which two pages count as copies
+    
+    # Answer generation configuration
+    'context_token_budget': 8000,  # Tokens of page summaries sent to write the answer; the best-ranked
+                                   # summaries are kept and the first one that does not fit is trimmed
+                                   # (0 sends every summary)
+    'context_min_source_tokens': 50,  # Drop rather than trim a summary if fewer tokens than this are left
+    'context_json_baseline': False,  # Also count each answer's sources in the old JSON format, for the
+                                     # 'reduction' in get_context_stats() (tokenizes the sources twice)
+    
+    # Pipeline concurrency configuration
+    'concurrent_pipeline': True,  # Fetch and summarize webpages in parallel instead of one by one
+    'max_fetch_workers': 8,  # Maximum number of webpages downloaded at the same time
+    'max_llm_workers': 4,  # Maximum number of summaries requested from OpenAI at the same time
+    
+    # Latency budget configuration (see byob_budget)
+    'latency_budget': None,  # Seconds a query may take; pages still being read when time runs out are
+                             # skipped and the answer is written from the rest (None waits for every page)
+    'summary_quorum': 0,  # Write the answer as soon as this many pages are summarized (0 waits for all)
+    'generation_reserve': 15.0,  # Seconds of the latency budget kept for writing the answer
+    
+    # Cache configuration
+    'cache_dir': DEFAULT_CACHE_DIR,  # Directory that holds the local caches
+    'page_cache_enabled': True,  # Keep extracted webpage text on disk between queries
+    'page_cache_ttl': 6 * 60 * 60,  # Seconds a cached page is used before asking the website if it changed
+    'page_cache_max_bytes': 200 * 1024 * 1024,  # Cache size before least recently used pages are removed
+    'summary_cache_enabled': True,  # Reuse summaries of the same page text for the same query and model
+    'summary_cache_ttl': 24 * 60 * 60,  # Seconds a summary is reused
+    'summary_cache_max_entries': 50000,  # Number of summaries kept before the least recently used are removed
+    'search_cache_enabled': True,  # Reuse refined search terms and Google results for repeated queries
+    'search_cache_persist': True,  # Also keep them on disk so they survive restarts
+    'search_cache_max_entries': 1000,  # Number of refined terms / result lists kept in memory
+    'refine_cache_ttl': 7 * 24 * 60 * 60,  # Seconds a refined search term is reused
+                                           # (Google results expire based on the recency window instead)
+    
+    # Connection pool configuration (applied when the shared pool is first created)
+    'http_max_connections_per_host': 10,  # Maximum open connections to a single host
+    'http_keepalive_expiry': 30.0,  # Seconds an idle connection is kept open for reuse
+    'http_pool_timeout': 10.0,  # Seconds a request waits for a free connection to a host at its limit
+    'http2': False,  # Use HTTP/2 for OpenAI calls (requires the 'h2' package)
+    
+    # Rate limit and retry configuration (applied when the shared limiters are first created)
+    'openai_rate_limits': {  # Starting limits per model; replaced by the ones OpenAI reports in its headers
+        'gpt-4o': {'requests_per_minute': 500, 'tokens_per_minute': 30000},
+        'gpt-4o-mini': {'requests_per_minute': 500, 'tokens_per_minute': 200000},
+        'default': {'requests_per_minute': 500, 'tokens_per_minute': 30000}
+    },
+    'cse_queries_per_minute': 100,  # Google Custom Search queries per minute (None for no limit)
+    'cse_queries_per_day': 10000,  # Google Custom Search daily quota (None for no limit)
+    'max_concurrent_requests': 64,  # Most OpenAI / Google calls in flight per model; the actual number
+                                    # adapts, halving whenever the provider answers 429
+    'max_retries': 4,  # Retries of a throttled or failed OpenAI / Google call
+    'retry_base_delay': 0.5,  # Seconds before the first retry (doubled, with jitter, for each further retry)
+    'retry_max_delay': 20.0,  # Longest wait between two attempts
+    'query_deadline': 120.0,  # Seconds a query may take; rate limit waits and retries stop there (0 for none)
+    
+    # AI model configuration
+    'summary_model': 'gpt-4o-mini',  # Default AI model for summarization
+    
+    # Optional filters
+    'website_filter': None,  # Optional website filter for search
+    
+    # Recency configuration
+    'recency': 'w1'  # Default recency filter set to last week
+                     # Format: '[age][period]' 
+                     # Examples: 'w1' (last week), 'd7' (last 7 days), 'm3' (last 3 months)
+}
+
 class BYOBTool:
     """
     A comprehensive AI-powered web research tool that combines web search, 
@@ -48,42 +176,101 @@ class BYOBTool:
 
         :param config: Dictionary of configuration parameters with defaults
         """
-        # Default configuration
-        self.config = {
-            # Search configuration
-            'max_search_results': 10,  # Number of search results to retrieve
-            'search_depth': 10,  # Depth of search processing
-            
-            # Content retrieval configuration
-            'max_content_chars': 50000,  # Maximum characters to retrieve from a webpage
-            
-            # Summarization configuration
-            'max_summary_chars': 1000,  # Maximum characters for AI summary
-            
-            # AI model configuration
-            'summary_model': 'gpt-4o-mini',  # Default AI model for summarization
-            
-            # Optional filters
-            'website_filter': None,  # Optional website filter for search
-            
-            # Recency configuration
-            'recency': 'w1'  # Default recency filter set to last week
-                             # Format: '[age][period]' 
-                             # Examples: 'w1' (last week), 'd7' (last 7 days), 'm3' (last 3 months)
-        }
+        # Start from the default configuration
+        self.config = dict(DEFAULT_CONFIG)
         
         # Update default configuration with provided config
         if config:
             self.config.update(config)
         
-        # Set up OpenAI client for AI-powered text processing
+        # Read and validate the OpenAI and Google credentials
+        openai_key = self._load_credentials()
+        
+        # Share keep-alive connections to Google, websites and OpenAI with every other BYOBTool
+        self.http_pool = get_shared_pool(
+            max_connections_per_host=self.config['http_max_connections_per_host'],
+            keepalive_expiry=self.config['http_keepalive_expiry'],
+            http2=self.config['http2'],
+            pool_timeout=self.config['http_pool_timeout'],
+            # One OpenAI connection for every call the rate limiters may let through at once
+            openai_max_connections=self.config['max_concurrent_requests']
+        )
+        
+        # Create OpenAI client on top of the shared HTTP connection pool
+        self.openai_client = OpenAI(api_key=openai_key, http_client=self.http_pool.openai_http_client)
+        
+        # Pipeline calls go through the shared rate limiters, which do the retrying themselves
+        self.rate_limiters = get_rate_limiters(self.config)
+        self._limited_openai_client = self.openai_client.with_options(max_retries=0)
+        
+        # Stream webpages through the same pool, within a byte and time budget
+        self.page_fetcher = PageFetcher(self.http_pool)
+        self.fetch_stats = self.page_fetcher.stats
+        
+        # Prompt tokens saved by sending only the relevant parts of each page
+        self.relevance_stats = RelevanceStats()
+        
+        # Sources packed into answer prompts and the prompt tokens they took
+        self.context_stats = ContextStats()
+        
+        # Duplicate pages found and OpenAI calls saved by skipping them
+        self.dedup_stats = DedupStats()
+        
+        # Stage measurements and deadline of the query this instance is running
+        # (set on the per-query copy made by run())
+        self.query_trace = None
+        self.deadline_at = None
+        self.latency_budget = None
+        
+        # Open the local caches
+        self._init_caches()
+
+    def _init_caches(self):
+        """
+        Open the local caches enabled in the configuration.
+        """
+        # Webpage text cache, so popular pages are not downloaded and parsed over and over
+        self.page_cache = None
+        if self.config['page_cache_enabled']:
+            self.page_cache = PageCache(
+                cache_dir=self.config['cache_dir'],
+                ttl_seconds=self.config['page_cache_ttl'],
+                max_bytes=self.config['page_cache_max_bytes']
+            )
+        
+        # Summary cache, so the same page is not summarized again for the same query
+        self.summary_cache = None
+        if self.config['summary_cache_enabled']:
+            self.summary_cache = SummaryCache(
+                cache_dir=self.config['cache_dir'],
+                ttl_seconds=self.config['summary_cache_ttl'],
+                max_entries=self.config['summary_cache_max_entries']
+            )
+        
+        # Refined search term and Google result cache, which also saves Custom Search quota
+        self.search_cache = None
+        if self.config['search_cache_enabled']:
+            self.search_cache = SearchCache(
+                cache_dir=self.config['cache_dir'],
+                persist=self.config['search_cache_persist'],
+                max_entries=self.config['search_cache_max_entries'],
+                refine_ttl_seconds=self.config['refine_cache_ttl']
+            )
+
+    def _load_credentials(self):
+        """
+        Read the API credentials from the environment.
+
+        Sets the Google Search API key and Custom Search Engine ID on the instance.
+
+        :return: OpenAI API key
+        :raises ValueError: If any required credential is missing
+        """
+        # Set up OpenAI credentials for AI-powered text processing
         openai_key = os.getenv('OPENAI_API_KEY')
         if not openai_key:
             raise ValueError("OpenAI API Key is required. Please set OPENAI_API_KEY in .env file.")
         
-        # Create OpenAI client with a custom HTTP client to handle connections
-        self.openai_client = OpenAI(api_key=openai_key, http_client=httpx.Client())
-        
         # Set up Google Search API credentials
         self.api_key = os.getenv('GOOGLE_API_KEY')
         self.cse_id = os.getenv('GOOGLE_CSE_ID')
@@ -91,6 +278,8 @@ class BYOBTool:
         # Validate that we have the necessary search credentials
         if not self.api_key or not self.cse_id:
             raise ValueError("Missing Google API key or Custom Search Engine ID. Please check your .env file.")
+        
+        return openai_key
 
     def search(self, search_query, max_search_results=None, website_filter=None, recency=None):
         """
@@ -101,8 +290,11 @@ class BYOBTool:
         - Finds relevant web pages
         - Returns a list of search results with links and snippets
 
+        More than 10 results are requested as several pages of results at the
+        same time (see iter_search_pages()).
+
         :param search_query: Search query (what you want to find)
-        :param max_search_results: Number of search results to return
+        :param max_search_results: Number of search results to return (default: the search depth)
         :param website_filter: Optional parameter to search within a specific website
         :param recency: Restrict results by recency. 
                         Specification: '[age][period]'
@@ -118,15 +310,129 @@ class BYOBTool:
                         - 'm3': Last 3 months
         :return: List of search results
         """
-        # Construct the API request to Google Custom Search
-        google_search_url = "https://www.googleapis.com/customsearch/v1"
+        return [
+            search_result
+            for search_page in self.iter_search_pages(search_query, max_search_results, website_filter, recency)
+            for search_result in search_page
+        ]
+
+    def iter_search_pages(self, search_query, max_search_results=None, website_filter=None, recency=None):
+        """
+        Perform a web search, yielding the results one page of Google results at a time.
+
+        Google returns at most 10 results per request, so a deeper search
+        asks for several pages ('start' = 1, 11, 21, ...), up to
+        'max_search_page_requests' of them at the same time. Pages are
+        yielded in ranking order as soon as they and every page before them
+        have arrived, without the results already seen on an earlier page.
+        A page that comes back short is the last one: requests for later
+        pages that have not been sent yet are cancelled. A page whose request
+        failed is yielded as an empty list, and the search goes on.
+
+        :param search_query: Search query (what you want to find)
+        :param max_search_results: Number of search results to return (default: the search depth)
+        :param website_filter: Optional parameter to search within a specific website
+        :param recency: Optional '[age][period]' recency restriction
+        :return: Generator of lists of search results (always at least one list)
+        """
+        paged_results = PagedResults(self._search_result_count(max_search_results))
+        page_requests = [
+            (self._build_search_params(search_query, page_size, website_filter, recency, start_index), page_size)
+            for start_index, page_size in paged_results.pages
+        ]
+        if len(page_requests) == 1:
+            # A single page needs no worker thread
+            search_params, page_size = page_requests[0]
+            yield paged_results.add_page(self._search_page(search_params), page_size)
+            return
+
+        page_pool = ThreadPoolExecutor(max_workers=min(len(page_requests), self.config['max_search_page_requests']))
+        try:
+            page_futures = [
+                (page_pool.submit(self._search_page, search_params), page_size)
+                for search_params, page_size in page_requests
+            ]
+            for page_future, page_size in page_futures:
+                yield paged_results.add_page(page_future.result(), page_size)
+                if paged_results.complete:
+                    break
+        finally:
+            # Pages after the last one are not requested, or their results are ignored
+            page_pool.shutdown(wait=False, cancel_futures=True)
+
+    def _search_page(self, search_params):
+        """
+        Request one page of Google Custom Search results.
+
+        :param search_params: Query parameters from _build_search_params()
+        :return: List of search result items (None if the search failed)
+        """
+        with self._stage(STAGE_SEARCH) as search_span:
+            # Reuse recent results for the exact same search
+            if self.search_cache:
+                cached_search_results = self.search_cache.get_search_results(search_params)
+                if cached_search_results is not None:
+                    search_span.mark_cache_hit()
+                    return cached_search_results
+            
+            try:
+                # Send the search request to Google, within the Custom Search quota
+                search_response = self.rate_limiters.google_search().call(
+                    lambda: self._send_search_request(search_params), deadline_at=self.deadline_at
+                )
+                
+                # Extract and return search results
+                search_results = search_response.json().get('items', [])
+                search_span.add_bytes(len(search_response.content))
+                if self.search_cache:
+                    self.search_cache.set_search_results(search_params, search_results)
+                return search_results
+            
+            except (requests.RequestException, DeadlineExceeded, QuotaExhausted) as search_error:
+                # Handle any errors that occur during the search
+                search_span.mark_error(search_error)
+                print(f"Web Search Error: {search_error}")
+                return None
+
+    def _send_search_request(self, search_params):
+        """
+        Send one Google Custom Search request (called by the rate limiter, which retries it).
+
+        :param search_params: Query parameters
+        :return: Tuple of (response, response headers)
+        :raises QuotaExhausted: If the daily quota is used up (retrying would only burn attempts)
+        :raises requests.RequestException: If the request failed
+        """
+        search_response = self.http_pool.get(GOOGLE_SEARCH_URL, params=search_params)
+        if search_response.status_code == 429 and 'per day' in search_response.text:
+            self.rate_limiters.google_search().exhaust_daily_quota()
+            raise QuotaExhausted("Google Custom Search daily quota exhausted")
+        search_response.raise_for_status()  # Raise an error for bad responses
+        return search_response, search_response.headers
+
+    def _build_search_params(self, search_query, max_search_results=None, website_filter=None, recency=None,
+                             start_index=None):
+        """
+        Build the query parameters for a Google Custom Search request.
+
+        :param search_query: Search query (what you want to find)
+        :param max_search_results: Number of search results to return (at most 10 per request)
+        :param website_filter: Optional parameter to search within a specific website
+        :param recency: Optional '[age][period]' recency restriction
+        :param start_index: Rank of the first result to return (None for the first page)
+        :return: Dictionary of query parameters
+        """
         search_params = {
             'key': self.api_key,
             'cx': self.cse_id,
             'q': search_query,
-            'num': max_search_results or self.config['max_search_results']
+            'num': min(max_search_results or self.config['max_search_results'], CSE_PAGE_SIZE)
         }
         
+        # Ask for a later page of results (the first page keeps the parameters, and cache key, it always had)
+        if start_index and start_index > 1:
+            search_params['start'] = start_index
+        
         # Add site filter if specified (like searching only within a specific website)
         if website_filter:
             search_params['siteSearch'] = website_filter
@@ -135,19 +441,16 @@ class BYOBTool:
         if recency:
             search_params['dateRestrict'] = recency
         
-        try:
-            # Send the search request to Google
-            search_response = requests.get(google_search_url, params=search_params)
-            search_response.raise_for_status()  # Raise an error for bad responses
-            
-            # Extract and return search results
-            search_results = search_response.json().get('items', [])
-            return search_results
-        
-        except requests.RequestException as search_error:
-            # Handle any errors that occur during the search
-            print(f"Web Search Error: {search_error}")
-            return []
+        return search_params
+
+    def _search_result_count(self, max_search_results=None):
+        """
+        Number of results a search retrieves.
+
+        :param max_search_results: Optional number requested by the caller
+        :return: Number of search results
+        """
+        return max_search_results or max(self.config['max_search_results'], self.config['search_depth'])
 
     def retrieve_content(self, webpage_url, max_content_chars=None):
         """
@@ -160,28 +463,126 @@ class BYOBTool:
         - Cleans up the text
         - Limits the amount of text to process
 
+        If the page cache is enabled, a recently read page is answered from 
+        disk, and an older one is only downloaded again if the website says 
+        it has changed.
+
         :param webpage_url: Web page URL to scrape
         :param max_content_chars: Maximum number of characters to retrieve
         :return: Cleaned text content
         """
-        try:
-            # Fetch the webpage content
-            webpage_response = requests.get(webpage_url, timeout=10)
-            webpage_response.raise_for_status()
-            
-            # Use BeautifulSoup to parse and extract text
-            webpage_soup = BeautifulSoup(webpage_response.text, 'html.parser')
+        max_content_chars = max_content_chars or self.config['max_content_chars']
+        
+        with self._stage(STAGE_FETCH, url=webpage_url) as fetch_span:
+            # Check whether we have already read this page
+            cached_page = self.page_cache.lookup(
+                webpage_url, max_content_chars, self._extraction_settings()
+            ) if self.page_cache else None
+            if cached_page and cached_page.is_fresh:
+                fetch_span.mark_cache_hit()
+                return cached_page.text
             
-            # Extract text and remove extra whitespace
-            webpage_text = ' '.join(webpage_soup.get_text().split())
+            # Never download past the query's deadline
+            fetch_deadline = self.config['page_fetch_deadline']
+            if self.deadline_at is not None:
+                fetch_deadline = min(fetch_deadline, self.deadline_at - time.monotonic())
+                if fetch_deadline <= 0:
+                    fetch_span.mark_skipped('query deadline')
+                    return None
             
-            # Truncate text to specified maximum length
-            return webpage_text[:max_content_chars or self.config['max_content_chars']]
+            # Stream the page, asking the website to skip it if our copy is still current
+            fetch_result = self.page_fetcher.fetch(
+                webpage_url,
+                self._content_extractor(),
+                max_chars=max_content_chars,
+                max_bytes=self.config['max_page_bytes'],
+                deadline_seconds=fetch_deadline,
+                timeout=self.config['page_fetch_timeout'],
+                headers=cached_page.conditional_headers() if cached_page else None,
+                stop_event=self.latency_budget.collection_stopped if self.latency_budget else None
+            )
+            self._record_fetch(fetch_span, fetch_result)
+            return self._handle_fetch_result(fetch_result, cached_page, max_content_chars)
+
+    def _record_fetch(self, fetch_span, fetch_result):
+        """
+        Add the outcome of a page download, and the time spent parsing it, to the stage metrics.
+
+        :param fetch_span: byob_metrics.StageSpan of the download
+        :param fetch_result: byob_fetch.FetchResult of the download
+        """
+        fetch_span.add_bytes(fetch_result.bytes_downloaded)
+        if fetch_result.not_modified:
+            # The cached copy was confirmed by a 304
+            fetch_span.mark_cache_hit()
+        elif fetch_result.skip_reason:
+            fetch_span.mark_skipped(fetch_result.skip_reason)
+        if fetch_result.parse_seconds:
+            record_stage(self.query_trace, STAGE_PARSE, fetch_result.parse_seconds, url=fetch_result.url)
+
+    def _handle_fetch_result(self, fetch_result, cached_page, max_content_chars):
+        """
+        Turn a page download into text, updating the page cache.
+
+        :param fetch_result: byob_fetch.FetchResult of the download
+        :param cached_page: CachedPage we already had, or None
+        :param max_content_chars: Character limit the page was extracted with
+        :return: Cleaned text content, or None if the page was skipped
+        """
+        if cached_page and fetch_result.not_modified:
+            self.page_cache.mark_revalidated(fetch_result.url, self._extraction_settings())
+            return cached_page.text
         
-        except (requests.RequestException, Exception) as content_retrieval_error:
-            # Handle any errors in retrieving or processing the webpage
-            print(f"Webpage Content Retrieval Error for {webpage_url}: {content_retrieval_error}")
-            return None
+        if fetch_result.text is None:
+            print(f"Skipped webpage {fetch_result.url}: {fetch_result.skip_reason} "
+                  f"(HTTP {fetch_result.status_code})")
+            # An out-of-date copy is better than nothing
+            return cached_page.text if cached_page else None
+        
+        # Remember the page for future queries
+        if self.page_cache:
+            self.page_cache.store(
+                fetch_result.url,
+                fetch_result.text,
+                char_limit=max_content_chars,
+                etag=fetch_result.headers.get('ETag'),
+                last_modified=fetch_result.headers.get('Last-Modified'),
+                refreshed=cached_page is not None,
+                extraction=self._extraction_settings()
+            )
+        return fetch_result.text
+
+    def _extract_webpage_text(self, webpage_html, max_content_chars=None):
+        """
+        Extract readable text from raw webpage HTML.
+
+        :param webpage_html: HTML source of the webpage
+        :param max_content_chars: Maximum number of characters to keep
+        :return: Cleaned text content
+        """
+        return self._content_extractor().extract(webpage_html, max_content_chars or self.config['max_content_chars'])
+
+    def _content_extractor(self):
+        """
+        Create the HTML-to-text engine chosen in the configuration.
+
+        :return: Extraction engine from byob_extract
+        """
+        return get_extractor(
+            self.config['content_extractor'],
+            prefer_main_content=self.config['prefer_main_content']
+        )
+
+    def _extraction_settings(self):
+        """
+        Settings that decide which text is extracted from a page (part of the page cache key).
+
+        :return: Dictionary of extraction settings
+        """
+        return {
+            'extractor': self.config['content_extractor'],
+            'prefer_main_content': self.config['prefer_main_content']
+        }
 
     def summarize_content(self, webpage_content, search_query, max_summary_chars=None):
         """
@@ -189,35 +590,111 @@ class BYOBTool:
 
         This is like having an AI assistant read a long article and 
         create a concise summary that highlights the most important points.
+        If the same text was already summarized for the same query, model and 
+        length, the remembered summary is returned without calling OpenAI.
 
         :param webpage_content: Text content to summarize
         :param search_query: Original search query (for context)
         :param max_summary_chars: Maximum summary length
         :return: Summarized content
         """
+        with self._stage(STAGE_SUMMARIZE, model=self.config['summary_model']) as summary_span:
+            # Reuse an earlier summary of the same page if we have one
+            summary_cache_key = self._summary_cache_key(webpage_content, search_query, max_summary_chars)
+            if summary_cache_key:
+                cached_summary = self.summary_cache.get(summary_cache_key)
+                if cached_summary is not None:
+                    summary_span.mark_cache_hit()
+                    return cached_summary
+            
+            # Nobody is waiting for this summary once the answer is being written
+            if self.latency_budget and self.latency_budget.collection_stopped.is_set():
+                summary_span.mark_skipped('collection stopped')
+                return None
+            
+            # Only send the parts of the page that are relevant to the query
+            relevant_content = self._select_relevant_content(webpage_content, search_query)
+            
+            try:
+                # Use OpenAI to generate a summary
+                summary_response = self._chat_completion(
+                    self.config['summary_model'],  # Use a compact, efficient AI model
+                    self._summary_messages(relevant_content, search_query, max_summary_chars),
+                    (max_summary_chars or self.config['max_summary_chars']) // CHARS_PER_TOKEN
+                )
+                summary_span.record_usage(summary_response.usage, self.config['summary_model'])
+                webpage_summary = summary_response.choices[0].message.content
+                
+                # Remember the summary for future queries
+                if summary_cache_key and webpage_summary:
+                    self.summary_cache.set(summary_cache_key, webpage_summary)
+                return webpage_summary
+            
+            except Exception as summary_generation_error:
+                # Handle any errors in summarization
+                summary_span.mark_error(summary_generation_error)
+                print(f"Content Summarization Error: {summary_generation_error}")
+                return None
+
+    def _summary_cache_key(self, webpage_content, search_query, max_summary_chars=None):
+        """
+        Build the summary cache key for a page, or None if the cache is disabled.
+
+        :param webpage_content: Text content to summarize
+        :param search_query: Original search query (for context)
+        :param max_summary_chars: Maximum summary length
+        :return: Cache key or None
+        """
+        if not self.summary_cache:
+            return None
+        return SummaryCache.make_key(
+            webpage_content,
+            search_query,
+            self.config['summary_model'],
+            max_summary_chars or self.config['max_summary_chars'],
+            content_selection=[self.config['summary_token_budget'], self.config['relevance_chunk_chars']]
+        )
+
+    def _select_relevant_content(self, webpage_content, search_query):
+        """
+        Keep the chunks of a page most relevant to the query, within the summary token budget.
+
+        :param webpage_content: Text content to summarize
+        :param search_query: Query the page is being summarized for
+        :return: Text to send to the summary model
+        """
+        if not self.config['summary_token_budget']:
+            return webpage_content
+        relevant_content, tokens_before, tokens_after = select_relevant_text(
+            webpage_content,
+            search_query,
+            token_budget=self.config['summary_token_budget'],
+            model=self.config['summary_model'],
+            chunk_chars=self.config['relevance_chunk_chars']
+        )
+        self.relevance_stats.record(tokens_before, tokens_after)
+        return relevant_content
+
+    def _summary_messages(self, webpage_content, search_query, max_summary_chars=None):
+        """
+        Build the chat messages used to summarize one webpage.
+
+        :param webpage_content: Text content to summarize
+        :param search_query: Original search query (for context)
+        :param max_summary_chars: Maximum summary length
+        :return: List of chat messages
+        """
         # Create a prompt that guides the AI in summarizing the content
         summary_prompt = (
             f"You are an AI assistant tasked with summarizing content relevant to '{search_query}'. "
             f"Please provide a concise summary in {max_summary_chars or self.config['max_summary_chars']} characters or less."
         )
-        
-        try:
-            # Use OpenAI to generate a summary
-            summary_response = self.openai_client.chat.completions.create(
-                model=self.config['summary_model'],  # Use a compact, efficient AI model
-                messages=[
-                    {"role": "system", "content": summary_prompt},
-                    {"role": "user", "content": webpage_content}
-                ]
-            )
-            return summary_response.choices[0].message.content
-        
-        except Exception as summary_generation_error:
-            # Handle any errors in summarization
-            print(f"Content Summarization Error: {summary_generation_error}")
-            return None
+        return [
+            {"role": "system", "content": summary_prompt},
+            {"role": "user", "content": webpage_content}
+        ]
 
-    def get_search_results(self, search_items, search_query, max_summary_chars=None):
+    def get_search_results(self, search_items, search_query, max_summary_chars=None, later_search_pages=None):
         """
         Process search results by retrieving and summarizing content.
 
@@ -227,34 +704,301 @@ class BYOBTool:
         3. Create a short summary
         4. Compile these summaries into a list
 
+        With 'concurrent_pipeline' enabled, a small team of assistants does this 
+        at the same time: up to 'max_fetch_workers' pages are downloaded and up to 
+        'max_llm_workers' pages are summarized in parallel. Results are still 
+        returned in their original search ranking order.
+
         :param search_items: List of search result items
         :param search_query: Original search query
         :param max_summary_chars: Maximum summary length
+        :param later_search_pages: Optional iterator of further result pages (see iter_search_results())
         :return: List of processed search results
         """
-        processed_search_results = []
-        for result_index, search_result in enumerate(search_items, start=1):
-            webpage_url = search_result.get('link')
-            result_snippet = search_result.get('snippet', '')
+        # Put the results back into the order Google ranked them
+        return sorted(
+            self.iter_search_results(search_items, search_query, max_summary_chars, later_search_pages),
+            key=lambda processed_result: processed_result['result_rank']
+        )
+
+    def iter_search_results(self, search_items, search_query, max_summary_chars=None, later_search_pages=None):
+        """
+        Retrieve and summarize search results, yielding each one as soon as it is ready.
+
+        Results arrive in the order they finish, not in search ranking order; 
+        each carries its 'result_rank' so callers can sort them afterwards.
+        Within a latency budget (see run()), collection stops at the budget's
+        collection deadline or once its summary quorum is met; downloads and
+        summaries still running are then called off.
+
+        With deduplication on, a downloaded page is checked for duplicates
+        only once every better-ranked download has finished, so the copy
+        kept (and summarized) is always the best-ranked one, whichever
+        download was fastest.
+
+        For deep searches, pass the first page of results as 'search_items'
+        and the rest of iter_search_pages() as 'later_search_pages': the
+        first page's webpages are downloaded while later pages are still on
+        their way, and each page joins the pipeline when it arrives.
+
+        :param search_items: List of search result items
+        :param search_query: Original search query
+        :param max_summary_chars: Maximum summary length
+        :param later_search_pages: Optional iterator of further lists of search result items, ranked after these
+        :return: Generator of processed search results
+        """
+        # Fall back to the one-page-at-a-time behaviour when the pipeline is disabled
+        if not self.config['concurrent_pipeline']:
+            if later_search_pages is not None:
+                search_items = list(search_items) + [
+                    search_result for search_page in later_search_pages for search_result in search_page
+                ]
+            yield from self._iter_search_results_serially(search_items, search_query, max_summary_chars)
+            return
+
+        # Workers give up at the collection deadline rather than the query's, leaving time for the answer
+        collect_tool = self._for_collection()
+        latency_budget = self.latency_budget
+        
+        # Two separate worker pools keep slow downloads from starving the OpenAI calls and vice versa
+        fetch_pool = ThreadPoolExecutor(max_workers=self.config['max_fetch_workers'])
+        llm_pool = ThreadPoolExecutor(max_workers=self.config['max_llm_workers'])
+        # Later result pages are waited for on their own thread, alongside the downloads
+        page_pool = ThreadPoolExecutor(max_workers=1) if later_search_pages is not None else None
+        deduplicator = self._new_deduplicator()
+        fetch_futures = {}
+        summary_futures = {}
+        pending_futures = set()
+
+        def start_fetches(search_results, first_rank):
+            # Start downloading every webpage right away (each canonical URL only once)
+            for result_index, search_result in self._results_to_fetch(search_results, deduplicator, first_rank):
+                fetch_future = fetch_pool.submit(collect_tool.retrieve_content, search_result.get('link'))
+                fetch_futures[fetch_future] = (result_index, search_result)
+                pending_futures.add(fetch_future)
+
+        try:
+            start_fetches(search_items, 1)
+            next_rank = len(search_items) + 1
+            page_future = None
+            if page_pool is not None:
+                page_future = page_pool.submit(next, later_search_pages, None)
+                pending_futures.add(page_future)
+            summaries_ready = 0
+
+            while pending_futures:
+                collect_seconds_left = latency_budget.collect_remaining() if latency_budget else None
+                if collect_seconds_left is not None and collect_seconds_left <= 0:
+                    latency_budget.stop_collection(STOP_DEADLINE)
+                    break
+                finished_futures, pending_futures = wait(
+                    pending_futures, timeout=collect_seconds_left, return_when=FIRST_COMPLETED
+                )
+                for finished_future in finished_futures:
+                    if finished_future is page_future:
+                        # Another page of search results arrived: download its webpages too
+                        search_page = finished_future.result()
+                        page_future = None
+                        if search_page is not None:
+                            start_fetches(search_page, next_rank)
+                            next_rank += len(search_page)
+                            page_future = page_pool.submit(next, later_search_pages, None)
+                            pending_futures.add(page_future)
+                    elif finished_future in fetch_futures:
+                        # Hand each webpage to the summarizer as soon as its download finishes,
+                        # so one slow website never holds up the others
+                        result_index, search_result = fetch_futures[finished_future]
+                        webpage_content = finished_future.result()
+                        downloaded_page = None
+                        if webpage_content is None:
+                            self._record_source(result_index, search_result, SOURCE_SKIPPED, SKIP_FETCH_FAILED)
+                        else:
+                            downloaded_page = (result_index, search_result, webpage_content)
+                        for result_index, search_result, webpage_content in self._release_downloads(
+                            deduplicator, result_index, downloaded_page
+                        ):
+                            if self._is_duplicate_page(deduplicator, result_index, search_result, webpage_content):
+                                self._record_source(result_index, search_result, SOURCE_SKIPPED, SKIP_DUPLICATE)
+                                continue
+                            summary_future = llm_pool.submit(
+                                collect_tool.summarize_content, webpage_content, search_query, max_summary_chars
+                            )
+                            summary_futures[summary_future] = (result_index, search_result)
+                            pending_futures.add(summary_future)
+                    else:
+                        # A summary is ready
+                        result_index, search_result = summary_futures[finished_future]
+                        webpage_summary = finished_future.result()
+                        if webpage_summary:
+                            summaries_ready += 1
+                            self._record_source(result_index, search_result, SOURCE_INCLUDED)
+                        else:
+                            self._record_source(result_index, search_result, SOURCE_SKIPPED, SKIP_SUMMARY_FAILED)
+                        yield self._build_processed_result(
+                            result_index, search_result, webpage_summary,
+                            self._duplicate_urls(deduplicator, result_index)
+                        )
+                
+                # Enough pages are summarized: write the answer from them
+                if latency_budget and pending_futures and latency_budget.quorum_met(summaries_ready):
+                    latency_budget.stop_collection(STOP_QUORUM)
+                    break
+            
+            if latency_budget:
+                latency_budget.stop_collection(STOP_COMPLETE)
+                latency_budget.record_unfinished(
+                    [fetch_futures.get(pending_future) or summary_futures[pending_future]
+                     for pending_future in pending_futures if pending_future is not page_future]
+                    + [(result_index, search_result)
+                       for result_index, search_result, _ in (deduplicator.held_pages() if deduplicator else [])]
+                )
+        finally:
+            # If the caller or the budget stops early, drop the work that has not started yet
+            # (and, within a budget, call off downloads and summaries still running)
+            if latency_budget:
+                latency_budget.collection_stopped.set()
+            fetch_pool.shutdown(wait=False, cancel_futures=True)
+            llm_pool.shutdown(wait=False, cancel_futures=True)
+            if page_pool is not None:
+                page_pool.shutdown(wait=False)
+
+    def _iter_search_results_serially(self, search_items, search_query, max_summary_chars=None):
+        """
+        Process search results one at a time (retrieve, then summarize, then move on).
+
+        :param search_items: List of search result items
+        :param search_query: Original search query
+        :param max_summary_chars: Maximum summary length
+        :return: Generator of processed search results
+        """
+        collect_tool = self._for_collection()
+        latency_budget = self.latency_budget
+        deduplicator = self._new_deduplicator()
+        results_to_fetch = self._results_to_fetch(search_items, deduplicator)
+        summaries_ready = 0
+        for result_position, (result_index, search_result) in enumerate(results_to_fetch):
+            # Stop at the collection deadline or once enough pages are summarized
+            if latency_budget:
+                stop_reason = STOP_QUORUM if latency_budget.quorum_met(summaries_ready) else None
+                collect_seconds_left = latency_budget.collect_remaining()
+                if collect_seconds_left is not None and collect_seconds_left <= 0:
+                    stop_reason = STOP_DEADLINE
+                if stop_reason:
+                    latency_budget.stop_collection(stop_reason)
+                    latency_budget.record_unfinished(results_to_fetch[result_position:])
+                    return
             
             # Retrieve full content of the webpage
-            webpage_content = self.retrieve_content(webpage_url)
+            webpage_content = collect_tool.retrieve_content(search_result.get('link'))
             if webpage_content is None:
+                self._record_source(result_index, search_result, SOURCE_SKIPPED, SKIP_FETCH_FAILED)
+                continue
+            if self._is_duplicate_page(deduplicator, result_index, search_result, webpage_content):
+                self._record_source(result_index, search_result, SOURCE_SKIPPED, SKIP_DUPLICATE)
                 continue
             
             # Summarize the content
-            webpage_summary = self.summarize_content(webpage_content, search_query, max_summary_chars)
-            
-            # Create a dictionary with result details
-            processed_result = {
-                'result_rank': result_index,
-                'webpage_url': webpage_url,
-                'result_title': result_snippet,
-                'webpage_summary': webpage_summary
-            }
-            processed_search_results.append(processed_result)
-        
-        return processed_search_results
+            webpage_summary = collect_tool.summarize_content(webpage_content, search_query, max_summary_chars)
+            if webpage_summary:
+                summaries_ready += 1
+                self._record_source(result_index, search_result, SOURCE_INCLUDED)
+            else:
+                self._record_source(result_index, search_result, SOURCE_SKIPPED, SKIP_SUMMARY_FAILED)
+            yield self._build_processed_result(
+                result_index, search_result, webpage_summary, self._duplicate_urls(deduplicator, result_index)
+            )
+        if latency_budget:
+            latency_budget.stop_collection(STOP_COMPLETE)
+
+    def _record_source(self, result_index, search_result, status, skip_reason=None):
+        """
+        Note in the latency budget's report whether a search result made it into the answer.
+
+        :param result_index: Search rank of the result
+        :param search_result: Raw search result item from Google
+        :param status: byob_budget.SOURCE_INCLUDED or SOURCE_SKIPPED
+        :param skip_reason: Why the result was skipped
+        """
+        if self.latency_budget:
+            self.latency_budget.record_source(result_index, search_result.get('link'), status, skip_reason)
+
+    def _build_processed_result(self, result_index, search_result, webpage_summary, duplicate_urls=None):
+        """
+        Create a dictionary with the details of one processed search result.
+
+        :param result_index: Position of the result in the search ranking (starting at 1)
+        :param search_result: Raw search result item from Google
+        :param webpage_summary: AI summary of the webpage
+        :param duplicate_urls: URLs of other copies of the same page, cited alongside it
+        :return: Processed search result dictionary
+        """
+        return {
+            'result_rank': result_index,
+            'webpage_url': search_result.get('link'),
+            'result_title': search_result.get('snippet', ''),
+            'webpage_summary': webpage_summary,
+            'duplicate_urls': duplicate_urls if duplicate_urls is not None else []
+        }
+
+    def _new_deduplicator(self):
+        """
+        Start duplicate detection for one query's results.
+
+        :return: PageDeduplicator, or None if deduplication is disabled
+        """
+        if not self.config['dedup_enabled']:
+            return None
+        return PageDeduplicator(self.config['dedup_similarity'], stats=self.dedup_stats)
+
+    def _results_to_fetch(self, search_items, deduplicator, first_rank=1):
+        """
+        Pick the search results to download, skipping repeated canonical URLs.
+
+        :param search_items: List of search result items
+        :param deduplicator: PageDeduplicator for this query, or None
+        :param first_rank: Search rank of the first item (above 1 for later pages of results)
+        :return: List of (result rank, search result)
+        """
+        if deduplicator is None:
+            return list(enumerate(search_items, start=first_rank))
+        return deduplicator.filter_urls(search_items, first_rank)
+
+    def _release_downloads(self, deduplicator, result_index, downloaded_page=None):
+        """
+        Pass a finished download on for duplicate checks, in search ranking order.
+
+        :param deduplicator: PageDeduplicator for this query, or None
+        :param result_index: Search rank of the finished download
+        :param downloaded_page: Anything standing for the downloaded page, or None if the download failed
+        :return: List of downloaded pages that can be checked now (see PageDeduplicator.release_in_rank_order)
+        """
+        if deduplicator is None:
+            return [downloaded_page] if downloaded_page is not None else []
+        return deduplicator.release_in_rank_order(result_index, downloaded_page)
+
+    def _is_duplicate_page(self, deduplicator, result_index, search_result, webpage_content):
+        """
+        Check whether a downloaded page is a copy of one already being summarized.
+
+        :param deduplicator: PageDeduplicator for this query, or None
+        :param result_index: Search rank of the page
+        :param search_result: Raw search result item from Google
+        :param webpage_content: Extracted page text
+        :return: True if the page should be skipped
+        """
+        if deduplicator is None:
+            return False
+        return deduplicator.check_content(result_index, search_result.get('link'), webpage_content) is not None
+
+    def _duplicate_urls(self, deduplicator, result_index):
+        """
+        URLs folded into a kept result.
+
+        :param deduplicator: PageDeduplicator for this query, or None
+        :param result_index: Search rank of the kept page
+        :return: List of duplicate URLs, or None without deduplication
+        """
+        return deduplicator.duplicates_of(result_index) if deduplicator else None
 
     def generate_rag_response(self, original_search_query, processed_search_results):
         """
@@ -271,28 +1015,44 @@ class BYOBTool:
         :param processed_search_results: Processed search results
         :return: Detailed response with citations
         """
+        with self._stage(STAGE_GENERATE, model=RESPONSE_MODEL) as generate_span:
+            try:
+                # Use OpenAI to generate a comprehensive response
+                answer_messages = self._rag_messages(original_search_query, processed_search_results, generate_span)
+                rag_response = self._chat_completion(
+                    RESPONSE_MODEL,  # Use a more advanced model for complex reasoning
+                    answer_messages,
+                    RESPONSE_COMPLETION_TOKENS,
+                    prompt_tokens=self._answer_prompt_tokens(answer_messages, generate_span),
+                    temperature=0  # Low temperature for more focused, factual response
+                )
+                generate_span.record_usage(rag_response.usage, RESPONSE_MODEL)
+                return rag_response.choices[0].message.content
+            
+            except Exception as rag_response_generation_error:
+                # Handle any errors in response generation
+                generate_span.mark_error(rag_response_generation_error)
+                print(f"RAG Response Generation Error: {rag_response_generation_error}")
+                return None
+
+    def _rag_messages(self, original_search_query, processed_search_results, generate_span=None):
+        """
+        Build the chat messages used to write the RAG response.
+
+        :param original_search_query: Original user query
+        :param processed_search_results: Processed search results
+        :param generate_span: Optional StageSpan to record the packing report in
+        :return: List of chat messages
+        """
         # Create a prompt to guide the AI in generating a comprehensive response
         rag_response_prompt = (
-            f"Based on the search results for the query: '{original_search_query}', "
-            "provide a detailed, chronological response. Cite all sources together with the relevant line items, and derive meaningful insights and implications."
+            f"Based on the numbered search results for the query: '{original_search_query}', "
+            "provide a detailed, chronological response. Cite all sources by their [number] together with the relevant line items, and derive meaningful insights and implications."
         )
-        
-        try:
-            # Use OpenAI to generate a comprehensive response
-            rag_response = self.openai_client.chat.completions.create(
-                model="gpt-4o",  # Use a more advanced model for complex reasoning
-                messages=[
-                    {"role": "system", "content": rag_response_prompt},
-                    {"role": "user", "content": json.dumps(processed_search_results)}
-                ],
-                temperature=0  # Low temperature for more focused, factual response
-            )
-            return rag_response.choices[0].message.content
-        
-        except Exception as rag_response_generation_error:
-            # Handle any errors in response generation
-            print(f"RAG Response Generation Error: {rag_response_generation_error}")
-            return None
+        return [
+            {"role": "system", "content": rag_response_prompt},
+            {"role": "user", "content": self._pack_sources(processed_search_results, generate_span)}
+        ]
 
     def refine_search_query(self, search_query):
         """
@@ -305,15 +1065,129 @@ class BYOBTool:
         :param search_query: User's search query
         :return: Refined search query
         """
-        # Use OpenAI to refine the search query
-        refined_search_query = self.openai_client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[
-                {"role": "system", "content": "Provide a google search term based on search query in 3-4 words"},
-                {"role": "user", "content": search_query}
-            ]
-        ).choices[0].message.content
-        return refined_search_query
+        return self.refine_search_terms(search_query)[0]
+
+    def refine_search_terms(self, search_query, term_count=1):
+        """
+        Turn the user's query into one or more short search terms with a single OpenAI call.
+
+        If refinement fails, the user's own query is returned so the search
+        can still go ahead.
+
+        :param search_query: User's search query
+        :param term_count: Number of different search terms wanted (the first is the best one)
+        :return: List of at least one search term
+        """
+        # Several terms are remembered separately from the single refined term
+        refine_cache_model = REFINE_MODEL if term_count == 1 else f"{REFINE_MODEL}/{term_count}"
+        with self._stage(STAGE_REFINE, model=REFINE_MODEL, terms=term_count) as refine_span:
+            # Reuse the refinement of a query we have seen before
+            if self.search_cache:
+                cached_refined_query = self.search_cache.get_refined_term(search_query, refine_cache_model)
+                if cached_refined_query is not None:
+                    refine_span.mark_cache_hit()
+                    return self._split_search_terms(cached_refined_query, term_count) or [search_query]
+            
+            try:
+                # Use OpenAI to refine the search query
+                refine_response = self._chat_completion(
+                    REFINE_MODEL, self._refine_messages(search_query, term_count), REFINE_COMPLETION_TOKENS * term_count
+                )
+                refine_span.record_usage(refine_response.usage, REFINE_MODEL)
+                refined_search_query = refine_response.choices[0].message.content
+            
+            except Exception as refine_error:
+                # Search with the user's own words rather than failing the whole query
+                refine_span.mark_error(refine_error)
+                print(f"Query Refinement Error: {refine_error}")
+                return [search_query]
+            
+            if self.search_cache and refined_search_query:
+                self.search_cache.set_refined_term(search_query, refine_cache_model, refined_search_query)
+            return self._split_search_terms(refined_search_query, term_count) or [search_query]
+
+    @staticmethod
+    def _split_search_terms(refined_search_query, term_count):
+        """
+        Split a refinement response into its search terms.
+
+        :param refined_search_query: Text returned by the refinement model
+        :param term_count: Number of search terms asked for
+        :return: List of search terms (empty if there are none)
+        """
+        if term_count == 1:
+            return [refined_search_query] if refined_search_query else []
+        return parse_search_terms(refined_search_query, term_count)
+
+    def _refine_messages(self, search_query, term_count=1):
+        """
+        Build the chat messages used to turn a user query into short search terms.
+
+        :param search_query: User's search query
+        :param term_count: Number of different search terms wanted
+        :return: List of chat messages
+        """
+        refine_prompt = "Provide a google search term based on search query in 3-4 words"
+        if term_count > 1:
+            refine_prompt = (
+                f"Provide {term_count} different google search terms based on search query, 3-4 words each, "
+                "one per line, best first"
+            )
+        return [
+            {"role": "system", "content": refine_prompt},
+            {"role": "user", "content": search_query}
+        ]
+
+    def fan_out_search(self, search_query, website_filter=None, recency=None):
+        """
+        Search the user's query while it is being refined, then the refined terms, and fuse the rankings.
+
+        The raw query's search overlaps the refinement round trip. Once the
+        refined term (plus 'query_rewrites' extra terms) is known, those are
+        searched in parallel, and all result lists are merged with
+        reciprocal rank fusion and de-duplicated by URL. If refinement is
+        still running 'speculative_refine_wait' seconds after the raw
+        results arrived, the raw results are used on their own.
+
+        :param search_query: User's search query
+        :param website_filter: Optional website to filter search results
+        :param recency: Optional '[age][period]' recency restriction
+        :return: Tuple of (refined search term, list of search terms searched, fused search results)
+        """
+        search_options = {'website_filter': website_filter, 'recency': recency}
+        search_pool = ThreadPoolExecutor(max_workers=2 + self.config['query_rewrites'])
+        try:
+            raw_search_future = search_pool.submit(self.search, search_query, **search_options)
+            refine_future = search_pool.submit(self.refine_search_terms, search_query, 1 + self.config['query_rewrites'])
+            
+            # Refinement only holds up the search for a limited time once the raw results are in
+            refine_wait = self.config['speculative_refine_wait']
+            wait([raw_search_future])
+            if refine_wait is not None and not wait([refine_future], timeout=refine_wait).done:
+                print(f"Query refinement took longer than {refine_wait}s; using the raw query's results")
+                return search_query, [search_query], raw_search_future.result()
+            refined_search_terms = refine_future.result()
+            
+            # Search every term that differs from the raw query at the same time
+            searched_terms = [search_query]
+            term_search_futures = []
+            for refined_search_term in refined_search_terms:
+                if refined_search_term.lower() in (searched_term.lower() for searched_term in searched_terms):
+                    continue
+                searched_terms.append(refined_search_term)
+                term_search_futures.append(search_pool.submit(self.search, refined_search_term, **search_options))
+            
+            # The refined term's list comes first, so it wins ties as the single-term pipeline's results would
+            ranked_lists = [term_search_future.result() for term_search_future in term_search_futures]
+            ranked_lists.append(raw_search_future.result())
+            fused_search_results = reciprocal_rank_fusion(
+                ranked_lists, k=self.config['rrf_k'],
+                limit=self._search_result_count()
+            )
+            return refined_search_terms[0], searched_terms, fused_search_results
+        finally:
+            # A refinement that is still running finishes in the background
+            search_pool.shutdown(wait=False)
 
     def generate_comprehensive_response(self, search_query, processed_search_results):
         """
@@ -329,33 +1203,356 @@ class BYOBTool:
         :param processed_search_results: Processed search results
         :return: Detailed response with citations
         """
+        with self._stage(STAGE_GENERATE, model=RESPONSE_MODEL) as generate_span:
+            try:
+                # Use OpenAI to generate a comprehensive response
+                answer_messages = self._comprehensive_messages(search_query, processed_search_results, generate_span)
+                comprehensive_response = self._chat_completion(
+                    RESPONSE_MODEL,  # Use a more advanced model for complex reasoning
+                    answer_messages,
+                    RESPONSE_COMPLETION_TOKENS,
+                    prompt_tokens=self._answer_prompt_tokens(answer_messages, generate_span),
+                    temperature=0  # Low temperature for more focused, factual response
+                )
+                generate_span.record_usage(comprehensive_response.usage, RESPONSE_MODEL)
+                return comprehensive_response.choices[0].message.content
+            
+            except Exception as comprehensive_response_generation_error:
+                # Handle any errors in response generation
+                generate_span.mark_error(comprehensive_response_generation_error)
+                print(f"Comprehensive Response Generation Error: {comprehensive_response_generation_error}")
+                return None
+
+    def stream_comprehensive_response(self, search_query, processed_search_results):
+        """
+        Generate the comprehensive response piece by piece as OpenAI writes it.
+
+        Streamed responses carry no 'usage' field, so the stage metrics count
+        the prompt and answer tokens locally (marked 'tokens_estimated').
+
+        :param search_query: Original user query
+        :param processed_search_results: Processed search results
+        :return: Generator of response text fragments
+        """
+        with self._stage(STAGE_GENERATE, model=RESPONSE_MODEL, streamed=True) as generate_span:
+            comprehensive_messages = self._comprehensive_messages(search_query, processed_search_results, generate_span)
+            prompt_tokens = self._answer_prompt_tokens(comprehensive_messages, generate_span)
+            response_fragments = []
+            try:
+                # Ask OpenAI to send the response as it is being generated
+                response_stream = self._chat_completion(
+                    RESPONSE_MODEL,  # Use a more advanced model for complex reasoning
+                    comprehensive_messages,
+                    RESPONSE_COMPLETION_TOKENS,
+                    prompt_tokens=prompt_tokens,
+                    temperature=0,  # Low temperature for more focused, factual response
+                    stream=True
+                )
+                for response_chunk in response_stream:
+                    if response_chunk.choices and response_chunk.choices[0].delta.content:
+                        if not response_fragments:
+                            generate_span.attributes['first_token_seconds'] = round(generate_span.elapsed(), 4)
+                        response_fragments.append(response_chunk.choices[0].delta.content)
+                        yield response_chunk.choices[0].delta.content
+            
+            except Exception as comprehensive_response_generation_error:
+                # Handle any errors in response generation
+                generate_span.mark_error(comprehensive_response_generation_error)
+                print(f"Comprehensive Response Generation Error: {comprehensive_response_generation_error}")
+            
+            finally:
+                generate_span.record_tokens(
+                    prompt_tokens,
+                    count_tokens(''.join(response_fragments), RESPONSE_MODEL),
+                    RESPONSE_MODEL,
+                    estimated=True
+                )
+
+    def _comprehensive_messages(self, search_query, processed_search_results, generate_span=None):
+        """
+        Build the chat messages used to write the final comprehensive response.
+
+        :param search_query: Original user query
+        :param processed_search_results: Processed search results
+        :param generate_span: Optional StageSpan to record the packing report in
+        :return: List of chat messages
+        """
         # Create a prompt to guide the AI in generating a comprehensive response
         comprehensive_response_prompt = (
-            f"Based on the search results for the query: '{search_query}', "
-            "provide a detailed, chronological response. Cite all sources at the end of your answer."
+            f"Based on the numbered search results for the query: '{search_query}', "
+            "provide a detailed, chronological response. Cite sources by their [number] and list all cited sources with their URLs at the end of your answer."
         )
+        return [
+            {"role": "system", "content": comprehensive_response_prompt},
+            {"role": "user", "content": self._pack_sources(processed_search_results, generate_span)}
+        ]
+
+    @staticmethod
+    def _answer_prompt_tokens(answer_messages, generate_span):
+        """
+        Count the prompt tokens of an answer request without tokenizing the packed sources again.
+
+        :param answer_messages: Messages from _comprehensive_messages() or _rag_messages()
+        :param generate_span: StageSpan the messages were built with (holds the packing report)
+        :return: Number of prompt tokens
+        """
+        return count_tokens(answer_messages[0]['content'], RESPONSE_MODEL) + generate_span.attributes['context_tokens']
+
+    def _pack_sources(self, processed_search_results, generate_span=None):
+        """
+        Pack the processed search results into numbered sources within 'context_token_budget'.
+
+        :param processed_search_results: Processed search results
+        :param generate_span: Optional StageSpan to record the packing report in
+        :return: Source text for the answer prompt
+        """
+        source_text, pack_report = pack_sources(
+            processed_search_results, self.config['context_token_budget'], RESPONSE_MODEL,
+            self.config['context_min_source_tokens']
+        )
+        if self.config['context_json_baseline']:
+            pack_report['json_tokens'] = json_baseline_tokens(processed_search_results, RESPONSE_MODEL)
+        self.context_stats.record(pack_report)
+        if generate_span is not None:
+            generate_span.attributes.update(pack_report)
+        return source_text or "No search results could be read."
+
+    def _chat_completion(self, model, messages, expected_completion_tokens, prompt_tokens=None,
+                         **request_options):
+        """
+        Send a chat completion request through the model's rate limiter.
+
+        The call waits for request and token capacity, is retried with
+        backoff when OpenAI throttles it or fails transiently, and gives up
+        at the query deadline.
+
+        :param model: OpenAI model
+        :param messages: Chat messages
+        :param expected_completion_tokens: Completion tokens to reserve until the real count is known
+        :param prompt_tokens: Prompt tokens, if already counted (default: counted from the messages)
+        :param request_options: Further create() arguments (e.g. temperature, stream=True)
+        :return: ChatCompletion, or a response stream if stream=True
+        :raises DeadlineExceeded: If the call could not be made before the query deadline
+        """
+        model_limiter = self.rate_limiters.openai(model)
+        if prompt_tokens is None:
+            prompt_tokens = sum(count_tokens(message['content'], model) for message in messages)
+        estimated_tokens = prompt_tokens + expected_completion_tokens
+        if self.deadline_at is not None:
+            # A call that cannot finish before the deadline is abandoned rather than waited for
+            request_options.setdefault('timeout', max(1.0, self.deadline_at - time.monotonic()))
         
-        try:
-            # Use OpenAI to generate a comprehensive response
-            comprehensive_response = self.openai_client.chat.completions.create(
-                model="gpt-4o",  # Use a more advanced model for complex reasoning
-                messages=[
-                    {"role": "system", "content": comprehensive_response_prompt},
-                    {"role": "user", "content": json.dumps(processed_search_results)}
-                ],
-                temperature=0  # Low temperature for more focused, factual response
+        def send_completion_request():
+            if request_options.get('stream'):
+                response_stream = self._limited_openai_client.chat.completions.create(
+                    model=model, messages=messages, **request_options
+                )
+                return response_stream, response_stream.response.headers
+            raw_response = self._limited_openai_client.chat.completions.with_raw_response.create(
+                model=model, messages=messages, **request_options
             )
-            return comprehensive_response.choices[0].message.content
+            return raw_response.parse(), raw_response.headers
         
-        except Exception as comprehensive_response_generation_error:
-            # Handle any errors in response generation
-            print(f"Comprehensive Response Generation Error: {comprehensive_response_generation_error}")
-            return None
+        chat_completion = model_limiter.call(send_completion_request, estimated_tokens, self.deadline_at)
+        if getattr(chat_completion, 'usage', None):
+            model_limiter.settle_tokens(estimated_tokens, chat_completion.usage.total_tokens)
+        return chat_completion
+
+    @staticmethod
+    def _query_config(config=None, latency_budget=None, summary_quorum=None):
+        """
+        Combine per-call configuration with the latency budget arguments of run().
+
+        :param config: Optional configuration dictionary
+        :param latency_budget: Optional seconds the whole query may take
+        :param summary_quorum: Optional number of summaries to write the answer from
+        :return: Configuration dictionary (None if there is nothing to override)
+        """
+        budget_config = {
+            config_key: config_value
+            for config_key, config_value in (('latency_budget', latency_budget), ('summary_quorum', summary_quorum))
+            if config_value is not None
+        }
+        return {**(config or {}), **budget_config} or None
+
+    def _refine_and_search(self, search_query, website_filter=None, recency=None):
+        """
+        Run the front of the pipeline: refinement and search.
+
+        :param search_query: User's search query
+        :param website_filter: Optional website to filter search results
+        :param recency: Optional '[age][period]' recency restriction
+        :return: Tuple of (refined search term, list of search terms searched, first page of search results,
+                 iterator of later result pages or None)
+        """
+        if self.config['speculative_search']:
+            return self.fan_out_search(search_query, website_filter=website_filter, recency=recency) + (None,)
+        refined_search_query = self.refine_search_query(search_query)
+        
+        # Processing starts with the first page of results; deeper pages join the pipeline as they arrive
+        search_pages = self.iter_search_pages(refined_search_query, website_filter=website_filter, recency=recency)
+        return refined_search_query, [refined_search_query], next(search_pages), search_pages
+
+    @staticmethod
+    def _track_arrivals(search_pages, arrived_pages):
+        """
+        Pass pages of search results through, adding each to a list as it arrives.
+
+        :param search_pages: Iterator of lists of search result items
+        :param arrived_pages: List the pages are appended to
+        :return: Generator of the same pages
+        """
+        for search_page in search_pages:
+            arrived_pages.append(search_page)
+            yield search_page
+
+    def with_config(self, config=None):
+        """
+        Create a copy of the tool with extra configuration.
+
+        The copy shares this tool's OpenAI client and HTTP connection pools, so 
+        it is cheap enough to create for every request.
+
+        :param config: Configuration dictionary to apply on top of the current one
+        :return: BYOBTool instance (this one if there is nothing to override)
+        """
+        if not config:
+            return self
+        tool_copy = copy.copy(self)
+        tool_copy.config = {**self.config, **config}
+        return tool_copy
+
+    def for_query(self, query_trace):
+        """
+        Create a copy of the tool for one query: it records its stages in the
+        query trace, stops waiting on rate limits at the query deadline and
+        keeps to the 'latency_budget' / 'summary_quorum' if either is set.
+
+        Pages are fetched and summarized on worker threads, so the trace,
+        deadline and budget travel with the copy rather than with the thread.
+
+        :param query_trace: byob_metrics.QueryTrace of the query
+        :return: BYOBTool instance
+        """
+        tool_copy = copy.copy(self)
+        tool_copy.query_trace = query_trace
+        tool_copy.deadline_at = time.monotonic() + self.config['query_deadline'] \
+            if self.config['query_deadline'] else None
+        tool_copy.latency_budget = None
+        if self.config['latency_budget'] or self.config['summary_quorum']:
+            tool_copy.latency_budget = LatencyBudget(
+                self.config['latency_budget'], self.config['summary_quorum'], self.config['generation_reserve']
+            )
+            if tool_copy.latency_budget.deadline_at is not None:
+                tool_copy.deadline_at = min(
+                    tool_copy.deadline_at or tool_copy.latency_budget.deadline_at,
+                    tool_copy.latency_budget.deadline_at
+                )
+        return tool_copy
+
+    def _for_collection(self):
+        """
+        Create the copy that downloads and summarizes pages within a latency budget.
+
+        Its deadline is the budget's collection deadline, so rate limit waits,
+        downloads and OpenAI calls of the collection phase end in time to
+        write the answer.
+
+        :return: BYOBTool instance (this one without a time budget)
+        """
+        if not self.latency_budget or self.latency_budget.collect_deadline_at is None:
+            return self
+        tool_copy = copy.copy(self)
+        tool_copy.deadline_at = min(self.deadline_at or self.latency_budget.collect_deadline_at,
+                                    self.latency_budget.collect_deadline_at)
+        return tool_copy
+
+    def _stage(self, stage, **attributes):
+        """
+        Start measuring a pipeline stage of the current query.
+
+        Outside run() (for example in batch mode) the stage is still counted
+        in the process-wide metrics, just not in a per-query trace.
+
+        :param stage: Stage name from byob_metrics
+        :param attributes: Extra details to keep with the stage
+        :return: byob_metrics.StageSpan (use it in a 'with' block)
+        """
+        return stage_span(self.query_trace, stage, **attributes)
+
+    def get_cache_stats(self):
+        """
+        Report how effective the local caches are.
+
+        :return: Dictionary of statistics for each enabled cache
+        """
+        return {
+            'page_cache': self.page_cache.get_stats() if self.page_cache else None,
+            'summary_cache': self.summary_cache.get_stats() if self.summary_cache else None,
+            'search_cache': self.search_cache.get_stats() if self.search_cache else None
+        }
+
+    def get_pool_stats(self):
+        """
+        Report how many requests and new connections each host has seen.
 
-    def run(self, search_query, website_filter=None, config=None, recency=None):
+        :return: Dictionary of connection pool statistics
+        """
+        return self.http_pool.get_stats()
+
+    def get_context_stats(self):
+        """
+        Report how the answer prompts' sources were packed.
+
+        :return: Dictionary of statistics (see byob_context.ContextStats)
+        """
+        return self.context_stats.get_stats()
+
+    def get_dedup_stats(self):
+        """
+        Report how many duplicate pages were skipped and how many OpenAI calls that saved.
+
+        :return: Dictionary of duplicate detection statistics
+        """
+        return self.dedup_stats.get_stats()
+
+    def get_relevance_stats(self):
+        """
+        Report how many summary prompt tokens chunk selection saved.
+
+        :return: Dictionary of token counts before and after selection
+        """
+        return self.relevance_stats.get_stats()
+
+    def get_rate_limit_stats(self):
+        """
+        Report the current OpenAI / Google limits and how often calls were throttled, retried or timed out.
+
+        :return: Dictionary of statistics per service
+        """
+        return self.rate_limiters.get_stats()
+
+    def get_fetch_stats(self):
+        """
+        Report how much webpage data was downloaded and how many pages were skipped.
+
+        :return: Dictionary of download statistics
+        """
+        return self.fetch_stats.snapshot()
+
+    def run(self, search_query, website_filter=None, config=None, recency=None, query_trace=None,
+            latency_budget=None, summary_quorum=None):
         """
         Main method to execute the BYOB search tool.
 
+        Every stage is measured in a byob_metrics.QueryTrace; pass one in to
+        read the per-query breakdown (trace.summary()) afterwards.
+
+        With a latency budget or summary quorum, the answer is written from
+        the pages summarized when the budget's collection deadline passes or
+        the quorum is met; the rest are skipped, and the response's 'sources'
+        says which results were included and why others were not.
+
         :param search_query: User's search query
         :param website_filter: Optional website to filter search results
         :param config: Optional configuration dictionary to override defaults
@@ -371,40 +1568,168 @@ class BYOBTool:
                         - 'w1': Last week
                         - 'd7': Last 7 days
                         - 'm3': Last 3 months
+        :param query_trace: Optional byob_metrics.QueryTrace to record the stages in
+        :param latency_budget: Optional seconds the whole query may take (overrides 'latency_budget')
+        :param summary_quorum: Optional number of summaries to write the answer from (overrides 'summary_quorum')
         :return: Comprehensive search results
         """
-        # Create a new instance with optional configuration
-        byob_instance = BYOBTool(config=config)
+        # Apply any per-call configuration without rebuilding clients or connection pools,
+        # on a copy that records its stages in this query's trace and keeps to its deadline
+        query_trace = query_trace or QueryTrace(search_query)
+        byob_instance = self.with_config(
+            self._query_config(config, latency_budget, summary_quorum)
+        ).for_query(query_trace)
+        query_outcome = OUTCOME_ERROR
+        try:
+            # Refine the search query using AI and search with the refined term
+            # (in speculative mode also with the raw query and any rewrites, fused into one ranking)
+            refined_search_query, searched_terms, search_result_items, later_search_pages = \
+                byob_instance._refine_and_search(
+                    search_query,
+                    website_filter=website_filter or byob_instance.config['website_filter'],
+                    recency=recency or byob_instance.config['recency']
+                )
+            print(f"Search parameters: query={refined_search_query}, recency={recency or byob_instance.config['recency']}")
 
-        # Refine the search query using AI
-        refined_search_query = byob_instance.refine_search_query(search_query)
+            # Process search results
+            processed_search_results = byob_instance.get_search_results(
+                search_items=search_result_items, 
+                search_query=refined_search_query,
+                later_search_pages=later_search_pages
+            )
+            if byob_instance.summary_cache:
+                print(f"Summary cache hit rate: {byob_instance.summary_cache.get_stats()['hit_rate']:.0%}")
 
-        # Perform web search using the refined search term
-        search_result_items = byob_instance.search(
-            search_query=refined_search_query, 
-            website_filter=website_filter or byob_instance.config['website_filter'],
-            recency=recency or byob_instance.config['recency']
-        )
-        print(f"Search parameters: query={refined_search_query}, recency={recency or byob_instance.config['recency']}")
+            # Generate comprehensive RAG response
+            comprehensive_rag_response = byob_instance.generate_comprehensive_response(
+                search_query=refined_search_query,
+                processed_search_results=processed_search_results
+            )
+            query_outcome = OUTCOME_OK
 
-        # Process search results
-        processed_search_results = byob_instance.get_search_results(
-            search_items=search_result_items, 
-            search_query=refined_search_query
-        )
+            # Return structured search results
+            search_response = {
+                "refined_search_term": refined_search_query,
+                "comprehensive_rag_response": comprehensive_rag_response,
+                "processed_search_results": processed_search_results
+            }
+            if byob_instance.config['speculative_search']:
+                search_response["search_terms"] = searched_terms
+            if byob_instance.latency_budget:
+                search_response["sources"] = byob_instance.latency_budget.report()
+            return search_response
+        finally:
+            query_trace.finish(query_outcome)
 
-        # Generate comprehensive RAG response
-        comprehensive_rag_response = byob_instance.generate_comprehensive_response(
-            search_query=refined_search_query,
-            processed_search_results=processed_search_results
-        )
+    def run_stream(self, search_query, website_filter=None, config=None, recency=None, query_trace=None,
+                   latency_budget=None, summary_quorum=None):
+        """
+        Execute the BYOB search tool, reporting progress as each step finishes.
 
-        # Return structured search results
-        return {
-            "refined_search_term": refined_search_query,
-            "comprehensive_rag_response": comprehensive_rag_response,
-            "processed_search_results": processed_search_results
-        }
+        Instead of waiting for the whole report, the caller receives a series 
+        of (event, data) pairs:
+        - ('refined', {'refined_search_term': ...}) once the query is refined (in speculative
+          mode once every search term has been searched, with the 'search_terms' list)
+        - ('search_result', {...}) for each search hit (hits on deeper pages of results
+          are reported when their page arrives, while earlier pages are being summarized)
+        - ('summary', processed_result) for each page, as soon as it is summarized
+        - ('answer_delta', {'content': ...}) for each fragment of the final answer
+        - ('done', {...}) with the same structure run() returns
+
+        :param search_query: User's search query
+        :param website_filter: Optional website to filter search results
+        :param config: Optional configuration dictionary to override defaults
+        :param recency: Optional '[age][period]' recency restriction
+        :param query_trace: Optional byob_metrics.QueryTrace to record the stages in
+        :param latency_budget: Optional seconds the whole query may take (see run())
+        :param summary_quorum: Optional number of summaries to write the answer from (see run())
+        :return: Generator of (event name, event data) tuples
+        """
+        # Apply any per-call configuration without rebuilding clients or connection pools,
+        # on a copy that records its stages in this query's trace and keeps to its deadline
+        query_trace = query_trace or QueryTrace(search_query)
+        byob_instance = self.with_config(
+            self._query_config(config, latency_budget, summary_quorum)
+        ).for_query(query_trace)
+        recency = recency or byob_instance.config['recency']
+        query_outcome = OUTCOME_CANCELLED
+        try:
+            website_filter = website_filter or byob_instance.config['website_filter']
+            later_search_pages = None
+            arrived_pages = []
+            if byob_instance.config['speculative_search']:
+                # Search the raw query, the refined term and any rewrites, fused into one ranking
+                refined_search_query, searched_terms, search_result_items = byob_instance.fan_out_search(
+                    search_query, website_filter=website_filter, recency=recency
+                )
+                yield 'refined', {'refined_search_term': refined_search_query, 'search_terms': searched_terms}
+            else:
+                # Refine the search query using AI
+                refined_search_query = byob_instance.refine_search_query(search_query)
+                yield 'refined', {'refined_search_term': refined_search_query}
+
+                # Perform web search using the refined search term; deeper pages of results
+                # are reported, and processed, as they arrive
+                search_pages = byob_instance.iter_search_pages(
+                    refined_search_query, website_filter=website_filter, recency=recency
+                )
+                search_result_items = next(search_pages)
+                later_search_pages = self._track_arrivals(search_pages, arrived_pages)
+                searched_terms = [refined_search_query]
+            arrived_pages.insert(0, search_result_items)
+            reported_results = 0
+
+            def report_search_results():
+                # Search hits of the pages that have arrived, ranked on from the pages before them
+                nonlocal reported_results
+                while arrived_pages:
+                    for search_result in arrived_pages.pop(0):
+                        reported_results += 1
+                        yield 'search_result', {
+                            'result_rank': reported_results,
+                            'webpage_url': search_result.get('link'),
+                            'result_title': search_result.get('snippet', '')
+                        }
+
+            yield from report_search_results()
+
+            # Report every page summary the moment it is ready (after the search hits that arrived before it)
+            processed_search_results = []
+            for processed_result in byob_instance.iter_search_results(
+                search_result_items, refined_search_query, later_search_pages=later_search_pages
+            ):
+                yield from report_search_results()
+                processed_search_results.append(processed_result)
+                yield 'summary', processed_result
+            yield from report_search_results()
+            processed_search_results.sort(key=lambda processed_result: processed_result['result_rank'])
+
+            # Stream the comprehensive response as it is written
+            response_fragments = []
+            for response_fragment in byob_instance.stream_comprehensive_response(
+                refined_search_query, processed_search_results
+            ):
+                response_fragments.append(response_fragment)
+                yield 'answer_delta', {'content': response_fragment}
+
+            # The query is complete even if the caller stops reading after this event
+            query_outcome = OUTCOME_OK
+            query_trace.finish(query_outcome)
+            search_response = {
+                "refined_search_term": refined_search_query,
+                "comprehensive_rag_response": ''.join(response_fragments) or None,
+                "processed_search_results": processed_search_results
+            }
+            if byob_instance.config['speculative_search']:
+                search_response["search_terms"] = searched_terms
+            if byob_instance.latency_budget:
+                search_response["sources"] = byob_instance.latency_budget.report()
+            yield 'done', search_response
+        except Exception:
+            query_outcome = OUTCOME_ERROR
+            raise
+        finally:
+            query_trace.finish(query_outcome)
 
 def main():
     """
@@ -0,0 +1,539 @@
+#!/usr/bin/env python3
+"""
+BYOB (Bring Your Own Browser) Web Search Tool - In-Process Vector Store
+
+The semantic search in EmbeddingsManagement/ asks Supabase for the
+match_documents function (vector_search.sql) over the network on every
+query. This module keeps the same 'documents' data (id, content, 1536-dim
+embedding) on local disk so Python code can search it in-process:
+- Embeddings live in one float32 file opened as a read-only memory map, so
+  the operating system pages it in on demand and shares it between processes
+- Rows are normalized when they are added, so cosine similarity is a single
+  matrix-vector product per query
+- Document text and ids live in a small SQLite database next to the matrix
+- New documents are appended to the end of the file; nothing is rewritten
+- The store can be filled from, and copied back to, the Postgres table
+
+match_documents() has the same semantics as the SQL function: documents
+whose similarity is above match_threshold, best first, at most max_limit.
+
+Key Components:
+- VectorStore: The memory-mapped store
+- parse_pgvector / format_pgvector: Convert between numpy and pgvector text
+"""
+
+import argparse   # For the command-line interface
+import json       # For JSONL import and export
+import os         # For working with file paths
+import re         # For validating table names
+import sqlite3    # For document ids and text
+import threading  # For protecting writes
+import numpy as np  # For the embedding matrix
+
+from byob_relevance import count_tokens  # For reserving tokens with the rate limiter
+
+# Embedding size of the documents table (vector(1536))
+DEFAULT_EMBEDDING_DIM = 1536
+
+# Defaults of the match_documents SQL function
+DEFAULT_MATCH_THRESHOLD = 0.1
+DEFAULT_MAX_LIMIT = 5
+
+# OpenAI model used to embed documents and queries (same as the JavaScript tools)
+EMBEDDING_MODEL = 'text-embedding-3-small'
+
+# File names inside the store directory
+EMBEDDINGS_FILE = 'embeddings.f32'
+DOCUMENTS_FILE = 'documents.sqlite'
+
+_TABLE_NAME = re.compile(r'^[A-Za-z_][A-Za-z0-9_]*(\.[A-Za-z_][A-Za-z0-9_]*)?$')
+
+
+def normalize_rows(embeddings):
+    """
+    Scale every row to unit length (rows of zeros are left as they are).
+
+    :param embeddings: 2-D array of embeddings
+    :return: float32 array of normalized rows
+    """
+    embeddings = np.asarray(embeddings, dtype=np.float32)
+    row_norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+    row_norms[row_norms == 0] = 1
+    return embeddings / row_norms
+
+
+def parse_pgvector(vector_text):
+    """
+    Turn pgvector's text form ('[0.1,0.2,...]') into a numpy array.
+
+    :param vector_text: Vector as text (a list of numbers is accepted too)
+    :return: float32 array
+    """
+    if isinstance(vector_text, str):
+        return np.array(vector_text.strip('[]').split(','), dtype=np.float32)
+    return np.asarray(vector_text, dtype=np.float32)
+
+
+def format_pgvector(embedding):
+    """
+    Turn an embedding into pgvector's text form.
+
+    :param embedding: Sequence of numbers
+    :return: Vector as text, e.g. '[0.1,0.2]'
+    """
+    return '[' + ','.join(repr(float(value)) for value in embedding) + ']'
+
+
+def _check_table_name(table):
+    """
+    Make sure a table name can be put into SQL safely.
+
+    :param table: Table name, optionally with a schema ('public.documents')
+    :return: The table name
+    :raises ValueError: If the name is not a plain identifier
+    """
+    if not _TABLE_NAME.match(table):
+        raise ValueError(f"Invalid table name: {table!r}")
+    return table
+
+
+def _connect_postgres(dsn):
+    """
+    Open a Postgres connection with whichever driver is installed.
+
+    :param dsn: Postgres connection string
+    :return: DB-API connection
+    :raises ImportError: If neither psycopg nor psycopg2 is installed
+    """
+    try:
+        import psycopg
+        return psycopg.connect(dsn)
+    except ImportError:
+        pass
+    try:
+        import psycopg2
+        return psycopg2.connect(dsn)
+    except ImportError:
+        raise ImportError("Postgres import/export needs the 'psycopg' (or 'psycopg2') package")
+
+
+class VectorStore:
+    """
+    Memory-mapped store of documents and their normalized embeddings.
+
+    Row i of the embedding file belongs to the document stored with row = i
+    in SQLite. SQLite is written last, so after a crash any rows past the
+    last committed one are simply cut off the file when it is reopened.
+    """
+
+    def __init__(self, store_dir, embedding_dim=DEFAULT_EMBEDDING_DIM):
+        """
+        Open (or create) a store.
+
+        :param store_dir: Directory holding the store files
+        :param embedding_dim: Number of dimensions of every embedding
+        :raises ValueError: If the store was created with a different dimension
+        """
+        self.store_dir = store_dir
+        self.embedding_dim = embedding_dim
+        self.embeddings_path = os.path.join(store_dir, EMBEDDINGS_FILE)
+        os.makedirs(store_dir, exist_ok=True)
+        self._lock = threading.Lock()
+
+        self.connection = sqlite3.connect(os.path.join(store_dir, DOCUMENTS_FILE), check_same_thread=False)
+        self.connection.execute('PRAGMA journal_mode=WAL')
+        self.connection.execute(
+            'CREATE TABLE IF NOT EXISTS documents ('
+            'id INTEGER PRIMARY KEY, row INTEGER UNIQUE NOT NULL, content TEXT NOT NULL)'
+        )
+        self.connection.execute('CREATE TABLE IF NOT EXISTS store_info (key TEXT PRIMARY KEY, value TEXT)')
+        stored_dim = self.connection.execute("SELECT value FROM store_info WHERE key = 'embedding_dim'").fetchone()
+        if stored_dim is None:
+            self.connection.execute(
+                "INSERT INTO store_info (key, value) VALUES ('embedding_dim', ?)", (str(embedding_dim),)
+            )
+            self.connection.commit()
+        elif int(stored_dim[0]) != embedding_dim:
+            raise ValueError(f"{store_dir} holds {stored_dim[0]}-dim embeddings, not {embedding_dim}")
+
+        # Row -> document id, for turning matrix rows back into documents
+        self._row_ids = np.array(
+            [row_id for (row_id,) in self.connection.execute('SELECT id FROM documents ORDER BY row')],
+            dtype=np.int64
+        )
+
+        # Cut off rows written by an append that never committed
+        row_bytes = embedding_dim * np.dtype(np.float32).itemsize
+        if not os.path.exists(self.embeddings_path):
+            open(self.embeddings_path, 'wb').close()
+        if os.path.getsize(self.embeddings_path) != len(self._row_ids) * row_bytes:
+            with open(self.embeddings_path, 'r+b') as embeddings_file:
+                embeddings_file.truncate(len(self._row_ids) * row_bytes)
+        self._open_matrix()
+
+    def _open_matrix(self):
+        """
+        Memory-map the embedding file with its current number of rows.
+        """
+        if len(self._row_ids):
+            self._matrix = np.memmap(
+                self.embeddings_path, dtype=np.float32, mode='r', shape=(len(self._row_ids), self.embedding_dim)
+            )
+        else:
+            self._matrix = np.empty((0, self.embedding_dim), dtype=np.float32)
+
+    def __len__(self):
+        """
+        Number of documents in the store.
+        """
+        return len(self._row_ids)
+
+    @property
+    def embeddings(self):
+        """
+        Read-only matrix of normalized embeddings; row i belongs to document row_ids[i].
+        """
+        return self._matrix
+
+    @property
+    def row_ids(self):
+        """
+        Document id of every embedding row.
+        """
+        return self._row_ids
+
+    def get_contents(self, document_ids):
+        """
+        Look up the text of some documents.
+
+        :param document_ids: List of document ids
+        :return: Dictionary of {id: content}
+        """
+        if not document_ids:
+            return {}
+        return dict(self.connection.execute(
+            f"SELECT id, content FROM documents WHERE id IN ({','.join('?' * len(document_ids))})",
+            [int(document_id) for document_id in document_ids]
+        ).fetchall())
+
+    def add_documents(self, documents):
+        """
+        Add documents, or replace the ones whose id is already stored.
+
+        New documents are appended to the end of the embedding file; replaced
+        ones are overwritten in place. Documents without an id get the next
+        free one, like the BIGSERIAL column in Postgres: above the highest id
+        stored or given in the batch.
+
+        :param documents: Iterable of (id or None, content, embedding)
+        :return: List of document ids, in input order
+        """
+        documents = list(documents)
+        if not documents:
+            return []
+        embeddings = normalize_rows([embedding for _, _, embedding in documents])
+        if embeddings.shape[1] != self.embedding_dim:
+            raise ValueError(f"Expected {self.embedding_dim}-dim embeddings, got {embeddings.shape[1]}")
+
+        with self._lock:
+            # Auto ids start above every stored id and every explicit id in the batch,
+            # so a later explicit id never collides with one handed out earlier
+            explicit_ids = [int(document_id) for document_id, _, _ in documents if document_id is not None]
+            next_id = max([int(self._row_ids.max()) if len(self._row_ids) else 0] + explicit_ids) + 1
+            existing_rows = {}
+            document_ids = []
+            for document_id, _, _ in documents:
+                if document_id is None:
+                    document_id = next_id
+                    next_id += 1
+                document_ids.append(int(document_id))
+            for document_id, row in self.connection.execute(
+                    f"SELECT id, row FROM documents WHERE id IN ({','.join('?' * len(document_ids))})", document_ids):
+                existing_rows[document_id] = row
+
+            # Work out where every embedding goes
+            new_row = len(self._row_ids)
+            target_rows = []
+            appended_ids = []
+            for document_id in document_ids:
+                if document_id not in existing_rows:
+                    existing_rows[document_id] = new_row
+                    appended_ids.append(document_id)
+                    new_row += 1
+                target_rows.append(existing_rows[document_id])
+
+            # Write the embeddings first, the index last
+            appended_count = len(appended_ids)
+            with open(self.embeddings_path, 'r+b') as embeddings_file:
+                for target_row, embedding in zip(target_rows, embeddings):
+                    embeddings_file.seek(target_row * embeddings.itemsize * self.embedding_dim)
+                    embeddings_file.write(embedding.tobytes())
+                embeddings_file.flush()
+                os.fsync(embeddings_file.fileno())
+
+            self.connection.executemany(
+                'INSERT INTO documents (id, row, content) VALUES (?, ?, ?) '
+                'ON CONFLICT(id) DO UPDATE SET content = excluded.content',
+                [(document_id, target_row, content)
+                 for document_id, target_row, (_, content, _) in zip(document_ids, target_rows, documents)]
+            )
+            self.connection.commit()
+
+            if appended_count:
+                self._row_ids = np.concatenate([self._row_ids, np.array(appended_ids, dtype=np.int64)])
+            self._open_matrix()
+        return document_ids
+
+    def match_documents(self, query_embedding, match_threshold=DEFAULT_MATCH_THRESHOLD,
+                        max_limit=DEFAULT_MAX_LIMIT, include_embedding=False):
+        """
+        Find the documents most similar to a query embedding.
+
+        Same semantics as the match_documents SQL function: cosine similarity
+        ('match_score') above match_threshold, best first, at most max_limit.
+
+        :param query_embedding: Embedding of the query
+        :param match_threshold: Minimum similarity (exclusive)
+        :param max_limit: Maximum number of documents to return
+        :param include_embedding: Also return each document's (normalized) embedding
+        :return: List of {'id', 'content', 'match_score'[, 'embedding']} dictionaries
+        """
+        matrix, row_ids = self._matrix, self._row_ids
+        if not len(row_ids) or max_limit <= 0:
+            return []
+
+        query_vector = normalize_rows(np.asarray(query_embedding, dtype=np.float32).reshape(1, -1))[0]
+        match_scores = matrix @ query_vector
+
+        # Only sort the rows above the threshold, and only the best max_limit of those
+        candidate_rows = np.flatnonzero(match_scores > match_threshold)
+        if len(candidate_rows) > max_limit:
+            best = np.argpartition(-match_scores[candidate_rows], max_limit - 1)[:max_limit]
+            candidate_rows = candidate_rows[best]
+        candidate_rows = candidate_rows[np.argsort(-match_scores[candidate_rows], kind='stable')]
+        if not len(candidate_rows):
+            return []
+
+        candidate_ids = [int(row_ids[row]) for row in candidate_rows]
+        contents = self.get_contents(candidate_ids)
+        matches = []
+        for row, document_id in zip(candidate_rows, candidate_ids):
+            match = {'id': document_id, 'content': contents[document_id], 'match_score': float(match_scores[row])}
+            if include_embedding:
+                match['embedding'] = matrix[row].tolist()
+            matches.append(match)
+        return matches
+
+    def iter_documents(self, batch_size=1000):
+        """
+        Yield every document with its embedding, in id order.
+
+        Embeddings are returned normalized (OpenAI embeddings already are).
+
+        :param batch_size: Number of documents read from SQLite at a time
+        :return: Generator of (id, content, embedding) tuples
+        """
+        matrix = self._matrix
+        last_id = None
+        while True:
+            if last_id is None:
+                document_rows = self.connection.execute(
+                    'SELECT id, row, content FROM documents ORDER BY id LIMIT ?', (batch_size,)
+                ).fetchall()
+            else:
+                document_rows = self.connection.execute(
+                    'SELECT id, row, content FROM documents WHERE id > ? ORDER BY id LIMIT ?', (last_id, batch_size)
+                ).fetchall()
+            if not document_rows:
+                return
+            for document_id, row, content in document_rows:
+                if row < len(matrix):
+                    yield document_id, content, np.array(matrix[row])
+            last_id = document_rows[-1][0]
+
+    def import_jsonl(self, jsonl_path, batch_size=1000):
+        """
+        Add documents from a JSONL file of {'id', 'content', 'embedding'} records.
+
+        The embedding may be a list of numbers or pgvector text.
+
+        :param jsonl_path: Path of the file to read
+        :param batch_size: Number of documents added at a time
+        :return: Number of documents imported
+        """
+        imported_count = 0
+        document_batch = []
+        with open(jsonl_path, encoding='utf-8') as jsonl_file:
+            for line in jsonl_file:
+                if not line.strip():
+                    continue
+                record = json.loads(line)
+                document_batch.append((record.get('id'), record['content'], parse_pgvector(record['embedding'])))
+                if len(document_batch) >= batch_size:
+                    imported_count += len(self.add_documents(document_batch))
+                    document_batch = []
+        imported_count += len(self.add_documents(document_batch))
+        return imported_count
+
+    def export_jsonl(self, jsonl_path):
+        """
+        Write every document to a JSONL file of {'id', 'content', 'embedding'} records.
+
+        :param jsonl_path: Path of the file to write
+        :return: Number of documents exported
+        """
+        exported_count = 0
+        with open(jsonl_path, 'w', encoding='utf-8') as jsonl_file:
+            for document_id, content, embedding in self.iter_documents():
+                jsonl_file.write(json.dumps({'id': document_id, 'content': content, 'embedding': embedding.tolist()}) + '\n')
+                exported_count += 1
+        return exported_count
+
+    def import_from_postgres(self, dsn, table='documents', batch_size=1000):
+        """
+        Copy every row of the Postgres documents table into the store.
+
+        Rows are streamed with a server-side cursor, so the table never has
+        to fit in memory.
+
+        :param dsn: Postgres connection string
+        :param table: Table with id, content and embedding columns
+        :param batch_size: Number of rows fetched and added at a time
+        :return: Number of documents imported
+        """
+        table = _check_table_name(table)
+        imported_count = 0
+        postgres_connection = _connect_postgres(dsn)
+        try:
+            postgres_cursor = postgres_connection.cursor(name='byob_vector_store_import')
+            postgres_cursor.itersize = batch_size
+            postgres_cursor.execute(
+                f"SELECT id, content, embedding::text FROM {table} WHERE embedding IS NOT NULL ORDER BY id"
+            )
+            while True:
+                table_rows = postgres_cursor.fetchmany(batch_size)
+                if not table_rows:
+                    break
+                imported_count += len(self.add_documents(
+                    (document_id, content, parse_pgvector(embedding)) for document_id, content, embedding in table_rows
+                ))
+            postgres_cursor.close()
+        finally:
+            postgres_connection.close()
+        return imported_count
+
+    def export_to_postgres(self, dsn, table='documents', batch_size=500):
+        """
+        Copy every document into the Postgres documents table (insert or update by id).
+
+        :param dsn: Postgres connection string
+        :param table: Table with id, content and embedding columns
+        :param batch_size: Number of rows sent at a time
+        :return: Number of documents exported
+        """
+        table = _check_table_name(table)
+        upsert_sql = (
+            f"INSERT INTO {table} (id, content, embedding) VALUES (%s, %s, %s::vector) "
+            f"ON CONFLICT (id) DO UPDATE SET content = EXCLUDED.content, embedding = EXCLUDED.embedding"
+        )
+        exported_count = 0
+        postgres_connection = _connect_postgres(dsn)
+        try:
+            postgres_cursor = postgres_connection.cursor()
+            table_rows = []
+            for document_id, content, embedding in self.iter_documents(batch_size):
+                table_rows.append((document_id, content, format_pgvector(embedding)))
+                if len(table_rows) >= batch_size:
+                    postgres_cursor.executemany(upsert_sql, table_rows)
+                    exported_count += len(table_rows)
+                    table_rows = []
+            if table_rows:
+                postgres_cursor.executemany(upsert_sql, table_rows)
+                exported_count += len(table_rows)
+
+            # Explicit ids bypass the BIGSERIAL sequence; move it past them
+            postgres_cursor.execute(
+                f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), (SELECT MAX(id) FROM {table})) "
+                f"WHERE EXISTS (SELECT 1 FROM {table})"
+            )
+            postgres_connection.commit()
+        finally:
+            postgres_connection.close()
+        return exported_count
+
+    def close(self):
+        """
+        Close the store.
+        """
+        self._matrix = np.empty((0, self.embedding_dim), dtype=np.float32)
+        self.connection.close()
+
+
+def embed_text(openai_client, text, rate_limiter=None):
+    """
+    Embed a text with the same model the JavaScript tools use.
+
+    :param openai_client: OpenAI client
+    :param text: Text to embed
+    :param rate_limiter: Optional byob_ratelimit.RateLimiter of the embedding model to send the request through
+    :return: Embedding as a list of floats
+    """
+    if rate_limiter is None:
+        return openai_client.embeddings.create(model=EMBEDDING_MODEL, input=text).data[0].embedding
+
+    def send_embedding_request():
+        raw_response = openai_client.embeddings.with_raw_response.create(model=EMBEDDING_MODEL, input=text)
+        return raw_response.parse(), raw_response.headers
+
+    embedding_response = rate_limiter.call(send_embedding_request, count_tokens(text, EMBEDDING_MODEL))
+    return embedding_response.data[0].embedding
+
+
+def main():
+    """
+    Fill, copy or search a vector store from the command line.
+    """
+    parser = argparse.ArgumentParser(description='Local memory-mapped copy of the documents vector table.')
+    parser.add_argument('--store', default='vector_store', help='Store directory')
+    parser.add_argument('--dim', type=int, default=DEFAULT_EMBEDDING_DIM, help='Embedding dimensions')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    for command in ('import-postgres', 'export-postgres'):
+        command_parser = subparsers.add_parser(command)
+        command_parser.add_argument('--dsn', default=os.getenv('DATABASE_URL'), help='Postgres connection string')
+        command_parser.add_argument('--table', default='documents')
+    for command in ('import-jsonl', 'export-jsonl'):
+        subparsers.add_parser(command).add_argument('path', help='JSONL file')
+    search_parser = subparsers.add_parser('search')
+    search_parser.add_argument('query', help='Text to search for')
+    search_parser.add_argument('--threshold', type=float, default=DEFAULT_MATCH_THRESHOLD)
+    search_parser.add_argument('--limit', type=int, default=DEFAULT_MAX_LIMIT)
+    args = parser.parse_args()
+
+    vector_store = VectorStore(args.store, embedding_dim=args.dim)
+    if args.command == 'import-postgres':
+        print(f"Imported {vector_store.import_from_postgres(args.dsn, args.table)} documents")
+    elif args.command == 'export-postgres':
+        print(f"Exported {vector_store.export_to_postgres(args.dsn, args.table)} documents")
+    elif args.command == 'import-jsonl':
+        print(f"Imported {vector_store.import_jsonl(args.path)} documents")
+    elif args.command == 'export-jsonl':
+        print(f"Exported {vector_store.export_jsonl(args.path)} documents")
+    else:
+        from dotenv import load_dotenv
+        from openai import OpenAI
+        from byob_ratelimit import get_rate_limiters
+        from byob_search import DEFAULT_CONFIG
+        load_dotenv()
+        # The rate limiter does the retrying, so the client must not retry on its own as well
+        query_embedding = embed_text(
+            OpenAI(api_key=os.getenv('OPENAI_API_KEY'), max_retries=0), args.query,
+            rate_limiter=get_rate_limiters(DEFAULT_CONFIG).openai(EMBEDDING_MODEL)
+        )
+        print(f"Searching {len(vector_store)} documents")
+        for match in vector_store.match_documents(query_embedding, args.threshold, args.limit):
+            print(f"{match['match_score']:.4f}  [{match['id']}] {match['content'][:100]}")
+    vector_store.close()
+
+
+if __name__ == "__main__":
+    main()
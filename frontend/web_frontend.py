@@ -13,9 +13,10 @@ from typing import Dict, Any
 # Add parent directory to Python path
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from flask import Flask, render_template, request, jsonify
+from flask import Flask, Response, render_template, request, jsonify, stream_with_context
 from flask_cors import CORS
 import requests
+from byob_proxy import BackendPool, BackendProxy, NoBackendAvailable
 
 # Configure logging
 logging.basicConfig(
@@ -32,17 +33,26 @@ class BYOBWebFrontend:
     communicates with the backend API.
     """
     
-    def __init__(self, backend_url='http://localhost:5001'):
+    def __init__(self, backend_url='http://localhost:5001', backend_urls=None):
         """
         Initialize the web frontend.
         
         :param backend_url: URL of the backend API
+        :param backend_urls: Optional list of backend URLs to balance requests across
+                             (defaults to the comma-separated BYOB_BACKEND_URLS, then backend_url)
         """
         self.app = Flask(__name__)
         CORS(self.app)
         
-        # Store backend URL
-        self.backend_url = backend_url
+        # Store backend URLs
+        if backend_urls is None and os.getenv('BYOB_BACKEND_URLS'):
+            backend_urls = [url.strip() for url in os.getenv('BYOB_BACKEND_URLS').split(',') if url.strip()]
+        self.backend_urls = backend_urls or [backend_url]
+        self.backend_url = self.backend_urls[0]
+        
+        # Forward requests over pooled keep-alive connections, spread across healthy backends
+        self.backend_pool = BackendPool(self.backend_urls)
+        self.backend_proxy = BackendProxy(self.backend_pool)
         
         # Register routes
         self._register_routes()
@@ -56,6 +66,16 @@ class BYOBWebFrontend:
         
         # Search API route
         self.app.route('/search', methods=['POST'])(self.search)
+        
+        # Streaming search API route (Server-Sent Events)
+        self.app.route('/search/stream', methods=['POST'])(self.search_stream)
+        
+        # Background search job routes
+        self.app.route('/search/jobs', methods=['POST'])(self.search_jobs)
+        self.app.route('/search/jobs/<job_id>', methods=['GET', 'DELETE'])(self.search_job)
+        
+        # Backend pool status
+        self.app.route('/backends', methods=['GET'])(self.backends)
     
     def index(self):
         """
@@ -73,42 +93,74 @@ class BYOBWebFrontend:
             'site_filter': 'optional site filter'
         }
         
-        Returns search results from backend API.
+        Returns search results from backend API. The backend validates the
+        payload; its answer (including errors) is relayed byte for byte.
+        """
+        return self._proxy('/api/search')
+    
+    def search_stream(self):
+        """
+        Proxy streaming search requests to the backend without buffering.
+        
+        Expects the same JSON payload as /search and relays the backend's
+        Server-Sent Events to the browser chunk by chunk as they arrive.
+        """
+        return self._proxy('/api/search/stream')
+    
+    def search_jobs(self):
+        """
+        Queue a search as a background job on the backend.
+        
+        Expects the same JSON payload as /search.
+        """
+        return self._proxy('/api/jobs')
+    
+    def search_job(self, job_id):
+        """
+        Poll (GET) or cancel (DELETE) a background search job.
+        
+        :param job_id: Job id returned by /search/jobs
+        """
+        return self._proxy(f'/api/jobs/{job_id}')
+    
+    def backends(self):
+        """
+        Report the health and load of every backend.
+        """
+        return jsonify(self.backend_pool.get_stats())
+    
+    def _proxy(self, backend_path):
+        """
+        Forward the current request to a backend and stream its response back unchanged.
+        
+        The request body and the response body are passed through as bytes
+        (never parsed), with the backend's status code and headers.
+        
+        :param backend_path: Path on the backend, e.g. '/api/search'
+        :return: Flask response
         """
         try:
-            # Get search data
-            search_data = request.get_json()
-            
-            # Validate input
-            if not search_data or 'query' not in search_data:
-                return jsonify({'error': 'Missing search query'}), 400
-            
-            # Prepare request to backend
-            response = requests.post(
-                f'{self.backend_url}/api/search', 
-                json=search_data,
-                timeout=60
+            backend, backend_response = self.backend_proxy.send(
+                request.method,
+                backend_path,
+                body=request.get_data(),
+                headers=request.headers,
+                query_string=request.query_string
             )
-            
-            # Check response
-            response.raise_for_status()
-            
-            # Return search results
-            return jsonify(response.json())
-        
-        except requests.RequestException as e:
+        
+        except (requests.RequestException, NoBackendAvailable) as e:
             logger.error(f"Backend API error: {e}")
             return jsonify({
                 'error': 'Failed to connect to search backend',
                 'details': str(e)
-            }), 500
+            }), 502
         
-        except Exception as e:
-            logger.error(f"Unexpected search error: {e}")
-            return jsonify({
-                'error': 'An unexpected error occurred',
-                'details': str(e)
-            }), 500
+        return Response(
+            stream_with_context(self.backend_proxy.relay(backend, backend_response)),
+            status=backend_response.status_code,
+            headers=self.backend_proxy.forwardable_headers(backend_response.raw.headers.items()),
+            direct_passthrough=True
+        )
     
     def run(self, host='0.0.0.0', port=3001, debug=True):
         """
@@ -0,0 +1,12 @@
+"""
+Shared pytest setup: make the repository modules importable from the tests.
+"""
+
+import os
+import sys
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# The modules live at the top of the repository (and the API in backend/), not in a package
+sys.path.insert(0, REPO_DIR)
+sys.path.insert(0, os.path.join(REPO_DIR, 'backend'))
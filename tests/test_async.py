@@ -0,0 +1,146 @@
+"""
+Tests for byob_async: the async-generator pipeline of AsyncBYOBTool and the AsyncBYOBRunner deadlines.
+"""
+
+import asyncio
+import concurrent.futures
+import threading
+
+import pytest
+
+from byob_async import RUNNER_TIMEOUT_GRACE, AsyncBYOBRunner, AsyncBYOBTool
+from byob_metrics import QueryTrace
+
+SEARCH_ITEMS = [
+    {'link': f'http://example.test/{result_rank}', 'snippet': f'Result {result_rank}'}
+    for result_rank in range(1, 4)
+]
+
+
+def _page_text(result_rank):
+    return f'Distinct page text number {result_rank} ' * result_rank * 20
+
+
+class _OfflineTool(AsyncBYOBTool):
+    """
+    AsyncBYOBTool whose network steps are replaced; later-ranked pages download faster.
+    """
+
+    async def refine_search_query(self, search_query):
+        return f'refined {search_query}'
+
+    async def iter_search_pages(self, search_query, max_search_results=None, website_filter=None, recency=None):
+        yield SEARCH_ITEMS
+
+    async def retrieve_content(self, webpage_url, max_content_chars=None):
+        result_rank = int(webpage_url.rsplit('/', 1)[1])
+        await asyncio.sleep(0.05 * (len(SEARCH_ITEMS) - result_rank))
+        return _page_text(result_rank)
+
+    async def summarize_content(self, webpage_content, search_query, max_summary_chars=None):
+        return f'summary of {webpage_content.split()[4]}'
+
+    async def stream_comprehensive_response(self, search_query, processed_search_results):
+        for processed_result in processed_search_results:
+            yield processed_result['webpage_summary'] + '. '
+
+
+@pytest.fixture
+def offline_tool(monkeypatch):
+    monkeypatch.setenv('OPENAI_API_KEY', 'test-key')
+    monkeypatch.setenv('GOOGLE_API_KEY', 'test-key')
+    monkeypatch.setenv('GOOGLE_CSE_ID', 'test-cse')
+    return _OfflineTool
+
+
+def _run_with_tool(tool_class, use_tool, config=None):
+    async def run():
+        byob_tool = tool_class(config)
+        try:
+            return await use_tool(byob_tool.for_query(QueryTrace('test query')))
+        finally:
+            await byob_tool.aclose()
+    return asyncio.run(run())
+
+
+@pytest.mark.parametrize('concurrent_pipeline', [True, False])
+def test_iter_search_results_is_an_async_generator(offline_tool, concurrent_pipeline):
+    async def collect(byob_tool):
+        return [
+            processed_result['result_rank']
+            async for processed_result in byob_tool.iter_search_results(SEARCH_ITEMS, 'query')
+        ]
+
+    arrival_ranks = _run_with_tool(
+        offline_tool, collect, {'concurrent_pipeline': concurrent_pipeline, 'dedup_enabled': False}
+    )
+    # Concurrently, results arrive as they finish; serially, in ranking order
+    assert arrival_ranks == ([3, 2, 1] if concurrent_pipeline else [1, 2, 3])
+
+
+def test_duplicates_keep_the_best_ranked_copy(offline_tool):
+    class _SyndicatedTool(offline_tool):
+        async def retrieve_content(self, webpage_url, max_content_chars=None):
+            # Rank 3 (fastest) carries the same story as rank 1 (slowest)
+            webpage_content = await super().retrieve_content(webpage_url, max_content_chars)
+            return _page_text(1) if webpage_url.endswith('/3') else webpage_content
+
+    async def collect(byob_tool):
+        return await byob_tool.get_search_results(SEARCH_ITEMS, 'query')
+
+    processed_search_results = _run_with_tool(_SyndicatedTool, collect)
+    assert [processed_result['result_rank'] for processed_result in processed_search_results] == [1, 2]
+    assert processed_search_results[0]['duplicate_urls'] == ['http://example.test/3']
+
+
+def test_get_search_results_returns_ranking_order(offline_tool):
+    async def collect(byob_tool):
+        return await byob_tool.get_search_results(SEARCH_ITEMS, 'query')
+
+    processed_search_results = _run_with_tool(offline_tool, collect)
+    assert [processed_result['result_rank'] for processed_result in processed_search_results] == [1, 2, 3]
+
+
+def test_run_stream_yields_the_sync_events(offline_tool):
+    async def collect(byob_tool):
+        return [stream_event async for stream_event in byob_tool.run_stream('query')]
+
+    stream_events = _run_with_tool(offline_tool, collect)
+    event_names = [event_name for event_name, _ in stream_events]
+    assert event_names[0] == 'refined'
+    assert event_names.count('search_result') == 3
+    assert event_names.count('summary') == 3
+    assert event_names.count('answer_delta') == 3
+    assert event_names[-1] == 'done'
+
+    search_response = stream_events[-1][1]
+    assert search_response['refined_search_term'] == 'refined query'
+    assert [processed_result['result_rank']
+            for processed_result in search_response['processed_search_results']] == [1, 2, 3]
+    assert search_response['comprehensive_rag_response'].startswith('summary of 1.')
+
+
+def test_runner_cancels_a_query_that_runs_out_of_time(offline_tool):
+    runner = AsyncBYOBRunner({'query_deadline': 30.0})
+    query_cancelled = threading.Event()
+
+    async def stuck_run(search_query, **options):
+        try:
+            await asyncio.sleep(60)
+        except asyncio.CancelledError:
+            query_cancelled.set()
+            raise
+
+    try:
+        # The wait is bounded by the query's deadlines
+        assert runner._query_timeout() == 30.0 + RUNNER_TIMEOUT_GRACE
+        assert runner._query_timeout(latency_budget=8.0) == 8.0 + RUNNER_TIMEOUT_GRACE
+        assert runner._query_timeout({'query_deadline': 0}) is None
+
+        runner.tool.run = stuck_run
+        with pytest.raises(concurrent.futures.TimeoutError):
+            runner.run('query', timeout=0.1)
+        assert query_cancelled.wait(5)
+    finally:
+        runner.close()
+    runner.close()
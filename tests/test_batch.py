@@ -0,0 +1,15 @@
+"""
+Tests for byob_batch: executor setup.
+"""
+
+import pytest
+
+from byob_batch import OpenAIBatchExecutor
+
+
+def test_openai_executor_fails_fast_without_batch_api():
+    class OldOpenAIClient:
+        files = object()
+
+    with pytest.raises(RuntimeError, match='--executor local'):
+        OpenAIBatchExecutor(OldOpenAIClient())
@@ -0,0 +1,131 @@
+"""
+Tests for byob_coalesce: single-flight computations and the response cache.
+"""
+
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from byob_coalesce import CACHE_COALESCED, CACHE_HIT, CACHE_MISS, ResponseCoalescer, SingleFlight, response_key
+
+CALLERS = 5
+
+
+def _run_together(run_one):
+    """
+    Call run_one() from CALLERS threads at once.
+
+    :return: List of the results (or exceptions), one per caller
+    """
+    def call():
+        try:
+            return run_one()
+        except Exception as call_error:
+            return call_error
+
+    with ThreadPoolExecutor(max_workers=CALLERS) as caller_pool:
+        return list(caller_pool.map(lambda _: call(), range(CALLERS)))
+
+
+def _blocking_compute(release, result=None, error=None):
+    """
+    Build a compute function that waits for 'release' and counts its calls.
+    """
+    calls = []
+
+    def compute():
+        calls.append(1)
+        release.wait(5)
+        if error is not None:
+            raise error
+        return result
+    return compute, calls
+
+
+def test_single_flight_runs_one_computation_for_concurrent_callers():
+    single_flight = SingleFlight()
+    release = threading.Event()
+    compute, calls = _blocking_compute(release, result={'answer': 42})
+    # Let every caller join the flight before the leader finishes
+    threading.Timer(0.2, release.set).start()
+
+    results = _run_together(lambda: single_flight.run('key', compute))
+
+    assert len(calls) == 1
+    assert all(result == {'answer': 42} for result, _ in results)
+    assert sorted(shared for _, shared in results) == [False] + [True] * (CALLERS - 1)
+    assert single_flight.in_flight() == 0
+
+
+def test_single_flight_shares_the_leader_error():
+    single_flight = SingleFlight()
+    release = threading.Event()
+    compute, calls = _blocking_compute(release, error=RuntimeError('pipeline failed'))
+    threading.Timer(0.2, release.set).start()
+
+    results = _run_together(lambda: single_flight.run('key', compute))
+
+    assert len(calls) == 1
+    assert all(isinstance(result, RuntimeError) for result in results)
+    # The failed flight is forgotten, so the next caller computes again
+    assert single_flight.run('key', lambda: 'retried') == ('retried', False)
+
+
+def test_single_flight_keys_run_independently():
+    single_flight = SingleFlight()
+    assert single_flight.run('a', lambda: 1) == (1, False)
+    assert single_flight.run('b', lambda: 2) == (2, False)
+
+
+def test_response_key_normalizes_equivalent_requests():
+    assert response_key('What is GPT-5?', 'https://www.example.com/') == response_key('  what is  gpt-5 ', 'www.example.com')
+    assert response_key('query', latency_budget=10) != response_key('query')
+
+
+def test_response_coalescer_caches_and_reports_status():
+    coalescer = ResponseCoalescer(ttl_seconds=60)
+    computations = []
+
+    def compute():
+        computations.append(1)
+        return {'comprehensive_rag_response': 'answer'}
+
+    assert coalescer.run('key', compute)[1] == CACHE_MISS
+    cached_response, cache_status, _ = coalescer.run('key', compute)
+    assert cache_status == CACHE_HIT
+    assert cached_response == {'comprehensive_rag_response': 'answer'}
+    assert len(computations) == 1
+
+
+def test_response_coalescer_skips_uncacheable_responses():
+    coalescer = ResponseCoalescer(ttl_seconds=60)
+    is_cacheable = lambda response: bool(response.get('comprehensive_rag_response'))
+
+    coalescer.run('key', lambda: {'comprehensive_rag_response': None}, is_cacheable=is_cacheable)
+    assert coalescer.run('key', lambda: {'comprehensive_rag_response': 'x'}, is_cacheable=is_cacheable)[1] == CACHE_MISS
+
+
+def test_response_coalescer_shares_in_flight_requests():
+    coalescer = ResponseCoalescer(ttl_seconds=0)
+    release = threading.Event()
+    compute, calls = _blocking_compute(release, result={'comprehensive_rag_response': 'answer'})
+    threading.Timer(0.2, release.set).start()
+
+    results = _run_together(lambda: coalescer.run('key', compute))
+
+    assert len(calls) == 1
+    assert sorted(cache_status for _, cache_status, _ in results) == [CACHE_COALESCED] * (CALLERS - 1) + [CACHE_MISS]
+    assert coalescer.get_stats()['coalesced'] == CALLERS - 1
+
+
+@pytest.mark.parametrize('ttl_seconds', [0, 60])
+def test_response_coalescer_counts_errors(ttl_seconds):
+    coalescer = ResponseCoalescer(ttl_seconds=ttl_seconds)
+
+    def compute():
+        raise ValueError('bad')
+
+    with pytest.raises(ValueError):
+        coalescer.run('key', compute)
+    assert coalescer.get_stats()['errors'] == 1
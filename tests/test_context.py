@@ -0,0 +1,49 @@
+"""
+Tests for byob_context: packing summaries into the answer prompt.
+"""
+
+from byob_context import TRIM_MARKER, pack_sources
+from byob_relevance import count_tokens
+
+MODEL = 'gpt-4o'
+
+
+def _result(result_rank, webpage_summary):
+    return {
+        'result_rank': result_rank,
+        'webpage_url': f'https://example.test/{result_rank}',
+        'webpage_summary': webpage_summary,
+        'duplicate_urls': []
+    }
+
+
+def test_sources_fill_the_budget_in_ranking_order():
+    processed_search_results = [_result(rank, f'Summary number {rank}. ' * 40) for rank in (3, 1, 2)]
+
+    source_text, pack_report = pack_sources(processed_search_results, 250, MODEL, min_source_tokens=20)
+
+    assert source_text.startswith('[1] https://example.test/1')
+    assert pack_report['sources_packed'] == 2
+    assert pack_report['sources_trimmed'] == 1
+    assert pack_report['sources_dropped'] == 1
+    assert pack_report['context_tokens'] <= 250
+
+
+def test_first_source_is_packed_even_if_it_exceeds_the_budget():
+    processed_search_results = [_result(1, 'A very long first summary. ' * 200), _result(2, 'Second summary.')]
+
+    source_text, pack_report = pack_sources(processed_search_results, 30, MODEL, min_source_tokens=50)
+
+    assert pack_report['sources_packed'] == 1
+    assert pack_report['sources_trimmed'] == 1
+    assert pack_report['sources_dropped'] == 1
+    assert source_text.startswith('[1] https://example.test/1')
+    assert source_text.endswith(TRIM_MARKER)
+    assert count_tokens(source_text, MODEL) < 80
+
+
+def test_results_without_a_summary_are_left_out():
+    source_text, pack_report = pack_sources([_result(1, ''), _result(2, 'Kept.')], None, MODEL)
+
+    assert source_text == '[2] https://example.test/2\nKept.'
+    assert pack_report['sources_empty'] == 1
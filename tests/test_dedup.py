@@ -0,0 +1,62 @@
+"""
+Tests for byob_dedup and the duplicate handling of BYOBTool.iter_search_results.
+"""
+
+import time
+
+import pytest
+
+from byob_dedup import PageDeduplicator, canonicalize_url
+from byob_search import BYOBTool
+
+STORY = 'The same wire story about the same event, syndicated word for word to many news sites. ' * 5
+
+SEARCH_ITEMS = [
+    {'link': 'https://news.example/story', 'snippet': 'Original'},
+    {'link': 'https://other.example/unrelated', 'snippet': 'Other'},
+    {'link': 'https://mirror.example/copy', 'snippet': 'Copy'},
+]
+
+
+def test_canonical_urls_drop_tracking_and_variants():
+    assert canonicalize_url('https://m.example.com/a/?utm_source=x&id=2') == canonicalize_url('https://example.com/a?id=2')
+
+
+def test_release_in_rank_order_holds_pages_behind_better_ranked_downloads():
+    deduplicator = PageDeduplicator(0.9)
+    deduplicator.filter_urls(SEARCH_ITEMS)
+
+    assert deduplicator.release_in_rank_order(3, 'page 3') == []
+    assert deduplicator.held_pages() == ['page 3']
+    assert deduplicator.release_in_rank_order(2) == []
+    assert deduplicator.release_in_rank_order(1, 'page 1') == ['page 1', 'page 3']
+    assert deduplicator.held_pages() == []
+
+
+class _OfflineTool(BYOBTool):
+    """
+    BYOBTool whose downloads and summaries are replaced; the copy ranked 3rd downloads first.
+    """
+
+    def retrieve_content(self, webpage_url, max_content_chars=None):
+        time.sleep({'story': 0.3, 'unrelated': 0.15, 'copy': 0.0}[webpage_url.rsplit('/', 1)[1]])
+        return 'Unrelated page about something else entirely. ' * 5 if 'unrelated' in webpage_url else STORY
+
+    def summarize_content(self, webpage_content, search_query, max_summary_chars=None):
+        return webpage_content[:20]
+
+
+@pytest.mark.parametrize('concurrent_pipeline', [True, False])
+def test_duplicates_keep_the_best_ranked_copy(monkeypatch, concurrent_pipeline):
+    monkeypatch.setenv('OPENAI_API_KEY', 'test-key')
+    monkeypatch.setenv('GOOGLE_API_KEY', 'test-key')
+    monkeypatch.setenv('GOOGLE_CSE_ID', 'test-cse')
+    byob_tool = _OfflineTool({'concurrent_pipeline': concurrent_pipeline})
+
+    processed_search_results = sorted(
+        byob_tool.iter_search_results(SEARCH_ITEMS, 'query'),
+        key=lambda processed_result: processed_result['result_rank']
+    )
+
+    assert [processed_result['result_rank'] for processed_result in processed_search_results] == [1, 2]
+    assert processed_search_results[0]['duplicate_urls'] == ['https://mirror.example/copy']
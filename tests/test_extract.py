@@ -0,0 +1,44 @@
+"""
+Tests for byob_extract: the streaming extractor on HTML shapes it must not drop.
+"""
+
+import pytest
+
+from byob_extract import StreamingTextExtractor, get_extractor
+
+# Valid HTML5 that leaves <head> open until <body>
+UNCLOSED_HEAD_PAGE = '<html><head><title>T</title><body><p>Hello world</p></body></html>'
+
+# ASP.NET WebForms pages wrap the whole body in one <form>
+FORM_WRAPPED_PAGE = (
+    '<html><head><title>Shop</title></head><body><form id="aspnetForm" method="post">'
+    '<div><h1>Order status</h1><p>Your order has shipped.</p><input name="q"><button>Search</button></div>'
+    '</form></body></html>'
+)
+
+
+@pytest.mark.parametrize('extractor_name', ['streaming', 'beautifulsoup'])
+def test_unclosed_head_keeps_body_text(extractor_name):
+    assert 'Hello world' in get_extractor(extractor_name).extract(UNCLOSED_HEAD_PAGE, 1000)
+
+
+@pytest.mark.parametrize('extractor_name', ['streaming', 'beautifulsoup'])
+def test_form_wrapped_page_keeps_body_text(extractor_name):
+    page_text = get_extractor(extractor_name).extract(FORM_WRAPPED_PAGE, 1000)
+    assert 'Order status' in page_text
+    assert 'Your order has shipped.' in page_text
+
+
+def test_streaming_skips_title_scripts_and_navigation():
+    page_text = get_extractor('streaming').extract(
+        '<head><title>Title</title><script>var x = 1;</script></head>'
+        '<body><nav>Menu</nav><p>Body</p><footer>Footer</footer></body>', 1000
+    )
+    assert page_text == 'Body'
+
+
+def test_streaming_stops_at_the_budget_across_chunks():
+    text_extractor = StreamingTextExtractor(10)
+    assert not text_extractor.feed('<p>Hello ')
+    assert text_extractor.feed('world, and more</p>')
+    assert text_extractor.get_text() == 'Hello worl'
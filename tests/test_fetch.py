@@ -0,0 +1,71 @@
+"""
+Tests for byob_fetch: download deadlines and content-type gating.
+"""
+
+import asyncio
+import time
+
+import httpx
+
+from byob_extract import get_extractor
+from byob_fetch import SKIP_DEADLINE, SKIP_UNSUPPORTED_TYPE, FetchStats, fetch_page_async
+
+
+def _fetch(handler, deadline_seconds, timeout=10):
+    """
+    Run fetch_page_async against an in-process transport.
+
+    :return: Tuple of (FetchResult, seconds taken)
+    """
+    async def run():
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as http_client:
+            started_at = time.monotonic()
+            fetch_result = await fetch_page_async(
+                http_client, 'http://example.test/page', get_extractor('streaming'), max_chars=10000,
+                max_bytes=1024 * 1024, deadline_seconds=deadline_seconds, timeout=timeout, stats=FetchStats()
+            )
+            return fetch_result, time.monotonic() - started_at
+    return asyncio.run(run())
+
+
+async def _trickle():
+    """
+    A body that sends a small piece of text every 2 seconds (well within the read timeout).
+    """
+    yield b'<html><body><p>first words</p>'
+    for _ in range(10):
+        await asyncio.sleep(2)
+        yield b'<p>more</p>'
+
+
+def test_trickling_page_stops_at_the_deadline_and_keeps_partial_text():
+    fetch_result, seconds = _fetch(
+        lambda request: httpx.Response(200, headers={'Content-Type': 'text/html'}, content=_trickle()),
+        deadline_seconds=0.5
+    )
+    assert seconds < 1.5
+    assert fetch_result.truncated
+    assert fetch_result.skip_reason is None
+    assert 'first words' in fetch_result.text
+
+
+def test_page_without_body_by_the_deadline_is_skipped_for_the_deadline():
+    async def stalled_body():
+        await asyncio.sleep(5)
+        yield b''
+
+    fetch_result, seconds = _fetch(
+        lambda request: httpx.Response(200, headers={'Content-Type': 'text/html'}, content=stalled_body()),
+        deadline_seconds=0.3
+    )
+    assert seconds < 1.5
+    assert fetch_result.skip_reason == SKIP_DEADLINE
+
+
+def test_unsupported_content_type_is_not_downloaded():
+    fetch_result, _ = _fetch(
+        lambda request: httpx.Response(200, headers={'Content-Type': 'application/pdf'}, content=b'%PDF' * 1000),
+        deadline_seconds=5
+    )
+    assert fetch_result.skip_reason == SKIP_UNSUPPORTED_TYPE
+    assert fetch_result.bytes_downloaded == 0
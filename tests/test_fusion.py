@@ -0,0 +1,57 @@
+"""
+Tests for byob_fusion: reciprocal rank fusion and search term parsing.
+"""
+
+import pytest
+
+from byob_fusion import parse_search_terms, reciprocal_rank_fusion
+
+
+def _results(*paths):
+    return [{'link': f'https://example.test/{path}', 'snippet': path} for path in paths]
+
+
+def test_pages_several_lists_agree_on_rise_to_the_top():
+    fused_results = reciprocal_rank_fusion([_results('a', 'b', 'c'), _results('c', 'd', 'b')], k=60)
+
+    assert [fused_result['snippet'] for fused_result in fused_results] == ['c', 'b', 'a', 'd']
+    assert fused_results[0]['fusion_ranks'] == [3, 1]
+    assert fused_results[0]['fusion_score'] == pytest.approx(1 / 63 + 1 / 61, abs=1e-6)
+    assert fused_results[2]['fusion_ranks'] == [1, None]
+
+
+def test_pages_are_merged_by_canonical_url():
+    first_list = _results('a')
+    second_list = [{'link': 'https://www.example.test/a/?utm_source=feed', 'snippet': 'variant'}]
+
+    fused_results = reciprocal_rank_fusion([first_list, second_list])
+
+    assert len(fused_results) == 1
+    # The first occurrence is the one kept
+    assert fused_results[0]['link'] == 'https://example.test/a'
+    assert fused_results[0]['fusion_ranks'] == [1, 1]
+
+
+def test_only_the_best_rank_in_a_list_counts():
+    fused_results = reciprocal_rank_fusion([_results('a', 'a')], k=0)
+
+    assert fused_results[0]['fusion_score'] == 1.0
+    assert fused_results[0]['fusion_ranks'] == [1]
+
+
+def test_ties_keep_first_seen_order_and_limit_applies():
+    fused_results = reciprocal_rank_fusion([_results('a', 'b'), _results('c', 'd')], limit=3)
+
+    assert [fused_result['snippet'] for fused_result in fused_results] == ['a', 'c', 'b']
+
+
+def test_inputs_are_not_modified():
+    ranked_list = _results('a')
+    reciprocal_rank_fusion([ranked_list])
+    assert ranked_list == _results('a')
+
+
+def test_parse_search_terms():
+    refine_text = '1. GPT-5 release\n- "gpt-5 release"\n\n* OpenAI launch news\n2) third term'
+    assert parse_search_terms(refine_text, 2) == ['GPT-5 release', 'OpenAI launch news']
+    assert parse_search_terms(None, 3) == []
@@ -0,0 +1,62 @@
+"""
+Tests for byob_paging: splitting deep searches into pages and merging them.
+"""
+
+import pytest
+
+from byob_paging import CSE_MAX_RESULTS, PagedResults, results_pages
+
+
+def _page(*paths):
+    return [{'link': f'https://example.test/{path}'} for path in paths]
+
+
+@pytest.mark.parametrize('result_count, expected_pages', [
+    (1, [(1, 1)]),
+    (10, [(1, 10)]),
+    (15, [(1, 10), (11, 5)]),
+    (0, [(1, 1)]),
+])
+def test_results_pages(result_count, expected_pages):
+    assert results_pages(result_count) == expected_pages
+
+
+def test_results_pages_stop_at_the_api_limit():
+    search_pages = results_pages(250)
+    assert len(search_pages) == CSE_MAX_RESULTS // 10
+    assert search_pages[-1] == (91, 10)
+
+
+def test_pages_merge_without_repeated_urls():
+    paged_results = PagedResults(20)
+
+    assert paged_results.add_page(_page(*range(1, 11)), 10) == _page(*range(1, 11))
+    assert not paged_results.complete
+    # The same page with a tracking parameter is dropped from the second page
+    new_results = paged_results.add_page(_page('3?utm_source=feed', *range(11, 20)), 10)
+
+    assert new_results == _page(*range(11, 20))
+    assert paged_results.search_results == _page(*range(1, 20))
+    assert paged_results.complete
+
+
+def test_short_page_ends_the_search():
+    paged_results = PagedResults(30)
+
+    paged_results.add_page(_page(*range(1, 11)), 10)
+    paged_results.add_page(_page(11, 12), 10)
+
+    assert paged_results.complete
+    assert len(paged_results.search_results) == 12
+
+
+def test_failed_page_is_skipped_without_ending_the_search():
+    paged_results = PagedResults(30)
+
+    assert paged_results.add_page(None, 10) == []
+    assert not paged_results.complete
+    paged_results.add_page(_page(*range(11, 21)), 10)
+    assert not paged_results.complete
+    assert paged_results.add_page(None, 10) == []
+    assert paged_results.complete
+    assert paged_results.search_results == _page(*range(11, 21))
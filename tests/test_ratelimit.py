@@ -0,0 +1,144 @@
+"""
+Tests for byob_ratelimit: token buckets, error classification and retries.
+"""
+
+import asyncio
+import time
+
+import httpx
+import pytest
+
+from byob_ratelimit import (
+    FATAL, THROTTLED, TRANSIENT, DeadlineExceeded, RateLimiter, TokenBucket, classify_error, parse_duration,
+    retry_after_seconds
+)
+
+
+def test_token_bucket_starts_full_and_refills_evenly():
+    bucket = TokenBucket(60, 60)
+    now = time.monotonic()
+
+    assert bucket.wait_time(60, now) == 0
+    bucket.take(60)
+    # One unit is earned per second
+    assert bucket.wait_time(1, now) == pytest.approx(1.0)
+    assert bucket.wait_time(1, now + 0.5) == pytest.approx(0.5)
+    assert bucket.wait_time(1, now + 1.0) == pytest.approx(0.0)
+    assert bucket.wait_time(60, now + 120) == 0
+    assert bucket.available == 60
+
+
+def test_token_bucket_caps_requests_at_its_capacity():
+    bucket = TokenBucket(10, 60)
+    now = time.monotonic()
+
+    # A request larger than the bucket only needs a full bucket
+    assert bucket.wait_time(500, now) == 0
+    bucket.take(500)
+    assert bucket.available == 0
+
+
+def test_token_bucket_adjust_and_pause():
+    bucket = TokenBucket(100, 60)
+    now = time.monotonic()
+    bucket.take(50)
+
+    bucket.adjust(-20)  # The call used 20 tokens fewer than estimated
+    assert bucket.available == pytest.approx(70, abs=0.1)
+    bucket.adjust(500)
+    assert bucket.available == -100
+
+    bucket.pause(5, now)
+    assert bucket.wait_time(1, now + 1) == pytest.approx(4.0)
+
+
+def test_token_bucket_update_limit_only_lowers_what_is_left():
+    bucket = TokenBucket(100, 60)
+
+    bucket.update_limit(capacity=40, remaining=90)
+    assert bucket.capacity == 40
+    assert bucket.available == 40
+    bucket.update_limit(remaining=10)
+    assert bucket.available == 10
+
+
+@pytest.mark.parametrize('duration_text, seconds', [
+    ('1s', 1.0), ('6m0s', 360.0), ('120ms', 0.12), ('1h2m3.5s', 3723.5), ('2.5', 2.5), ('', None), ('soon', None)
+])
+def test_parse_duration(duration_text, seconds):
+    assert parse_duration(duration_text) == (pytest.approx(seconds) if seconds is not None else None)
+
+
+def test_retry_after_seconds():
+    assert retry_after_seconds(httpx.Headers({'retry-after-ms': '1500'})) == 1.5
+    assert retry_after_seconds(httpx.Headers({'retry-after': '3'})) == 3.0
+    assert retry_after_seconds(httpx.Headers({})) is None
+
+
+def _status_error(status_code, headers=None):
+    request = httpx.Request('POST', 'https://api.example.test/')
+    response = httpx.Response(status_code, headers=headers, request=request)
+    return httpx.HTTPStatusError(f'{status_code}', request=request, response=response)
+
+
+def test_classify_error():
+    assert classify_error(_status_error(429))[0] == THROTTLED
+    assert classify_error(_status_error(503))[0] == TRANSIENT
+    assert classify_error(_status_error(400))[0] == FATAL
+    assert classify_error(httpx.ConnectError('refused'))[0] == TRANSIENT
+    assert classify_error(ValueError('bug'))[0] == FATAL
+
+
+def _flaky_send(*errors):
+    """
+    Build a send() that raises the given errors in turn, then succeeds.
+    """
+    remaining_errors = list(errors)
+
+    def send():
+        if remaining_errors:
+            raise remaining_errors.pop(0)
+        return 'ok', httpx.Headers({})
+    return send
+
+
+def test_call_retries_throttled_and_transient_errors():
+    rate_limiter = RateLimiter('test', retry_base_delay=0.01)
+
+    assert rate_limiter.call(_flaky_send(_status_error(429), httpx.ConnectError('refused'))) == 'ok'
+    stats = rate_limiter.get_stats()
+    assert (stats['throttled'], stats['transient_errors'], stats['retries'], stats['succeeded']) == (1, 1, 2, 1)
+    assert stats['in_flight'] == 0
+
+
+def test_call_gives_up_on_fatal_errors_and_after_max_retries():
+    rate_limiter = RateLimiter('test', max_retries=1, retry_base_delay=0.01)
+
+    with pytest.raises(httpx.HTTPStatusError):
+        rate_limiter.call(_flaky_send(_status_error(400)))
+    with pytest.raises(httpx.HTTPStatusError):
+        rate_limiter.call(_flaky_send(_status_error(503), _status_error(503)))
+    assert rate_limiter.get_stats()['failed'] == 2
+    assert rate_limiter.get_stats()['in_flight'] == 0
+
+
+def test_call_stops_at_the_deadline_instead_of_waiting():
+    rate_limiter = RateLimiter('test', requests_per_minute=1)
+    rate_limiter.call(_flaky_send())
+
+    started_at = time.monotonic()
+    with pytest.raises(DeadlineExceeded):
+        rate_limiter.call(_flaky_send(), deadline_at=time.monotonic() + 0.5)
+    assert time.monotonic() - started_at < 0.5
+    assert rate_limiter.get_stats()['deadline_exceeded'] == 1
+
+
+def test_call_async_retries_like_call():
+    rate_limiter = RateLimiter('test', retry_base_delay=0.01)
+    send = _flaky_send(_status_error(502))
+
+    async def send_async():
+        return send()
+
+    assert asyncio.run(rate_limiter.call_async(send_async)) == 'ok'
+    assert rate_limiter.get_stats()['retries'] == 1
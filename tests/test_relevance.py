@@ -0,0 +1,57 @@
+"""
+Tests for byob_relevance: token counting, including the fallback when no tokenizer can be loaded.
+"""
+
+import pytest
+
+import byob_relevance
+from byob_relevance import CHARS_PER_TOKEN, count_tokens, truncate_to_tokens
+
+
+class _FailingTiktoken:
+    """
+    Stand-in for a tiktoken that cannot load an encoding.
+    """
+
+    def __init__(self, load_error):
+        self.load_error = load_error
+
+    def encoding_for_model(self, model):
+        raise KeyError(model)
+
+    def get_encoding(self, encoding_name):
+        raise self.load_error
+
+
+@pytest.fixture
+def failing_tiktoken(monkeypatch, request):
+    """
+    Replace tiktoken with one whose encodings fail to load, with a clean encoding cache.
+    """
+    monkeypatch.setattr(byob_relevance, 'tiktoken', _FailingTiktoken(request.param))
+    monkeypatch.setattr(byob_relevance, '_unavailable_encodings', set())
+    byob_relevance._get_encoding.cache_clear()
+    yield
+    byob_relevance._get_encoding.cache_clear()
+
+
+@pytest.mark.parametrize('failing_tiktoken', [
+    ValueError("Unknown encoding o200k_base"),      # tiktoken older than 0.7
+    ConnectionError("BPE file download failed")     # offline host
+], indirect=True)
+def test_unloadable_encoding_falls_back_to_estimate(failing_tiktoken):
+    assert byob_relevance._get_encoding('gpt-4o') is None
+    assert count_tokens('x' * 40, 'gpt-4o') == 40 // CHARS_PER_TOKEN
+    assert truncate_to_tokens('x' * 40, 2, 'gpt-4o') == 'x' * (2 * CHARS_PER_TOKEN)
+    assert byob_relevance.token_counter_name() == 'estimate'
+    assert not byob_relevance.exact_token_counts()
+
+
+def test_estimate_without_tiktoken(monkeypatch):
+    monkeypatch.setattr(byob_relevance, 'tiktoken', None)
+    byob_relevance._get_encoding.cache_clear()
+    try:
+        assert count_tokens('abcdefghi', 'gpt-4o') == 3
+        assert byob_relevance.token_counter_name() == 'estimate'
+    finally:
+        byob_relevance._get_encoding.cache_clear()
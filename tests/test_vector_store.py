@@ -0,0 +1,59 @@
+"""
+Tests for byob_vector_store: document id assignment and lookups.
+"""
+
+import numpy as np
+import pytest
+
+from byob_vector_store import VectorStore
+
+EMBEDDING_DIM = 4
+
+
+def _embedding(seed):
+    return np.random.default_rng(seed).random(EMBEDDING_DIM).tolist()
+
+
+@pytest.fixture
+def store(tmp_path):
+    vector_store = VectorStore(str(tmp_path / 'store'), embedding_dim=EMBEDDING_DIM)
+    yield vector_store
+    vector_store.close()
+
+
+def test_auto_ids_continue_after_stored_ids(store):
+    assert store.add_documents([(None, 'a', _embedding(1)), (None, 'b', _embedding(2))]) == [1, 2]
+    assert store.add_documents([(None, 'c', _embedding(3))]) == [3]
+
+
+def test_auto_ids_skip_explicit_ids_later_in_the_batch(store):
+    store.add_documents([(None, f'doc {seed}', _embedding(seed)) for seed in range(3000)])
+
+    document_ids = store.add_documents([(None, 'a', _embedding(1)), (3001, 'b', _embedding(2))])
+
+    assert document_ids == [3002, 3001]
+    assert len(store) == 3002
+    assert store.get_contents(document_ids) == {3002: 'a', 3001: 'b'}
+
+
+def test_explicit_id_replaces_stored_document(store):
+    store.add_documents([(7, 'old', _embedding(1))])
+
+    assert store.add_documents([(7, 'new', _embedding(2)), (None, 'next', _embedding(3))]) == [7, 8]
+    assert len(store) == 2
+    assert store.get_contents([7, 8]) == {7: 'new', 8: 'next'}
+
+
+def test_reopened_store_keeps_documents(tmp_path):
+    store_dir = str(tmp_path / 'store')
+    vector_store = VectorStore(store_dir, embedding_dim=EMBEDDING_DIM)
+    vector_store.add_documents([(None, 'kept', _embedding(1))])
+    vector_store.close()
+
+    reopened_store = VectorStore(store_dir, embedding_dim=EMBEDDING_DIM)
+    try:
+        assert reopened_store.get_contents([1]) == {1: 'kept'}
+        with pytest.raises(ValueError):
+            VectorStore(store_dir, embedding_dim=EMBEDDING_DIM + 1)
+    finally:
+        reopened_store.close()